@@ -3,12 +3,25 @@ AppConfig: CLI 引数解析・起動設定管理
 """
 import argparse
 import sys
-from dataclasses import dataclass
+import tempfile
+from dataclasses import dataclass, field
 from pathlib import Path
 
 # デフォルト値定数
 DEFAULT_PORT: int = 8080
 DEFAULT_LIBRARY_PATH: Path = Path("library.yaml")
+DEFAULT_LIBRARY_STORE: str = "memory"
+LIBRARY_STORE_CHOICES: tuple[str, ...] = ("memory", "compact", "sqlite")
+DEFAULT_IMAGE_CACHE_DIR: Path = Path(tempfile.gettempdir()) / "comfyui-prompt-maker" / "images"
+DEFAULT_IMAGE_CACHE_SIZE_MIB: int = 512
+DEFAULT_IMAGE_MEMORY_CACHE_SIZE_MIB: int = 64
+DEFAULT_IMAGE_MEMORY_CACHE_MAX_OBJECT_KIB: int = 1024
+DEFAULT_IMAGE_QUALITY: int = 80
+DEFAULT_WARM_IMAGE_WIDTHS: tuple[int, ...] = (256, 512)
+DEFAULT_GENERATE_WORKERS: int = 2
+DEFAULT_PLACEHOLDER_CACHE: Path = (
+    Path(tempfile.gettempdir()) / "comfyui-prompt-maker" / "placeholders.json"
+)
 
 
 @dataclass(frozen=True)
@@ -17,6 +30,26 @@ class AppConfig:
 
     port: int
     library_path: Path
+    watch_library: bool = False
+    library_store: str = DEFAULT_LIBRARY_STORE
+    library_db: Path | None = None
+    stream_library: bool = False
+    lazy_library: bool = False
+    libraries: dict[str, Path] = field(default_factory=dict)
+    library_memory_budget_mib: int | None = None
+    image_cache_dir: Path = DEFAULT_IMAGE_CACHE_DIR
+    image_cache_size_mib: int = DEFAULT_IMAGE_CACHE_SIZE_MIB
+    image_workers: int | None = None
+    content_addressed_images: bool = False
+    image_memory_cache_size_mib: int = DEFAULT_IMAGE_MEMORY_CACHE_SIZE_MIB
+    image_memory_cache_max_object_kib: int = DEFAULT_IMAGE_MEMORY_CACHE_MAX_OBJECT_KIB
+    image_renditions: bool = True
+    image_quality: int = DEFAULT_IMAGE_QUALITY
+    image_placeholders: bool = True
+    warm_images: bool = False
+    warm_image_widths: tuple[int, ...] = DEFAULT_WARM_IMAGE_WIDTHS
+    generate_workers: int = DEFAULT_GENERATE_WORKERS
+    placeholder_cache: Path = DEFAULT_PLACEHOLDER_CACHE
 
     @classmethod
     def from_args(cls, args: list[str] | None = None) -> "AppConfig":
@@ -26,10 +59,10 @@ class AppConfig:
             args: コマンドライン引数のリスト。None の場合は sys.argv[1:] を使用。
 
         Returns:
-            AppConfig インスタンス。library_path は存在するファイルを指す。
+            AppConfig インスタンス。library_path は存在するファイルまたはディレクトリを指す。
 
         Raises:
-            SystemExit: ライブラリファイルが存在しない場合（終了コード 1）
+            SystemExit: ライブラリファイル（ディレクトリ）が存在しない場合（終了コード 1）
         """
         parser = argparse.ArgumentParser(
             description="ComfyUI Workflow Config Generator"
@@ -45,17 +78,259 @@ class AppConfig:
             type=Path,
             default=DEFAULT_LIBRARY_PATH,
             dest="library_path",
-            help=f"ライブラリ YAML ファイルのパス（デフォルト: {DEFAULT_LIBRARY_PATH}）",
+            help=(
+                "ライブラリ YAML ファイル、またはシャード（*.yaml）を格納したディレクトリのパス"
+                f"（デフォルト: {DEFAULT_LIBRARY_PATH}）"
+            ),
         )
 
-        parsed = parser.parse_args(args)
-        library_path: Path = parsed.library_path
+        parser.add_argument(
+            "--watch-library",
+            action="store_true",
+            dest="watch_library",
+            help="ライブラリファイルの変更を監視し、再起動せずに再読み込みする",
+        )
+
+        parser.add_argument(
+            "--library-store",
+            choices=LIBRARY_STORE_CHOICES,
+            default=DEFAULT_LIBRARY_STORE,
+            dest="library_store",
+            help=(
+                "ライブラリの保持方式。compact は文字列の共有とタグ辞書で常駐メモリを削減し、"
+                "sqlite は大規模ライブラリ向けに SQLite へ格納して参照時にのみモデルを生成する"
+                f"（デフォルト: {DEFAULT_LIBRARY_STORE}）"
+            ),
+        )
+        parser.add_argument(
+            "--library-db",
+            type=Path,
+            default=None,
+            dest="library_db",
+            help="--library-store sqlite のデータベースパス（デフォルト: <library-path>.sqlite3）",
+        )
+
+        parser.add_argument(
+            "--stream-library",
+            action="store_true",
+            dest="stream_library",
+            help="ライブラリ YAML を要素単位で解析・検証し、読み込み時のピークメモリを抑える",
+        )
+
+        parser.add_argument(
+            "--lazy-library",
+            action="store_true",
+            dest="lazy_library",
+            help=(
+                "シーン・環境を起動時に検証せず、初回参照時に検証する（memory ストアのみ）。"
+                "全件の検証は validate-library コマンドで行う"
+            ),
+        )
+
+        parser.add_argument(
+            "--library",
+            action="append",
+            default=[],
+            metavar="NAME=PATH",
+            dest="libraries",
+            help=(
+                "名前付きライブラリを追加する（複数指定可）。API の ?library=NAME で選択し、"
+                "初回参照時に読み込む"
+            ),
+        )
+        parser.add_argument(
+            "--library-memory-budget",
+            type=int,
+            default=None,
+            metavar="MIB",
+            dest="library_memory_budget_mib",
+            help="名前付きライブラリの推定メモリ使用量の上限（MiB）。超えた場合は参照の古いものから解放する",
+        )
+
+        parser.add_argument(
+            "--image-cache-dir",
+            type=Path,
+            default=DEFAULT_IMAGE_CACHE_DIR,
+            dest="image_cache_dir",
+            help=f"リサイズした画像のキャッシュディレクトリ（デフォルト: {DEFAULT_IMAGE_CACHE_DIR}）",
+        )
+        parser.add_argument(
+            "--image-cache-size",
+            type=int,
+            default=DEFAULT_IMAGE_CACHE_SIZE_MIB,
+            metavar="MIB",
+            dest="image_cache_size_mib",
+            help=(
+                "リサイズした画像のキャッシュの上限（MiB）。超えた場合は参照の古いものから削除する"
+                f"（デフォルト: {DEFAULT_IMAGE_CACHE_SIZE_MIB}）"
+            ),
+        )
+        parser.add_argument(
+            "--image-workers",
+            type=int,
+            default=None,
+            dest="image_workers",
+            help="画像のリサイズに用いるプロセス数（デフォルト: CPU コア数）",
+        )
+        parser.add_argument(
+            "--image-memory-cache-size",
+            type=int,
+            default=DEFAULT_IMAGE_MEMORY_CACHE_SIZE_MIB,
+            metavar="MIB",
+            dest="image_memory_cache_size_mib",
+            help=(
+                "配信する画像の内容をメモリに保持するキャッシュの上限（MiB）。0 の場合は無効"
+                f"（デフォルト: {DEFAULT_IMAGE_MEMORY_CACHE_SIZE_MIB}）"
+            ),
+        )
+        parser.add_argument(
+            "--image-memory-cache-max-object",
+            type=int,
+            default=DEFAULT_IMAGE_MEMORY_CACHE_MAX_OBJECT_KIB,
+            metavar="KIB",
+            dest="image_memory_cache_max_object_kib",
+            help=(
+                "メモリキャッシュに保持する画像 1 件あたりの上限（KiB）。超える画像はファイルから配信する"
+                f"（デフォルト: {DEFAULT_IMAGE_MEMORY_CACHE_MAX_OBJECT_KIB}）"
+            ),
+        )
+
+        parser.add_argument(
+            "--no-image-renditions",
+            action="store_false",
+            dest="image_renditions",
+            help="Accept に応じた WebP・JPEG への変換を行わず、元の形式の画像を返す",
+        )
+        parser.add_argument(
+            "--image-quality",
+            type=int,
+            default=DEFAULT_IMAGE_QUALITY,
+            dest="image_quality",
+            help=f"WebP・JPEG に変換する画像の品質（1〜100、デフォルト: {DEFAULT_IMAGE_QUALITY}）",
+        )
 
-        if not library_path.exists():
+        parser.add_argument(
+            "--warm-images",
+            action="store_true",
+            dest="warm_images",
+            help=(
+                "起動後に、ライブラリが参照する画像の標準のバリアント（--warm-image-widths の幅と"
+                "その WebP 版）を優先度の低いプロセスで事前に生成する"
+            ),
+        )
+        parser.add_argument(
+            "--warm-image-widths",
+            default=",".join(str(width) for width in DEFAULT_WARM_IMAGE_WIDTHS),
+            metavar="W1,W2,...",
+            dest="warm_image_widths",
+            help=(
+                "事前に生成するバリアントの幅（px、カンマ区切り）"
+                f"（デフォルト: {','.join(str(width) for width in DEFAULT_WARM_IMAGE_WIDTHS)}）"
+            ),
+        )
+        parser.add_argument(
+            "--no-image-placeholders",
+            action="store_false",
+            dest="image_placeholders",
+            help="ライブラリ API のレスポンスに画像の寸法と LQIP（極小のサムネイル）を含めない",
+        )
+        parser.add_argument(
+            "--placeholder-cache",
+            type=Path,
+            default=DEFAULT_PLACEHOLDER_CACHE,
+            dest="placeholder_cache",
+            help=(
+                "画像の寸法と LQIP を内容ハッシュごとに保存するファイル"
+                f"（デフォルト: {DEFAULT_PLACEHOLDER_CACHE}）"
+            ),
+        )
+
+        parser.add_argument(
+            "--generate-workers",
+            type=int,
+            default=DEFAULT_GENERATE_WORKERS,
+            dest="generate_workers",
+            help=(
+                "/api/generate のコンフィグ生成・検証を同時に実行するプロセス数"
+                f"（デフォルト: {DEFAULT_GENERATE_WORKERS}）"
+            ),
+        )
+
+        parser.add_argument(
+            "--content-addressed-images",
+            action="store_true",
+            dest="content_addressed_images",
+            help=(
+                "ライブラリ API の画像 URL を内容アドレスの URL（/api/images/<hash>/<path>）にする"
+                "（ブラウザが再検証せずに長期キャッシュを使う）"
+            ),
+        )
+
+        parsed = parser.parse_args(args)
+        if parsed.lazy_library and parsed.library_store != DEFAULT_LIBRARY_STORE:
+            parser.error(
+                f"--lazy-library は --library-store {DEFAULT_LIBRARY_STORE} でのみ利用できます"
+            )
+        if not 1 <= parsed.image_quality <= 100:
+            parser.error("--image-quality は 1〜100 で指定してください")
+        if parsed.generate_workers < 1:
+            parser.error("--generate-workers は 1 以上で指定してください")
+        widths = [width.strip() for width in parsed.warm_image_widths.split(",") if width.strip()]
+        if not all(width.isdigit() and 1 <= int(width) <= 2048 for width in widths):
+            parser.error("--warm-image-widths は 1〜2048 の整数をカンマ区切りで指定してください")
+        # 起動後にワーカープールの作成で失敗しないよう、ここで終了する
+        if not widths:
+            print(
+                "エラー: --warm-image-widths には 1 つ以上の幅を指定してください",
+                file=sys.stderr,
+            )
+            sys.exit(1)
+        if parsed.image_workers is not None and parsed.image_workers < 1:
             print(
-                f"エラー: ライブラリファイルが見つかりません: {library_path}",
+                f"エラー: --image-workers は 1 以上で指定してください: {parsed.image_workers}",
                 file=sys.stderr,
             )
             sys.exit(1)
+        warm_image_widths = tuple(int(width) for width in widths)
+        library_path: Path = parsed.library_path
+        libraries: dict[str, Path] = {}
+        for spec in parsed.libraries:
+            name, sep, path = spec.partition("=")
+            if not sep or not name or not path:
+                parser.error(f"--library は NAME=PATH の形式で指定してください: {spec}")
+            if name in libraries:
+                parser.error(f"--library の名前が重複しています: {name}")
+            libraries[name] = Path(path)
 
-        return cls(port=parsed.port, library_path=library_path)
+        for path in (library_path, *libraries.values()):
+            if not path.exists():
+                print(
+                    f"エラー: ライブラリファイルが見つかりません: {path}",
+                    file=sys.stderr,
+                )
+                sys.exit(1)
+
+        return cls(
+            port=parsed.port,
+            library_path=library_path,
+            watch_library=parsed.watch_library,
+            library_store=parsed.library_store,
+            library_db=parsed.library_db,
+            stream_library=parsed.stream_library,
+            lazy_library=parsed.lazy_library,
+            libraries=libraries,
+            library_memory_budget_mib=parsed.library_memory_budget_mib,
+            image_cache_dir=parsed.image_cache_dir,
+            image_cache_size_mib=parsed.image_cache_size_mib,
+            image_workers=parsed.image_workers,
+            content_addressed_images=parsed.content_addressed_images,
+            image_memory_cache_size_mib=parsed.image_memory_cache_size_mib,
+            image_memory_cache_max_object_kib=parsed.image_memory_cache_max_object_kib,
+            image_renditions=parsed.image_renditions,
+            image_quality=parsed.image_quality,
+            image_placeholders=parsed.image_placeholders,
+            warm_images=parsed.warm_images,
+            warm_image_widths=warm_image_widths,
+            generate_workers=parsed.generate_workers,
+            placeholder_cache=parsed.placeholder_cache,
+        )
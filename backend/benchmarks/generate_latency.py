@@ -0,0 +1,225 @@
+"""/api/generate の実行中に /api/scenes の応答時間が悪化しないことを確かめるベンチマーク
+
+合成したライブラリでサーバ（uvicorn）を起動し、/api/scenes を逐次に要求して応答時間の
+p50・p99 を測る。まず負荷なしで測り、次に多数のシーンを含む /api/generate を並行して
+送り続けながら測る。生成・検証・YAML の書き出しが優先度を下げたワーカープロセスで
+行われていれば、p99 はほとんど変わらない。--threads を指定するとスレッドプールで実行し、
+GIL の奪い合いによる悪化と比較できる。
+
+    python -m backend.benchmarks.generate_latency --generate-scenes 5000 --generate-clients 4
+"""
+
+import argparse
+import http.client
+import json
+import socket
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from pathlib import Path
+
+import uvicorn
+
+from backend.main import SCHEMA_PATH, create_app
+from backend.routers.generate_router import create_generate_executor
+from backend.services.config_generator import ConfigGeneratorService
+from backend.services.config_validator import ConfigValidatorService
+from backend.services.library_service import LibraryService
+
+_WORKFLOW_CONFIG: dict = {
+    "workflow_json_path": "/path/to/workflow.json",
+    "image_output_path": "/path/to/output",
+    "library_file_path": "/path/to/library.yaml",
+    "seed_node_id": 164,
+    "batch_size_node_id": 22,
+    "negative_prompt_node_id": 174,
+    "positive_prompt_node_id": 257,
+    "environment_prompt_node_id": 303,
+    "default_prompts": {
+        "base_positive_prompt": "masterpiece",
+        "negative_prompt": "lowres",
+        "batch_size": 1,
+    },
+}
+
+
+def write_library(path: Path, scene_count: int) -> None:
+    """scene_count 件のシーンを含むライブラリ YAML を書き出す。"""
+    lines = ["scenes:"]
+    for i in range(scene_count):
+        lines += [
+            f'  - name: "scene_{i}"',
+            f'    display_name: "シーン {i}"',
+            f'    positive_prompt: "prompt {i}, sitting, smiling"',
+            '    negative_prompt: "blurry"',
+        ]
+    lines += [
+        "environments:",
+        '  - name: "indoor"',
+        '    display_name: "室内"',
+        '    environment_prompt: "indoor room"',
+    ]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+def generate_body(scene_count: int, library_scenes: int) -> bytes:
+    """scene_count 件のシーンを含む /api/generate のリクエストボディを返す。"""
+    body = {
+        "global_settings": {
+            "character_name": "Hana",
+            "environment_name": "indoor",
+            "environment_prompt": "indoor room",
+        },
+        "tech_settings": {
+            "comfyui_config": {"server_address": "127.0.0.1:8188", "client_id": "bench"},
+            "workflow_config": _WORKFLOW_CONFIG,
+        },
+        "scenes": [
+            {"template_name": f"scene_{i % library_scenes}", "overrides": {"batch_size": 2}}
+            for i in range(scene_count)
+        ],
+    }
+    return json.dumps(body).encode("utf-8")
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _percentile(samples: list[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def measure_scenes(port: int, requests: int) -> list[float]:
+    """/api/scenes を requests 回逐次に要求し、応答時間（ミリ秒）の一覧を返す。"""
+    connection = http.client.HTTPConnection("127.0.0.1", port)
+    samples = []
+    try:
+        for _ in range(requests):
+            started = time.perf_counter()
+            connection.request("GET", "/api/scenes")
+            response = connection.getresponse()
+            response.read()
+            samples.append((time.perf_counter() - started) * 1000)
+            if response.status != 200:
+                raise RuntimeError(f"/api/scenes が {response.status} を返しました")
+    finally:
+        connection.close()
+    return samples
+
+
+def _post_generates(port: int, body: bytes, stop: threading.Event, durations: list[float]) -> None:
+    connection = http.client.HTTPConnection("127.0.0.1", port)
+    try:
+        while not stop.is_set():
+            started = time.perf_counter()
+            connection.request(
+                "POST", "/api/generate", body=body, headers={"Content-Type": "application/json"}
+            )
+            response = connection.getresponse()
+            response.read()
+            durations.append((time.perf_counter() - started) * 1000)
+            if response.status != 200:
+                raise RuntimeError(f"/api/generate が {response.status} を返しました")
+    finally:
+        connection.close()
+
+
+def _report(label: str, samples: list[float]) -> None:
+    print(
+        f"{label}: n={len(samples)} p50={statistics.median(samples):.2f}ms "
+        f"p99={_percentile(samples, 0.99):.2f}ms max={max(samples):.2f}ms"
+    )
+
+
+def run(args: argparse.Namespace) -> int:
+    with tempfile.TemporaryDirectory() as tmp:
+        library_path = Path(tmp) / "library.yaml"
+        write_library(library_path, args.library_scenes)
+        library_service = LibraryService()
+        library_service.load(library_path)
+        generate_executor: Executor
+        if args.threads:
+            generate_executor = ThreadPoolExecutor(
+                max_workers=args.generate_workers, thread_name_prefix="generate"
+            )
+        else:
+            generate_executor = create_generate_executor(args.generate_workers)
+        app = create_app(
+            Path(tmp) / "dist",
+            library_service=library_service,
+            config_generator=ConfigGeneratorService(),
+            config_validator=ConfigValidatorService(SCHEMA_PATH),
+            generate_executor=generate_executor,
+        )
+        port = _free_port()
+        server = uvicorn.Server(
+            uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning")
+        )
+        server_thread = threading.Thread(target=server.run, daemon=True)
+        server_thread.start()
+        while not server.started:
+            time.sleep(0.05)
+
+        try:
+            measure_scenes(port, args.warmup)
+            idle = measure_scenes(port, args.requests)
+            _report("負荷なし", idle)
+
+            body = generate_body(args.generate_scenes, args.library_scenes)
+            stop = threading.Event()
+            durations: list[float] = []
+            clients = [
+                threading.Thread(target=_post_generates, args=(port, body, stop, durations))
+                for _ in range(args.generate_clients)
+            ]
+            for client in clients:
+                client.start()
+            try:
+                # 生成が実行中になってから測る
+                while not durations:
+                    time.sleep(0.05)
+                loaded = measure_scenes(port, args.requests)
+            finally:
+                stop.set()
+                for client in clients:
+                    client.join()
+            _report(f"/api/generate 実行中（{args.generate_clients} 並列）", loaded)
+            _report(f"/api/generate（{args.generate_scenes} シーン）", durations)
+        finally:
+            server.should_exit = True
+            server_thread.join()
+            generate_executor.shutdown()
+
+    ratio = _percentile(loaded, 0.99) / _percentile(idle, 0.99)
+    print(f"p99 の比（実行中 / 負荷なし）: {ratio:.2f}")
+    return 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--library-scenes", type=int, default=200,
+                        help="合成するライブラリのシーン数（デフォルト: 200）")
+    parser.add_argument("--generate-scenes", type=int, default=5000,
+                        help="/api/generate 1 回あたりのシーン数（デフォルト: 5000）")
+    parser.add_argument("--generate-clients", type=int, default=4,
+                        help="/api/generate を並行して送るクライアント数（デフォルト: 4）")
+    parser.add_argument("--generate-workers", type=int, default=2,
+                        help="生成を実行するプロセス数（デフォルト: 2）")
+    parser.add_argument("--threads", action="store_true",
+                        help="生成をプロセスではなくスレッドで実行する（比較用）")
+    parser.add_argument("--requests", type=int, default=500,
+                        help="/api/scenes の計測回数（デフォルト: 500）")
+    parser.add_argument("--warmup", type=int, default=50,
+                        help="計測前に送る /api/scenes の回数（デフォルト: 50）")
+    return run(parser.parse_args(argv))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
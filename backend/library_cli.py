@@ -0,0 +1,91 @@
+"""
+ライブラリ管理用オフラインコマンド
+
+サブコマンド:
+  compile-library  - ライブラリ YAML を検証し、起動高速化用のスナップショットを生成する
+  validate-library - ライブラリ YAML の全要素を検証する（CI 向け。--lazy-library 運用時の事前検証）
+
+使用例:
+  python -m backend.library_cli compile-library --library-path library.yaml
+  python -m backend.library_cli validate-library --library-path library.yaml
+"""
+import argparse
+import sys
+from pathlib import Path
+
+from .app_config import DEFAULT_LIBRARY_PATH
+from .services.library_service import LibraryService
+
+
+def compile_library(library_path: Path, output: Path | None = None) -> Path:
+    """ライブラリ YAML からスナップショットを生成し、書き出したパスを返す。"""
+    service = LibraryService(index_images=False)
+    snapshot_path = service.compile_snapshot(library_path, output)
+    print(
+        f"スナップショットを生成しました: {snapshot_path} "
+        f"(シーン {len(service.get_scenes())} 件 / 環境 {len(service.get_environments())} 件)"
+    )
+    return snapshot_path
+
+
+def validate_library(library_path: Path) -> None:
+    """ライブラリ YAML（ディレクトリ指定時は全シャード）の全要素を検証する。
+
+    スナップショットは参照しない。不正な場合はエラーを出力し sys.exit(1) で終了する。
+    """
+    service = LibraryService(index_images=False)
+    service.load(library_path, use_snapshot=False)
+    print(
+        f"ライブラリは有効です: {library_path} "
+        f"(シーン {len(service.get_scenes())} 件 / 環境 {len(service.get_environments())} 件)"
+    )
+
+
+def main(args: list[str] | None = None) -> None:
+    """CLI 引数を解析してサブコマンドを実行する。
+
+    Args:
+        args: コマンドライン引数のリスト。None の場合は sys.argv[1:] を使用。
+    """
+    parser = argparse.ArgumentParser(description="ライブラリ管理コマンド")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    compile_parser = subparsers.add_parser(
+        "compile-library",
+        help="ライブラリ YAML を検証し、スナップショットを生成する",
+    )
+    compile_parser.add_argument(
+        "--library-path",
+        type=Path,
+        default=DEFAULT_LIBRARY_PATH,
+        dest="library_path",
+        help=f"ライブラリ YAML ファイルのパス（デフォルト: {DEFAULT_LIBRARY_PATH}）",
+    )
+    compile_parser.add_argument(
+        "--output",
+        type=Path,
+        default=None,
+        help="スナップショットの出力先（デフォルト: <library-path>.snapshot）",
+    )
+
+    validate_parser = subparsers.add_parser(
+        "validate-library",
+        help="ライブラリ YAML の全要素を検証する",
+    )
+    validate_parser.add_argument(
+        "--library-path",
+        type=Path,
+        default=DEFAULT_LIBRARY_PATH,
+        dest="library_path",
+        help=f"ライブラリ YAML ファイルのパス（デフォルト: {DEFAULT_LIBRARY_PATH}）",
+    )
+
+    parsed = parser.parse_args(args)
+    if parsed.command == "compile-library":
+        compile_library(parsed.library_path, parsed.output)
+    elif parsed.command == "validate-library":
+        validate_library(parsed.library_path)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -2,19 +2,32 @@
 FastAPI アプリ定義・起動エントリポイント
 """
 import sys
+from concurrent.futures import Executor
 from pathlib import Path
 
 import uvicorn
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
 
 from .app_config import AppConfig
+from .routers.generate_router import create_generate_executor
 from .routers.generate_router import router as generate_router
 from .routers.image_router import router as image_router
 from .routers.library_router import router as library_router
+from .routers.sprite_router import router as sprite_router
 from .services.config_generator import ConfigGeneratorService
 from .services.config_validator import ConfigValidatorService
+from .services.image_memory_cache import ImageMemoryCache
+from .services.image_placeholders import ImagePlaceholderCache
+from .services.image_variants import ImageVariantCache
+from .services.image_warmup import ImageWarmup, standard_variants
+from .services.library_events import LibraryEventBroadcaster
+from .services.library_registry import LibraryRegistry
 from .services.library_service import LibraryService
+from .services.library_store_lazy import LibraryEntryError
+from .services.library_watcher import LibraryWatcher
+from .services.sprite_sheets import SpriteSheetCache
 
 # React ビルド成果物のデフォルトパス（プロジェクトルート基準）
 FRONTEND_DIST: Path = Path(__file__).parent.parent / "frontend" / "dist"
@@ -28,6 +41,14 @@ def create_app(
     library_service: LibraryService | None = None,
     config_generator: ConfigGeneratorService | None = None,
     config_validator: ConfigValidatorService | None = None,
+    library_registry: LibraryRegistry | None = None,
+    image_variants: ImageVariantCache | None = None,
+    content_addressed_images: bool = False,
+    image_memory_cache: ImageMemoryCache | None = None,
+    image_rendition_quality: int | None = None,
+    image_placeholders: ImagePlaceholderCache | None = None,
+    image_warmup: ImageWarmup | None = None,
+    generate_executor: Executor | None = None,
 ) -> FastAPI:
     """FastAPI アプリを生成する。
 
@@ -39,6 +60,21 @@ def create_app(
         library_service: LibraryService インスタンス。提供時は app.state に格納する。
         config_generator: ConfigGeneratorService インスタンス。提供時は app.state に格納する。
         config_validator: ConfigValidatorService インスタンス。提供時は app.state に格納する。
+        library_registry: 名前付きライブラリの LibraryRegistry。提供時は app.state に格納する。
+        image_variants: リサイズ画像の ImageVariantCache。提供時は app.state に格納する
+            （未提供の場合、/api/images の ?w=&h= は無視して元画像を返す）。
+        content_addressed_images: True の場合、ライブラリ API の画像 URL を
+            内容アドレスの URL（/api/images/<hash>/<path>）にする。
+        image_memory_cache: 画像の内容を保持する ImageMemoryCache。提供時は app.state に格納する
+            （未提供の場合、/api/images は毎回ファイルから配信する）。
+        image_rendition_quality: 指定した場合、/api/images は Accept に応じて
+            WebP・JPEG に変換した画像をこの品質で返す（image_variants が必要）。
+        image_placeholders: LibraryService と共有する ImagePlaceholderCache。提供時は
+            ライブラリ API のレスポンスに画像の寸法と LQIP を含める。
+        image_warmup: バリアントの事前生成の ImageWarmup。提供時は app.state に格納する
+            （/api/image-warmup で進捗を返す）。
+        generate_executor: /api/generate の生成・検証・YAML 書き出しを実行するワーカープール。
+            未提供の場合は Starlette の既定のスレッドプールで実行する。
 
     Returns:
         設定済み FastAPI インスタンス。
@@ -47,14 +83,43 @@ def create_app(
 
     if library_service is not None:
         app.state.library_service = library_service
+        # 更新通知（/api/library/events）の配信元
+        broadcaster = LibraryEventBroadcaster()
+        library_service.add_change_listener(broadcaster.publish)
+        app.state.library_events = broadcaster
     if config_generator is not None:
         app.state.config_generator = config_generator
     if config_validator is not None:
         app.state.config_validator = config_validator
+    if library_registry is not None:
+        app.state.library_registry = library_registry
+    if image_variants is not None:
+        app.state.image_variants = image_variants
+    app.state.content_addressed_images = content_addressed_images
+    if image_memory_cache is not None:
+        app.state.image_memory_cache = image_memory_cache
+    if image_rendition_quality is not None:
+        app.state.image_rendition_quality = image_rendition_quality
+    if image_placeholders is not None:
+        app.state.image_placeholders = image_placeholders
+    if image_warmup is not None:
+        app.state.image_warmup = image_warmup
+    if generate_executor is not None:
+        app.state.generate_executor = generate_executor
+    app.state.sprite_sheets = SpriteSheetCache()
+
+    @app.exception_handler(LibraryEntryError)
+    async def handle_library_entry_error(request: Request, exc: LibraryEntryError):
+        # --lazy-library で参照時に不正な定義が見つかった場合
+        print(f"エラー: ライブラリの定義が不正です: {exc}", file=sys.stderr)
+        return JSONResponse(
+            status_code=500, content={"detail": f"ライブラリの定義が不正です: {exc}"}
+        )
 
     # API ルーターを登録する
     app.include_router(library_router, prefix="/api")
     app.include_router(image_router, prefix="/api")
+    app.include_router(sprite_router, prefix="/api")
     app.include_router(generate_router, prefix="/api")
 
     # React ビルド成果物の静的ファイル配信（API ルートより後に登録）
@@ -78,8 +143,50 @@ def start_server(config: AppConfig, frontend_dist: Path = FRONTEND_DIST) -> None
     Raises:
         SystemExit: サーバの起動に失敗した場合（終了コード 1）。
     """
-    library_service = LibraryService()
+    image_placeholders: ImagePlaceholderCache | None = None
+    if config.image_placeholders:
+        image_placeholders = ImagePlaceholderCache(config.placeholder_cache)
+
+    def new_library_service(sqlite_path: Path | None = None) -> LibraryService:
+        # 名前付きライブラリは --library-db を共有せず、各ライブラリの隣にデータベースを置く
+        return LibraryService(
+            store=config.library_store,
+            sqlite_path=sqlite_path,
+            streaming=config.stream_library,
+            lazy=config.lazy_library,
+            placeholders=image_placeholders,
+        )
+
+    library_service = new_library_service(config.library_db)
     library_service.load(config.library_path)
+    library_registry: LibraryRegistry | None = None
+    if config.libraries:
+        budget = config.library_memory_budget_mib
+        library_registry = LibraryRegistry(
+            config.libraries,
+            memory_budget=budget * 1024 * 1024 if budget is not None else None,
+            service_factory=new_library_service,
+        )
+    image_variants = ImageVariantCache(
+        config.image_cache_dir,
+        max_bytes=config.image_cache_size_mib * 1024 * 1024,
+        workers=config.image_workers,
+    )
+    rendition_quality = config.image_quality if config.image_renditions else None
+    image_warmup: ImageWarmup | None = None
+    if config.warm_images:
+        image_warmup = ImageWarmup(
+            image_variants,
+            standard_variants(config.warm_image_widths, rendition_quality),
+            workers=config.image_workers,
+        )
+    image_memory_cache: ImageMemoryCache | None = None
+    if config.image_memory_cache_size_mib > 0:
+        image_memory_cache = ImageMemoryCache(
+            max_bytes=config.image_memory_cache_size_mib * 1024 * 1024,
+            max_object_bytes=config.image_memory_cache_max_object_kib * 1024,
+        )
+    generate_executor = create_generate_executor(config.generate_workers)
     config_generator = ConfigGeneratorService()
     config_validator = ConfigValidatorService(SCHEMA_PATH)
     app = create_app(
@@ -87,14 +194,41 @@ def start_server(config: AppConfig, frontend_dist: Path = FRONTEND_DIST) -> None
         library_service=library_service,
         config_generator=config_generator,
         config_validator=config_validator,
+        library_registry=library_registry,
+        image_variants=image_variants,
+        content_addressed_images=config.content_addressed_images,
+        image_memory_cache=image_memory_cache,
+        image_rendition_quality=rendition_quality,
+        image_placeholders=image_placeholders,
+        image_warmup=image_warmup,
+        generate_executor=generate_executor,
     )
     print(f"サーバを起動しています: http://localhost:{config.port}")
 
+    if image_warmup is not None:
+        # 事前生成はバックグラウンドで行い、サーバの起動を待たせない
+        image_warmup.start(library_service.referenced_images())
+
+    watcher: LibraryWatcher | None = None
+    if config.watch_library:
+        watcher = LibraryWatcher(library_service)
+        watcher.start()
+
     try:
         uvicorn.run(app, host="0.0.0.0", port=config.port)
     except Exception as e:
         print(f"エラー: サーバの起動に失敗しました: {e}", file=sys.stderr)
         sys.exit(1)
+    finally:
+        if watcher is not None:
+            watcher.stop()
+        library_service.close()
+        if library_registry is not None:
+            library_registry.close()
+        if image_warmup is not None:
+            image_warmup.close()
+        image_variants.close()
+        generate_executor.shutdown(wait=False, cancel_futures=True)
 
 
 if __name__ == "__main__":
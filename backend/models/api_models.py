@@ -1,5 +1,7 @@
 """ライブラリ API レスポンス用・コンフィグ生成リクエスト用 Pydantic モデル定義"""
 
+from typing import Literal
+
 from pydantic import BaseModel, Field
 
 from backend.models.library_models import ComfyUIConfigModel, WorkflowConfigParamsModel
@@ -12,6 +14,27 @@ class SceneTemplateResponse(BaseModel):
     negative_prompt: str
     batch_size: int
     preview_image_url: str | None
+    preview_image_width: int | None = None
+    preview_image_height: int | None = None
+    preview_image_placeholder: str | None = None
+
+
+class SceneSearchResponse(BaseModel):
+    query: str
+    total: int
+    offset: int
+    limit: int
+    items: list[SceneTemplateResponse]
+
+
+class TagCountResponse(BaseModel):
+    tag: str
+    count: int
+
+
+class SceneFacetsResponse(BaseModel):
+    total: int
+    tags: list[TagCountResponse]
 
 
 class EnvironmentResponse(BaseModel):
@@ -19,6 +42,67 @@ class EnvironmentResponse(BaseModel):
     display_name: str
     environment_prompt: str
     thumbnail_url: str | None
+    thumbnail_width: int | None = None
+    thumbnail_height: int | None = None
+    thumbnail_placeholder: str | None = None
+
+
+class SceneChangesResponse(BaseModel):
+    version: int
+    full_resync: bool
+    added: list[SceneTemplateResponse]
+    modified: list[SceneTemplateResponse]
+    removed: list[str]
+
+
+class EnvironmentChangesResponse(BaseModel):
+    version: int
+    full_resync: bool
+    added: list[EnvironmentResponse]
+    modified: list[EnvironmentResponse]
+    removed: list[str]
+
+
+class ImageCacheStatsResponse(BaseModel):
+    hits: int
+    misses: int
+    entries: int
+    bytes: int
+    max_bytes: int
+    max_object_bytes: int
+
+
+class ImageBatchRequest(BaseModel):
+    # 1 回に要求できる画像の数と幅・高さの上限（MAX_VARIANT_SIZE と同じ）
+    paths: list[str] = Field(min_length=1, max_length=100)
+    w: int | None = Field(default=None, ge=1, le=2048)
+    h: int | None = Field(default=None, ge=1, le=2048)
+    fit: Literal["contain", "cover", "fill"] = "contain"
+
+
+class ImageWarmupResponse(BaseModel):
+    total: int
+    done: int
+    failed: int
+    running: bool
+
+
+class SpriteFrameResponse(BaseModel):
+    name: str
+    x: int
+    y: int
+
+
+class SpriteSheetResponse(BaseModel):
+    version: int
+    total: int
+    page: int
+    per_page: int
+    image_url: str
+    width: int
+    height: int
+    tile_size: int
+    frames: list[SpriteFrameResponse]
 
 
 class TechDefaultsResponse(BaseModel):
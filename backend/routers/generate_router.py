@@ -3,20 +3,40 @@ Generate ルーター
 
 エンドポイント:
   POST /api/generate - GenerateRequest を受信し、YAML コンフィグをレスポンスとして返す
+
+コンフィグの生成・JSON Schema 検証・YAML への書き出しは CPU を使うため、イベントループでは
+行わず、app.state.generate_executor（プロセス数を制限したワーカープール）で実行する。
+スレッドでは GIL を奪い合い他の API の応答が遅れるため、起動時は優先度を下げたプロセスプール
+（create_generate_executor）を用いる。
+未設定の場合は Starlette の既定のスレッドプールで実行する。
+ワーカープロセスが異常終了してプールが壊れた場合は、その要求をスレッドプールで処理し、
+同じプロセス数のプールを作り直す。
 """
 
+import asyncio
 import io
+import multiprocessing
+import sys
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, Depends, FastAPI, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import Response
 from ruamel.yaml import YAML
 
 from ..models.api_models import GenerateRequest
 from ..services.config_generator import ConfigGeneratorService
 from ..services.config_validator import ConfigValidationError, ConfigValidatorService
+from ..services.library_service import LibraryService
+from ..services.process_priority import lower_priority
+from .library_router import resolve_library
 
 router = APIRouter()
 
+# 生成処理のワーカープロセスの nice 値の増分
+GENERATE_NICENESS: int = 10
+
 
 def get_config_generator(request: Request) -> ConfigGeneratorService:
     """app.state から ConfigGeneratorService を取得する依存関数。"""
@@ -28,30 +48,120 @@ def get_config_validator(request: Request) -> ConfigValidatorService:
     return request.app.state.config_validator
 
 
+def get_library_service(request: Request, library: str | None = None) -> LibraryService | None:
+    """app.state から LibraryService を取得する依存関数。未設定の場合は None。
+
+    ?library=NAME の場合は名前付きライブラリを返す。
+    """
+    if library is None:
+        return getattr(request.app.state, "library_service", None)
+    return resolve_library(request, library)
+
+
+def create_generate_executor(workers: int, niceness: int = GENERATE_NICENESS) -> Executor:
+    """生成処理用のプロセスプールを作成する。
+
+    ワーカープロセスの優先度を下げ、CPU が混み合っても一覧などの軽い API の応答を優先させる。
+    """
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=lower_priority,
+        initargs=(niceness,),
+    )
+
+
+def get_generate_executor(request: Request) -> Executor | None:
+    """app.state から生成処理用の Executor を取得する依存関数。未設定の場合は None。"""
+    return getattr(request.app.state, "generate_executor", None)
+
+
+def replace_broken_executor(app: FastAPI, broken: ProcessPoolExecutor) -> None:
+    """壊れたプロセスプールを破棄し、同じプロセス数のプールを app.state に設定する。
+
+    同時に失敗した複数の要求から呼ばれても、作り直すのは 1 度だけ。
+    """
+    if getattr(app.state, "generate_executor", None) is not broken:
+        return
+    # ProcessPoolExecutor はプロセス数を公開していないため、内部属性から引き継ぐ
+    app.state.generate_executor = create_generate_executor(broken._max_workers)
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+def render_config(
+    generator: ConfigGeneratorService,
+    validator: ConfigValidatorService,
+    generate_request: GenerateRequest,
+) -> str:
+    """コンフィグを生成・検証し、YAML 文字列にして返す（ブロッキング）。
+
+    ワーカープロセスで実行される（引数は pickle して渡す）。
+
+    Raises:
+        ConfigValidationError: JSON Schema 検証に失敗した場合。
+    """
+    config_dict = generator.generate(generate_request)
+    validator.validate(config_dict)
+
+    yaml = YAML()
+    yaml.default_flow_style = False
+    stream = io.StringIO()
+    yaml.dump(config_dict, stream)
+    return stream.getvalue()
+
+
 @router.post("/generate")
 async def generate_config(
+    request: Request,
     generate_request: GenerateRequest,
     generator: ConfigGeneratorService = Depends(get_config_generator),
     validator: ConfigValidatorService = Depends(get_config_validator),
+    library: LibraryService | None = Depends(get_library_service),
+    executor: Executor | None = Depends(get_generate_executor),
 ) -> Response:
     """GenerateRequest を受信し、スキーマ準拠の YAML をダウンロードレスポンスとして返す。
 
+    LibraryService が設定されている場合は、各シーンの template_name を
+    ライブラリの名前索引で解決し、存在しないテンプレートを拒否する。
+
     Raises:
-        HTTPException(422): JSON Schema 検証失敗時。違反内容を detail に含める。
+        HTTPException(422): 未知の template_name を含む場合、または JSON Schema 検証失敗時。
+            違反内容を detail に含める。
     """
-    config_dict = generator.generate(generate_request)
+    if library is not None:
+        unknown = [
+            item.template_name
+            for item in generate_request.scenes
+            if library.get_scene(item.template_name) is None
+        ]
+        if unknown:
+            raise HTTPException(
+                status_code=422,
+                detail=f"シーンテンプレートが見つかりません: {', '.join(unknown)}",
+            )
 
     try:
-        validator.validate(config_dict)
+        if executor is None:
+            yaml_content = await run_in_threadpool(
+                render_config, generator, validator, generate_request
+            )
+        else:
+            try:
+                yaml_content = await asyncio.get_running_loop().run_in_executor(
+                    executor, render_config, generator, validator, generate_request
+                )
+            except BrokenProcessPool as e:
+                print(
+                    f"エラー: 生成処理のワーカープロセスが停止しました（プールを作り直します）: {e}",
+                    file=sys.stderr,
+                )
+                replace_broken_executor(request.app, executor)
+                yaml_content = await run_in_threadpool(
+                    render_config, generator, validator, generate_request
+                )
     except ConfigValidationError as e:
         raise HTTPException(status_code=422, detail=str(e))
 
-    yaml = YAML()
-    yaml.default_flow_style = False
-    stream = io.StringIO()
-    yaml.dump(config_dict, stream)
-    yaml_content = stream.getvalue()
-
     return Response(
         content=yaml_content,
         media_type="application/yaml",
@@ -2,32 +2,401 @@
 画像配信 API ルーター
 
 エンドポイント:
-  GET /api/images/{image_path:path} - ライブラリ基準の相対パスから画像ファイルを配信する
+  GET /api/images/{image_path:path}        - ライブラリ基準の相対パスから画像ファイルを配信する
+  GET /api/images/{hash}/{image_path:path} - 内容アドレスの URL（hash は内容ハッシュの先頭 16 桁）
+  POST /api/images/batch                   - 複数の画像を 1 つの multipart/mixed レスポンスで返す
+  GET /api/image-cache                     - 画像のメモリキャッシュのヒット・ミスの回数と使用量
+  GET /api/image-warmup                    - バリアントの事前生成（--warm-images）の進捗
+
+いずれも ?library=NAME で名前付きライブラリを指定できる。
+
+配信するファイルはライブラリ読み込み時に構築した画像の索引（ImageIndex）から引き、
+索引にないパスは 404 とする。索引にないパスが要求された場合は、前回の走査から
+IMAGE_REFRESH_INTERVAL 秒以上経っていれば索引を更新してから引き直す（追加された画像を拾うため）。
+索引にある画像はサイズ・mtime をファイルと突き合わせ、変更されていれば内容ハッシュを
+求め直し、削除されていれば索引から取り除いて 404 とする（LibraryService.revalidate_image）。
+ETag・内容アドレスの URL・バリアントやレンディションのキャッシュのキーは確かめた内容ハッシュから作る。
+
+?w=&h=&fit= を指定すると、縮小した画像（バリアント）を返す。バリアントはワーカープールで
+生成し、ディスクにキャッシュする（app.state.image_variants の ImageVariantCache）。
+
+app.state.image_rendition_quality が設定されている場合は Accept で形式を交渉し、WebP を受け付ける
+クライアントには WebP 版（image/jpeg を明示するクライアントには PNG の JPEG 版）を
+その品質で変換して返す（レンディション。バリアントと同じく内容ハッシュをキーにキャッシュする）。
+
+レスポンスには内容ハッシュの ETag と Last-Modified を付け、If-None-Match・If-Modified-Since が
+一致する場合は 304 を返す。内容アドレスの URL はハッシュが現在の内容と一致する場合に限り
+Cache-Control: immutable で返す（一致しない場合は現在の内容を再検証付きで返す）。
+
+app.state.image_memory_cache（ImageMemoryCache）がある場合、配信する画像（バリアントを含む）の
+内容をメモリに保持し、2 回目以降はディスクを読まずに返す。
+
+/api/images/batch は {"paths": [...], "w": , "h": , "fit": } を受け取り、各画像（w・h 指定時は
+縮小した画像）を要求順に multipart/mixed のパートとして返す。パートはディスクから
+BATCH_CHUNK_SIZE ずつ読みながら送る（全体をメモリに載せない）。
 """
-from fastapi import APIRouter, Depends, HTTPException, Request
-from fastapi.responses import FileResponse
+import asyncio
+import mimetypes
+import os
+import re
+import secrets
+import sys
+from collections.abc import AsyncIterator, Hashable
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from typing import Literal
+from urllib.parse import quote
+
+import anyio
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, Response, StreamingResponse
 
+from ..models.api_models import ImageBatchRequest, ImageCacheStatsResponse, ImageWarmupResponse
+from ..services.image_index import ImageEntry
+from ..services.image_memory_cache import ImageMemoryCache
+from ..services.image_warmup import ImageWarmup
+from ..services.image_variants import (
+    MAX_VARIANT_SIZE,
+    MEDIA_TYPES,
+    ImageVariantCache,
+    VariantSpec,
+    is_resizable,
+    source_format,
+)
 from ..services.library_service import LibraryService
+from .library_router import IMAGE_URL_HASH_LENGTH, etag_matches, resolve_library
 
 router = APIRouter()
 
+# 索引にない画像が要求された場合に、索引を再走査する最短間隔（秒）
+IMAGE_REFRESH_INTERVAL: float = 10.0
+
+# 内容アドレスの URL の Cache-Control（内容が変わると URL が変わるため、変更されない）
+IMMUTABLE_CACHE_CONTROL: str = "public, max-age=31536000, immutable"
+# それ以外の URL の Cache-Control（キャッシュしてよいが、使う前に ETag で再検証する）
+REVALIDATE_CACHE_CONTROL: str = "no-cache"
+
+# 一括取得で画像をディスクから読んで送る単位（バイト）
+BATCH_CHUNK_SIZE: int = 64 * 1024
+
+# 一括取得の 1 パート（要求されたパス, 送るファイル, Content-Type, ETag）。画像がない場合のファイルは None
+BatchPart = tuple[str, Path | None, str | None, str | None]
+
+_URL_HASH = re.compile(f"[0-9a-f]{{{IMAGE_URL_HASH_LENGTH}}}")
+
+FitParam = Literal["contain", "cover", "fill"]
+
+
+def get_library_service(request: Request, library: str | None = None) -> LibraryService:
+    """app.state から LibraryService を取得する依存関数（?library= で名前付きライブラリを選択）。"""
+    return resolve_library(request, library)
+
+
+def find_image(service: LibraryService, image_path: str) -> tuple[ImageEntry | None, bool]:
+    """image_path の画像を索引から探し、ファイルと突き合わせる（ブロッキング）。
+
+    Returns:
+        (画像, 内容アドレスの URL で現在の内容と一致するか)。見つからない場合は (None, False)。
+    """
+    image = service.revalidate_image(image_path)
+    if image is not None:
+        return image, False
+    digest, sep, relative_path = image_path.partition("/")
+    if sep and _URL_HASH.fullmatch(digest):
+        image = service.revalidate_image(relative_path)
+        if image is not None:
+            return image, image.content_hash.startswith(digest)
+    return None, False
+
+
+def not_modified(request: Request, etag: str, mtime_ns: int) -> bool:
+    """条件付きリクエストが一致するか（If-None-Match を優先し、なければ If-Modified-Since）。"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag_matches(if_none_match, etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since).timestamp()
+    except (TypeError, ValueError):
+        return False
+    return mtime_ns // 1_000_000_000 <= since
+
+
+def accepted_media_types(accept: str | None) -> set[str]:
+    """Accept ヘッダのうち q > 0 のメディアタイプ（小文字）の集合を返す。"""
+    accepted: set[str] = set()
+    for part in (accept or "").split(","):
+        media_type, *params = (p.strip() for p in part.split(";"))
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if media_type and quality > 0:
+            accepted.add(media_type.lower())
+    return accepted
+
+
+def negotiate_format(accept: str | None, source: str | None) -> str | None:
+    """Accept と元画像の形式から変換先の形式を選ぶ。変換しない場合は None。
+
+    image/webp を受け付ける場合は WebP、image/jpeg を明示している場合は PNG を JPEG に変換する
+    （ワイルドカードのみの場合は変換しない）。
+    """
+    if source is None:
+        return None
+    accepted = accepted_media_types(accept)
+    if "image/webp" in accepted and source != "WEBP":
+        return "WEBP"
+    if "image/jpeg" in accepted and source == "PNG":
+        return "JPEG"
+    return None
+
+
+async def send_file(
+    request: Request,
+    path: Path,
+    stamp: Hashable,
+    headers: dict[str, str],
+    media_type: str | None = None,
+    expected_size: int | None = None,
+) -> Response:
+    """path のファイルを返す。メモリキャッシュがある場合はキャッシュから返す（なければ読み込んで格納する）。
 
-def get_library_service(request: Request) -> LibraryService:
-    """app.state から LibraryService を取得する依存関数。"""
-    return request.app.state.library_service
+    1 件あたりの上限を超えるファイルや、読み込めないファイルは FileResponse で返す。
+    """
+    memory: ImageMemoryCache | None = getattr(request.app.state, "image_memory_cache", None)
+    if memory is not None:
+        data = memory.get(path, stamp)
+        if data is None:
+            try:
+                data = await run_in_threadpool(memory.load, path, stamp, expected_size)
+            except OSError:
+                data = None
+        if data is not None:
+            if media_type is None:
+                media_type = mimetypes.guess_type(path.name)[0] or "text/plain"
+            return Response(content=data, media_type=media_type, headers=headers)
+    return FileResponse(path, media_type=media_type, headers=headers)
+
+
+async def batch_part(
+    variants: ImageVariantCache | None,
+    spec: VariantSpec | None,
+    relative_path: str,
+    image: ImageEntry | None,
+) -> BatchPart:
+    """一括取得で relative_path に対して送るファイルを決める（spec 指定時は縮小した画像を生成する）。"""
+    if image is None:
+        return relative_path, None, None, None
+    if spec is not None and variants is not None and is_resizable(image.path):
+        try:
+            variant_path = await asyncio.wrap_future(
+                variants.get(image.path, image.content_hash, spec)
+            )
+        except Exception as exc:
+            # 画像として読み込めない場合などは元の画像を返す
+            print(f"エラー: 画像の縮小に失敗しました: {relative_path}: {exc}", file=sys.stderr)
+        else:
+            return (
+                relative_path,
+                variant_path,
+                MEDIA_TYPES[spec.output_format(image.path.suffix)],
+                f'"{variant_path.name.partition(".")[0]}"',
+            )
+    media_type = mimetypes.guess_type(image.path.name)[0] or "application/octet-stream"
+    return relative_path, image.path, media_type, f'"{image.content_hash[:32]}"'
+
+
+def part_header(boundary: str, headers: dict[str, str]) -> bytes:
+    """multipart の 1 パートの区切りとヘッダを組み立てる。"""
+    lines = [f"--{boundary}", *(f"{name}: {value}" for name, value in headers.items())]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+
+async def multipart_stream(parts: list[BatchPart], boundary: str) -> AsyncIterator[bytes]:
+    """パートごとにヘッダを送り、ファイルを BATCH_CHUNK_SIZE ずつ読みながら送る。
+
+    画像がない（読み込めない）パートは X-Status: 404 と空の本文で送る。
+    """
+    for relative_path, path, media_type, etag in parts:
+        headers = {"Content-Location": quote(relative_path)}
+        try:
+            file = await anyio.open_file(path, "rb") if path is not None else None
+        except OSError:
+            file = None
+        if file is None:
+            yield part_header(boundary, {**headers, "X-Status": "404", "Content-Length": "0"})
+            yield b"\r\n"
+            continue
+        async with file:
+            size = os.fstat(file.wrapped.fileno()).st_size
+            yield part_header(boundary, {
+                **headers,
+                "Content-Type": media_type,
+                "Content-Length": str(size),
+                "ETag": etag,
+            })
+            remaining = size
+            while remaining > 0:
+                chunk = await file.read(min(BATCH_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+        if remaining > 0:
+            # 送信中にファイルが切り詰められた場合も、Content-Length どおりに送って区切りを保つ
+            yield bytes(remaining)
+        yield b"\r\n"
+    yield f"--{boundary}--\r\n".encode("latin-1")
+
+
+@router.post("/images/batch")
+async def get_image_batch(
+    request: Request,
+    body: ImageBatchRequest,
+    service: LibraryService = Depends(get_library_service),
+):
+    """複数の画像を要求順に multipart/mixed で返す。
+
+    各パートには Content-Location（要求されたパスを URL エンコードしたもの）・Content-Type・
+    Content-Length・ETag を付ける。w・h を指定した場合は /api/images?w=&h=&fit= と同じく
+    縮小した画像を返す。索引にない画像は X-Status: 404 の空のパートになる。
+    """
+    def find_all() -> list[ImageEntry | None]:
+        return [find_image(service, path)[0] for path in body.paths]
+
+    images = await run_in_threadpool(find_all)
+    if None in images and await run_in_threadpool(service.refresh_images, IMAGE_REFRESH_INTERVAL):
+        images = await run_in_threadpool(find_all)
+
+    variants: ImageVariantCache | None = getattr(request.app.state, "image_variants", None)
+    spec = None
+    if body.w is not None or body.h is not None:
+        spec = VariantSpec(width=body.w, height=body.h, fit=body.fit)
+    parts = await asyncio.gather(*(
+        batch_part(variants, spec, path, image) for path, image in zip(body.paths, images)
+    ))
+    boundary = secrets.token_hex(16)
+    return StreamingResponse(
+        multipart_stream(list(parts), boundary),
+        media_type=f"multipart/mixed; boundary={boundary}",
+        headers={"Cache-Control": "no-store"},
+    )
+
+
+@router.get("/image-cache", response_model=ImageCacheStatsResponse)
+async def get_image_cache_stats(request: Request):
+    """画像のメモリキャッシュのヒット・ミスの回数と使用量を返す。
+
+    メモリキャッシュが無効の場合は HTTP 404 を返す。
+    """
+    memory: ImageMemoryCache | None = getattr(request.app.state, "image_memory_cache", None)
+    if memory is None:
+        raise HTTPException(status_code=404, detail="画像のメモリキャッシュは無効です")
+    stats = memory.stats()
+    return ImageCacheStatsResponse(
+        hits=stats.hits,
+        misses=stats.misses,
+        entries=stats.entries,
+        bytes=stats.bytes,
+        max_bytes=stats.max_bytes,
+        max_object_bytes=stats.max_object_bytes,
+    )
+
+
+@router.get("/image-warmup", response_model=ImageWarmupResponse)
+async def get_image_warmup(request: Request):
+    """バリアントの事前生成の進捗を返す。
+
+    事前生成が無効の場合は HTTP 404 を返す。
+    """
+    warmup: ImageWarmup | None = getattr(request.app.state, "image_warmup", None)
+    if warmup is None:
+        raise HTTPException(status_code=404, detail="画像の事前生成は無効です")
+    progress = warmup.progress()
+    return ImageWarmupResponse(
+        total=progress.total, done=progress.done, failed=progress.failed, running=progress.running
+    )
 
 
 @router.get("/images/{image_path:path}")
 async def get_image(
+    request: Request,
     image_path: str,
+    w: int | None = Query(default=None, ge=1, le=MAX_VARIANT_SIZE),
+    h: int | None = Query(default=None, ge=1, le=MAX_VARIANT_SIZE),
+    fit: FitParam = "contain",
     service: LibraryService = Depends(get_library_service),
 ):
     """ライブラリ基準の相対パスから画像ファイルを取得して配信する。
 
     画像形式に応じた Content-Type ヘッダを付与する。
-    対応ファイルが存在しない場合は HTTP 404 を返す。
+    w・h のいずれかを指定した場合は、その枠に合わせて縮小した画像を返す（拡大はしない）。
+    リサイズに対応しない形式（PNG・JPEG・WebP 以外）の場合は元の画像を返す。
+    レンディションが有効な場合は Accept に応じて WebP・JPEG に変換した画像を返す。
+    ETag・If-Modified-Since が一致する場合は 304 を返す。
+    画像の索引にない場合は HTTP 404 を返す。
     """
-    abs_path = service.resolve_image_path(image_path)
-    if abs_path is None:
+    image, immutable = await run_in_threadpool(find_image, service, image_path)
+    if image is None and await run_in_threadpool(service.refresh_images, IMAGE_REFRESH_INTERVAL):
+        image, immutable = await run_in_threadpool(find_image, service, image_path)
+    if image is None:
+        raise HTTPException(status_code=404, detail="画像ファイルが見つかりません")
+    abs_path = image.path
+
+    variants: ImageVariantCache | None = getattr(request.app.state, "image_variants", None)
+    quality: int | None = getattr(request.app.state, "image_rendition_quality", None)
+    negotiated = variants is not None and quality is not None and is_resizable(abs_path)
+    image_format = None
+    if negotiated:
+        image_format = negotiate_format(request.headers.get("accept"), source_format(abs_path))
+    spec = None
+    if variants is not None and is_resizable(abs_path):
+        if image_format is not None:
+            spec = VariantSpec(width=w, height=h, fit=fit, image_format=image_format, quality=quality)
+        elif w is not None or h is not None:
+            spec = VariantSpec(width=w, height=h, fit=fit)
+
+    if spec is None:
+        etag_key = image.content_hash[:32]
+    else:
+        etag_key = spec.cache_name(image.content_hash, abs_path.suffix).partition(".")[0]
+    headers = {
+        "ETag": f'"{etag_key}"',
+        "Last-Modified": formatdate(image.mtime_ns / 1_000_000_000, usegmt=True),
+        "Cache-Control": IMMUTABLE_CACHE_CONTROL if immutable else REVALIDATE_CACHE_CONTROL,
+    }
+    if negotiated:
+        headers["Vary"] = "Accept"
+    if not_modified(request, headers["ETag"], image.mtime_ns):
+        return Response(status_code=304, headers=headers)
+    stamp = (image.size, image.mtime_ns)
+    if spec is None:
+        return await send_file(request, abs_path, stamp, headers, expected_size=image.size)
+
+    try:
+        variant_path = await asyncio.wrap_future(
+            variants.get(abs_path, image.content_hash, spec)
+        )
+    except FileNotFoundError:
         raise HTTPException(status_code=404, detail="画像ファイルが見つかりません")
-    return FileResponse(abs_path)
+    except Exception as exc:
+        # 画像として読み込めない場合などは元の画像を返す
+        print(f"エラー: 画像の縮小に失敗しました: {image_path}: {exc}", file=sys.stderr)
+        headers["ETag"] = f'"{image.content_hash[:32]}"'
+        return await send_file(request, abs_path, stamp, headers, expected_size=image.size)
+    # バリアントのファイル名は元画像の内容ハッシュを含むため、内容は変わらない
+    return await send_file(
+        request,
+        variant_path,
+        None,
+        headers,
+        media_type=MEDIA_TYPES[spec.output_format(abs_path.suffix)],
+    )
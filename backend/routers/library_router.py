@@ -2,70 +2,534 @@
 ライブラリ API ルーター
 
 エンドポイント:
-  GET /api/scenes           - シーンテンプレート一覧を返す
+  GET /api/scenes           - シーンテンプレート一覧を返す（?tags=&exclude= でタグ絞り込み）
+  GET /api/scenes/search    - 表示名・プロンプトを全文検索し、順位順にページ単位で返す
+  GET /api/scenes/facets    - タグ絞り込み後のシーン数とタグごとの件数を返す
+  GET /api/scenes/changes   - ?since= のバージョン以降に追加・変更・削除されたシーンを返す
   GET /api/environments     - 環境一覧を返す
+  GET /api/environments/changes - ?since= のバージョン以降に追加・変更・削除された環境を返す
   GET /api/settings/defaults - デフォルト技術設定を返す（未設定時は 404）
+  GET /api/library/events   - ライブラリの更新通知を Server-Sent Events で配信する
+
+いずれも ?library=NAME で名前付きライブラリ（--library NAME=PATH）を指定できる。
+
+/api/scenes・/api/environments は ?sort=&limit=&cursor=&fields= でページ単位の取得と
+フィールドの絞り込みができる。次ページのカーソルは X-Next-Cursor ヘッダで返す。
+
+条件を指定しない一覧と /api/settings/defaults は、ライブラリのバージョンごとに一度だけ
+JSON へシリアライズしたバイト列を返す。内容ハッシュの ETag を付け、If-None-Match が
+一致する場合は 304 を返す。
+
+/changes は差分同期用で、レスポンスの version を次回の since に渡す。変更履歴から
+差分を求められない場合（履歴より古い since、別のプロセスのバージョンなど）は
+full_resync=true とし、全件を added で返す。
+
+app.state.content_addressed_images が真の場合、preview_image_url・thumbnail_url は
+内容アドレスの URL（/api/images/<hash>/<path>、長期キャッシュ可能）になる。
+
+app.state.image_placeholders が設定されている場合、シーン・環境の画像の幅・高さと
+LQIP（極小のサムネイルの data URI）を *_width・*_height・*_placeholder に含める。
+
+/api/library/events はデフォルトのライブラリ（--library-path）の再読み込みを、
+新しいバージョンと変更された name の一覧として通知する（内容は /changes で取得する）。
 """
-from fastapi import APIRouter, Depends, HTTPException, Request
+import asyncio
+import hashlib
+import json
+from collections.abc import AsyncIterator, Callable, Sequence
+from typing import Literal
+from urllib.parse import urlencode
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 
 from ..models.api_models import (
+    EnvironmentChangesResponse,
     EnvironmentResponse,
+    SceneChangesResponse,
+    SceneFacetsResponse,
+    SceneSearchResponse,
     SceneTemplateResponse,
+    TagCountResponse,
     TechDefaultsResponse,
 )
-from ..services.library_service import LibraryService
+from ..models.library_models import LibraryEnvironment, LibraryScene
+from ..services.image_placeholders import ImagePlaceholder
+from ..services.library_events import LibraryEventBroadcaster, Subscription
+from ..services.library_listing import InvalidCursorError, Page
+from ..services.library_registry import UnknownLibraryError
+from ..services.library_service import LibraryLoadError, LibraryService
 
 router = APIRouter()
 
+# ページ単位で取得する場合の最大件数
+MAX_PAGE_SIZE: int = 500
 
-def get_library_service(request: Request) -> LibraryService:
-    """app.state から LibraryService を取得する依存関数。"""
-    return request.app.state.library_service
+# 更新通知がない間に接続維持のコメントを送る間隔（秒）
+EVENT_KEEPALIVE_INTERVAL: float = 15.0
 
+SortParam = Literal["position", "name", "display_name"]
 
-@router.get("/scenes", response_model=list[SceneTemplateResponse])
-async def get_scenes(service: LibraryService = Depends(get_library_service)):
-    """シーンテンプレート一覧を返す。"""
-    return [
-        SceneTemplateResponse(
-            name=s.name,
-            display_name=s.display_name,
-            positive_prompt=s.positive_prompt,
-            negative_prompt=s.negative_prompt,
-            batch_size=s.batch_size,
-            preview_image_url=(
-                f"/api/images/{s.preview_image}" if s.preview_image else None
-            ),
+# 内容アドレスの画像 URL に含めるハッシュの長さ（16 進の桁数）
+IMAGE_URL_HASH_LENGTH: int = 16
+
+
+class ImageRefs:
+    """リクエストの対象ライブラリの画像の配信 URL とプレースホルダーを引く。"""
+
+    def __init__(
+        self,
+        service: LibraryService,
+        library: str | None,
+        content_addressed: bool = False,
+        placeholders: bool = False,
+    ) -> None:
+        self._service = service
+        self._library = library
+        self._content_addressed = content_addressed
+        self._placeholders = placeholders
+
+    def url(self, relative_path: str | None) -> str | None:
+        """画像の配信 URL を返す（内容アドレスの URL は画像の索引にある画像のみ）。
+
+        ファイルとの突き合わせは行わない（一覧をイベントループでハッシュし直さないため）。
+        上書きされた画像は /api/images での突き合わせ・再走査で索引が更新され、バージョンが
+        進んだ後の一覧から新しい URL になる。それまでの古い URL は immutable にせず再検証付きで返す。
+        """
+        if not relative_path or not self._content_addressed:
+            return image_url(relative_path, self._library)
+        image = self._service.get_image(relative_path)
+        return image_url(
+            relative_path, self._library, image.content_hash if image is not None else None
         )
-        for s in service.get_scenes()
-    ]
 
+    def placeholder(self, relative_path: str | None) -> ImagePlaceholder | None:
+        """画像のプレースホルダーを返す。無効な場合・画像がない場合は None。"""
+        if not relative_path or not self._placeholders:
+            return None
+        return self._service.get_image_placeholder(relative_path)
 
-@router.get("/environments", response_model=list[EnvironmentResponse])
-async def get_environments(service: LibraryService = Depends(get_library_service)):
-    """環境一覧を返す。"""
-    return [
-        EnvironmentResponse(
-            name=e.name,
-            display_name=e.display_name,
-            environment_prompt=e.environment_prompt,
-            thumbnail_url=(
-                f"/api/images/{e.thumbnail}" if e.thumbnail else None
+    def width(self, relative_path: str | None) -> int | None:
+        placeholder = self.placeholder(relative_path)
+        return placeholder.width if placeholder is not None else None
+
+    def height(self, relative_path: str | None) -> int | None:
+        placeholder = self.placeholder(relative_path)
+        return placeholder.height if placeholder is not None else None
+
+    def lqip(self, relative_path: str | None) -> str | None:
+        placeholder = self.placeholder(relative_path)
+        return placeholder.lqip if placeholder is not None else None
+
+
+# レスポンスのフィールドごとの値の取り出し方（fields= では指定されたものだけを計算する）
+_SCENE_FIELDS: dict[str, Callable[[LibraryScene, ImageRefs], object]] = {
+    "name": lambda s, images: s.name,
+    "display_name": lambda s, images: s.display_name,
+    "positive_prompt": lambda s, images: s.positive_prompt,
+    "negative_prompt": lambda s, images: s.negative_prompt,
+    "batch_size": lambda s, images: s.batch_size,
+    "preview_image_url": lambda s, images: images.url(s.preview_image),
+    "preview_image_width": lambda s, images: images.width(s.preview_image),
+    "preview_image_height": lambda s, images: images.height(s.preview_image),
+    "preview_image_placeholder": lambda s, images: images.lqip(s.preview_image),
+}
+_ENVIRONMENT_FIELDS: dict[str, Callable[[LibraryEnvironment, ImageRefs], object]] = {
+    "name": lambda e, images: e.name,
+    "display_name": lambda e, images: e.display_name,
+    "environment_prompt": lambda e, images: e.environment_prompt,
+    "thumbnail_url": lambda e, images: images.url(e.thumbnail),
+    "thumbnail_width": lambda e, images: images.width(e.thumbnail),
+    "thumbnail_height": lambda e, images: images.height(e.thumbnail),
+    "thumbnail_placeholder": lambda e, images: images.lqip(e.thumbnail),
+}
+
+
+def resolve_library(request: Request, library: str | None) -> LibraryService:
+    """library が None の場合はデフォルトの LibraryService、それ以外は名前付きライブラリを返す。
+
+    名前付きライブラリは app.state.library_registry から取得する（未読み込みの場合は読み込む）。
+
+    Raises:
+        HTTPException(404): 登録されていないライブラリ名の場合。
+        HTTPException(500): ライブラリの読み込みに失敗した場合。
+    """
+    if library is None:
+        return request.app.state.library_service
+    registry = getattr(request.app.state, "library_registry", None)
+    if registry is None:
+        raise HTTPException(status_code=404, detail=f"ライブラリが登録されていません: {library}")
+    try:
+        return registry.get(library)
+    except UnknownLibraryError as exc:
+        raise HTTPException(status_code=404, detail=str(exc))
+    except LibraryLoadError as exc:
+        raise HTTPException(
+            status_code=500, detail=f"ライブラリの読み込みに失敗しました: {library}: {exc}"
+        )
+
+
+def get_library_service(request: Request, library: str | None = None) -> LibraryService:
+    """app.state から LibraryService を取得する依存関数（?library= で名前付きライブラリを選択）。"""
+    return resolve_library(request, library)
+
+
+def image_url(
+    relative_path: str | None, library: str | None, content_hash: str | None = None
+) -> str | None:
+    """ライブラリ基準の相対パスから画像配信 URL を組み立てる。
+
+    content_hash を指定した場合は内容アドレスの URL（/api/images/<hash>/<path>）にする。
+    """
+    if not relative_path:
+        return None
+    if content_hash is not None:
+        relative_path = f"{content_hash[:IMAGE_URL_HASH_LENGTH]}/{relative_path}"
+    url = f"/api/images/{relative_path}"
+    return f"{url}?{urlencode({'library': library})}" if library is not None else url
+
+
+def image_refs(request: Request, service: LibraryService, library: str | None) -> ImageRefs:
+    """リクエストの対象ライブラリの ImageRefs を返す。
+
+    app.state.content_addressed_images が真の場合、画像の索引にある画像は
+    内容アドレスの URL にする（内容が変わると URL も変わるため、長期キャッシュできる）。
+    app.state.image_placeholders が設定されている場合は、画像のプレースホルダーを引く。
+    """
+    return ImageRefs(
+        service,
+        library,
+        content_addressed=getattr(request.app.state, "content_addressed_images", False),
+        placeholders=getattr(request.app.state, "image_placeholders", None) is not None,
+    )
+
+
+def scene_response(scene: LibraryScene, images: ImageRefs) -> SceneTemplateResponse:
+    """LibraryScene を API レスポンスに変換する。"""
+    return SceneTemplateResponse(
+        **{name: getter(scene, images) for name, getter in _SCENE_FIELDS.items()}
+    )
+
+
+def environment_response(environment: LibraryEnvironment, images: ImageRefs) -> EnvironmentResponse:
+    """LibraryEnvironment を API レスポンスに変換する。"""
+    return EnvironmentResponse(
+        **{name: getter(environment, images) for name, getter in _ENVIRONMENT_FIELDS.items()}
+    )
+
+
+def parse_fields(fields: str | None, available: Sequence[str]) -> list[str]:
+    """fields= の値（カンマ区切り）を検証してフィールド名の一覧にする。None の場合はすべて。
+
+    Raises:
+        HTTPException(422): 未対応のフィールドを含む場合。
+    """
+    if fields is None:
+        return list(available)
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in names if name not in available]
+    if unknown or not names:
+        raise HTTPException(
+            status_code=422,
+            detail=(
+                f"未対応のフィールドです: {', '.join(unknown)}"
+                f"（指定可能: {', '.join(available)}）"
             ),
         )
-        for e in service.get_environments()
-    ]
+    return names
+
+
+def page_response(
+    page: Page,
+    getters: dict[str, Callable[[object, ImageRefs], object]],
+    fields: list[str],
+    images: ImageRefs,
+) -> JSONResponse:
+    """ページの要素を指定フィールドのみの JSON 配列にし、件数とカーソルをヘッダに付ける。"""
+    selected = [(name, getters[name]) for name in fields]
+    headers = {"X-Total-Count": str(page.total)}
+    if page.next_cursor is not None:
+        headers["X-Next-Cursor"] = page.next_cursor
+    return JSONResponse(
+        content=[
+            {name: getter(item, images) for name, getter in selected} for item in page.items
+        ],
+        headers=headers,
+    )
+
+
+def wants_page(sort: str, cursor: str | None, limit: int | None, fields: str | None) -> bool:
+    """ページング・並び替え・フィールド絞り込みのいずれかが指定されているか。"""
+    return sort != "position" or cursor is not None or limit is not None or fields is not None
+
+
+def serialize_json(payload: object) -> tuple[bytes, str]:
+    """payload を JSONResponse と同じ形式でシリアライズし、(本文, 強い ETag) を返す。"""
+    body = json.dumps(
+        payload, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
+    return body, f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """If-None-Match ヘッダが etag に一致するか（弱い比較。* はすべてに一致）。"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def cached_json_response(
+    request: Request,
+    service: LibraryService,
+    key: tuple,
+    build_payload: Callable[[], object],
+) -> Response:
+    """ライブラリのバージョンごとにシリアライズ済みの JSON を返す（ETag 一致時は 304）。"""
+    body, etag = service.cached(key, lambda: serialize_json(build_payload()))
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def split_tag_params(values: list[str]) -> list[str]:
+    """?tags=a,b&tags=c のようなクエリパラメータをタグの一覧にする。"""
+    return [tag for value in values for tag in value.split(",") if tag.strip()]
+
+
+@router.get("/scenes", response_model=list[SceneTemplateResponse])
+async def get_scenes(
+    request: Request,
+    tags: list[str] = Query(default=[]),
+    exclude: list[str] = Query(default=[]),
+    sort: SortParam = "position",
+    cursor: str | None = None,
+    limit: int | None = Query(default=None, ge=1, le=MAX_PAGE_SIZE),
+    fields: str | None = None,
+    library: str | None = None,
+    service: LibraryService = Depends(get_library_service),
+):
+    """シーンテンプレート一覧を返す。
+
+    tags（カンマ区切り・複数指定可）をすべて含み、exclude をいずれも含まないシーンに絞り込める。
+    sort・cursor・limit・fields のいずれかを指定した場合は、sort 順に cursor の直後から
+    limit 件を fields のフィールドのみで返す（X-Total-Count・X-Next-Cursor ヘッダ付き）。
+
+    Raises:
+        HTTPException(400): カーソルが不正な場合。
+        HTTPException(422): 未対応のフィールドを指定した場合。
+    """
+    tags, exclude = split_tag_params(tags), split_tag_params(exclude)
+    images = image_refs(request, service, library)
+    if wants_page(sort, cursor, limit, fields):
+        selected_fields = parse_fields(fields, list(_SCENE_FIELDS))
+        try:
+            page = service.list_scenes(sort, cursor, limit, tags, exclude)
+        except InvalidCursorError as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+        return page_response(page, _SCENE_FIELDS, selected_fields, images)
+
+    if tags or exclude:
+        return [scene_response(s, images) for s in service.filter_scenes(tags, exclude)]
+    return cached_json_response(
+        request,
+        service,
+        ("scenes", library),
+        lambda: [
+            {name: getter(s, images) for name, getter in _SCENE_FIELDS.items()}
+            for s in service.get_scenes()
+        ],
+    )
+
+
+@router.get("/scenes/facets", response_model=SceneFacetsResponse)
+async def get_scene_facets(
+    tags: list[str] = Query(default=[]),
+    exclude: list[str] = Query(default=[]),
+    limit: int = Query(default=50, ge=1, le=1000),
+    service: LibraryService = Depends(get_library_service),
+):
+    """/api/scenes と同じ条件で絞り込んだシーン数と、タグごとの件数（多い順に limit 件）を返す。"""
+    total, counts = service.get_scene_tag_facets(
+        split_tag_params(tags), split_tag_params(exclude), limit
+    )
+    return SceneFacetsResponse(
+        total=total, tags=[TagCountResponse(tag=tag, count=count) for tag, count in counts]
+    )
+
+
+@router.get("/scenes/search", response_model=SceneSearchResponse)
+async def search_scenes(
+    request: Request,
+    q: str = Query(min_length=1, max_length=200),
+    offset: int = Query(default=0, ge=0),
+    limit: int = Query(default=20, ge=1, le=100),
+    library: str | None = None,
+    service: LibraryService = Depends(get_library_service),
+):
+    """表示名・プロンプトを全文検索し、一致したシーンを順位順に offset から limit 件返す。"""
+    total, scenes = service.search_scenes(q, offset, limit)
+    images = image_refs(request, service, library)
+    return SceneSearchResponse(
+        query=q,
+        total=total,
+        offset=offset,
+        limit=limit,
+        items=[scene_response(s, images) for s in scenes],
+    )
+
+
+@router.get("/scenes/changes", response_model=SceneChangesResponse)
+async def get_scene_changes(
+    request: Request,
+    since: int = Query(ge=0),
+    library: str | None = None,
+    service: LibraryService = Depends(get_library_service),
+):
+    """バージョン since より後に追加・変更・削除されたシーンを返す。
+
+    履歴から差分を求められない場合は full_resync=true で全シーンを added に入れて返す。
+    """
+    changes, added, modified = service.get_scene_changes(since)
+    images = image_refs(request, service, library)
+    return SceneChangesResponse(
+        version=changes.version,
+        full_resync=changes.full_resync,
+        added=[scene_response(s, images) for s in added],
+        modified=[scene_response(s, images) for s in modified],
+        removed=changes.removed,
+    )
+
+
+@router.get("/environments", response_model=list[EnvironmentResponse])
+async def get_environments(
+    request: Request,
+    sort: SortParam = "position",
+    cursor: str | None = None,
+    limit: int | None = Query(default=None, ge=1, le=MAX_PAGE_SIZE),
+    fields: str | None = None,
+    library: str | None = None,
+    service: LibraryService = Depends(get_library_service),
+):
+    """環境一覧を返す。
+
+    sort・cursor・limit・fields の扱いは /api/scenes と同じ。
+
+    Raises:
+        HTTPException(400): カーソルが不正な場合。
+        HTTPException(422): 未対応のフィールドを指定した場合。
+    """
+    images = image_refs(request, service, library)
+    if wants_page(sort, cursor, limit, fields):
+        selected_fields = parse_fields(fields, list(_ENVIRONMENT_FIELDS))
+        try:
+            page = service.list_environments(sort, cursor, limit)
+        except InvalidCursorError as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+        return page_response(page, _ENVIRONMENT_FIELDS, selected_fields, images)
+
+    return cached_json_response(
+        request,
+        service,
+        ("environments", library),
+        lambda: [
+            {name: getter(e, images) for name, getter in _ENVIRONMENT_FIELDS.items()}
+            for e in service.get_environments()
+        ],
+    )
+
+
+@router.get("/environments/changes", response_model=EnvironmentChangesResponse)
+async def get_environment_changes(
+    request: Request,
+    since: int = Query(ge=0),
+    library: str | None = None,
+    service: LibraryService = Depends(get_library_service),
+):
+    """バージョン since より後に追加・変更・削除された環境を返す（/api/scenes/changes と同様）。"""
+    changes, added, modified = service.get_environment_changes(since)
+    images = image_refs(request, service, library)
+    return EnvironmentChangesResponse(
+        version=changes.version,
+        full_resync=changes.full_resync,
+        added=[environment_response(e, images) for e in added],
+        modified=[environment_response(e, images) for e in modified],
+        removed=changes.removed,
+    )
 
 
 @router.get("/settings/defaults", response_model=TechDefaultsResponse)
-async def get_settings_defaults(service: LibraryService = Depends(get_library_service)):
+async def get_settings_defaults(
+    request: Request,
+    service: LibraryService = Depends(get_library_service),
+):
     """デフォルト技術設定を返す。未設定の場合は 404 を返す。"""
     defaults = service.get_tech_defaults()
     if defaults is None:
         raise HTTPException(
             status_code=404, detail="デフォルト技術設定が設定されていません"
         )
-    return TechDefaultsResponse(
-        comfyui_config=defaults.comfyui_config,
-        workflow_config=defaults.workflow_config,
+    return cached_json_response(
+        request,
+        service,
+        ("settings/defaults",),
+        lambda: TechDefaultsResponse(
+            comfyui_config=defaults.comfyui_config,
+            workflow_config=defaults.workflow_config,
+        ).model_dump(mode="json"),
+    )
+
+
+def sse_message(event: str, data: object) -> str:
+    """Server-Sent Events の 1 メッセージを組み立てる。"""
+    payload = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+    return f"event: {event}\ndata: {payload}\n\n"
+
+
+async def library_event_stream(
+    request: Request,
+    broadcaster: LibraryEventBroadcaster,
+    subscription: Subscription,
+    version: int,
+    keepalive_interval: float = EVENT_KEEPALIVE_INTERVAL,
+) -> AsyncIterator[str]:
+    """購読した更新通知を SSE として送り続ける。切断時に購読を終了する。
+
+    最初に現在のバージョンを ready イベントで送り、以降は再読み込みごとに library イベントを送る。
+    """
+    try:
+        yield sse_message("ready", {"version": version})
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.get(), keepalive_interval)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    break
+                yield ": keepalive\n\n"
+                continue
+            yield sse_message("library", event.to_dict())
+    finally:
+        broadcaster.unsubscribe(subscription)
+
+
+@router.get("/library/events")
+async def get_library_events(request: Request):
+    """デフォルトのライブラリの更新通知を Server-Sent Events で配信する。
+
+    再読み込みのたびに {version, resync, scenes, environments} を送る（scenes・environments は
+    added・modified・removed の name の一覧）。受信が追いつかず通知を取りこぼした場合は
+    resync=true の通知を送る。
+    """
+    broadcaster: LibraryEventBroadcaster = request.app.state.library_events
+    service: LibraryService = request.app.state.library_service
+    # 購読してからバージョンを読む（間に差し替わっても通知を取りこぼさない）
+    subscription = broadcaster.subscribe()
+    return StreamingResponse(
+        library_event_stream(request, broadcaster, subscription, service.version),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
@@ -0,0 +1,135 @@
+"""
+スプライトシート API ルーター
+
+エンドポイント:
+  GET /api/sprites/{kind}       - kind（scenes / environments）の 1 ページ分の画像をまとめた
+                                  スプライトシートの座標と画像 URL を返す
+  GET /api/sprites/{kind}/image - スプライトシートの画像（WebP）を返す
+
+いずれも ?page=&per_page=&tile=&library= で対象のページ・タイルの大きさ・ライブラリを指定する。
+ページは /api/scenes・/api/environments の定義順と同じ並びで区切る。
+
+スプライトシートはライブラリのバージョンごとに一度だけ合成し、app.state.sprite_sheets
+（SpriteSheetCache）に保持する。画像 URL にはバージョン（v=）を含め、現在のバージョンと
+一致する場合は Cache-Control: immutable で返す。
+"""
+from typing import Literal
+from urllib.parse import urlencode
+
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response
+
+from ..models.api_models import SpriteFrameResponse, SpriteSheetResponse
+from ..services.library_service import LibraryService
+from ..services.sprite_sheets import (
+    SPRITE_MEDIA_TYPE,
+    SpriteSheet,
+    SpriteSheetCache,
+    build_sprite_sheet,
+)
+from .image_router import IMMUTABLE_CACHE_CONTROL, REVALIDATE_CACHE_CONTROL
+from .library_router import etag_matches, resolve_library
+
+router = APIRouter()
+
+# 1 枚のスプライトシートにまとめる最大件数
+MAX_SPRITE_PAGE_SIZE: int = 200
+
+# タイル（1 要素の画像）の一辺の既定値と範囲（px）
+DEFAULT_TILE_SIZE: int = 128
+MIN_TILE_SIZE: int = 16
+MAX_TILE_SIZE: int = 256
+
+KindParam = Literal["scenes", "environments"]
+
+
+def get_library_service(request: Request, library: str | None = None) -> LibraryService:
+    """app.state から LibraryService を取得する依存関数（?library= で名前付きライブラリを選択）。"""
+    return resolve_library(request, library)
+
+
+def load_sprite_sheet(
+    request: Request,
+    service: LibraryService,
+    library: str | None,
+    kind: str,
+    page: int,
+    per_page: int,
+    tile: int,
+) -> tuple[int, int, SpriteSheet]:
+    """現在のバージョンのスプライトシートを返す（未合成の場合は合成する）。
+
+    ブロッキングで画像を読み込むため、スレッドプールから呼ぶ。
+
+    Returns:
+        (バージョン, 全件数, スプライトシート)。
+    """
+    cache: SpriteSheetCache = request.app.state.sprite_sheets
+    version, total, sources = service.image_sources(kind, page * per_page, per_page)
+    sheet = cache.get_or_build(
+        (library, version, kind, page, per_page, tile),
+        lambda: build_sprite_sheet(sources, tile),
+    )
+    return version, total, sheet
+
+
+@router.get("/sprites/{kind}", response_model=SpriteSheetResponse)
+async def get_sprite_sheet(
+    request: Request,
+    kind: KindParam,
+    page: int = Query(default=0, ge=0),
+    per_page: int = Query(default=MAX_SPRITE_PAGE_SIZE, ge=1, le=MAX_SPRITE_PAGE_SIZE),
+    tile: int = Query(default=DEFAULT_TILE_SIZE, ge=MIN_TILE_SIZE, le=MAX_TILE_SIZE),
+    library: str | None = None,
+    service: LibraryService = Depends(get_library_service),
+):
+    """page ページ目（per_page 件ずつ）の画像をまとめたスプライトシートの座標を返す。
+
+    各要素の画像は tile 四方のタイルに縮小され、frames の (x, y) に置かれる。
+    画像がない要素は frames に含まれない。
+    """
+    version, total, sheet = await run_in_threadpool(
+        load_sprite_sheet, request, service, library, kind, page, per_page, tile
+    )
+    params = {"page": page, "per_page": per_page, "tile": tile, "v": version}
+    if library is not None:
+        params["library"] = library
+    return SpriteSheetResponse(
+        version=version,
+        total=total,
+        page=page,
+        per_page=per_page,
+        image_url=f"/api/sprites/{kind}/image?{urlencode(params)}",
+        width=sheet.width,
+        height=sheet.height,
+        tile_size=sheet.tile_size,
+        frames=[SpriteFrameResponse(name=f.name, x=f.x, y=f.y) for f in sheet.frames],
+    )
+
+
+@router.get("/sprites/{kind}/image")
+async def get_sprite_sheet_image(
+    request: Request,
+    kind: KindParam,
+    page: int = Query(default=0, ge=0),
+    per_page: int = Query(default=MAX_SPRITE_PAGE_SIZE, ge=1, le=MAX_SPRITE_PAGE_SIZE),
+    tile: int = Query(default=DEFAULT_TILE_SIZE, ge=MIN_TILE_SIZE, le=MAX_TILE_SIZE),
+    v: int | None = None,
+    library: str | None = None,
+    service: LibraryService = Depends(get_library_service),
+):
+    """スプライトシートの画像を返す（ETag 一致時は 304）。
+
+    v が現在のバージョンと一致する場合は immutable、それ以外は再検証付きで返す。
+    """
+    version, _, sheet = await run_in_threadpool(
+        load_sprite_sheet, request, service, library, kind, page, per_page, tile
+    )
+    headers = {
+        "ETag": sheet.etag,
+        "Cache-Control": IMMUTABLE_CACHE_CONTROL if v == version else REVALIDATE_CACHE_CONTROL,
+    }
+    if etag_matches(request.headers.get("if-none-match"), sheet.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=sheet.image, media_type=SPRITE_MEDIA_TYPE, headers=headers)
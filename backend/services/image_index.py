@@ -0,0 +1,193 @@
+"""ImageIndex: ライブラリディレクトリ配下の画像ファイルの索引
+
+ライブラリの読み込み時に、ライブラリディレクトリを os.scandir で一度だけ走査し、
+画像ファイルごとにサイズ・mtime・内容ハッシュ（SHA-256）を記録する。
+/api/images はこの索引を引くだけで配信するファイルを決め、リクエストごとの
+Path.resolve()・exists() を行わない。索引にないパス（ディレクトリ外を指すパスを含む）は拒否する。
+
+索引は構築後に変更されない。再構築時は前回の索引を渡すと、サイズ・mtime が変わっていない
+ファイルのハッシュを再利用する（変更されたファイルのみ読み直す）。
+配信時は revalidate() で 1 件ずつサイズ・mtime を確かめ、変更・削除されたファイルは
+with_entry() で差し替えた索引を作る。
+ドット始まりのディレクトリは走査せず、ディレクトリ外を指すシンボリックリンクは索引に含めない。
+"""
+
+import hashlib
+import os
+import posixpath
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+
+# 索引に含める画像の拡張子
+IMAGE_SUFFIXES: frozenset[str] = frozenset({
+    ".png", ".jpg", ".jpeg", ".gif", ".webp", ".bmp", ".svg", ".avif",
+})
+
+# ハッシュ計算に用いるスレッド数の上限（hashlib は計算中に GIL を解放する）
+_MAX_HASH_WORKERS: int = 8
+
+_HASH_CHUNK_SIZE: int = 1024 * 1024
+
+
+def file_hash(path: Path) -> str:
+    """ファイル内容の SHA-256（16 進）を返す。"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(_HASH_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@dataclass(frozen=True)
+class ImageEntry:
+    """索引に登録された画像ファイル。"""
+
+    path: Path
+    size: int
+    mtime_ns: int
+    content_hash: str
+
+
+def revalidate(entry: ImageEntry) -> ImageEntry | None:
+    """entry のファイルのサイズ・mtime を確かめる。
+
+    Returns:
+        変わっていない場合は entry、変わった場合は内容ハッシュを求め直したもの、
+        ファイルが削除された場合は None。
+    """
+    try:
+        stat = os.stat(entry.path)
+        if (stat.st_size, stat.st_mtime_ns) == (entry.size, entry.mtime_ns):
+            return entry
+        if not os.path.isfile(entry.path):
+            return None
+        return ImageEntry(entry.path, stat.st_size, stat.st_mtime_ns, file_hash(entry.path))
+    except OSError:
+        return None
+
+
+def _normalize(relative_path: str) -> str | None:
+    """URL 中の相対パスを索引のキーに正規化する。ディレクトリ外を指す場合は None。"""
+    if not relative_path or relative_path.startswith("/") or "\\" in relative_path:
+        return None
+    key = posixpath.normpath(relative_path)
+    if key == ".." or key.startswith("../"):
+        return None
+    return key
+
+
+def _scan(root: Path) -> Iterator[tuple[str, str, int, int]]:
+    """root 配下の画像ファイルの (相対パス, 絶対パス, サイズ, mtime) を列挙する。"""
+    root_str = str(root)
+    pending = [("", root_str)]
+    while pending:
+        prefix, directory = pending.pop()
+        try:
+            it = os.scandir(directory)
+        except OSError:
+            continue
+        with it:
+            for entry in it:
+                if entry.name.startswith("."):
+                    continue
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append((prefix + entry.name + "/", entry.path))
+                        continue
+                    if os.path.splitext(entry.name)[1].lower() not in IMAGE_SUFFIXES:
+                        continue
+                    if entry.is_symlink():
+                        target = os.path.realpath(entry.path)
+                        if os.path.commonpath([root_str, target]) != root_str:
+                            continue  # ディレクトリ外を指すリンク
+                    if not entry.is_file():
+                        continue
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                yield prefix + entry.name, entry.path, stat.st_size, stat.st_mtime_ns
+
+
+class ImageIndex:
+    """ライブラリディレクトリ配下の画像ファイルの不変な索引。"""
+
+    def __init__(self, root: Path, entries: dict[str, ImageEntry]) -> None:
+        self._root = root
+        self._entries = entries
+
+    @classmethod
+    def build(
+        cls,
+        root: Path,
+        previous: "ImageIndex | None" = None,
+        hash_workers: int | None = None,
+    ) -> "ImageIndex":
+        """root を走査して索引を構築する。
+
+        Args:
+            root: ライブラリディレクトリ。
+            previous: 前回の索引。サイズ・mtime が一致するファイルはハッシュを再利用する。
+            hash_workers: ハッシュ計算のスレッド数。None の場合は CPU コア数（上限 8）。
+        """
+        root = root.resolve()
+        reusable = previous._entries if previous is not None and previous._root == root else {}
+        entries: dict[str, ImageEntry] = {}
+        to_hash: list[tuple[str, str, int, int]] = []
+        for key, path, size, mtime_ns in _scan(root):
+            old = reusable.get(key)
+            if old is not None and (old.size, old.mtime_ns) == (size, mtime_ns):
+                entries[key] = old
+            else:
+                to_hash.append((key, path, size, mtime_ns))
+
+        def hash_one(item: tuple[str, str, int, int]) -> ImageEntry | None:
+            _, path, size, mtime_ns = item
+            try:
+                return ImageEntry(Path(path), size, mtime_ns, file_hash(Path(path)))
+            except OSError:
+                return None  # 走査後に削除された
+
+        workers = min(hash_workers or os.cpu_count() or 1, _MAX_HASH_WORKERS)
+        if workers > 1 and len(to_hash) > 1:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                hashed = list(executor.map(hash_one, to_hash))
+        else:
+            hashed = [hash_one(item) for item in to_hash]
+        for (key, *_), entry in zip(to_hash, hashed):
+            if entry is not None:
+                entries[key] = entry
+        return cls(root, entries)
+
+    @property
+    def root(self) -> Path:
+        """索引を構築したディレクトリ（絶対パス）。"""
+        return self._root
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, relative_path: str) -> bool:
+        return self.get(relative_path) is not None
+
+    def entries_equal(self, other: "ImageIndex") -> bool:
+        """other と同じファイル・内容の索引か。"""
+        return self._root == other._root and self._entries == other._entries
+
+    def get(self, relative_path: str) -> ImageEntry | None:
+        """ライブラリディレクトリ基準の相対パスの画像を返す。索引にない場合は None。"""
+        key = _normalize(relative_path)
+        return self._entries.get(key) if key is not None else None
+
+    def with_entry(self, relative_path: str, entry: ImageEntry | None) -> "ImageIndex":
+        """relative_path の画像を entry に差し替えた索引を返す（None の場合は取り除く）。"""
+        key = _normalize(relative_path)
+        if key is None:
+            return self
+        entries = dict(self._entries)
+        if entry is None:
+            entries.pop(key, None)
+        else:
+            entries[key] = entry
+        return ImageIndex(self._root, entries)
@@ -0,0 +1,107 @@
+"""ImageMemoryCache: /api/images で配信する画像の内容をメモリに保持する LRU キャッシュ
+
+同じ画像（一覧のサムネイルなど）が繰り返し要求される場合に、毎回ディスクから読まずに
+メモリ上のバイト列を返す。合計サイズの上限（max_bytes）を超えた場合は参照の古いものから
+破棄し、1 件あたりの上限（max_object_bytes）を超える画像はキャッシュしない（ファイルから配信する）。
+
+エントリはファイルのパスごとに 1 件で、読み込んだ時点のスタンプ（画像の索引のサイズ・mtime）を
+合わせて保持する。索引の更新でスタンプが変わった場合は、古い内容を破棄して読み直す。
+ヒット・ミスの回数は stats() で参照できる。
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from collections.abc import Hashable
+from dataclasses import dataclass
+from pathlib import Path
+
+# 合計サイズの上限のデフォルト
+DEFAULT_MEMORY_CACHE_BYTES: int = 64 * 1024 * 1024
+# 1 件あたりのサイズの上限のデフォルト
+DEFAULT_MEMORY_CACHE_MAX_OBJECT_BYTES: int = 1024 * 1024
+
+
+@dataclass(frozen=True)
+class ImageMemoryCacheStats:
+    """キャッシュの統計情報。"""
+
+    hits: int
+    misses: int
+    entries: int
+    bytes: int
+    max_bytes: int
+    max_object_bytes: int
+
+
+class ImageMemoryCache:
+    """画像のバイト列を合計サイズの上限つきで保持する（LRU、スレッドセーフ）。"""
+
+    def __init__(
+        self,
+        max_bytes: int = DEFAULT_MEMORY_CACHE_BYTES,
+        max_object_bytes: int = DEFAULT_MEMORY_CACHE_MAX_OBJECT_BYTES,
+    ) -> None:
+        self._max_bytes = max_bytes
+        self._max_object_bytes = min(max_object_bytes, max_bytes)
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[Path, tuple[Hashable, bytes]] = OrderedDict()
+        self._total_bytes = 0
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, path: Path, stamp: Hashable) -> bytes | None:
+        """path の内容を返す。保持していない場合・スタンプが異なる場合は None（ミス）。"""
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry[0] == stamp:
+                self._entries.move_to_end(path)
+                self._hits += 1
+                return entry[1]
+            if entry is not None:
+                self._discard(path)  # 索引の更新で内容が変わった
+            self._misses += 1
+            return None
+
+    def load(self, path: Path, stamp: Hashable, expected_size: int | None = None) -> bytes | None:
+        """path を読み込んでキャッシュに格納し、内容を返す。
+
+        ファイルが 1 件あたりの上限より大きい場合は読み込まずに None を返す。
+        expected_size を指定した場合、読み込んだサイズが一致しなければ（索引の作成後に
+        変更された）キャッシュに格納しない。ブロッキングで読み込むため、スレッドプールから呼ぶ。
+
+        Raises:
+            OSError: ファイルを読み込めない場合。
+        """
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size > self._max_object_bytes:
+                return None
+            data = f.read(self._max_object_bytes + 1)
+        if len(data) > self._max_object_bytes:
+            return None
+        if expected_size is not None and len(data) != expected_size:
+            return data
+        with self._lock:
+            self._discard(path)
+            self._entries[path] = (stamp, data)
+            self._total_bytes += len(data)
+            while self._total_bytes > self._max_bytes:
+                self._discard(next(iter(self._entries)))
+        return data
+
+    def stats(self) -> ImageMemoryCacheStats:
+        """ヒット・ミスの回数と使用量を返す。"""
+        with self._lock:
+            return ImageMemoryCacheStats(
+                hits=self._hits,
+                misses=self._misses,
+                entries=len(self._entries),
+                bytes=self._total_bytes,
+                max_bytes=self._max_bytes,
+                max_object_bytes=self._max_object_bytes,
+            )
+
+    def _discard(self, path: Path) -> None:
+        entry = self._entries.pop(path, None)
+        if entry is not None:
+            self._total_bytes -= len(entry[1])
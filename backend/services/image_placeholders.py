@@ -0,0 +1,164 @@
+"""画像のプレースホルダー: プレビュー画像・サムネイルの寸法と極小のサムネイル（LQIP）
+
+一覧のカードは画像の読み込みが終わるまで大きさが決まらず、レイアウトが崩れる。
+ライブラリの読み込み時に、シーンのプレビュー画像・環境のサムネイルごとに幅・高さと
+PLACEHOLDER_SIZE px 四方に収まる WebP のサムネイル（data URI）を求めておき、
+一覧のレスポンスに含めることで、画像の読み込み前から枠とぼかした画像を表示できるようにする。
+
+寸法は画像のヘッダから読み（JPEG は縮小デコードする）、計算はワーカープールで並列に行う。
+LibraryService は読み込みの完了後にバックグラウンドのスレッドから update() を呼ぶ。
+結果は画像の内容ハッシュをキーとして JSON ファイルに保存し、再起動後は計算し直さない。
+"""
+
+import base64
+import io
+import json
+import multiprocessing
+import os
+import sys
+import threading
+from collections.abc import Iterable
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from backend.services.image_index import ImageEntry
+
+# LQIP の長辺（px）
+PLACEHOLDER_SIZE: int = 16
+
+# 保存形式のバージョン。計算方法を変更した場合は値を上げて保存済みの結果を無効化する
+PLACEHOLDER_FORMAT_VERSION: int = 1
+
+_LQIP_QUALITY: int = 40
+
+# EXIF の Orientation のうち、縦横が入れ替わるもの
+_TRANSPOSED_ORIENTATIONS: frozenset[int] = frozenset({5, 6, 7, 8})
+_EXIF_ORIENTATION: int = 0x0112
+
+
+@dataclass(frozen=True)
+class ImagePlaceholder:
+    """画像の寸法（EXIF の向きを反映した表示上の幅・高さ）と LQIP の data URI。"""
+
+    width: int
+    height: int
+    lqip: str
+
+
+def compute_placeholder(path: Path) -> ImagePlaceholder | None:
+    """path の画像のプレースホルダーを求める。Pillow で読み込めない画像（SVG など）は None。
+
+    ワーカープロセスで実行される。
+    """
+    try:
+        with Image.open(path) as image:
+            # 寸法はヘッダのみから求める（デコードしない）
+            width, height = image.size
+            if image.getexif().get(_EXIF_ORIENTATION) in _TRANSPOSED_ORIENTATIONS:
+                width, height = height, width
+            image.draft("RGB", (PLACEHOLDER_SIZE, PLACEHOLDER_SIZE))
+            image = ImageOps.exif_transpose(image)
+            image.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE), Image.Resampling.BILINEAR)
+            if image.mode not in ("RGB", "RGBA"):
+                image = image.convert("RGBA")
+            buffer = io.BytesIO()
+            image.save(buffer, format="WEBP", quality=_LQIP_QUALITY)
+    except (OSError, UnidentifiedImageError, ValueError, Image.DecompressionBombError):
+        return None
+    lqip = "data:image/webp;base64," + base64.b64encode(buffer.getvalue()).decode("ascii")
+    return ImagePlaceholder(width=width, height=height, lqip=lqip)
+
+
+class ImagePlaceholderCache:
+    """画像の内容ハッシュ → プレースホルダーを保持し、JSON ファイルに保存する（スレッドセーフ）。
+
+    読み込めない画像は None として記録し、内容が変わるまで計算し直さない。
+    """
+
+    def __init__(self, path: Path | None = None) -> None:
+        """
+        Args:
+            path: 保存先の JSON ファイル。None の場合は保存しない（メモリ上のみ）。
+                存在する場合は読み込む（形式が異なる・壊れている場合は破棄する）。
+        """
+        self._path = path
+        self._lock = threading.Lock()
+        self._placeholders: dict[str, ImagePlaceholder | None] = {}
+        if path is not None:
+            self._load(path)
+
+    def __len__(self) -> int:
+        return len(self._placeholders)
+
+    def get(self, content_hash: str) -> ImagePlaceholder | None:
+        """内容ハッシュの画像のプレースホルダーを返す。未計算・読み込めない画像の場合は None。"""
+        return self._placeholders.get(content_hash)
+
+    def update(self, images: Iterable[ImageEntry], workers: int = 1) -> int:
+        """images のうち未計算のもののプレースホルダーを求めて保存する。
+
+        Args:
+            images: 対象の画像（画像の索引のエントリ）。
+            workers: 計算に用いるプロセス数。1 以下の場合は呼び出し元のスレッドで計算する。
+
+        Returns:
+            新たに計算した画像の数。
+        """
+        pending: dict[str, Path] = {}
+        for image in images:
+            if image.content_hash not in self._placeholders:
+                pending.setdefault(image.content_hash, image.path)
+        if not pending:
+            return 0
+
+        hashes, paths = list(pending), list(pending.values())
+        workers = min(workers, len(paths))
+        if workers > 1:
+            with ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+            ) as executor:
+                results = list(executor.map(compute_placeholder, paths, chunksize=16))
+        else:
+            results = [compute_placeholder(path) for path in paths]
+
+        with self._lock:
+            self._placeholders.update(zip(hashes, results))
+            if self._path is not None:
+                self._save(self._path)
+        return len(paths)
+
+    # ------------------------------------------------------------------
+
+    def _load(self, path: Path) -> None:
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+            if data.get("version") != PLACEHOLDER_FORMAT_VERSION:
+                return
+            self._placeholders = {
+                content_hash: ImagePlaceholder(*value) if value is not None else None
+                for content_hash, value in data["placeholders"].items()
+            }
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            # 存在しない・壊れている場合は計算し直す
+            self._placeholders = {}
+
+    def _save(self, path: Path) -> None:
+        data = {
+            "version": PLACEHOLDER_FORMAT_VERSION,
+            "placeholders": {
+                content_hash: (
+                    [value.width, value.height, value.lqip] if value is not None else None
+                )
+                for content_hash, value in self._placeholders.items()
+            },
+        }
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            partial = path.with_name(f"{path.name}.{os.getpid()}.partial")
+            partial.write_text(json.dumps(data, separators=(",", ":")), encoding="utf-8")
+            os.replace(partial, path)
+        except OSError as exc:
+            print(f"エラー: 画像のプレースホルダーを保存できません: {path}: {exc}", file=sys.stderr)
@@ -0,0 +1,333 @@
+"""ImageVariantCache: 画像のリサイズ版・形式変換版（バリアント）を生成し、ディスクにキャッシュする
+
+/api/images/{path}?w=&h=&fit= で要求されたサイズのバリアントや、Accept に応じた
+WebP・JPEG 版（レンディション）を Pillow で生成する。
+生成はワーカープール（既定はプロセスプール）で行い、イベントループを止めない。
+
+バリアントは「元画像の内容ハッシュ + パラメータ」をキーとしたファイル名でキャッシュディレクトリに
+保存する（元画像が更新されるとキーが変わるため、古いバリアントは参照されなくなり、やがて追い出される）。
+合計サイズが上限を超えた場合は、参照が最も古いものから削除する（LRU）。
+参照順はファイルの mtime にも反映するため、再起動後も引き継がれる。
+ワーカープロセスが異常終了してプールが壊れた場合は、次の生成時にプールを作り直す。
+"""
+
+import hashlib
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import (
+    CancelledError,
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from pathlib import Path
+
+from PIL import Image, ImageOps
+
+# fit の種類（contain: 縦横比を保って枠に収める / cover: 枠を埋めるよう切り抜く / fill: 枠に合わせて伸縮）
+FIT_CONTAIN: str = "contain"
+FIT_COVER: str = "cover"
+FIT_FILL: str = "fill"
+FIT_MODES: tuple[str, ...] = (FIT_CONTAIN, FIT_COVER, FIT_FILL)
+
+# 要求できる最大の幅・高さ（px）
+MAX_VARIANT_SIZE: int = 2048
+
+# キャッシュの合計サイズの上限のデフォルト
+DEFAULT_CACHE_BYTES: int = 512 * 1024 * 1024
+
+# リサイズに対応する拡張子と、バリアントの保存形式
+_FORMATS: dict[str, str] = {
+    ".png": "PNG",
+    ".jpg": "JPEG",
+    ".jpeg": "JPEG",
+    ".webp": "WEBP",
+}
+MEDIA_TYPES: dict[str, str] = {
+    "PNG": "image/png",
+    "JPEG": "image/jpeg",
+    "WEBP": "image/webp",
+}
+
+# 変換先に指定できる形式と拡張子
+RENDITION_FORMATS: dict[str, str] = {
+    "WEBP": ".webp",
+    "JPEG": ".jpg",
+}
+
+# JPEG・WebP の品質のデフォルト
+DEFAULT_QUALITY: int = 85
+
+# 生成途中のファイルの拡張子（起動時に残っていれば削除する）
+_PARTIAL_SUFFIX: str = ".partial"
+
+
+def is_resizable(path: Path) -> bool:
+    """リサイズに対応する画像形式か（拡張子で判定する）。"""
+    return path.suffix.lower() in _FORMATS
+
+
+def source_format(path: Path) -> str | None:
+    """画像の形式（Pillow の形式名）を拡張子から返す。リサイズに対応しない形式の場合は None。"""
+    return _FORMATS.get(path.suffix.lower())
+
+
+@dataclass(frozen=True)
+class VariantSpec:
+    """バリアントのパラメータ。
+
+    width・height の一方のみの場合は縦横比を保って縮小する。両方とも None の場合は縮小せず、
+    image_format（RENDITION_FORMATS のいずれか）への変換のみを行う。
+    image_format が None の場合は元画像と同じ形式で保存する。
+    """
+
+    width: int | None = None
+    height: int | None = None
+    fit: str = FIT_CONTAIN
+    image_format: str | None = None
+    quality: int = DEFAULT_QUALITY
+
+    def __post_init__(self) -> None:
+        if self.width is None and self.height is None and self.image_format is None:
+            raise ValueError("width・height・image_format の少なくとも 1 つを指定してください")
+        if self.fit not in FIT_MODES:
+            raise ValueError(f"未対応の fit です: {self.fit}")
+        if self.image_format is not None and self.image_format not in RENDITION_FORMATS:
+            raise ValueError(f"未対応の変換先の形式です: {self.image_format}")
+        if not 1 <= self.quality <= 100:
+            raise ValueError(f"quality は 1〜100 で指定してください: {self.quality}")
+
+    def output_format(self, source_suffix: str) -> str:
+        """バリアントの保存形式（Pillow の形式名）を返す。"""
+        return self.image_format or _FORMATS[source_suffix.lower()]
+
+    def cache_name(self, source_hash: str, source_suffix: str) -> str:
+        """キャッシュファイル名（元画像のハッシュとパラメータから決まる）を返す。"""
+        params = f"{source_hash}:{self.width or ''}x{self.height or ''}:{self.fit}"
+        if self.image_format is None:
+            suffix = source_suffix.lower()
+        else:
+            params += f":{self.image_format}:{self.quality}"
+            suffix = RENDITION_FORMATS[self.image_format]
+        key = hashlib.sha256(params.encode("ascii")).hexdigest()[:32]
+        return key + suffix
+
+
+def _target_size(
+    size: tuple[int, int], width: int | None, height: int | None
+) -> tuple[int, int]:
+    """枠 (width, height) を元画像より大きくならないよう縮めて返す（片方省略時は縦横比から補う）。"""
+    source_width, source_height = size
+    if width is None:
+        width = max(1, round(source_width * height / source_height))
+    elif height is None:
+        height = max(1, round(source_height * width / source_width))
+    scale = min(1.0, source_width / width, source_height / height)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def resize_image(image: Image.Image, spec: VariantSpec) -> Image.Image:
+    """spec に従って縮小した画像を返す（拡大はしない）。"""
+    if spec.width is None and spec.height is None:
+        return image
+    if spec.width is None or spec.height is None or spec.fit == FIT_CONTAIN:
+        box = (spec.width or image.width, spec.height or image.height)
+        resized = image.copy()
+        resized.thumbnail(box, Image.Resampling.LANCZOS)
+        return resized
+    if spec.fit == FIT_COVER:
+        return ImageOps.fit(
+            image, _target_size(image.size, spec.width, spec.height), Image.Resampling.LANCZOS
+        )
+    return image.resize(
+        (min(spec.width, image.width), min(spec.height, image.height)),
+        Image.Resampling.LANCZOS,
+    )
+
+
+def save_image(
+    image: Image.Image, destination: Path, image_format: str, quality: int = DEFAULT_QUALITY
+) -> None:
+    """image_format で destination に保存する（生成途中のファイルを見せないよう rename する）。"""
+    if image_format == "JPEG" and image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    partial = destination.with_name(f"{destination.name}.{os.getpid()}{_PARTIAL_SUFFIX}")
+    options = {"quality": quality} if image_format in ("JPEG", "WEBP") else {}
+    image.save(partial, format=image_format, **options)
+    os.replace(partial, destination)
+
+
+def render_variant(source: Path, destination: Path, spec: VariantSpec) -> int:
+    """source から spec のバリアントを生成して destination に保存し、そのサイズを返す。
+
+    ワーカープロセスで実行される。
+    """
+    image_format = spec.output_format(source.suffix)
+    with Image.open(source) as image:
+        if spec.width is not None and spec.height is not None:
+            image.draft("RGB", (spec.width, spec.height))  # JPEG は縮小デコードする
+        image = ImageOps.exif_transpose(image)
+        save_image(resize_image(image, spec), destination, image_format, spec.quality)
+    return destination.stat().st_size
+
+
+class ImageVariantCache:
+    """リサイズ版の画像をワーカープールで生成し、ディスク上に LRU でキャッシュする。"""
+
+    def __init__(
+        self,
+        cache_dir: Path,
+        max_bytes: int = DEFAULT_CACHE_BYTES,
+        workers: int | None = None,
+    ) -> None:
+        """
+        Args:
+            cache_dir: バリアントを保存するディレクトリ（存在しない場合は作成する）。
+            max_bytes: キャッシュの合計サイズの上限（バイト）。
+            workers: 生成に用いるプロセス数。None の場合は CPU コア数。
+                1 以下の場合はプロセスを使わず、1 スレッドで生成する。
+        """
+        self._cache_dir = cache_dir
+        self._max_bytes = max_bytes
+        self._workers = workers or os.cpu_count() or 1
+        self._lock = threading.Lock()
+        self._executor: Executor | None = None
+        # キャッシュファイル名 → サイズ（参照の古い順）
+        self._entries: OrderedDict[str, int] = OrderedDict()
+        self._total_bytes = 0
+        self._pending: dict[str, Future[Path]] = {}
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        self._scan()
+
+    @property
+    def total_bytes(self) -> int:
+        """キャッシュ済みのバリアントの合計サイズ（バイト）。"""
+        return self._total_bytes
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(
+        self,
+        source: Path,
+        source_hash: str,
+        spec: VariantSpec,
+        executor: Executor | None = None,
+    ) -> Future[Path]:
+        """source の spec のバリアントのパスを返す Future を返す。
+
+        source_hash は元画像の内容ハッシュ（ImageIndex の content_hash）。
+        executor を指定した場合は、このキャッシュのワーカープールの代わりにそれで生成する
+        （事前生成を優先度の低いプロセスで行う場合など）。
+
+        キャッシュ済みの場合は完了済みの Future を返す。同じバリアントを生成中の場合は
+        その Future を共有する（同時に要求されても 1 回だけ生成する）。
+        """
+        name = spec.cache_name(source_hash, source.suffix)
+        path = self._cache_dir / name
+        with self._lock:
+            pending = self._pending.get(name)
+            if pending is not None:
+                return pending
+            if name in self._entries and self._touch(name, path):
+                done: Future[Path] = Future()
+                done.set_result(path)
+                return done
+            if executor is not None:
+                future = executor.submit(render_variant, source, path, spec)
+            else:
+                try:
+                    future = self._get_executor().submit(render_variant, source, path, spec)
+                except BrokenProcessPool:
+                    # 以前の生成でワーカーが異常終了した（メモリ不足など）。プールを作り直す
+                    self._replace_broken_executor()
+                    future = self._get_executor().submit(render_variant, source, path, spec)
+            self._pending[name] = result = Future()
+        future.add_done_callback(lambda f: self._finish(name, path, f, result))
+        return result
+
+    def close(self) -> None:
+        """ワーカープールを停止する。"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    # ------------------------------------------------------------------
+
+    def _get_executor(self) -> Executor:
+        # 最初の生成時にワーカーを起動する（リサイズを使わない場合はプロセスを作らない）
+        if self._executor is None:
+            if self._workers > 1:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self._workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix="image-variant"
+                )
+        return self._executor
+
+    def _replace_broken_executor(self) -> None:
+        # self._lock を保持して呼ぶ。次の _get_executor() で新しいプールを作る
+        broken, self._executor = self._executor, None
+        if broken is not None:
+            broken.shutdown(wait=False, cancel_futures=True)
+
+    def _touch(self, name: str, path: Path) -> bool:
+        # 参照順を更新する。ファイルが外部から削除されていた場合は False
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            self._total_bytes -= self._entries.pop(name)
+            return False
+        self._entries.move_to_end(name)
+        return True
+
+    def _finish(
+        self, name: str, path: Path, future: Future[int], result: Future[Path]
+    ) -> None:
+        with self._lock:
+            del self._pending[name]
+            exc = CancelledError() if future.cancelled() else future.exception()
+            if exc is None:
+                self._total_bytes += future.result() - self._entries.pop(name, 0)
+                self._entries[name] = future.result()
+                self._evict()
+        if exc is None:
+            result.set_result(path)
+        else:
+            result.set_exception(exc)
+
+    def _evict(self) -> None:
+        # 直前に追加したもの（末尾）は残す
+        while self._total_bytes > self._max_bytes and len(self._entries) > 1:
+            name, size = self._entries.popitem(last=False)
+            self._total_bytes -= size
+            try:
+                (self._cache_dir / name).unlink()
+            except FileNotFoundError:
+                pass
+
+    def _scan(self) -> None:
+        """既存のキャッシュファイルを mtime の古い順に読み込む。"""
+        entries: list[tuple[int, str, int]] = []
+        with os.scandir(self._cache_dir) as it:
+            for entry in it:
+                if not entry.is_file():
+                    continue
+                if entry.name.endswith(_PARTIAL_SUFFIX):
+                    os.unlink(entry.path)  # 前回の生成途中で停止した
+                    continue
+                stat = entry.stat()
+                entries.append((stat.st_mtime_ns, entry.name, stat.st_size))
+        for _, name, size in sorted(entries):
+            self._entries[name] = size
+            self._total_bytes += size
+        self._evict()
@@ -0,0 +1,213 @@
+"""ImageWarmup: ライブラリが参照する画像の標準のバリアントを事前に生成する
+
+デプロイ直後はバリアントのキャッシュが空のため、最初の利用者が縮小・変換の待ち時間を負う。
+ライブラリの読み込み後に、シーンのプレビュー画像・環境のサムネイルごとに標準のバリアント
+（standard_variants）を ImageVariantCache に生成しておく。
+
+生成は優先度を下げた（os.nice）専用のプロセスプールで行い、リクエスト処理のワーカープールとは
+分ける。キューに積むのはワーカー数分までとし、同じバリアントを要求したリクエストが
+事前生成の長い待ち行列の後ろで待たされないようにする。起動（readiness）は待たない。
+ワーカープロセスが異常終了してプールが壊れた場合は、プールを作り直して残りを続ける。
+"""
+
+import multiprocessing
+import os
+import sys
+import threading
+from collections.abc import Iterable, Sequence
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    CancelledError,
+    Future,
+    ProcessPoolExecutor,
+    wait,
+)
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from pathlib import Path
+
+from backend.services.image_index import ImageEntry
+from backend.services.image_variants import ImageVariantCache, VariantSpec, is_resizable
+from backend.services.process_priority import lower_priority
+
+# 事前生成のワーカープロセスの nice 値の増分（大きいほど優先度が低い）
+WARMUP_NICENESS: int = 19
+
+# 進捗をコンソールに表示する間隔（件数に対する割合）
+_REPORT_FRACTION: float = 0.1
+
+
+def standard_variants(
+    widths: Sequence[int], rendition_quality: int | None = None
+) -> list[VariantSpec]:
+    """事前生成する標準のバリアントを返す。
+
+    widths の各幅に縮小したもの。rendition_quality を指定した場合（WebP への変換が有効な場合）は、
+    それぞれの WebP 版と、元の大きさの WebP 版も含める。
+    """
+    specs = [VariantSpec(width=width) for width in widths]
+    if rendition_quality is not None:
+        specs += [
+            VariantSpec(width=width, image_format="WEBP", quality=rendition_quality)
+            for width in (*widths, None)
+        ]
+    return specs
+
+
+@dataclass(frozen=True)
+class WarmupProgress:
+    """事前生成の進捗。done は失敗したものを含む処理済みの件数。"""
+
+    total: int
+    done: int
+    failed: int
+    running: bool
+
+
+class ImageWarmup:
+    """参照されている画像の標準のバリアントを、優先度の低いプロセスプールで生成する。"""
+
+    def __init__(
+        self,
+        variants: ImageVariantCache,
+        specs: Sequence[VariantSpec],
+        workers: int | None = None,
+        niceness: int = WARMUP_NICENESS,
+    ) -> None:
+        """
+        Args:
+            variants: 生成したバリアントを格納する ImageVariantCache。
+            specs: 画像ごとに生成するバリアント。
+            workers: 生成に用いるプロセス数。None の場合は CPU コア数。
+            niceness: ワーカープロセスの nice 値の増分。
+        """
+        self._variants = variants
+        self._specs = list(specs)
+        self._workers = workers or os.cpu_count() or 1
+        self._niceness = niceness
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._executor: ProcessPoolExecutor | None = None
+        self._total = 0
+        self._done = 0
+        self._failed = 0
+
+    def start(self, images: Iterable[ImageEntry]) -> None:
+        """images の標準のバリアントの生成をバックグラウンドで開始する（完了を待たない）。
+
+        リサイズに対応しない形式の画像は対象外。すでに実行中の場合は何もしない。
+        """
+        tasks = [
+            (image, spec) for image in images if is_resizable(image.path) for spec in self._specs
+        ]
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._total, self._done, self._failed = len(tasks), 0, 0
+            if self._executor is None:
+                self._executor = self._create_executor()
+            self._thread = threading.Thread(
+                target=self._run, args=(tasks, self._executor), name="image-warmup", daemon=True
+            )
+            self._thread.start()
+
+    def progress(self) -> WarmupProgress:
+        """現在の進捗を返す。"""
+        with self._lock:
+            return WarmupProgress(
+                total=self._total,
+                done=self._done,
+                failed=self._failed,
+                running=self._thread is not None and self._thread.is_alive(),
+            )
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """生成の完了を待つ。timeout 秒以内に完了した（または開始していない）場合は True。"""
+        thread = self._thread
+        if thread is None:
+            return True
+        thread.join(timeout)
+        return not thread.is_alive()
+
+    def close(self) -> None:
+        """生成を中止し、ワーカープールを停止する。"""
+        self._stop.set()
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+        self.wait()
+
+    # ------------------------------------------------------------------
+
+    def _create_executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self._workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=lower_priority,
+            initargs=(self._niceness,),
+        )
+
+    def _replace_broken_executor(self, broken: ProcessPoolExecutor) -> ProcessPoolExecutor:
+        """壊れたプールを破棄して作り直す。close() 後の場合は RuntimeError。"""
+        with self._lock:
+            if self._stop.is_set() or self._executor is None:
+                raise RuntimeError("事前生成は停止されました")
+            if self._executor is broken:
+                self._executor = self._create_executor()
+            executor = self._executor
+        broken.shutdown(wait=False, cancel_futures=True)
+        return executor
+
+    def _submit(
+        self, image: ImageEntry, spec: VariantSpec, executor: ProcessPoolExecutor
+    ) -> tuple[Future[Path], ProcessPoolExecutor]:
+        try:
+            future = self._variants.get(image.path, image.content_hash, spec, executor=executor)
+        except BrokenProcessPool:
+            # 以前の生成でワーカーが異常終了した（メモリ不足など）。プールを作り直して続ける
+            print("エラー: 事前生成のワーカープロセスが停止しました（プールを作り直します）",
+                  file=sys.stderr)
+            executor = self._replace_broken_executor(executor)
+            future = self._variants.get(image.path, image.content_hash, spec, executor=executor)
+        return future, executor
+
+    def _run(
+        self, tasks: list[tuple[ImageEntry, VariantSpec]], executor: ProcessPoolExecutor
+    ) -> None:
+        print(f"画像のバリアントの事前生成を開始します: {len(tasks)} 件")
+        report_every = max(1, int(len(tasks) * _REPORT_FRACTION))
+        in_flight: set[Future[Path]] = set()
+        try:
+            for image, spec in tasks:
+                if self._stop.is_set():
+                    break
+                # キューに積むのはワーカー数分まで（リクエストが長い待ち行列の後ろに並ばないように）
+                while len(in_flight) >= self._workers:
+                    finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    self._record(finished, report_every)
+                future, executor = self._submit(image, spec, executor)
+                in_flight.add(future)
+        except RuntimeError:
+            pass  # close() でワーカープールが停止された
+        finally:
+            finished, _ = wait(in_flight)
+            self._record(finished, report_every)
+        progress = self.progress()
+        print(
+            f"画像のバリアントの事前生成を終了しました: {progress.done}/{progress.total} 件"
+            f"（失敗 {progress.failed} 件）"
+        )
+
+    def _record(self, finished: Iterable[Future[Path]], report_every: int) -> None:
+        for future in finished:
+            exc = CancelledError() if future.cancelled() else future.exception()
+            with self._lock:
+                self._done += 1
+                self._failed += exc is not None
+                done, total = self._done, self._total
+            if exc is not None and not isinstance(exc, CancelledError):
+                print(f"エラー: 画像のバリアントの事前生成に失敗しました: {exc}", file=sys.stderr)
+            if done % report_every == 0 and done < total:
+                print(f"画像のバリアントの事前生成: {done}/{total} 件")
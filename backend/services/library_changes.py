@@ -0,0 +1,165 @@
+"""ライブラリの変更履歴（差分同期用）
+
+ライブラリの状態を差し替えるたびに、直前の状態とのシーン・環境の差分（追加・変更・削除された
+name）をバージョン番号とともに記録する。クライアントは手元のバージョンを since として渡し、
+それ以降の差分だけを受け取る。履歴は一定件数のみ保持し、それより古いバージョンからの
+同期は全件の再取得（full resync）とする。
+
+差分は name 単位で、要素の内容のダイジェスト（SHA-256）を比較して判定する。
+同名の要素が複数ある場合は先頭の要素を対象とする（名前索引と同じ）。
+"""
+
+import hashlib
+import json
+import threading
+from collections import deque
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass, field
+
+from pydantic import BaseModel
+
+# 差分を記録する項目の種類
+KIND_SCENES: str = "scenes"
+KIND_ENVIRONMENTS: str = "environments"
+
+# 保持する変更履歴のバージョン数のデフォルト
+DEFAULT_HISTORY_SIZE: int = 100
+
+_ADDED = "added"
+_MODIFIED = "modified"
+_REMOVED = "removed"
+
+
+def _digest(data: str) -> bytes:
+    # 比較にのみ用いるため、SHA-256 の先頭 16 バイトで十分
+    return hashlib.sha256(data.encode("utf-8")).digest()[:16]
+
+
+def digest_items(items: Iterable[BaseModel]) -> dict[str, bytes]:
+    """要素の name から内容のダイジェストへの辞書を作る。"""
+    digests: dict[str, bytes] = {}
+    for item in items:
+        if item.name not in digests:
+            digests[item.name] = _digest(item.model_dump_json())
+    return digests
+
+
+def digest_rows(rows: Iterable[Sequence]) -> dict[str, bytes]:
+    """先頭の列を name とする行から name → ダイジェストの辞書を作る（SQLite ストア用）。"""
+    digests: dict[str, bytes] = {}
+    for row in rows:
+        if row[0] not in digests:
+            digests[row[0]] = _digest(json.dumps(list(row), ensure_ascii=False))
+    return digests
+
+
+def digest_raw_items(items: Iterable[dict]) -> dict[str, bytes]:
+    """未検証の生のマッピングから name → ダイジェストの辞書を作る（遅延検証のストア用）。"""
+    digests: dict[str, bytes] = {}
+    for raw in items:
+        if raw["name"] not in digests:
+            digests[raw["name"]] = _digest(
+                json.dumps(raw, sort_keys=True, ensure_ascii=False, default=str)
+            )
+    return digests
+
+
+@dataclass(frozen=True)
+class ItemChanges:
+    """1 種類の項目の差分（name の集合）。"""
+
+    added: frozenset[str] = frozenset()
+    modified: frozenset[str] = frozenset()
+    removed: frozenset[str] = frozenset()
+
+    @classmethod
+    def between(cls, before: dict[str, bytes], after: dict[str, bytes]) -> "ItemChanges":
+        """2 つのダイジェスト辞書の差分を求める。"""
+        return cls(
+            added=frozenset(after.keys() - before.keys()),
+            modified=frozenset(
+                name for name in after.keys() & before.keys() if after[name] != before[name]
+            ),
+            removed=frozenset(before.keys() - after.keys()),
+        )
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.modified or self.removed)
+
+
+@dataclass(frozen=True)
+class ChangeSet:
+    """あるバージョンで生じた差分。"""
+
+    version: int
+    items: dict[str, ItemChanges] = field(default_factory=dict)
+
+    def names(self, kind: str) -> ItemChanges:
+        return self.items.get(kind, ItemChanges())
+
+
+@dataclass(frozen=True)
+class PendingChanges:
+    """since 以降の差分をまとめたもの。full_resync が True の場合は差分を求められない。"""
+
+    version: int
+    full_resync: bool
+    added: list[str] = field(default_factory=list)
+    modified: list[str] = field(default_factory=list)
+    removed: list[str] = field(default_factory=list)
+
+
+class ChangeHistory:
+    """直近のバージョンの ChangeSet を保持する。"""
+
+    def __init__(self, size: int = DEFAULT_HISTORY_SIZE) -> None:
+        self._lock = threading.Lock()
+        self._changes: deque[ChangeSet] = deque(maxlen=size)
+        # 差分を求められる最も古い since（これより前は履歴から溢れている）
+        self._oldest_base: int | None = None
+
+    def start(self, version: int) -> None:
+        """初回の読み込みを記録する（このバージョン以降の差分を追跡する）。"""
+        with self._lock:
+            self._changes.clear()
+            self._oldest_base = version
+
+    def record(self, change_set: ChangeSet) -> None:
+        """状態の差し替えによる差分を記録する。"""
+        with self._lock:
+            if len(self._changes) == self._changes.maxlen:
+                self._oldest_base = self._changes[0].version
+            self._changes.append(change_set)
+
+    def since(self, kind: str, since: int, current: int) -> PendingChanges:
+        """since より後（current まで）の kind の差分を合成して返す。"""
+        with self._lock:
+            oldest_base = self._oldest_base
+            change_sets = [c for c in self._changes if since < c.version <= current]
+        if oldest_base is None or since < oldest_base or since > current:
+            return PendingChanges(version=current, full_resync=True)
+
+        status: dict[str, str] = {}
+        for change_set in change_sets:
+            changes = change_set.names(kind)
+            for name in changes.added:
+                # 期間内に削除されてから追加された場合は、since 時点から見れば変更
+                status[name] = _MODIFIED if status.get(name) == _REMOVED else _ADDED
+            for name in changes.modified:
+                status[name] = _ADDED if status.get(name) == _ADDED else _MODIFIED
+            for name in changes.removed:
+                if status.get(name) == _ADDED:
+                    del status[name]  # 期間内に追加されて削除された
+                else:
+                    status[name] = _REMOVED
+
+        def names(state: str) -> list[str]:
+            return sorted(name for name, s in status.items() if s == state)
+
+        return PendingChanges(
+            version=current,
+            full_resync=False,
+            added=names(_ADDED),
+            modified=names(_MODIFIED),
+            removed=names(_REMOVED),
+        )
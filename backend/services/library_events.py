@@ -0,0 +1,134 @@
+"""LibraryEventBroadcaster: ライブラリの更新通知を接続中のクライアントへ配信する
+
+LibraryService の状態が差し替わるたびに、新しいバージョンと変更されたシーン・環境の name を
+購読者（Server-Sent Events の接続）ごとのキューへ積む。再読み込みは監視スレッドで行われるため、
+通知は各購読者のイベントループへ call_soon_threadsafe で渡し、購読者はポーリングせずに待つ。
+
+キューの長さは購読者ごとに上限があり、受信が追いつかない購読者のキューが溢れた場合は
+溜まった通知を捨てて「再同期が必要」という通知 1 件に置き換える（全体の配信は遅らせない）。
+"""
+
+import asyncio
+import threading
+from collections import deque
+from dataclasses import dataclass
+
+from backend.services.library_changes import (
+    KIND_ENVIRONMENTS,
+    KIND_SCENES,
+    ChangeSet,
+    ItemChanges,
+)
+
+# 購読者ごとに保持する未配信の通知数のデフォルト
+DEFAULT_MAX_QUEUED: int = 16
+
+
+@dataclass(frozen=True)
+class LibraryEvent:
+    """ライブラリの更新通知。resync が True の場合は通知を取りこぼしている（差分は空）。"""
+
+    version: int
+    scenes: ItemChanges = ItemChanges()
+    environments: ItemChanges = ItemChanges()
+    resync: bool = False
+
+    @classmethod
+    def from_change_set(cls, change_set: ChangeSet) -> "LibraryEvent":
+        return cls(
+            version=change_set.version,
+            scenes=change_set.names(KIND_SCENES),
+            environments=change_set.names(KIND_ENVIRONMENTS),
+        )
+
+    def to_dict(self) -> dict:
+        """SSE の data に載せる JSON 用の辞書を返す（name は昇順）。"""
+        def names(changes: ItemChanges) -> dict[str, list[str]]:
+            return {
+                "added": sorted(changes.added),
+                "modified": sorted(changes.modified),
+                "removed": sorted(changes.removed),
+            }
+
+        return {
+            "version": self.version,
+            "resync": self.resync,
+            "scenes": names(self.scenes),
+            "environments": names(self.environments),
+        }
+
+
+class Subscription:
+    """1 購読者分の通知キュー。購読したイベントループ上でのみ get() する。"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, max_queued: int) -> None:
+        self._loop = loop
+        self._max_queued = max_queued
+        self._queue: deque[LibraryEvent] = deque()
+        self._ready = asyncio.Event()
+
+    @property
+    def pending(self) -> int:
+        """未配信の通知数。"""
+        return len(self._queue)
+
+    async def get(self) -> LibraryEvent:
+        """次の通知を待って返す。"""
+        while not self._queue:
+            self._ready.clear()
+            await self._ready.wait()
+        return self._queue.popleft()
+
+    def _deliver(self, event: LibraryEvent) -> None:
+        # 購読者のイベントループ上で呼ばれる
+        if len(self._queue) >= self._max_queued:
+            self._queue.clear()
+            event = LibraryEvent(version=event.version, resync=True)
+        self._queue.append(event)
+        self._ready.set()
+
+
+class LibraryEventBroadcaster:
+    """ライブラリの更新通知を購読者へ配信する（プロセス内で 1 つ）。"""
+
+    def __init__(self, max_queued: int = DEFAULT_MAX_QUEUED) -> None:
+        """
+        Args:
+            max_queued: 購読者ごとに保持する未配信の通知数の上限。
+        """
+        self._max_queued = max_queued
+        self._lock = threading.Lock()
+        self._subscriptions: set[Subscription] = set()
+
+    @property
+    def subscriber_count(self) -> int:
+        """購読者数。"""
+        with self._lock:
+            return len(self._subscriptions)
+
+    def subscribe(self) -> Subscription:
+        """実行中のイベントループ上で購読を開始する。終了時は unsubscribe() を呼ぶ。"""
+        subscription = Subscription(asyncio.get_running_loop(), self._max_queued)
+        with self._lock:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """購読を終了する。"""
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def publish(self, change_set: ChangeSet) -> None:
+        """変更を全購読者へ通知する（任意のスレッドから呼べる）。
+
+        LibraryService.add_change_listener() に登録して用いる。
+        """
+        event = LibraryEvent.from_change_set(change_set)
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            try:
+                subscription._loop.call_soon_threadsafe(subscription._deliver, event)
+            except RuntimeError:
+                # イベントループが終了している（サーバ停止中）
+                self.unsubscribe(subscription)
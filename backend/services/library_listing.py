@@ -0,0 +1,183 @@
+"""ライブラリ一覧のカーソルページング・並び替え
+
+シーン・環境の一覧を name / display_name 順に返せるよう、読み込み時に
+(キー, 定義位置) の整列済みリストを構築しておき、リクエストごとの並び替えを避ける。
+
+カーソルは直前のページ末尾の (並び順, キー, 定義位置) を符号化した不透明な文字列で、
+次のページはその直後から二分探索で再開する（キーセット方式）。オフセットではなく
+キーで再開するため、ページ送りの途中でライブラリが再読み込みされても重複・欠落が起きにくい。
+"""
+
+import base64
+import binascii
+import json
+import threading
+from bisect import bisect_right
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass
+from typing import Generic, TypeVar
+
+SORT_POSITION: str = "position"
+SORT_NAME: str = "name"
+SORT_DISPLAY_NAME: str = "display_name"
+SORT_KEYS: tuple[str, ...] = (SORT_POSITION, SORT_NAME, SORT_DISPLAY_NAME)
+
+_Item = TypeVar("_Item")
+
+
+class InvalidCursorError(ValueError):
+    """カーソルが不正、または並び順と一致しない場合の例外"""
+    pass
+
+
+@dataclass(frozen=True)
+class Page(Generic[_Item]):
+    """一覧の 1 ページ。next_cursor は続きがない場合は None。"""
+
+    items: list[_Item]
+    total: int
+    next_cursor: str | None
+
+
+def encode_cursor(sort: str, key: str | int, position: int) -> str:
+    """ページ末尾の要素からカーソル文字列を作る。"""
+    raw = json.dumps([sort, key, position], ensure_ascii=False, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str) -> tuple[str | int, int]:
+    """カーソル文字列を (キー, 定義位置) に戻す。
+
+    Raises:
+        InvalidCursorError: 形式が不正な場合、または別の並び順で発行されたカーソルの場合。
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_sort, key, position = json.loads(raw.decode("utf-8"))
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError) as exc:
+        raise InvalidCursorError("カーソルが不正です") from exc
+    if cursor_sort != sort:
+        raise InvalidCursorError(f"カーソルの並び順が一致しません: {cursor_sort}")
+    key_type = int if sort == SORT_POSITION else str
+    if not isinstance(position, int) or not isinstance(key, key_type):
+        raise InvalidCursorError("カーソルが不正です")
+    return key, position
+
+
+class SortedOrders:
+    """name / display_name 順の (キー, 定義位置) リストを保持する。
+
+    構築後に変更されない。eager=False の場合は並び順ごとに最初の利用時に構築する
+    （--lazy-library で起動時の全件検証を避けるため）。
+    """
+
+    def __init__(self, items: Sequence, eager: bool = True) -> None:
+        self._items = items
+        self._lock = threading.Lock()
+        self._orders: dict[str, list[tuple[str, int]]] = {}
+        if eager:
+            for sort in (SORT_NAME, SORT_DISPLAY_NAME):
+                self.keys(sort)
+
+    def keys(self, sort: str) -> list[tuple[str, int]]:
+        """sort 順に整列した (キー, 定義位置) のリストを返す。"""
+        order = self._orders.get(sort)
+        if order is None:
+            with self._lock:
+                order = self._orders.get(sort)
+                if order is None:
+                    order = sorted(
+                        (getattr(item, sort), position)
+                        for position, item in enumerate(self._items)
+                    )
+                    self._orders[sort] = order
+                    if len(self._orders) == 2:
+                        self._items = ()  # すべて構築したら一覧への参照を保持しない
+        return order
+
+
+def paginate_query(
+    query: Callable[[str, tuple[str | int, int] | None, int | None], list[tuple[int, _Item]]],
+    total: int,
+    sort: str = SORT_POSITION,
+    cursor: str | None = None,
+    limit: int | None = None,
+) -> Page[_Item]:
+    """並び替え・ページングをストアのクエリで行う（SQLite ストア用。カーソルは paginate と共通）。
+
+    Args:
+        query: (並び順, 直前の (キー, 定義位置), 最大件数) を受け取り、並び順で後続の
+            (定義位置, 要素) を返す関数。
+        total: 要素の総数。
+        sort・cursor・limit: paginate と同じ。
+
+    Raises:
+        ValueError: 未対応の並び順の場合。
+        InvalidCursorError: カーソルが不正な場合。
+    """
+    if sort not in SORT_KEYS:
+        raise ValueError(f"未対応の並び順です: {sort}")
+    after = decode_cursor(cursor, sort) if cursor is not None else None
+    # 1 件多く取得して続きの有無を判定する
+    rows = query(sort, after, None if limit is None else limit + 1)
+    has_more = limit is not None and len(rows) > limit
+    rows = rows[:limit] if limit is not None else rows
+    next_cursor = None
+    if has_more and rows:
+        position, item = rows[-1]
+        key = position if sort == SORT_POSITION else getattr(item, sort)
+        next_cursor = encode_cursor(sort, key, position)
+    return Page(items=[item for _, item in rows], total=total, next_cursor=next_cursor)
+
+
+def paginate(
+    items: Sequence[_Item],
+    orders: SortedOrders,
+    sort: str = SORT_POSITION,
+    cursor: str | None = None,
+    limit: int | None = None,
+    subset: Sequence[int] | None = None,
+) -> Page[_Item]:
+    """items を sort 順に並べ、cursor の直後から limit 件を返す。
+
+    Args:
+        items: 定義順の要素。
+        orders: items から構築した SortedOrders。
+        sort: 並び順（SORT_KEYS のいずれか）。
+        cursor: 前のページの next_cursor。None の場合は先頭から。
+        limit: 最大件数。None の場合は残りすべて。
+        subset: 対象とする要素の定義位置（昇順）。None の場合はすべて。
+
+    Raises:
+        ValueError: 未対応の並び順の場合。
+        InvalidCursorError: カーソルが不正な場合。
+    """
+    if sort not in SORT_KEYS:
+        raise ValueError(f"未対応の並び順です: {sort}")
+    after = decode_cursor(cursor, sort) if cursor is not None else None
+
+    if sort == SORT_POSITION:
+        positions: Sequence[int] = subset if subset is not None else range(len(items))
+        start = bisect_right(positions, after[1]) if after is not None else 0
+        selected = positions[start:] if limit is None else positions[start:start + limit]
+        has_more = start + len(selected) < len(positions)
+        total = len(positions)
+        last = (selected[-1], selected[-1]) if selected else None
+    else:
+        keys = orders.keys(sort)
+        if subset is not None:
+            members = set(subset)
+            keys = [entry for entry in keys if entry[1] in members]
+        start = bisect_right(keys, after) if after is not None else 0
+        page_keys = keys[start:] if limit is None else keys[start:start + limit]
+        selected = [position for _, position in page_keys]
+        has_more = start + len(page_keys) < len(keys)
+        total = len(keys)
+        last = page_keys[-1] if page_keys else None
+
+    next_cursor = encode_cursor(sort, *last) if has_more and last is not None else None
+    return Page(
+        items=[items[position] for position in selected],
+        total=total,
+        next_cursor=next_cursor,
+    )
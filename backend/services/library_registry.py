@@ -0,0 +1,122 @@
+"""LibraryRegistry: 1 プロセスで複数の名前付きライブラリを提供する
+
+--library NAME=PATH で登録したライブラリは、初めて参照されたときに読み込み、
+推定メモリ使用量の合計が予算を超えた場合は最も長く参照されていないものから解放する（LRU）。
+解放したライブラリは次に参照されたときに再度読み込む。
+
+--library-path のデフォルトライブラリはレジストリの管理外で、常に常駐する。
+"""
+
+import threading
+from collections import OrderedDict
+from collections.abc import Callable
+from pathlib import Path
+
+from backend.services.library_service import LibraryService
+
+
+class UnknownLibraryError(Exception):
+    """登録されていないライブラリ名が指定された場合の例外"""
+    pass
+
+
+class LibraryRegistry:
+    """名前付きライブラリを必要時に読み込み、メモリ予算内で LRU 管理するレジストリ。"""
+
+    def __init__(
+        self,
+        libraries: dict[str, Path],
+        memory_budget: int | None = None,
+        service_factory: Callable[[], LibraryService] = LibraryService,
+    ) -> None:
+        """
+        Args:
+            libraries: ライブラリ名とライブラリパスの対応。
+            memory_budget: 読み込み済みライブラリの推定メモリ使用量の上限（バイト）。
+                None の場合は解放しない。直近に読み込んだ 1 件は予算を超えても保持する。
+            service_factory: ライブラリごとの LibraryService を生成する関数
+                （ストア方式などの設定はデフォルトライブラリと揃える）。
+        """
+        self._paths = dict(libraries)
+        self._memory_budget = memory_budget
+        self._service_factory = service_factory
+        # 参照順（末尾が最新）に並べた読み込み済みライブラリと推定メモリ使用量
+        self._loaded: OrderedDict[str, tuple[LibraryService, int]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_locks = {name: threading.Lock() for name in self._paths}
+
+    @property
+    def names(self) -> list[str]:
+        """登録されているライブラリ名の一覧。"""
+        return list(self._paths)
+
+    @property
+    def loaded_names(self) -> list[str]:
+        """読み込み済みのライブラリ名を参照の古い順に返す。"""
+        with self._lock:
+            return list(self._loaded)
+
+    @property
+    def memory_usage(self) -> int:
+        """読み込み済みライブラリの推定メモリ使用量の合計（バイト）。"""
+        with self._lock:
+            return sum(size for _, size in self._loaded.values())
+
+    def get(self, name: str) -> LibraryService:
+        """名前付きライブラリを返す。未読み込みの場合は読み込む。
+
+        同じライブラリへの同時要求では読み込みは 1 回だけ行う。
+
+        Raises:
+            UnknownLibraryError: 登録されていない名前の場合。
+            LibraryLoadError: ライブラリの読み込みに失敗した場合。
+        """
+        if name not in self._paths:
+            raise UnknownLibraryError(f"ライブラリが登録されていません: {name}")
+
+        service = self._lookup(name)
+        if service is not None:
+            return service
+
+        with self._load_locks[name]:
+            service = self._lookup(name)
+            if service is not None:
+                return service
+
+            service = self._service_factory()
+            service.load_or_raise(self._paths[name])
+            size = service.memory_footprint()
+            with self._lock:
+                self._loaded[name] = (service, size)
+                self._evict()
+            print(f"ライブラリを読み込みました: {name} (推定 {size / (1024 * 1024):.1f} MiB)")
+            return service
+
+    def close(self) -> None:
+        """読み込み済みのライブラリをすべて閉じる（サーバの停止時）。
+
+        予算超過で解放したライブラリのストアは、参照する処理がなくなった時点で閉じられる。
+        """
+        with self._lock:
+            services = [service for service, _ in self._loaded.values()]
+            self._loaded.clear()
+        for service in services:
+            service.close()
+
+    def _lookup(self, name: str) -> LibraryService | None:
+        with self._lock:
+            entry = self._loaded.get(name)
+            if entry is None:
+                return None
+            self._loaded.move_to_end(name)
+            return entry[0]
+
+    def _evict(self) -> None:
+        """予算を超えている間、参照の古いライブラリから解放する（self._lock を保持して呼ぶ）。"""
+        if self._memory_budget is None:
+            return
+        total = sum(size for _, size in self._loaded.values())
+        while total > self._memory_budget and len(self._loaded) > 1:
+            name, (_, size) = self._loaded.popitem(last=False)
+            total -= size
+            print(f"ライブラリを解放しました: {name}")
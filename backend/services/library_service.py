@@ -1,7 +1,18 @@
 """LibraryService: ライブラリ YAML を起動時に読み込み、シーン・環境・設定データを提供する"""
 
+import io
+import multiprocessing
+import os
+import sqlite3
 import sys
+import threading
+import time
+from collections.abc import Callable, Hashable, Sequence
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field, replace
+from itertools import count, repeat
 from pathlib import Path
+from typing import TypeVar
 
 from pydantic import ValidationError
 from ruamel.yaml import YAML, YAMLError
@@ -12,82 +23,1021 @@ from backend.models.library_models import (
     LibraryScene,
     LibraryTechDefaults,
 )
+from backend.services.image_index import ImageEntry, ImageIndex, revalidate
+from backend.services.image_placeholders import ImagePlaceholder, ImagePlaceholderCache
+from backend.services.library_changes import (
+    DEFAULT_HISTORY_SIZE,
+    KIND_ENVIRONMENTS,
+    KIND_SCENES,
+    ChangeHistory,
+    ChangeSet,
+    ItemChanges,
+    PendingChanges,
+    digest_items,
+    digest_raw_items,
+)
+from backend.services.library_listing import (
+    SORT_POSITION,
+    Page,
+    SortedOrders,
+    paginate,
+    paginate_query,
+)
+from backend.services.library_snapshot import (
+    default_snapshot_path,
+    fingerprint,
+    read_snapshot,
+    write_snapshot,
+)
+from backend.services.library_sources import library_root, source_files
+from backend.services.library_store import LibraryStore, MemoryLibraryStore
+from backend.services.library_store_compact import CompactLibraryStore, deep_sizeof
+from backend.services.library_store_lazy import (
+    LazyLibraryStore,
+    LibraryEntryError,
+    check_raw_items,
+)
+from backend.services.library_store_sqlite import SqliteLibraryStore, default_sqlite_path
+from backend.services.library_stream import LibraryStreamError, load_streaming
+from backend.services.scene_search import SceneSearchIndex, SearchResult
+from backend.services.scene_tags import SceneTagIndex
+
+# ストアの種類（memory: Pydantic モデルを常駐 / compact: インターン済みの軽量レコードで常駐 /
+# sqlite: SQLite に格納し参照時に生成）
+STORE_MEMORY: str = "memory"
+STORE_COMPACT: str = "compact"
+STORE_SQLITE: str = "sqlite"
+STORE_KINDS: tuple[str, ...] = (STORE_MEMORY, STORE_COMPACT, STORE_SQLITE)
+
+_MIB: float = 1024 * 1024
+
+_T = TypeVar("_T")
+
+
+class LibraryLoadError(Exception):
+    """ライブラリの読み込み・検証に失敗した場合の例外"""
+    pass
+
+
+@dataclass(frozen=True)
+class _LibraryState:
+    """ロード済みライブラリの不変スナップショット。
+
+    再読み込み時は新しいインスタンスを構築してから参照を差し替える（read-copy-update）。
+    リクエスト処理中のアクセサは常に完全に構築済みのいずれかの状態を参照する。
+    version は状態を構築するたびに増える番号で、derived はこの状態から導出した
+    値（シリアライズ済みレスポンス、変更検出用のダイジェストなど）を保持する。
+    """
+
+    version: int
+    store: LibraryStore
+    library_dir: Path
+    library_path: Path
+    search_index: SceneSearchIndex
+    tag_index: SceneTagIndex
+    scene_orders: SortedOrders
+    environment_orders: SortedOrders
+    images: ImageIndex
+    derived: dict = field(default_factory=dict, compare=False, repr=False)
+
+
+def _derive(state: _LibraryState, key: Hashable, build: Callable[[], _T]) -> _T:
+    """state から導出した値を state.derived にメモ化して返す。"""
+    value = state.derived.get(key)
+    if value is None:
+        value = state.derived.setdefault(key, build())
+    return value
+
+
+def _item_digests(state: _LibraryState, kind: str) -> dict[str, bytes]:
+    """state のシーンまたは環境の name → 内容ダイジェストを返す。
+
+    memory・遅延検証のストアでは状態ごとにメモ化する。compact・sqlite のストアでは
+    常駐メモリを増やさないよう保持せず、差し替えのたびに求める（sqlite は行から直接求める）。
+    """
+    store = state.store
+    if isinstance(store, SqliteLibraryStore):
+        return store.scene_digests() if kind == KIND_SCENES else store.environment_digests()
+    if isinstance(store, CompactLibraryStore):
+        return digest_items(store.scenes if kind == KIND_SCENES else store.environments)
+
+    def build() -> dict[str, bytes]:
+        if isinstance(store, LazyLibraryStore):
+            # 遅延検証のストアでは、差分の検出のために全件を検証しない
+            raw = store.raw_scenes if kind == KIND_SCENES else store.raw_environments
+            return digest_raw_items(raw)
+        items = store.scenes if kind == KIND_SCENES else store.environments
+        return digest_items(items)
+
+    return _derive(state, ("digests", kind), build)
+
+
+@dataclass(frozen=True)
+class _RawLibrary:
+    """遅延検証用に読み込んだ、未検証のシーン・環境と検証済みのデフォルト技術設定。"""
+
+    scenes: list[dict]
+    environments: list[dict]
+    tech_defaults: LibraryTechDefaults | None
+
+
+def _parse_shard(name: str, data: bytes, streaming: bool = False) -> LibraryFile:
+    """ディレクトリ指定時のシャード 1 ファイルを解析・検証する（プロセスプール上で実行）。
+
+    シャードでは scenes・environments を省略できる。
+
+    Raises:
+        LibraryLoadError: YAML の構文エラーまたはモデル検証エラーの場合。
+    """
+    if streaming:
+        return _parse_streaming(data, name=name, partial=True)
+
+    try:
+        raw = YAML().load(data.decode("utf-8"))
+    except YAMLError as exc:
+        raise LibraryLoadError(f"ライブラリ YAML の解析に失敗しました ({name}):\n{exc}") from exc
+
+    if raw is None:
+        raw = {}
+    if not isinstance(raw, dict):
+        raise LibraryLoadError(f"ライブラリファイルの形式が不正です ({name}): マッピングではありません")
+
+    try:
+        return LibraryFile.model_validate({"scenes": [], "environments": [], **raw})
+    except ValidationError as exc:
+        raise LibraryLoadError(f"ライブラリファイルの形式が不正です ({name}):\n{exc}") from exc
+
+
+def _parse_streaming(data: bytes, name: str | None = None, partial: bool = False) -> LibraryFile:
+    """YAML バイト列を要素単位でストリーミング解析・検証する。
+
+    Raises:
+        LibraryLoadError: YAML の構文エラーまたはモデル検証エラーの場合。
+    """
+    where = f" ({name})" if name is not None else ""
+    try:
+        return load_streaming(io.BytesIO(data), partial=partial)
+    except YAMLError as exc:
+        raise LibraryLoadError(f"ライブラリ YAML の解析に失敗しました{where}:\n{exc}") from exc
+    except LibraryStreamError as exc:
+        raise LibraryLoadError(f"ライブラリファイルの形式が不正です{where}: {exc}") from exc
+
+
+def _parse_raw(data: bytes, name: str | None = None, partial: bool = False) -> _RawLibrary:
+    """遅延検証用に YAML バイト列を生のマッピングとして読み込む。
+
+    scenes・environments は索引の構築に必要な構造のみ確認し、
+    default_tech_settings は件数によらず小さいためこの時点で検証する。
+
+    Raises:
+        LibraryLoadError: YAML の構文エラーまたは構造・検証エラーの場合。
+    """
+    where = f" ({name})" if name is not None else ""
+    try:
+        raw = YAML(typ="safe").load(data)
+    except YAMLError as exc:
+        raise LibraryLoadError(f"ライブラリ YAML の解析に失敗しました{where}:\n{exc}") from exc
+
+    if raw is None and partial:
+        raw = {}
+    if not isinstance(raw, dict):
+        raise LibraryLoadError(f"ライブラリファイルの形式が不正です{where}: マッピングではありません")
+
+    try:
+        items = {}
+        for key in ("scenes", "environments"):
+            if key not in raw and not partial:
+                raise LibraryEntryError(f"{key}: 必須項目がありません")
+            items[key] = check_raw_items(key, raw.get(key, []))
+        tech_defaults = None
+        if raw.get("default_tech_settings") is not None:
+            try:
+                tech_defaults = LibraryTechDefaults.model_validate(raw["default_tech_settings"])
+            except ValidationError as exc:
+                raise LibraryEntryError(f"default_tech_settings:\n{exc}") from exc
+    except LibraryEntryError as exc:
+        raise LibraryLoadError(f"ライブラリファイルの形式が不正です{where}: {exc}") from exc
+
+    return _RawLibrary(
+        scenes=items["scenes"], environments=items["environments"], tech_defaults=tech_defaults
+    )
+
+
+def _check_shard_duplicates(
+    shards: list[tuple[str, list[str], list[str], bool]]
+) -> None:
+    """シャード間の定義の重複を検出する。
+
+    Args:
+        shards: シャードごとの (ファイル名, シーン名一覧, 環境名一覧, default_tech_settings の有無)。
+
+    Raises:
+        LibraryLoadError: 重複が見つかった場合（重複箇所をすべて列挙する）。
+    """
+    scene_owner: dict[str, str] = {}
+    environment_owner: dict[str, str] = {}
+    tech_defaults_owner: str | None = None
+    problems: list[str] = []
+
+    for shard_name, scene_names, environment_names, has_tech_defaults in shards:
+        for name in scene_names:
+            if name in scene_owner:
+                problems.append(f"シーン '{name}': {scene_owner[name]}, {shard_name}")
+            else:
+                scene_owner[name] = shard_name
+        for name in environment_names:
+            if name in environment_owner:
+                problems.append(f"環境 '{name}': {environment_owner[name]}, {shard_name}")
+            else:
+                environment_owner[name] = shard_name
+        if has_tech_defaults:
+            if tech_defaults_owner is not None:
+                problems.append(
+                    f"default_tech_settings: {tech_defaults_owner}, {shard_name}"
+                )
+            else:
+                tech_defaults_owner = shard_name
+
+    if problems:
+        raise LibraryLoadError(
+            "ライブラリシャード間で定義が重複しています:\n" + "\n".join(problems)
+        )
+
+
+def _merge_shards(shards: list[tuple[str, LibraryFile]]) -> LibraryFile:
+    """シャードをファイル名順に結合して 1 つの LibraryFile にする。
+
+    シーン・環境の name の重複、および default_tech_settings の複数定義はエラーとする。
+
+    Raises:
+        LibraryLoadError: 重複が見つかった場合（重複箇所をすべて列挙する）。
+    """
+    _check_shard_duplicates([
+        (
+            shard_name,
+            [scene.name for scene in shard.scenes],
+            [env.name for env in shard.environments],
+            shard.default_tech_settings is not None,
+        )
+        for shard_name, shard in shards
+    ])
+    return LibraryFile(
+        scenes=[scene for _, shard in shards for scene in shard.scenes],
+        environments=[env for _, shard in shards for env in shard.environments],
+        default_tech_settings=next(
+            (
+                shard.default_tech_settings
+                for _, shard in shards
+                if shard.default_tech_settings is not None
+            ),
+            None,
+        ),
+    )
+
+
+def _merge_raw_shards(shards: list[tuple[str, _RawLibrary]]) -> _RawLibrary:
+    """遅延検証用のシャードを結合する（重複の扱いは _merge_shards と同じ）。
+
+    Raises:
+        LibraryLoadError: 重複が見つかった場合。
+    """
+    _check_shard_duplicates([
+        (
+            shard_name,
+            [raw["name"] for raw in shard.scenes],
+            [raw["name"] for raw in shard.environments],
+            shard.tech_defaults is not None,
+        )
+        for shard_name, shard in shards
+    ])
+    return _RawLibrary(
+        scenes=[raw for _, shard in shards for raw in shard.scenes],
+        environments=[raw for _, shard in shards for raw in shard.environments],
+        tech_defaults=next(
+            (shard.tech_defaults for _, shard in shards if shard.tech_defaults is not None),
+            None,
+        ),
+    )
 
 
 class LibraryService:
-    """ライブラリ YAML を起動時に一度だけ読み込み、メモリで保持・提供するサービス。"""
+    """ライブラリ YAML を読み込み、ストア（メモリまたは SQLite）で保持・提供するサービス。
+
+    通常は起動時に一度だけ load() する。reload() による再読み込みは
+    バックグラウンドで新しい状態を構築し、完成後に原子的に差し替える。
+    """
 
-    def __init__(self) -> None:
-        self._library_file: LibraryFile | None = None
-        self._library_dir: Path | None = None
+    def __init__(
+        self,
+        parse_workers: int | None = None,
+        store: str = STORE_MEMORY,
+        sqlite_path: Path | None = None,
+        streaming: bool = False,
+        lazy: bool = False,
+        change_history_size: int = DEFAULT_HISTORY_SIZE,
+        placeholders: ImagePlaceholderCache | None = None,
+        index_images: bool = True,
+    ) -> None:
+        """
+        Args:
+            parse_workers: ディレクトリ指定時にシャードを並列解析するプロセス数。
+                None の場合は CPU コア数。1 以下の場合は並列化しない。
+            store: データの保持方式（STORE_KINDS のいずれか）。
+            sqlite_path: store="sqlite" のときのデータベースパス。
+                None の場合はライブラリの隣（<library-path>.sqlite3）に置く。
+            streaming: True の場合、YAML 全体のノード木を作らず要素単位で解析・検証し、
+                解析時のピークメモリを抑える。
+            lazy: True の場合、シーン・環境を起動時に検証せず、初回参照時に検証する
+                （store="memory" のみ対応）。
+            change_history_size: 差分同期のために保持する変更履歴のバージョン数。
+            placeholders: 指定した場合、読み込みのたびにシーンのプレビュー画像・環境のサムネイルの
+                プレースホルダー（寸法と LQIP）を求めておく（名前付きライブラリと共有できる）。
+            index_images: False の場合、画像の索引（走査と内容ハッシュの計算）と
+                プレースホルダーを作らない（画像を配信しない CLI コマンド用）。
+        """
+        if store not in STORE_KINDS:
+            raise ValueError(f"未対応のストアです: {store}")
+        if lazy and store != STORE_MEMORY:
+            raise ValueError(f"遅延検証は {STORE_MEMORY} ストアでのみ利用できます: {store}")
+        self._state: _LibraryState | None = None
+        # 起動時刻（ミリ秒）から数え始め、再起動前のバージョンと重ならないようにする
+        # （前のプロセスのバージョンで差分を求めると、全件の再取得として扱われる）
+        self._versions = count(time.time_ns() // 1_000_000)
+        self._swap_lock = threading.Lock()
+        self._history = ChangeHistory(change_history_size)
+        self._change_listeners: list[Callable[[ChangeSet], None]] = []
+        # 画像の索引を最後に走査した時刻（time.monotonic()）
+        self._images_scanned_at = 0.0
+        self._parse_workers = parse_workers if parse_workers is not None else (os.cpu_count() or 1)
+        self._store_kind = store
+        self._sqlite_path = sqlite_path
+        self._streaming = streaming
+        self._lazy = lazy
+        self._placeholders = placeholders if index_images else None
+        self._index_images = index_images
+        # 読み込み・refresh_images() で見つかった画像のプレースホルダーを求めるバックグラウンドのスレッド
+        self._placeholder_executor: ThreadPoolExecutor | None = None
+        self._placeholder_updates: set[Future[None]] = set()
 
     # ------------------------------------------------------------------
     # 起動時ロード
     # ------------------------------------------------------------------
 
-    def load(self, library_path: Path) -> None:
+    def load(
+        self,
+        library_path: Path,
+        snapshot_path: Path | None = None,
+        use_snapshot: bool = True,
+    ) -> None:
         """ライブラリ YAML を読み込みメモリに保持する。
 
+        鮮度が確認できるスナップショット（compile-library で生成）が存在する場合は
+        YAML の解析・検証を省略してスナップショットから復元する。
         フォーマット不正またはファイル不在の場合はエラーをコンソールに出力し
         sys.exit(1) でプロセスを終了する。
+
+        Args:
+            library_path: ライブラリ YAML のパス、またはシャード（*.yaml）を格納したディレクトリ。
+            snapshot_path: スナップショットのパス。None の場合は library_path の隣を参照する。
+            use_snapshot: False の場合はスナップショットを参照せず常に YAML を解析する。
         """
-        if not library_path.exists():
-            print(
-                f"エラー: ライブラリファイルが見つかりません: {library_path}",
-                file=sys.stderr,
-            )
+        try:
+            self.load_or_raise(library_path, snapshot_path, use_snapshot)
+        except LibraryLoadError as exc:
+            print(f"エラー: {exc}", file=sys.stderr)
             sys.exit(1)
 
-        yaml = YAML()
+    def load_or_raise(
+        self,
+        library_path: Path,
+        snapshot_path: Path | None = None,
+        use_snapshot: bool = True,
+    ) -> None:
+        """load() と同じだが、失敗時はプロセスを終了せずに例外を送出する。
+
+        起動後に必要に応じて読み込む場合（LibraryRegistry）に用いる。
+
+        Raises:
+            LibraryLoadError: 読み込み・解析・検証に失敗した場合。
+        """
         try:
-            with open(library_path, encoding="utf-8") as f:
-                raw = yaml.load(f)
-        except YAMLError as exc:
+            store = self._load_store(library_path, snapshot_path, use_snapshot)
+        except OSError as exc:
+            raise LibraryLoadError(f"ライブラリの読み込みに失敗しました: {exc}") from exc
+        self._swap_state(self._build_state(store, library_path))
+
+    def reload(self) -> bool:
+        """ロード済みのライブラリ YAML を再解析し、成功した場合のみ状態を差し替える。
+
+        解析・検証に失敗した場合はエラーをコンソールに出力し、現在の状態を維持する
+        （プロセスは終了しない）。
+
+        Returns:
+            差し替えた場合は True、失敗して現在の状態を維持した場合は False。
+        """
+        assert self._state is not None, "load() を先に呼び出してください"
+        library_path = self._state.library_path
+        try:
+            store = self._load_store(library_path, None, use_snapshot=False)
+        except (LibraryLoadError, OSError) as exc:
             print(
-                f"エラー: ライブラリ YAML の解析に失敗しました:\n{exc}",
+                f"エラー: ライブラリの再読み込みに失敗しました（現在の内容を維持します）: {exc}",
                 file=sys.stderr,
             )
-            sys.exit(1)
+            return False
+
+        self._swap_state(self._build_state(store, library_path))
+        return True
+
+    def compile_snapshot(
+        self, library_path: Path, snapshot_path: Path | None = None
+    ) -> Path:
+        """ライブラリ YAML を解析・検証し、スナップショットを書き出す。
 
+        書き出した後はロード済みの状態となり、アクセサを利用できる。
+        フォーマット不正またはファイル不在の場合は sys.exit(1) でプロセスを終了する。
+
+        Returns:
+            書き出したスナップショットのパス。
+        """
+        snapshot_path = snapshot_path or default_snapshot_path(library_path)
         try:
-            self._library_file = LibraryFile.model_validate(raw)
-        except ValidationError as exc:
+            sources = self._read_sources(library_path)
+            library_file = self._parse_sources(library_path, sources)
+        except OSError as exc:
+            print(f"エラー: ライブラリの読み込みに失敗しました: {exc}", file=sys.stderr)
+            sys.exit(1)
+        except LibraryLoadError as exc:
+            print(f"エラー: {exc}", file=sys.stderr)
+            sys.exit(1)
+
+        write_snapshot(library_file, fingerprint(sources), snapshot_path)
+        self._swap_state(self._build_state(MemoryLibraryStore(library_file), library_path))
+        return snapshot_path
+
+    @property
+    def version(self) -> int:
+        """ロード済みライブラリのバージョン。読み込み・再読み込みのたびに増える。"""
+        return self._current().version
+
+    @property
+    def library_path(self) -> Path | None:
+        """ロード済みライブラリ YAML のパス。未ロードの場合は None。"""
+        state = self._state
+        return state.library_path if state is not None else None
+
+    def memory_footprint(self) -> int:
+        """ロード済みストアと索引の推定メモリ使用量（バイト）を返す。"""
+        state = self._current()
+        return deep_sizeof((
+            state.store,
+            state.search_index,
+            state.tag_index,
+            state.scene_orders,
+            state.environment_orders,
+            state.images,
+        ))
+
+    def _build_state(self, store: LibraryStore, library_path: Path) -> _LibraryState:
+        # 索引を起動時に構築するのは memory ストアのみ。遅延検証では全件を検証しないよう、
+        # compact・sqlite では全件の読み込みと常駐メモリの増加を避けるよう、最初の利用まで遅らせる
+        eager_indexes = isinstance(store, MemoryLibraryStore)
+        library_dir = library_root(library_path)
+        previous = self._state
+        images = self._scan_images(library_dir, previous.images if previous else None)
+        return _LibraryState(
+            version=next(self._versions),
+            store=store,
+            library_dir=library_dir,
+            library_path=library_path,
+            search_index=SceneSearchIndex(store.scenes, eager=eager_indexes),
+            tag_index=SceneTagIndex(store.scenes, eager=eager_indexes),
+            scene_orders=SortedOrders(store.scenes, eager=eager_indexes),
+            environment_orders=SortedOrders(store.environments, eager=eager_indexes),
+            images=images,
+        )
+
+    def _scan_images(self, library_dir: Path, previous: ImageIndex | None) -> ImageIndex:
+        self._images_scanned_at = time.monotonic()
+        if not self._index_images:
+            return ImageIndex(library_dir, {})
+        return ImageIndex.build(library_dir, previous, hash_workers=max(1, self._parse_workers))
+
+    def _swap_state(self, state: _LibraryState) -> None:
+        """状態を差し替え、直前の状態からのシーン・環境の差分を変更履歴に記録する。
+
+        差分は参照を差し替える前に記録する（新しいバージョンを読んだクライアントが
+        そのバージョンの差分を取り損ねないようにするため）。
+        """
+        change_set: ChangeSet | None = None
+        with self._swap_lock:
+            previous = self._state
+            if previous is None:
+                self._history.start(state.version)
+            else:
+                change_set = ChangeSet(
+                    version=state.version,
+                    items={
+                        kind: ItemChanges.between(
+                            _item_digests(previous, kind), _item_digests(state, kind)
+                        )
+                        for kind in (KIND_SCENES, KIND_ENVIRONMENTS)
+                    },
+                )
+                self._history.record(change_set)
+            self._state = state
+            if self._placeholders is not None:
+                # 起動・再読み込みを待たせないよう、プレースホルダーはバックグラウンドで求める
+                self._schedule_placeholders(state.images, workers=self._parse_workers)
+
+        if change_set is not None:
+            for listener in list(self._change_listeners):
+                try:
+                    listener(change_set)
+                except Exception as exc:
+                    print(f"エラー: ライブラリの変更通知に失敗しました: {exc}", file=sys.stderr)
+
+    def close(self) -> None:
+        """ストアを閉じる（サーバの停止時）。以降、アクセサは利用できない。
+
+        再読み込みで差し替えた古いストアは、参照する処理がなくなった時点で閉じられる。
+        """
+        state = self._state
+        if state is not None:
+            state.store.close()
+        if self._placeholder_executor is not None:
+            self._placeholder_executor.shutdown(wait=False, cancel_futures=True)
+
+    def add_change_listener(self, listener: Callable[[ChangeSet], None]) -> None:
+        """状態が差し替わるたびに、その差分を引数に listener を呼ぶよう登録する。
+
+        初回の読み込みでは呼ばれない。listener は差し替えを行ったスレッド
+        （--watch-library では監視スレッド）で呼ばれる。
+        """
+        self._change_listeners.append(listener)
+
+    def _load_store(
+        self, library_path: Path, snapshot_path: Path | None, use_snapshot: bool
+    ) -> LibraryStore:
+        """設定された方式でストアを構築する。
+
+        sqlite の場合、同じ内容から構築済みのデータベースがあれば YAML を解析せずに再利用する。
+
+        Raises:
+            LibraryLoadError: 読み込み・解析・検証・データベース構築に失敗した場合。
+        """
+        self._ensure_exists(library_path)
+        snapshot_path = snapshot_path or default_snapshot_path(library_path)
+
+        if self._store_kind == STORE_SQLITE:
+            sources = self._read_sources(library_path)
+            source_sha256 = fingerprint(sources).sha256
+            db_path = self._sqlite_path or default_sqlite_path(library_path)
+            try:
+                store = SqliteLibraryStore.open_if_fresh(db_path, source_sha256)
+                if store is None:
+                    library_file = read_snapshot(library_path, snapshot_path) if use_snapshot else None
+                    if library_file is None:
+                        library_file = self._parse_sources(library_path, sources)
+                    store = SqliteLibraryStore.build(db_path, library_file, source_sha256)
+            except (sqlite3.Error, OSError) as exc:
+                raise LibraryLoadError(
+                    f"ライブラリデータベースの構築に失敗しました: {db_path}: {exc}"
+                ) from exc
+            return store
+
+        library_file = read_snapshot(library_path, snapshot_path) if use_snapshot else None
+        if library_file is None and self._lazy:
+            # スナップショットは検証済みのためそのまま使い、ない場合のみ遅延検証とする
+            raw = self._parse_sources_raw(library_path, self._read_sources(library_path))
+            return LazyLibraryStore(raw.scenes, raw.environments, raw.tech_defaults)
+        if library_file is None:
+            library_file = self._parse_sources(library_path, self._read_sources(library_path))
+
+        if self._store_kind == STORE_COMPACT:
+            compact = CompactLibraryStore(library_file)
+            before, after = deep_sizeof(library_file), deep_sizeof(compact)
             print(
-                f"エラー: ライブラリファイルの形式が不正です:\n{exc}",
-                file=sys.stderr,
+                "ライブラリをコンパクト形式で保持します: "
+                f"推定 {before / _MIB:.1f} MiB → {after / _MIB:.1f} MiB"
+                f"（タグ {compact.tag_count} 種）"
             )
-            sys.exit(1)
+            return compact
+        return MemoryLibraryStore(library_file)
+
+    @staticmethod
+    def _ensure_exists(library_path: Path) -> None:
+        if not library_path.exists():
+            raise LibraryLoadError(f"ライブラリファイルが見つかりません: {library_path}")
+
+    def _read_sources(self, library_path: Path) -> list[tuple[Path, bytes]]:
+        """ライブラリのソースファイルを (パス, 内容) の一覧として読み込む。"""
+        self._ensure_exists(library_path)
+        return [(path, path.read_bytes()) for path in source_files(library_path)]
+
+    def _parse_sources(
+        self, library_path: Path, sources: list[tuple[Path, bytes]]
+    ) -> LibraryFile:
+        """読み込んだソースを解析・検証して 1 つの LibraryFile にする。
+
+        ディレクトリ指定時はシャードをプロセスプールで並列に解析してから結合する
+        （ruamel.yaml の解析は GIL に縛られるため、スレッドではなくプロセスで分散する）。
+
+        Raises:
+            LibraryLoadError: 解析・検証エラー、またはシャード間で定義が重複する場合。
+        """
+        if not library_path.is_dir():
+            if self._streaming:
+                return _parse_streaming(sources[0][1])
+            return self._parse(sources[0][1])
+
+        names = [path.name for path, _ in sources]
+        datas = [data for _, data in sources]
+        workers = min(len(sources), self._parse_workers)
+        if workers <= 1:
+            shards = [
+                _parse_shard(name, data, self._streaming) for name, data in zip(names, datas)
+            ]
+        else:
+            # 監視スレッドなど他スレッドが動作中でも安全なよう spawn で子プロセスを起動する
+            with ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+            ) as executor:
+                shards = list(
+                    executor.map(_parse_shard, names, datas, repeat(self._streaming))
+                )
+        return _merge_shards(list(zip(names, shards)))
+
+    @staticmethod
+    def _parse_sources_raw(
+        library_path: Path, sources: list[tuple[Path, bytes]]
+    ) -> _RawLibrary:
+        """読み込んだソースを遅延検証用に生のマッピングとして読み込む。
+
+        要素の検証を行わないため解析は軽く、シャードも逐次に読み込む。
+
+        Raises:
+            LibraryLoadError: 解析・構造エラー、またはシャード間で定義が重複する場合。
+        """
+        if not library_path.is_dir():
+            return _parse_raw(sources[0][1])
+        return _merge_raw_shards([
+            (path.name, _parse_raw(data, name=path.name, partial=True))
+            for path, data in sources
+        ])
+
+    @staticmethod
+    def _parse(data: bytes) -> LibraryFile:
+        """YAML バイト列を解析・検証して LibraryFile を返す。
+
+        Raises:
+            LibraryLoadError: YAML の構文エラーまたはモデル検証エラーの場合。
+        """
+        yaml = YAML()
+        try:
+            raw = yaml.load(data.decode("utf-8"))
+        except YAMLError as exc:
+            raise LibraryLoadError(f"ライブラリ YAML の解析に失敗しました:\n{exc}") from exc
 
-        self._library_dir = library_path.parent.resolve()
+        try:
+            return LibraryFile.model_validate(raw)
+        except ValidationError as exc:
+            raise LibraryLoadError(f"ライブラリファイルの形式が不正です:\n{exc}") from exc
 
     # ------------------------------------------------------------------
     # アクセサ
     # ------------------------------------------------------------------
 
-    def get_scenes(self) -> list[LibraryScene]:
-        """ロード済みのシーンテンプレート一覧を返す。"""
-        assert self._library_file is not None, "load() を先に呼び出してください"
-        return self._library_file.scenes
+    def _current(self) -> _LibraryState:
+        state = self._state
+        assert state is not None, "load() を先に呼び出してください"
+        return state
+
+    def get_scenes(self) -> Sequence[LibraryScene]:
+        """ロード済みのシーンテンプレート一覧を返す。
 
-    def get_environments(self) -> list[LibraryEnvironment]:
+        sqlite ストアでは要素を参照時に生成する遅延シーケンスを返す。
+        """
+        return self._current().store.scenes
+
+    def get_environments(self) -> Sequence[LibraryEnvironment]:
         """ロード済みの環境一覧を返す。"""
-        assert self._library_file is not None, "load() を先に呼び出してください"
-        return self._library_file.environments
+        return self._current().store.environments
+
+    def get_scene(self, name: str) -> LibraryScene | None:
+        """name に一致するシーンテンプレートを返す。存在しない場合は None。"""
+        return self._current().store.get_scene(name)
+
+    def get_environment(self, name: str) -> LibraryEnvironment | None:
+        """name に一致する環境を返す。存在しない場合は None。"""
+        return self._current().store.get_environment(name)
 
     def get_tech_defaults(self) -> LibraryTechDefaults | None:
         """ロード済みのデフォルト技術設定を返す。未定義の場合は None。"""
-        assert self._library_file is not None, "load() を先に呼び出してください"
-        return self._library_file.default_tech_settings
+        return self._current().store.tech_defaults
+
+    def cached(self, key: Hashable, build: Callable[[], _T]) -> _T:
+        """現在のライブラリのバージョンについて build() の結果をメモ化して返す。
+
+        再読み込みで状態が差し替わると、キャッシュも新しい状態のものに切り替わる。
+        同時に呼ばれた場合は build() が重複して実行されることがあるが、先に格納された値を返す。
+        """
+        return _derive(self._current(), key, build)
+
+    def search_scenes(
+        self, query: str, offset: int = 0, limit: int = 20
+    ) -> tuple[int, list[LibraryScene]]:
+        """display_name・positive_prompt の全文検索で一致したシーンを順位順に返す。
+
+        Returns:
+            (一致した総件数, offset から limit 件のシーン)。
+        """
+        state = self._current()
+        result: SearchResult = state.search_index.search(query, offset, limit)
+        scenes = state.store.scenes
+        return result.total, [scenes[position] for position in result.positions]
+
+    def filter_scenes(
+        self, tags: Sequence[str] = (), exclude: Sequence[str] = ()
+    ) -> Sequence[LibraryScene]:
+        """positive_prompt に tags をすべて含み、exclude をいずれも含まないシーンを定義順に返す。
+
+        タグは大文字・小文字、アンダースコアと空白の違いを区別せずに照合する。
+        """
+        state = self._current()
+        if not tags and not exclude:
+            return state.store.scenes
+        scenes = state.store.scenes
+        return [scenes[position] for position in state.tag_index.filter(tags, exclude)]
+
+    def get_scene_tag_facets(
+        self, tags: Sequence[str] = (), exclude: Sequence[str] = (), limit: int | None = None
+    ) -> tuple[int, list[tuple[str, int]]]:
+        """filter_scenes と同じ条件で絞り込んだシーンについて、タグごとの件数を集計する。
+
+        Returns:
+            (絞り込み後のシーン数, 件数の多い順の (タグ, 件数) の一覧)。
+        """
+        state = self._current()
+        if not tags and not exclude:
+            return len(state.store.scenes), state.tag_index.facets(limit=limit)
+        positions = state.tag_index.filter(tags, exclude)
+        return len(positions), state.tag_index.facets(positions, limit)
+
+    def list_scenes(
+        self,
+        sort: str = SORT_POSITION,
+        cursor: str | None = None,
+        limit: int | None = None,
+        tags: Sequence[str] = (),
+        exclude: Sequence[str] = (),
+    ) -> Page[LibraryScene]:
+        """シーンを sort 順（position / name / display_name）に cursor の直後から limit 件返す。
+
+        tags・exclude を指定した場合は filter_scenes と同じ条件で絞り込む。
+
+        Raises:
+            InvalidCursorError: カーソルが不正な場合。
+        """
+        state = self._current()
+        store = state.store
+        if isinstance(store, SqliteLibraryStore) and not tags and not exclude:
+            # 並び替え・ページングは索引を張った列へのクエリで行い、全件を読み込まない
+            return paginate_query(store.query_scenes, len(store.scenes), sort, cursor, limit)
+        subset = state.tag_index.filter(tags, exclude) if tags or exclude else None
+        return paginate(store.scenes, state.scene_orders, sort, cursor, limit, subset)
+
+    def list_environments(
+        self, sort: str = SORT_POSITION, cursor: str | None = None, limit: int | None = None
+    ) -> Page[LibraryEnvironment]:
+        """環境を sort 順（position / name / display_name）に cursor の直後から limit 件返す。
+
+        Raises:
+            InvalidCursorError: カーソルが不正な場合。
+        """
+        state = self._current()
+        store = state.store
+        if isinstance(store, SqliteLibraryStore):
+            return paginate_query(
+                store.query_environments, len(store.environments), sort, cursor, limit
+            )
+        return paginate(store.environments, state.environment_orders, sort, cursor, limit)
+
+    def get_scene_changes(
+        self, since: int
+    ) -> tuple[PendingChanges, list[LibraryScene], list[LibraryScene]]:
+        """バージョン since より後に追加・変更・削除されたシーンを返す。
+
+        Returns:
+            (差分の name 一覧, 追加されたシーン, 変更されたシーン)。
+            履歴から差分を求められない場合は full_resync=True で、全シーンを追加として返す。
+        """
+        state = self._current()
+        changes = self._history.since(KIND_SCENES, since, state.version)
+        if changes.full_resync:
+            return changes, list(state.store.scenes), []
+        store = state.store
+        return (
+            changes,
+            _resolve(store.get_scene, changes.added),
+            _resolve(store.get_scene, changes.modified),
+        )
+
+    def get_environment_changes(
+        self, since: int
+    ) -> tuple[PendingChanges, list[LibraryEnvironment], list[LibraryEnvironment]]:
+        """バージョン since より後に追加・変更・削除された環境を返す（get_scene_changes と同様）。"""
+        state = self._current()
+        changes = self._history.since(KIND_ENVIRONMENTS, since, state.version)
+        if changes.full_resync:
+            return changes, list(state.store.environments), []
+        store = state.store
+        return (
+            changes,
+            _resolve(store.get_environment, changes.added),
+            _resolve(store.get_environment, changes.modified),
+        )
 
     # ------------------------------------------------------------------
     # 画像パス解決
     # ------------------------------------------------------------------
 
+    def image_sources(
+        self, kind: str, offset: int = 0, limit: int | None = None
+    ) -> tuple[int, int, list[tuple[str, Path | None]]]:
+        """シーンのプレビュー画像（kind="scenes"）または環境のサムネイル（kind="environments"）を
+        定義順に offset から limit 件返す。
+
+        Returns:
+            (バージョン, 全件数, (name, 画像の絶対パス) の一覧)。画像が未設定または索引にない
+            場合のパスは None。すべて同じバージョンの状態から取得する。
+        """
+        state = self._current()
+        if kind == KIND_SCENES:
+            items, image_of = state.store.scenes, lambda s: s.preview_image
+        elif kind == KIND_ENVIRONMENTS:
+            items, image_of = state.store.environments, lambda e: e.thumbnail
+        else:
+            raise ValueError(f"未対応の種類です: {kind}")
+        stop = len(items) if limit is None else offset + limit
+        sources = []
+        for item in items[offset:stop]:
+            relative_path = image_of(item)
+            image = state.images.get(relative_path) if relative_path else None
+            sources.append((item.name, image.path if image is not None else None))
+        return state.version, len(items), sources
+
+    def get_image(self, relative_path: str) -> ImageEntry | None:
+        """ライブラリディレクトリ基準の相対パスの画像を索引から返す。
+
+        索引にない場合（ファイルが存在しない、ディレクトリ外を指すなど）は None を返す。
+        """
+        return self._current().images.get(relative_path)
+
+    def revalidate_image(self, relative_path: str) -> ImageEntry | None:
+        """索引の画像のサイズ・mtime をファイルと突き合わせて返す（ブロッキング）。
+
+        変更されたファイルは内容ハッシュを求め直し、削除されたファイルは索引から取り除く。
+        いずれの場合もバージョンを進める（画像 URL を含むレスポンスのキャッシュを作り直すため）。
+        索引にない場合、削除された場合は None を返す。
+        """
+        image = self.get_image(relative_path)
+        if image is None:
+            return None
+        current = revalidate(image)
+        if current is image:
+            return image
+        with self._swap_lock:
+            state = self._current()
+            if state.images.get(relative_path) == image:
+                images = state.images.with_entry(relative_path, current)
+                self._state = replace(
+                    state, version=next(self._versions), images=images, derived={}
+                )
+                if current is not None and self._placeholders is not None:
+                    self._schedule_placeholders(images)
+        return current
+
+    def referenced_images(self) -> list[ImageEntry]:
+        """シーンのプレビュー画像・環境のサムネイルのうち、画像の索引にあるものを返す。"""
+        state = self._current()
+        return _referenced_entries(state.store, state.images)
+
+    def get_image_placeholder(self, relative_path: str) -> ImagePlaceholder | None:
+        """画像のプレースホルダー（寸法と LQIP）を返す。
+
+        プレースホルダーを有効にしていない場合、画像が索引にない場合、読み込めない画像の場合は None。
+        """
+        if self._placeholders is None:
+            return None
+        image = self.get_image(relative_path)
+        return self._placeholders.get(image.content_hash) if image is not None else None
+
     def resolve_image_path(self, relative_path: str) -> Path | None:
-        """ライブラリディレクトリ基準の相対パスを絶対パスに解決する。
+        """ライブラリディレクトリ基準の相対パスを索引から絶対パスに解決する。
 
-        ファイルが存在しない場合は None を返す。
+        索引にない場合は None を返す。
         """
-        assert self._library_dir is not None, "load() を先に呼び出してください"
-        abs_path = (self._library_dir / relative_path).resolve()
-        return abs_path if abs_path.exists() else None
+        entry = self.get_image(relative_path)
+        return entry.path if entry is not None else None
+
+    def refresh_images(self, min_interval: float = 0.0) -> bool:
+        """ライブラリディレクトリを再走査し、画像の索引を更新する（ライブラリ本体は再読み込みしない）。
+
+        サイズ・mtime が変わっていないファイルのハッシュは再利用する。索引が変わった場合は
+        バージョンを進める（画像 URL を含むレスポンスのキャッシュを作り直すため）。
+
+        Args:
+            min_interval: 前回の走査からこの秒数が経っていない場合は走査しない。
+
+        Returns:
+            走査した場合は True。
+        """
+        with self._swap_lock:
+            state = self._current()
+            if time.monotonic() - self._images_scanned_at < min_interval:
+                return False
+            images = self._scan_images(state.library_dir, state.images)
+            if images.entries_equal(state.images):
+                return True
+            # 差分の記録（ChangeHistory）はシーン・環境のみのため、バージョンだけ進める
+            self._state = replace(
+                state, version=next(self._versions), images=images, derived={}
+            )
+            if self._placeholders is not None:
+                self._schedule_placeholders(images)
+        return True
+
+    def wait_for_placeholders(self, timeout: float | None = None) -> bool:
+        """読み込み・refresh_images() が開始したプレースホルダーの計算の完了を待つ。
+
+        Returns:
+            timeout 秒以内にすべて完了した場合は True。
+        """
+        _, not_done = wait(list(self._placeholder_updates), timeout)
+        return not not_done
+
+    def _schedule_placeholders(self, images: ImageIndex, workers: int = 1) -> None:
+        """images のプレースホルダーをバックグラウンドで求める（self._swap_lock を保持して呼ぶ）。
+
+        画像の要求を処理するスレッドや、読み込み・再読み込みを待たせないようにするため。
+        workers は ImagePlaceholderCache.update() のプロセス数（追加された画像のみの場合は 1）。
+        """
+        if self._placeholder_executor is None:
+            self._placeholder_executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="library-placeholders"
+            )
+        future = self._placeholder_executor.submit(self._refresh_placeholders, images, workers)
+        self._placeholder_updates.add(future)
+        future.add_done_callback(self._placeholder_updates.discard)
+
+    def _refresh_placeholders(self, images: ImageIndex, workers: int) -> None:
+        """images のうち未計算のもののプレースホルダーを求め、完了後にバージョンを進める。
+
+        ロックの外で計算し、差し替えのみロックを保持して行う。
+        """
+        assert self._placeholders is not None
+        try:
+            computed = self._placeholders.update(
+                _referenced_entries(self._current().store, images), workers=workers
+            )
+        except Exception as exc:
+            print(f"エラー: 画像のプレースホルダーの計算に失敗しました: {exc}", file=sys.stderr)
+            return
+        if computed == 0:
+            return
+        with self._swap_lock:
+            state = self._current()
+            if state.images is images:
+                # プレースホルダーを含むレスポンスを作り直すよう、バージョンを進める
+                self._state = replace(state, version=next(self._versions), derived={})
+
+
+def _referenced_images(store: LibraryStore) -> set[str]:
+    """シーンのプレビュー画像・環境のサムネイルの相対パスの集合を返す。"""
+    if isinstance(store, LazyLibraryStore):
+        # 遅延検証のストアでは、画像のパスを得るために全件を検証しない
+        paths = [raw.get("preview_image") for raw in store.raw_scenes]
+        paths += [raw.get("thumbnail") for raw in store.raw_environments]
+    elif isinstance(store, SqliteLibraryStore):
+        # SQLite では列を直接読み、全行のモデルを生成しない
+        paths = store.image_paths()
+    else:
+        paths = [scene.preview_image for scene in store.scenes]
+        paths += [environment.thumbnail for environment in store.environments]
+    return {path for path in paths if isinstance(path, str) and path}
+
+
+def _referenced_entries(store: LibraryStore, images: ImageIndex) -> list[ImageEntry]:
+    """store が参照する画像のうち、images にあるものを返す。"""
+    entries = (images.get(path) for path in sorted(_referenced_images(store)))
+    return [entry for entry in entries if entry is not None]
+
+
+def _resolve(get: Callable[[str], _T | None], names: Sequence[str]) -> list[_T]:
+    items = []
+    for name in names:
+        item = get(name)
+        if item is not None:
+            items.append(item)
+    return items
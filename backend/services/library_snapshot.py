@@ -0,0 +1,124 @@
+"""ライブラリスナップショット: 検証済み LibraryFile をバイナリ形式で保存・復元する
+
+library.yaml の解析と Pydantic 検証を毎回の起動で行わずに済むよう、
+検証済みの LibraryFile を pickle 形式で保存する。スナップショットは元 YAML
+（ディレクトリ指定時は全シャード）の mtime・サイズと内容ハッシュをキーとして持ち、
+mtime・サイズが一致するか、内容ハッシュが一致する場合のみ使用する。
+
+スナップショットはデプロイ時に自前で生成したファイルのみを読み込む前提とする
+（pickle は信頼できない入力に対して安全ではないため）。
+"""
+
+import hashlib
+import os
+import pickle
+from dataclasses import dataclass
+from pathlib import Path
+
+from backend.models.library_models import LibraryFile
+from backend.services.library_sources import source_files
+
+# スナップショット形式のバージョン。モデル定義を変更した場合は値を上げて古い形式を無効化する
+SNAPSHOT_FORMAT_VERSION: int = 2
+
+# スナップショットファイル名の接尾辞（library.yaml → library.yaml.snapshot）
+SNAPSHOT_SUFFIX: str = ".snapshot"
+
+
+@dataclass(frozen=True)
+class SourceFingerprint:
+    """スナップショットの鮮度判定に用いるソースファイル群の識別情報。
+
+    files はソースファイルごとの (ファイル名, mtime_ns, サイズ)。
+    """
+
+    files: tuple[tuple[str, int, int], ...]
+    sha256: str
+
+
+def default_snapshot_path(library_path: Path) -> Path:
+    """ライブラリに対応するデフォルトのスナップショットパスを返す。
+
+    library.yaml → library.yaml.snapshot、library.d/ → library.d.snapshot
+    """
+    return library_path.with_name(library_path.name + SNAPSHOT_SUFFIX)
+
+
+def _stat_signature(paths: list[Path]) -> tuple[tuple[str, int, int], ...]:
+    signature = []
+    for path in paths:
+        stat = path.stat()
+        signature.append((path.name, stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+
+def _content_hash(sources: list[tuple[Path, bytes]]) -> str:
+    digest = hashlib.sha256()
+    for path, data in sources:
+        digest.update(path.name.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(hashlib.sha256(data).digest())
+    return digest.hexdigest()
+
+
+def fingerprint(sources: list[tuple[Path, bytes]]) -> SourceFingerprint:
+    """読み込み済みのソースファイル群 (パス, 内容) から識別情報を作る。
+
+    解析に用いたのと同じバイト列からハッシュを計算し、解析中にファイルが
+    更新されてもスナップショットのキーと内容が食い違わないようにする。
+    """
+    files = tuple(
+        (path.name, path.stat().st_mtime_ns, len(data)) for path, data in sources
+    )
+    return SourceFingerprint(files=files, sha256=_content_hash(sources))
+
+
+def read_snapshot(library_path: Path, snapshot_path: Path) -> LibraryFile | None:
+    """鮮度が確認できたスナップショットから LibraryFile を復元する。
+
+    mtime とサイズが一致すればハッシュ計算を省略する。一致しない場合
+    （CI でビルドしたスナップショットをデプロイした場合など）は内容ハッシュで判定する。
+    スナップショットが存在しない・壊れている・古い場合は None を返す。
+    """
+    if not snapshot_path.exists():
+        return None
+
+    try:
+        with open(snapshot_path, "rb") as f:
+            payload = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+        return None
+
+    if not isinstance(payload, dict) or payload.get("format") != SNAPSHOT_FORMAT_VERSION:
+        return None
+    library = payload.get("library")
+    if not isinstance(library, LibraryFile):
+        return None
+
+    paths = source_files(library_path)
+    if payload.get("files") == _stat_signature(paths):
+        return library
+
+    sources = [(path, path.read_bytes()) for path in paths]
+    if payload.get("sha256") == _content_hash(sources):
+        return library
+    return None
+
+
+def write_snapshot(
+    library: LibraryFile, source: SourceFingerprint, snapshot_path: Path
+) -> None:
+    """LibraryFile をスナップショットとして書き出す。
+
+    書き込み途中のファイルを読まれないよう、一時ファイルに書いてから置き換える。
+    """
+    payload = {
+        "format": SNAPSHOT_FORMAT_VERSION,
+        "files": source.files,
+        "sha256": source.sha256,
+        "library": library,
+    }
+    tmp_path = snapshot_path.with_name(snapshot_path.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, snapshot_path)
@@ -0,0 +1,40 @@
+"""ライブラリのソースファイル解決
+
+--library-path には単一の YAML ファイル、または YAML シャードを格納したディレクトリ
+（例: library.d/*.yaml）を指定できる。ここではそのどちらであっても
+ソースファイル一覧とライブラリのルートディレクトリを同じ形で扱えるようにする。
+"""
+
+from pathlib import Path
+
+# ディレクトリ指定時にシャードとして読み込む拡張子
+SHARD_SUFFIXES: tuple[str, ...] = (".yaml", ".yml")
+
+
+def is_shard_file(path: Path) -> bool:
+    """ディレクトリ指定時にシャードとして扱うファイルかを判定する（隠しファイルは除外）。"""
+    return path.suffix in SHARD_SUFFIXES and not path.name.startswith(".")
+
+
+def source_files(library_path: Path) -> list[Path]:
+    """ライブラリを構成するソースファイルを読み込み順に返す。
+
+    ファイル指定時はそのファイルのみ、ディレクトリ指定時は直下のシャードを
+    ファイル名順に返す（サブディレクトリは対象外）。
+    """
+    if library_path.is_dir():
+        return sorted(
+            (p for p in library_path.iterdir() if p.is_file() and is_shard_file(p)),
+            key=lambda p: p.name,
+        )
+    return [library_path]
+
+
+def library_root(library_path: Path) -> Path:
+    """画像パス解決の基準となるディレクトリを返す。
+
+    ファイル指定時はその親ディレクトリ、ディレクトリ指定時はディレクトリ自身。
+    """
+    if library_path.is_dir():
+        return library_path.resolve()
+    return library_path.parent.resolve()
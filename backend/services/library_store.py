@@ -0,0 +1,87 @@
+"""LibraryStore: LibraryService が保持するライブラリデータの格納方式
+
+LibraryService はロード済みデータをストア経由で参照する。ストアは構築後に変更されない
+（再読み込み時は新しいストアを構築して差し替える）。
+
+- MemoryLibraryStore: 検証済みの LibraryFile をそのままメモリに保持する（デフォルト）
+- SqliteLibraryStore: SQLite ファイルに格納し、参照時に行単位でモデルを生成する
+  （library_store_sqlite.py）
+"""
+
+from abc import ABC, abstractmethod
+from collections.abc import Sequence
+from typing import TypeVar
+
+from backend.models.library_models import (
+    LibraryEnvironment,
+    LibraryFile,
+    LibraryScene,
+    LibraryTechDefaults,
+)
+
+_Named = TypeVar("_Named", LibraryScene, LibraryEnvironment)
+
+
+def index_by_name(items: Sequence[_Named]) -> dict[str, _Named]:
+    """name をキーとする辞書を構築する。同名の項目がある場合は先頭を優先する。"""
+    index: dict[str, _Named] = {}
+    for item in items:
+        index.setdefault(item.name, item)
+    return index
+
+
+class LibraryStore(ABC):
+    """ライブラリデータの読み取り専用インタフェース。"""
+
+    @property
+    @abstractmethod
+    def scenes(self) -> Sequence[LibraryScene]:
+        """シーンテンプレートを定義順に返す。"""
+
+    @property
+    @abstractmethod
+    def environments(self) -> Sequence[LibraryEnvironment]:
+        """環境を定義順に返す。"""
+
+    @property
+    @abstractmethod
+    def tech_defaults(self) -> LibraryTechDefaults | None:
+        """デフォルト技術設定を返す。未定義の場合は None。"""
+
+    @abstractmethod
+    def get_scene(self, name: str) -> LibraryScene | None:
+        """name に一致するシーンテンプレートを返す。存在しない場合は None。"""
+
+    @abstractmethod
+    def get_environment(self, name: str) -> LibraryEnvironment | None:
+        """name に一致する環境を返す。存在しない場合は None。"""
+
+    def close(self) -> None:
+        """ストアが保持する資源（データベース接続など）を解放する。既定では何もしない。"""
+
+
+class MemoryLibraryStore(LibraryStore):
+    """検証済みの LibraryFile をメモリに保持し、name の辞書索引で引くストア。"""
+
+    def __init__(self, library_file: LibraryFile) -> None:
+        self._library_file = library_file
+        self._scenes_by_name = index_by_name(library_file.scenes)
+        self._environments_by_name = index_by_name(library_file.environments)
+
+    @property
+    def scenes(self) -> list[LibraryScene]:
+        return self._library_file.scenes
+
+    @property
+    def environments(self) -> list[LibraryEnvironment]:
+        return self._library_file.environments
+
+    @property
+    def tech_defaults(self) -> LibraryTechDefaults | None:
+        return self._library_file.default_tech_settings
+
+    def get_scene(self, name: str) -> LibraryScene | None:
+        return self._scenes_by_name.get(name)
+
+    def get_environment(self, name: str) -> LibraryEnvironment | None:
+        return self._environments_by_name.get(name)
@@ -0,0 +1,229 @@
+"""CompactLibraryStore: ライブラリをインターン済み文字列と軽量レコードで保持するストア
+
+多くのシーンは同じ negative_prompt や重複の多いタグ列（カンマ区切りの positive_prompt）を
+持つが、Pydantic モデルではシーンごとに文字列のコピーを保持してしまう。このストアでは
+
+- 文字列を sys.intern で共有し、
+- シーン・環境を __slots__ のレコードで保持し、
+- positive_prompt をタグ辞書の ID 列（array('I')）に符号化する
+
+ことで常駐メモリを削減する。モデルは参照時に生成し、アクセサの戻り値は従来と同じ。
+"""
+
+import sys
+from array import array
+from collections.abc import Iterator, Sequence
+from typing import Callable, Generic, TypeVar, overload
+
+from backend.models.library_models import (
+    LibraryEnvironment,
+    LibraryFile,
+    LibraryScene,
+    LibraryTechDefaults,
+)
+from backend.services.library_store import LibraryStore
+
+# positive_prompt のタグ区切り
+TAG_SEPARATOR: str = ","
+
+_Record = TypeVar("_Record")
+_Model = TypeVar("_Model", LibraryScene, LibraryEnvironment)
+
+
+def _intern(value: str | None) -> str | None:
+    return sys.intern(value) if value is not None else None
+
+
+class TagDictionary:
+    """タグ文字列と ID の対応表。
+
+    プロンプトはカンマで分割したセグメント（前後の空白を含む）単位で符号化するため、
+    復号結果は元の文字列と完全に一致する。
+    """
+
+    def __init__(self) -> None:
+        self._ids: dict[str, int] = {}
+        self._tags: list[str] = []
+
+    def __len__(self) -> int:
+        return len(self._tags)
+
+    def encode(self, prompt: str) -> array:
+        ids = array("I")
+        for segment in prompt.split(TAG_SEPARATOR):
+            tag_id = self._ids.get(segment)
+            if tag_id is None:
+                tag_id = len(self._tags)
+                self._tags.append(sys.intern(segment))
+                self._ids[self._tags[-1]] = tag_id
+            ids.append(tag_id)
+        return ids
+
+    def decode(self, ids: array) -> str:
+        tags = self._tags
+        return TAG_SEPARATOR.join(tags[i] for i in ids)
+
+
+class _CompactScene:
+    __slots__ = (
+        "name",
+        "display_name",
+        "positive_tags",
+        "negative_prompt",
+        "batch_size",
+        "preview_image",
+    )
+
+    def __init__(self, scene: LibraryScene, tags: TagDictionary) -> None:
+        self.name = sys.intern(scene.name)
+        self.display_name = sys.intern(scene.display_name)
+        self.positive_tags = tags.encode(scene.positive_prompt)
+        self.negative_prompt = sys.intern(scene.negative_prompt)
+        self.batch_size = scene.batch_size
+        self.preview_image = _intern(scene.preview_image)
+
+
+class _CompactEnvironment:
+    __slots__ = ("name", "display_name", "environment_prompt", "thumbnail")
+
+    def __init__(self, env: LibraryEnvironment) -> None:
+        self.name = sys.intern(env.name)
+        self.display_name = sys.intern(env.display_name)
+        self.environment_prompt = sys.intern(env.environment_prompt)
+        self.thumbnail = _intern(env.thumbnail)
+
+
+class _RecordSequence(Sequence[_Model], Generic[_Record, _Model]):
+    """レコードのタプルを、参照時にモデルへ変換する読み取り専用シーケンスとして見せる。"""
+
+    def __init__(
+        self, records: tuple[_Record, ...], to_model: Callable[[_Record], _Model]
+    ) -> None:
+        self._records = records
+        self._to_model = to_model
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    @overload
+    def __getitem__(self, index: int) -> _Model: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[_Model]: ...
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._to_model(r) for r in self._records[index]]
+        return self._to_model(self._records[index])
+
+    def __iter__(self) -> Iterator[_Model]:
+        return map(self._to_model, self._records)
+
+
+class CompactLibraryStore(LibraryStore):
+    """インターン済み文字列・__slots__ レコード・タグ辞書で保持するストア。"""
+
+    def __init__(self, library_file: LibraryFile) -> None:
+        self._tags = TagDictionary()
+        self._scene_records = tuple(
+            _CompactScene(scene, self._tags) for scene in library_file.scenes
+        )
+        self._environment_records = tuple(
+            _CompactEnvironment(env) for env in library_file.environments
+        )
+        self._tech_defaults = library_file.default_tech_settings
+
+        self._scene_positions: dict[str, int] = {}
+        for i, record in enumerate(self._scene_records):
+            self._scene_positions.setdefault(record.name, i)
+        self._environment_positions: dict[str, int] = {}
+        for i, record in enumerate(self._environment_records):
+            self._environment_positions.setdefault(record.name, i)
+
+        self._scenes = _RecordSequence(self._scene_records, self._to_scene)
+        self._environments = _RecordSequence(
+            self._environment_records, self._to_environment
+        )
+
+    @property
+    def tag_count(self) -> int:
+        """タグ辞書に登録された異なるタグの数。"""
+        return len(self._tags)
+
+    def _to_scene(self, record: _CompactScene) -> LibraryScene:
+        return LibraryScene.model_construct(
+            name=record.name,
+            display_name=record.display_name,
+            positive_prompt=self._tags.decode(record.positive_tags),
+            negative_prompt=record.negative_prompt,
+            batch_size=record.batch_size,
+            preview_image=record.preview_image,
+        )
+
+    @staticmethod
+    def _to_environment(record: _CompactEnvironment) -> LibraryEnvironment:
+        return LibraryEnvironment.model_construct(
+            name=record.name,
+            display_name=record.display_name,
+            environment_prompt=record.environment_prompt,
+            thumbnail=record.thumbnail,
+        )
+
+    # ------------------------------------------------------------------
+    # LibraryStore
+    # ------------------------------------------------------------------
+
+    @property
+    def scenes(self) -> Sequence[LibraryScene]:
+        return self._scenes
+
+    @property
+    def environments(self) -> Sequence[LibraryEnvironment]:
+        return self._environments
+
+    @property
+    def tech_defaults(self) -> LibraryTechDefaults | None:
+        return self._tech_defaults
+
+    def get_scene(self, name: str) -> LibraryScene | None:
+        position = self._scene_positions.get(name)
+        return self._to_scene(self._scene_records[position]) if position is not None else None
+
+    def get_environment(self, name: str) -> LibraryEnvironment | None:
+        position = self._environment_positions.get(name)
+        if position is None:
+            return None
+        return self._to_environment(self._environment_records[position])
+
+
+def deep_sizeof(obj: object) -> int:
+    """obj から辿れるオブジェクトの合計サイズ（バイト）を概算する。
+
+    同一オブジェクトは一度だけ数えるため、共有された文字列は 1 回分として計上される。
+    Pydantic モデル・コンテナ・__slots__ レコードを辿る。
+    """
+    seen: set[int] = set()
+    total = 0
+    stack = [obj]
+    while stack:
+        current = stack.pop()
+        if id(current) in seen:
+            continue
+        seen.add(id(current))
+        total += sys.getsizeof(current)
+
+        if isinstance(current, dict):
+            stack.extend(current.keys())
+            stack.extend(current.values())
+        elif isinstance(current, (list, tuple, set, frozenset)):
+            stack.extend(current)
+        elif isinstance(current, (str, bytes, int, float, bool, array)) or current is None:
+            continue
+        else:
+            if hasattr(current, "__dict__"):
+                stack.append(vars(current))
+            for cls in type(current).__mro__:
+                for slot in getattr(cls, "__slots__", ()):
+                    if slot != "__dict__" and hasattr(current, slot):
+                        stack.append(getattr(current, slot))
+    return total
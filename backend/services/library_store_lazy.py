@@ -0,0 +1,171 @@
+"""LazyLibraryStore: シーン・環境を初回参照時に検証するストア
+
+起動時にはライブラリ YAML を生のマッピングとして読み込むだけで、LibraryScene・
+LibraryEnvironment への検証は要素が初めて参照（一覧での配信や生成時の名前解決）
+されたときに行い、結果をメモ化する。起動時間がライブラリの件数に比例して
+伸びないようにするためのもので、全件の検証は validate-library コマンドで行う。
+
+起動時に確認するのは索引の構築に必要な構造（各要素がマッピングで name を持つこと）と
+default_tech_settings のみ。それ以外の不正は参照時に LibraryEntryError となる。
+"""
+
+from collections.abc import Iterator, Sequence
+from typing import Generic, TypeVar, overload
+
+from pydantic import ValidationError
+
+from backend.models.library_models import (
+    LibraryEnvironment,
+    LibraryScene,
+    LibraryTechDefaults,
+)
+from backend.services.library_store import LibraryStore
+
+_Model = TypeVar("_Model", LibraryScene, LibraryEnvironment)
+
+
+class LibraryEntryError(Exception):
+    """遅延検証でライブラリの要素が不正と判明した場合の例外"""
+    pass
+
+
+class _LazyItems(Sequence[_Model], Generic[_Model]):
+    """生のマッピングを保持し、要素を初回参照時に検証してメモ化するシーケンス。
+
+    検証結果の書き込みは冪等なため、複数スレッドから同時に参照されてもロックは不要
+    （同じ要素を重複して検証することはあっても結果は変わらない）。
+    """
+
+    def __init__(self, key: str, model: type[_Model], raw_items: list[dict]) -> None:
+        self._key = key
+        self._model = model
+        self._raw = raw_items
+        self._validated: list[_Model | None] = [None] * len(raw_items)
+
+    def __len__(self) -> int:
+        return len(self._raw)
+
+    @overload
+    def __getitem__(self, index: int) -> _Model: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[_Model]: ...
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._get(i) for i in range(*index.indices(len(self._raw)))]
+        if index < 0:
+            index += len(self._raw)
+        if not 0 <= index < len(self._raw):
+            raise IndexError(index)
+        return self._get(index)
+
+    def __iter__(self) -> Iterator[_Model]:
+        return map(self._get, range(len(self._raw)))
+
+    @property
+    def raw(self) -> list[dict]:
+        """未検証の生のマッピング。"""
+        return self._raw
+
+    @property
+    def validated_count(self) -> int:
+        """検証済みの要素数。"""
+        return sum(item is not None for item in self._validated)
+
+    def _get(self, index: int) -> _Model:
+        item = self._validated[index]
+        if item is None:
+            raw = self._raw[index]
+            try:
+                item = self._model.model_validate(raw)
+            except ValidationError as exc:
+                raise LibraryEntryError(
+                    f"{self._key}[{index}] '{raw.get('name')}':\n{exc}"
+                ) from exc
+            self._validated[index] = item
+        return item
+
+
+class LazyLibraryStore(LibraryStore):
+    """生のマッピングから初回参照時に検証するストア。"""
+
+    def __init__(
+        self,
+        raw_scenes: list[dict],
+        raw_environments: list[dict],
+        tech_defaults: LibraryTechDefaults | None,
+    ) -> None:
+        """
+        Args:
+            raw_scenes: シーンの生のマッピング（各要素が name を持つこと）。
+            raw_environments: 環境の生のマッピング（各要素が name を持つこと）。
+            tech_defaults: 検証済みのデフォルト技術設定。
+        """
+        self._scenes = _LazyItems("scenes", LibraryScene, raw_scenes)
+        self._environments = _LazyItems("environments", LibraryEnvironment, raw_environments)
+        self._tech_defaults = tech_defaults
+        self._scene_positions = _positions(raw_scenes)
+        self._environment_positions = _positions(raw_environments)
+
+    @property
+    def validated_count(self) -> int:
+        """検証済みのシーン・環境の合計数。"""
+        return self._scenes.validated_count + self._environments.validated_count
+
+    @property
+    def raw_scenes(self) -> list[dict]:
+        """シーンの生のマッピング（変更検出など検証を伴わない参照用）。"""
+        return self._scenes.raw
+
+    @property
+    def raw_environments(self) -> list[dict]:
+        """環境の生のマッピング（変更検出など検証を伴わない参照用）。"""
+        return self._environments.raw
+
+    # ------------------------------------------------------------------
+    # LibraryStore
+    # ------------------------------------------------------------------
+
+    @property
+    def scenes(self) -> Sequence[LibraryScene]:
+        return self._scenes
+
+    @property
+    def environments(self) -> Sequence[LibraryEnvironment]:
+        return self._environments
+
+    @property
+    def tech_defaults(self) -> LibraryTechDefaults | None:
+        return self._tech_defaults
+
+    def get_scene(self, name: str) -> LibraryScene | None:
+        position = self._scene_positions.get(name)
+        return self._scenes[position] if position is not None else None
+
+    def get_environment(self, name: str) -> LibraryEnvironment | None:
+        position = self._environment_positions.get(name)
+        return self._environments[position] if position is not None else None
+
+
+def _positions(raw_items: list[dict]) -> dict[str, int]:
+    """name から位置への索引を構築する。同名の項目がある場合は先頭を優先する。"""
+    positions: dict[str, int] = {}
+    for i, raw in enumerate(raw_items):
+        positions.setdefault(raw["name"], i)
+    return positions
+
+
+def check_raw_items(key: str, value: object) -> list[dict]:
+    """scenes・environments の生の値が索引を構築できる構造であることを確認する。
+
+    Raises:
+        LibraryEntryError: リストでない場合、または name（文字列）を持たない要素がある場合。
+    """
+    if not isinstance(value, list):
+        raise LibraryEntryError(f"{key}: リストである必要があります")
+    for index, raw in enumerate(value):
+        if not isinstance(raw, dict) or not isinstance(raw.get("name"), str):
+            raise LibraryEntryError(f"{key}[{index}]: name を持つマッピングである必要があります")
+    return value
+
@@ -0,0 +1,381 @@
+"""SqliteLibraryStore: ライブラリを SQLite ファイルに格納するストア
+
+10 万件規模のシーンを Pydantic オブジェクトとして常駐させずに済むよう、
+検証済みのライブラリを SQLite に書き出し、参照時に行単位でモデルを生成する。
+name・display_name には索引を張り、名前検索や並び替えをクエリで行えるようにする。
+
+データベースには元 YAML の内容ハッシュを記録し、一致する場合は YAML の解析を省略して再利用する。
+構築は一時ファイルに対して行い、完成後に置き換える。既に開いている接続は置き換え前の
+ファイルを参照し続けるため、再読み込み中のリクエストにも一貫した内容を返せる。
+接続は、ストアとストアから取得したシーケンスがすべて参照されなくなった時点で閉じる
+（再読み込みのたびに古い接続が残らないよう、循環参照を作らない）。
+"""
+
+import os
+import sqlite3
+import threading
+import weakref
+from collections.abc import Iterator, Sequence
+from pathlib import Path
+from typing import Generic, TypeVar, overload
+
+from backend.models.library_models import (
+    LibraryEnvironment,
+    LibraryFile,
+    LibraryScene,
+    LibraryTechDefaults,
+)
+from backend.services.library_changes import digest_rows
+from backend.services.library_store import LibraryStore
+
+# データベース形式のバージョン。スキーマを変更した場合は値を上げて再構築させる
+SQLITE_FORMAT_VERSION: str = "1"
+
+# データベースファイル名の接尾辞（library.yaml → library.yaml.sqlite3）
+SQLITE_SUFFIX: str = ".sqlite3"
+
+# 反復取得時に 1 回のクエリで読み込む行数
+_CHUNK_SIZE: int = 500
+
+_SCENE_COLUMNS: tuple[str, ...] = (
+    "name",
+    "display_name",
+    "positive_prompt",
+    "negative_prompt",
+    "batch_size",
+    "preview_image",
+)
+_ENVIRONMENT_COLUMNS: tuple[str, ...] = (
+    "name",
+    "display_name",
+    "environment_prompt",
+    "thumbnail",
+)
+
+_SCHEMA = """
+CREATE TABLE meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE scenes (
+    position INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    display_name TEXT NOT NULL,
+    positive_prompt TEXT NOT NULL,
+    negative_prompt TEXT NOT NULL,
+    batch_size INTEGER NOT NULL,
+    preview_image TEXT
+);
+CREATE INDEX scenes_name ON scenes (name, position);
+CREATE INDEX scenes_display_name ON scenes (display_name, position);
+CREATE TABLE environments (
+    position INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    display_name TEXT NOT NULL,
+    environment_prompt TEXT NOT NULL,
+    thumbnail TEXT
+);
+CREATE INDEX environments_name ON environments (name, position);
+CREATE INDEX environments_display_name ON environments (display_name, position);
+"""
+
+_Model = TypeVar("_Model", LibraryScene, LibraryEnvironment)
+
+
+def default_sqlite_path(library_path: Path) -> Path:
+    """ライブラリに対応するデフォルトのデータベースパスを返す。"""
+    return library_path.with_name(library_path.name + SQLITE_SUFFIX)
+
+
+class _Database:
+    """読み取り専用の接続。スレッド間で共有し、アクセスはロックで直列化する。
+
+    参照されなくなった時点で接続を閉じる。
+    """
+
+    def __init__(self, db_path: Path) -> None:
+        self._conn = sqlite3.connect(
+            f"{db_path.resolve().as_uri()}?mode=ro", uri=True, check_same_thread=False
+        )
+        self._lock = threading.Lock()
+        self._finalizer = weakref.finalize(self, self._conn.close)
+
+    def fetchone(self, sql: str, params: tuple = ()) -> tuple | None:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchone()
+
+    def fetchall(self, sql: str, params: tuple = ()) -> list[tuple]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def close(self) -> None:
+        with self._lock:
+            self._finalizer()
+
+
+class _Table(Generic[_Model]):
+    """1 テーブル分のクエリと行→モデル変換をまとめたもの。"""
+
+    def __init__(
+        self,
+        database: _Database,
+        table: str,
+        columns: tuple[str, ...],
+        model: type[_Model],
+    ) -> None:
+        self._database = database
+        self._table = table
+        self._columns = columns
+        self._model = model
+        self._select = f"SELECT {', '.join(columns)} FROM {table}"
+
+    def to_model(self, row: tuple) -> _Model:
+        # 格納時に検証済みのため、再検証せずに構築する
+        return self._model.model_construct(**dict(zip(self._columns, row)))
+
+    def count(self) -> int:
+        return self._database.fetchone(f"SELECT COUNT(*) FROM {self._table}")[0]
+
+    def get(self, name: str) -> _Model | None:
+        row = self._database.fetchone(
+            f"{self._select} WHERE name = ? ORDER BY position LIMIT 1", (name,)
+        )
+        return self.to_model(row) if row is not None else None
+
+    def at(self, position: int) -> _Model | None:
+        row = self._database.fetchone(f"{self._select} WHERE position = ?", (position,))
+        return self.to_model(row) if row is not None else None
+
+    def rows(self) -> Iterator[tuple]:
+        """全行を定義順に、モデルを生成せず一定件数ずつ取得して返す。"""
+        for start in range(0, self.count(), _CHUNK_SIZE):
+            yield from self._database.fetchall(
+                f"SELECT {', '.join(self._columns)} FROM {self._table} "
+                "WHERE position >= ? AND position < ? ORDER BY position",
+                (start, start + _CHUNK_SIZE),
+            )
+
+    def column_values(self, column: str) -> list:
+        """column の値を重複なく返す（モデルを生成しない）。"""
+        if column not in self._columns:
+            raise ValueError(f"存在しない列です: {column}")
+        rows = self._database.fetchall(f"SELECT DISTINCT {column} FROM {self._table}")
+        return [row[0] for row in rows]
+
+    def range(self, start: int, stop: int) -> list[_Model]:
+        rows = self._database.fetchall(
+            f"{self._select} WHERE position >= ? AND position < ? ORDER BY position",
+            (start, stop),
+        )
+        return [self.to_model(row) for row in rows]
+
+    def query(
+        self,
+        order_by: str = "position",
+        after: tuple[str | int, int] | None = None,
+        limit: int | None = None,
+        offset: int = 0,
+    ) -> list[tuple[int, _Model]]:
+        """order_by（position / name / display_name）順に (定義位置, 要素) を limit 件返す。
+
+        after を指定した場合は、並び順で (キー, 定義位置) より後の要素から返す（キーセット方式）。
+        """
+        if order_by not in ("position", "name", "display_name"):
+            raise ValueError(f"並び替えできない列です: {order_by}")
+        where, params = "", ()
+        if order_by == "position":
+            order = "position"
+            if after is not None:
+                where, params = " WHERE position > ?", (after[1],)
+        else:
+            order = f"{order_by}, position"
+            if after is not None:
+                where, params = f" WHERE ({order_by}, position) > (?, ?)", after
+        rows = self._database.fetchall(
+            f"SELECT position, {', '.join(self._columns)} FROM {self._table}{where} "
+            f"ORDER BY {order} LIMIT ? OFFSET ?",
+            (*params, -1 if limit is None else limit, offset),
+        )
+        return [(row[0], self.to_model(row[1:])) for row in rows]
+
+
+class _LazyRows(Sequence[_Model]):
+    """テーブルの行を読み取り専用シーケンスとして見せる。要素は参照時に生成する。"""
+
+    def __init__(self, table: _Table[_Model]) -> None:
+        self._table = table
+        self._length = table.count()
+
+    def __len__(self) -> int:
+        return self._length
+
+    @overload
+    def __getitem__(self, index: int) -> _Model: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[_Model]: ...
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._length)
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            return self._table.range(start, stop)
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError(index)
+        return self._table.at(index)
+
+    def __iter__(self) -> Iterator[_Model]:
+        # 全件を一度に取得せず、一定件数ずつ取得してモデル化する
+        for start in range(0, self._length, _CHUNK_SIZE):
+            yield from self._table.range(start, start + _CHUNK_SIZE)
+
+
+class SqliteLibraryStore(LibraryStore):
+    """SQLite ファイルに格納されたライブラリを参照するストア。
+
+    接続は構築時に 1 本だけ開き、スレッド間で共有する（アクセスはロックで直列化）。
+    """
+
+    def __init__(self, db_path: Path) -> None:
+        self._db_path = db_path
+        self._database = _Database(db_path)
+
+        self._scene_table = _Table(self._database, "scenes", _SCENE_COLUMNS, LibraryScene)
+        self._environment_table = _Table(
+            self._database, "environments", _ENVIRONMENT_COLUMNS, LibraryEnvironment
+        )
+        self._scenes = _LazyRows(self._scene_table)
+        self._environments = _LazyRows(self._environment_table)
+
+        row = self._database.fetchone("SELECT value FROM meta WHERE key = 'tech_defaults'")
+        self._tech_defaults = (
+            LibraryTechDefaults.model_validate_json(row[0]) if row is not None else None
+        )
+
+    # ------------------------------------------------------------------
+    # 構築・再利用
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def open_if_fresh(cls, db_path: Path, source_sha256: str) -> "SqliteLibraryStore | None":
+        """source_sha256 のライブラリから構築済みのデータベースがあれば開いて返す。"""
+        if not db_path.exists():
+            return None
+        try:
+            conn = sqlite3.connect(f"{db_path.resolve().as_uri()}?mode=ro", uri=True)
+            try:
+                meta = dict(conn.execute("SELECT key, value FROM meta").fetchall())
+            finally:
+                conn.close()
+        except sqlite3.DatabaseError:
+            return None
+        if meta.get("format") != SQLITE_FORMAT_VERSION or meta.get("source_sha256") != source_sha256:
+            return None
+        return cls(db_path)
+
+    @classmethod
+    def build(
+        cls, db_path: Path, library_file: LibraryFile, source_sha256: str
+    ) -> "SqliteLibraryStore":
+        """検証済みの LibraryFile からデータベースを構築し、開いて返す。"""
+        tmp_path = db_path.with_name(db_path.name + ".tmp")
+        tmp_path.unlink(missing_ok=True)
+
+        conn = sqlite3.connect(tmp_path)
+        try:
+            conn.executescript(_SCHEMA)
+            meta = [("format", SQLITE_FORMAT_VERSION), ("source_sha256", source_sha256)]
+            if library_file.default_tech_settings is not None:
+                meta.append(("tech_defaults", library_file.default_tech_settings.model_dump_json()))
+            conn.executemany("INSERT INTO meta (key, value) VALUES (?, ?)", meta)
+            _insert_rows(conn, "scenes", _SCENE_COLUMNS, library_file.scenes)
+            _insert_rows(conn, "environments", _ENVIRONMENT_COLUMNS, library_file.environments)
+            conn.commit()
+        finally:
+            conn.close()
+
+        os.replace(tmp_path, db_path)
+        return cls(db_path)
+
+    def close(self) -> None:
+        """接続を直ちに閉じる（以降、このストアとそのシーケンスは利用できない）。"""
+        self._database.close()
+
+    # ------------------------------------------------------------------
+    # LibraryStore
+    # ------------------------------------------------------------------
+
+    @property
+    def scenes(self) -> Sequence[LibraryScene]:
+        return self._scenes
+
+    @property
+    def environments(self) -> Sequence[LibraryEnvironment]:
+        return self._environments
+
+    @property
+    def tech_defaults(self) -> LibraryTechDefaults | None:
+        return self._tech_defaults
+
+    def get_scene(self, name: str) -> LibraryScene | None:
+        return self._scene_table.get(name)
+
+    def get_environment(self, name: str) -> LibraryEnvironment | None:
+        return self._environment_table.get(name)
+
+    def query_scenes(
+        self,
+        order_by: str = "position",
+        after: tuple[str | int, int] | None = None,
+        limit: int | None = None,
+        offset: int = 0,
+    ) -> list[tuple[int, LibraryScene]]:
+        """シーンを order_by（position / name / display_name）順に (定義位置, シーン) で取得する。"""
+        return self._scene_table.query(order_by, after, limit, offset)
+
+    def image_paths(self) -> list[str | None]:
+        """シーンのプレビュー画像・環境のサムネイルのパスを列から直接返す（モデルを生成しない）。"""
+        return (
+            self._scene_table.column_values("preview_image")
+            + self._environment_table.column_values("thumbnail")
+        )
+
+    def scene_digests(self) -> dict[str, bytes]:
+        """シーンの name → 内容ダイジェストを行から直接求める（モデルを生成しない）。"""
+        return digest_rows(self._scene_table.rows())
+
+    def environment_digests(self) -> dict[str, bytes]:
+        """環境の name → 内容ダイジェストを行から直接求める（モデルを生成しない）。"""
+        return digest_rows(self._environment_table.rows())
+
+    def query_environments(
+        self,
+        order_by: str = "position",
+        after: tuple[str | int, int] | None = None,
+        limit: int | None = None,
+        offset: int = 0,
+    ) -> list[tuple[int, LibraryEnvironment]]:
+        """環境を order_by（position / name / display_name）順に (定義位置, 環境) で取得する。"""
+        return self._environment_table.query(order_by, after, limit, offset)
+
+
+def _insert_rows(
+    conn: sqlite3.Connection,
+    table: str,
+    columns: tuple[str, ...],
+    items: Sequence[LibraryScene] | Sequence[LibraryEnvironment],
+) -> None:
+    sql = (
+        f"INSERT INTO {table} (position, {', '.join(columns)}) "
+        f"VALUES ({', '.join('?' * (len(columns) + 1))})"
+    )
+    conn.executemany(
+        sql,
+        (
+            (position, *(getattr(item, column) for column in columns))
+            for position, item in enumerate(items)
+        ),
+    )
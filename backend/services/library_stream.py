@@ -0,0 +1,131 @@
+"""ライブラリ YAML のストリーミング読み込み
+
+通常の読み込みはドキュメント全体のノード木（round-trip のコメント情報を含む）を構築してから
+検証するため、ピークメモリが最終的なモデルの数倍になる。ここでは YAML のイベント列を直接たどり、
+scenes・environments の要素を 1 件ずつ組み立てて検証し、生のノードはすぐに破棄する。
+これによりピークメモリは「検証済みモデル + 1 要素分のノード」程度に抑えられる。
+"""
+
+from collections.abc import Iterator
+from typing import IO
+
+from pydantic import BaseModel, ValidationError
+from ruamel.yaml import YAML
+from ruamel.yaml.events import (
+    MappingEndEvent,
+    MappingStartEvent,
+    SequenceEndEvent,
+    SequenceStartEvent,
+    StreamEndEvent,
+)
+
+from backend.models.library_models import (
+    LibraryEnvironment,
+    LibraryFile,
+    LibraryScene,
+    LibraryTechDefaults,
+)
+
+# 要素ごとに逐次検証するトップレベルのキーと、その要素モデル
+_ITEM_MODELS: dict[str, type[BaseModel]] = {
+    "scenes": LibraryScene,
+    "environments": LibraryEnvironment,
+}
+
+
+class LibraryStreamError(Exception):
+    """ストリーミング読み込み中の構造・検証エラー"""
+    pass
+
+
+def iter_top_level(stream: IO[bytes]) -> Iterator[tuple[str, object]]:
+    """トップレベルのマッピングを (キー, 値) として 1 件ずつ返す。
+
+    scenes・environments の値がシーケンスの場合は、値の代わりに要素を 1 件ずつ
+    構築して返すイテレータを返す（呼び出し側は次のキーへ進む前に消費すること。
+    消費されなかった要素は読み飛ばされる）。
+
+    Raises:
+        YAMLError: YAML の構文エラーの場合。
+        LibraryStreamError: トップレベルがマッピングでない場合。
+    """
+    yaml = YAML(typ="safe", pure=True)
+    constructor, parser = yaml.get_constructor_parser(stream)
+    composer = yaml.composer
+
+    def construct_next() -> object:
+        # construct_document は構築済みオブジェクトのキャッシュも破棄する
+        return constructor.construct_document(composer.compose_node(None, None))
+
+    def sequence_items() -> Iterator[object]:
+        while not parser.check_event(SequenceEndEvent):
+            yield construct_next()
+        parser.get_event()
+
+    try:
+        parser.get_event()  # StreamStart
+        if parser.check_event(StreamEndEvent):
+            return  # 空のドキュメント
+        parser.get_event()  # DocumentStart
+        if not parser.check_event(MappingStartEvent):
+            raise LibraryStreamError("トップレベルがマッピングではありません")
+        parser.get_event()
+
+        while not parser.check_event(MappingEndEvent):
+            key = construct_next()
+            if key in _ITEM_MODELS and parser.check_event(SequenceStartEvent):
+                parser.get_event()
+                items = sequence_items()
+                yield key, items
+                for _ in items:
+                    pass
+            else:
+                yield key, construct_next()
+    finally:
+        parser.dispose()
+
+
+def load_streaming(stream: IO[bytes], partial: bool = False) -> LibraryFile:
+    """YAML ストリームを要素単位で検証しながら LibraryFile を構築する。
+
+    Args:
+        stream: ライブラリ YAML のバイトストリーム。
+        partial: True の場合は scenes・environments の省略を許す（シャード用）。
+
+    Raises:
+        YAMLError: YAML の構文エラーの場合。
+        LibraryStreamError: 構造エラーまたは要素の検証エラーの場合（位置を含む）。
+    """
+    items: dict[str, list] = {}
+    tech_defaults: LibraryTechDefaults | None = None
+
+    for key, value in iter_top_level(stream):
+        if key in _ITEM_MODELS:
+            if not isinstance(value, Iterator):
+                # シーケンス以外（null など）が書かれている場合
+                raise LibraryStreamError(f"{key}: リストである必要があります")
+            model = _ITEM_MODELS[key]
+            validated = items.setdefault(key, [])
+            for index, raw in enumerate(value):
+                try:
+                    validated.append(model.model_validate(raw))
+                except ValidationError as exc:
+                    raise LibraryStreamError(f"{key}[{index}]:\n{exc}") from exc
+        elif key == "default_tech_settings" and value is not None:
+            try:
+                tech_defaults = LibraryTechDefaults.model_validate(value)
+            except ValidationError as exc:
+                raise LibraryStreamError(f"default_tech_settings:\n{exc}") from exc
+
+    for key in _ITEM_MODELS:
+        if key not in items:
+            if not partial:
+                raise LibraryStreamError(f"{key}: 必須項目がありません")
+            items[key] = []
+
+    # 要素は検証済みのため、全体の再検証は行わない
+    return LibraryFile.model_construct(
+        scenes=items["scenes"],
+        environments=items["environments"],
+        default_tech_settings=tech_defaults,
+    )
@@ -0,0 +1,117 @@
+"""LibraryWatcher: ライブラリ YAML の変更を監視し、LibraryService をバックグラウンドで再読み込みする
+
+ディレクトリ指定のライブラリでは、直下のシャードの追加・変更・削除を監視する。
+
+watchfiles（uvicorn[standard] に同梱、Linux では inotify を使用）が利用可能な場合は
+ファイルシステム通知で変更を検知し、利用できない環境では mtime・サイズのポーリングで検知する。
+再読み込みは監視スレッド上で行われ、リクエスト処理はその完了を待たない。
+"""
+
+import threading
+from pathlib import Path
+
+from backend.services.library_service import LibraryService
+from backend.services.library_sources import is_shard_file, source_files
+
+try:
+    import watchfiles
+except ImportError:  # pragma: no cover - watchfiles は uvicorn[standard] に含まれる
+    watchfiles = None
+
+# ポーリング時の確認間隔（秒）
+DEFAULT_POLL_INTERVAL: float = 1.0
+
+
+class LibraryWatcher:
+    """ライブラリ YAML を監視し、変更時に LibraryService.reload() を呼ぶ監視スレッド。"""
+
+    def __init__(
+        self,
+        service: LibraryService,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+        use_polling: bool | None = None,
+    ) -> None:
+        """
+        Args:
+            service: ロード済みの LibraryService。
+            poll_interval: ポーリング時の確認間隔（秒）。
+            use_polling: True の場合は常にポーリングを使う。None の場合は
+                watchfiles が利用できないときのみポーリングを使う。
+        """
+        library_path = service.library_path
+        assert library_path is not None, "load() 済みの LibraryService を渡してください"
+        self._service = service
+        self._library_path = library_path.resolve()
+        self._is_directory = self._library_path.is_dir()
+        self._poll_interval = poll_interval
+        self._use_polling = watchfiles is None if use_polling is None else use_polling
+        self._stop_event = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def uses_polling(self) -> bool:
+        """ポーリングで変更を検知する場合は True。"""
+        return self._use_polling
+
+    def start(self) -> None:
+        """監視スレッドを開始する（デーモンスレッド）。"""
+        if self._thread is not None:
+            return
+        self._stop_event.clear()
+        target = self._poll_loop if self._use_polling else self._notify_loop
+        self._thread = threading.Thread(
+            target=target, name="library-watcher", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float | None = 5.0) -> None:
+        """監視スレッドを停止し、終了を待つ。"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    # ------------------------------------------------------------------
+    # 監視ループ
+    # ------------------------------------------------------------------
+
+    def _notify_loop(self) -> None:
+        # エディタによる「一時ファイル書き込み → rename」での保存も拾えるよう
+        # ファイルではなく親ディレクトリを監視し、対象ファイルの変更のみ扱う
+        watch_dir = self._library_path if self._is_directory else self._library_path.parent
+        for changes in watchfiles.watch(
+            watch_dir,
+            stop_event=self._stop_event,
+            recursive=False,
+            raise_interrupt=False,
+        ):
+            if any(self._is_source(Path(path).resolve()) for _, path in changes):
+                self._reload()
+
+    def _is_source(self, path: Path) -> bool:
+        if self._is_directory:
+            return path.parent == self._library_path and is_shard_file(path)
+        return path == self._library_path
+
+    def _poll_loop(self) -> None:
+        last = self._signature()
+        while not self._stop_event.wait(self._poll_interval):
+            current = self._signature()
+            if current != last:
+                last = current
+                self._reload()
+
+    def _signature(self) -> tuple[tuple[str, int, int], ...] | None:
+        signature = []
+        try:
+            for path in source_files(self._library_path):
+                stat = path.stat()
+                signature.append((path.name, stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            return None
+        return tuple(signature)
+
+    def _reload(self) -> None:
+        # 失敗時のエラー出力は reload() が行い、現在の内容が維持される
+        if self._service.reload():
+            print(f"ライブラリを再読み込みしました: {self._library_path}")
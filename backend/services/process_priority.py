@@ -0,0 +1,16 @@
+"""プロセスの優先度: バックグラウンド処理のワーカープロセスの優先度を下げる
+
+画像の事前生成（ImageWarmup）や /api/generate の生成処理は CPU を使うため、専用のプロセス
+プールで実行する。ワーカープロセスの優先度を下げ、一覧などの軽い API の応答を優先させる。
+"""
+
+import os
+
+
+def lower_priority(niceness: int) -> None:
+    """ワーカープロセスの初期化: 優先度を下げる（os.nice がない環境では何もしない）。"""
+    if hasattr(os, "nice"):
+        try:
+            os.nice(niceness)
+        except OSError:
+            pass
@@ -0,0 +1,162 @@
+"""SceneSearchIndex: シーンの display_name・positive_prompt に対する全文検索索引
+
+日本語の表示名にも対応できるよう、単語ではなく文字 n-gram（1-gram と 2-gram）で
+転置索引を構築する。正規化（NFKC + casefold）した各フィールドの n-gram ごとに、
+それを含むシーンの位置を昇順の array('I') で保持する。
+
+検索語は空白・カンマで区切った語の AND とし、各語の n-gram の転置リストの積集合を
+短いリストから順に取ることで候補を絞る（n-gram の出現順は確認しないため、
+語の並びが異なる場合も一致として扱うことがある）。
+"""
+
+import heapq
+import re
+import threading
+import unicodedata
+from array import array
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass
+
+from backend.models.library_models import LibraryScene
+
+# 検索語の区切り文字
+_TERM_SEPARATOR = re.compile(r"[\s,、，]+")
+
+# フィールドごとのスコア（語が一致したフィールドの重みの合計で順位付けする）
+_DISPLAY_NAME_WEIGHT: int = 2
+_PROMPT_WEIGHT: int = 1
+# 表示名が検索文字列全体と一致した場合の加点
+_EXACT_DISPLAY_NAME_BONUS: int = 3
+
+
+def normalize(text: str) -> str:
+    """検索用に文字列を正規化する（全角・半角や大文字・小文字の違いを吸収する）。"""
+    return unicodedata.normalize("NFKC", text).casefold()
+
+
+def ngrams(text: str) -> set[str]:
+    """正規化済み文字列の 1-gram と 2-gram の集合を返す。"""
+    grams = set(text)
+    grams.update(text[i:i + 2] for i in range(len(text) - 1))
+    return grams
+
+
+def _query_grams(term: str) -> set[str]:
+    """検索語を引くための n-gram（2 文字以上は 2-gram、1 文字はその文字）を返す。"""
+    if len(term) == 1:
+        return {term}
+    return {term[i:i + 2] for i in range(len(term) - 1)}
+
+
+@dataclass(frozen=True)
+class SearchResult:
+    """検索結果。positions は順位順のシーンの位置（offset・limit 適用後）。"""
+
+    total: int
+    positions: list[int]
+
+
+class _Postings:
+    """1 フィールド分の n-gram → シーン位置の転置リスト。"""
+
+    def __init__(self) -> None:
+        self._lists: dict[str, array] = {}
+
+    def add(self, position: int, grams: Iterable[str]) -> None:
+        # 位置は昇順に追加されるため、各リストは常に整列済み
+        for gram in grams:
+            postings = self._lists.get(gram)
+            if postings is None:
+                postings = self._lists[gram] = array("I")
+            postings.append(position)
+
+    def match(self, grams: set[str]) -> set[int]:
+        """すべての n-gram を含むシーンの位置の集合を返す。"""
+        lists = []
+        for gram in grams:
+            postings = self._lists.get(gram)
+            if postings is None:
+                return set()
+            lists.append(postings)
+        lists.sort(key=len)
+        result = set(lists[0])
+        for postings in lists[1:]:
+            if not result:
+                break
+            result.intersection_update(postings)
+        return result
+
+
+class SceneSearchIndex:
+    """シーン一覧から構築する全文検索索引。
+
+    構築後に変更されない（再読み込み時は新しい索引を構築する）。
+    eager=False の場合は最初の検索時に構築する（--lazy-library で起動時の全件検証を避けるため）。
+    """
+
+    def __init__(self, scenes: Sequence[LibraryScene], eager: bool = True) -> None:
+        self._scenes = scenes
+        self._lock = threading.Lock()
+        self._built = False
+        self._display_names: list[str] = []
+        self._display_postings = _Postings()
+        self._prompt_postings = _Postings()
+        if eager:
+            self._ensure_built()
+
+    def _ensure_built(self) -> None:
+        if self._built:
+            return
+        with self._lock:
+            if self._built:
+                return
+            for position, scene in enumerate(self._scenes):
+                display_name = normalize(scene.display_name)
+                self._display_names.append(display_name)
+                self._display_postings.add(position, ngrams(display_name))
+                self._prompt_postings.add(position, ngrams(normalize(scene.positive_prompt)))
+            self._scenes = ()  # 構築後はシーン一覧への参照を保持しない
+            self._built = True
+
+    def search(self, query: str, offset: int = 0, limit: int = 20) -> SearchResult:
+        """query に一致するシーンを順位順に返す。
+
+        順位は語が一致したフィールドの重み（表示名 > プロンプト）の合計の降順、
+        同点の場合はライブラリでの定義順。
+        """
+        self._ensure_built()
+        normalized = normalize(query).strip()
+        terms = [t for t in _TERM_SEPARATOR.split(normalized) if t]
+        if not terms:
+            return SearchResult(total=0, positions=[])
+
+        scores: dict[int, int] | None = None
+        for term in terms:
+            grams = _query_grams(term)
+            in_display = self._display_postings.match(grams)
+            in_prompt = self._prompt_postings.match(grams)
+            term_scores: dict[int, int] = {}
+            for position in in_display:
+                term_scores[position] = _DISPLAY_NAME_WEIGHT
+            for position in in_prompt:
+                term_scores[position] = term_scores.get(position, 0) + _PROMPT_WEIGHT
+
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {
+                    position: score + term_scores[position]
+                    for position, score in scores.items()
+                    if position in term_scores
+                }
+            if not scores:
+                return SearchResult(total=0, positions=[])
+
+        for position in scores:
+            if self._display_names[position] == normalized:
+                scores[position] += _EXACT_DISPLAY_NAME_BONUS
+
+        ranked = heapq.nsmallest(
+            offset + limit, scores, key=lambda position: (-scores[position], position)
+        )
+        return SearchResult(total=len(scores), positions=ranked[offset:])
@@ -0,0 +1,143 @@
+"""SceneTagIndex: positive_prompt のタグによるシーンの絞り込み・集計用索引
+
+positive_prompt はカンマ区切りのタグ列のため、読み込み時にタグへ分割・正規化し、
+
+- タグ → シーン位置の転置リスト（昇順の array('I')）
+- シーン → タグ ID 列（array('I')）
+
+を構築する。絞り込みは転置リストの積集合・差集合で行い、タグごとの件数は
+絞り込み後のシーンのタグ ID 列のみを数える（絞り込みがない場合は構築時の件数を使う）。
+"""
+
+import re
+import threading
+import unicodedata
+from array import array
+from collections import Counter
+from collections.abc import Iterable, Sequence
+
+from backend.models.library_models import LibraryScene
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_tag(tag: str) -> str:
+    """タグを正規化する（NFKC・小文字化・アンダースコアと連続空白を 1 つの空白に）。"""
+    tag = unicodedata.normalize("NFKC", tag).casefold().replace("_", " ")
+    return _WHITESPACE.sub(" ", tag).strip()
+
+
+def split_tags(prompt: str) -> list[str]:
+    """プロンプトを正規化済みタグの一覧に分割する（空のタグと重複は除く）。"""
+    tags: dict[str, None] = {}
+    for segment in prompt.split(","):
+        tag = normalize_tag(segment)
+        if tag:
+            tags[tag] = None
+    return list(tags)
+
+
+class SceneTagIndex:
+    """シーン一覧から構築するタグ索引。
+
+    構築後に変更されない（再読み込み時は新しい索引を構築する）。
+    eager=False の場合は最初の利用時に構築する（--lazy-library で起動時の全件検証を避けるため）。
+    """
+
+    def __init__(self, scenes: Sequence[LibraryScene], eager: bool = True) -> None:
+        self._scenes = scenes
+        self._lock = threading.Lock()
+        self._built = False
+        self._scene_count = 0
+        self._tag_ids: dict[str, int] = {}
+        self._tags: list[str] = []
+        self._postings: list[array] = []
+        self._scene_tags: list[array] = []
+        # 全シーンでのタグ ID の件数順（絞り込みなしの集計用）
+        self._ranked_tag_ids: list[int] = []
+        if eager:
+            self._ensure_built()
+
+    def _ensure_built(self) -> None:
+        if self._built:
+            return
+        with self._lock:
+            if self._built:
+                return
+            for position, scene in enumerate(self._scenes):
+                ids = array("I")
+                for tag in split_tags(scene.positive_prompt):
+                    tag_id = self._tag_ids.get(tag)
+                    if tag_id is None:
+                        tag_id = self._tag_ids[tag] = len(self._tags)
+                        self._tags.append(tag)
+                        self._postings.append(array("I"))
+                    self._postings[tag_id].append(position)
+                    ids.append(tag_id)
+                self._scene_tags.append(ids)
+            self._scene_count = len(self._scene_tags)
+            self._ranked_tag_ids = sorted(
+                range(len(self._tags)), key=lambda i: (-len(self._postings[i]), self._tags[i])
+            )
+            self._scenes = ()  # 構築後はシーン一覧への参照を保持しない
+            self._built = True
+
+    @property
+    def tag_count(self) -> int:
+        """異なるタグの数。"""
+        self._ensure_built()
+        return len(self._tags)
+
+    def filter(self, tags: Iterable[str] = (), exclude: Iterable[str] = ()) -> list[int]:
+        """tags をすべて含み、exclude をいずれも含まないシーンの位置を昇順で返す。
+
+        タグは normalize_tag で正規化してから照合する。
+        """
+        self._ensure_built()
+        include_ids = {self._tag_ids.get(tag) for tag in _normalized(tags)}
+        exclude_ids = {self._tag_ids.get(tag) for tag in _normalized(exclude)}
+        exclude_ids.discard(None)
+
+        if None in include_ids:
+            return []  # 存在しないタグを含む条件には一致しない
+        if include_ids:
+            postings = sorted((self._postings[i] for i in include_ids), key=len)
+            matched = set(postings[0])
+            for other in postings[1:]:
+                if not matched:
+                    break
+                matched.intersection_update(other)
+        elif exclude_ids:
+            matched = set(range(self._scene_count))
+        else:
+            return list(range(self._scene_count))
+
+        for tag_id in exclude_ids:
+            if not matched:
+                break
+            matched.difference_update(self._postings[tag_id])
+        return sorted(matched)
+
+    def facets(
+        self, positions: Sequence[int] | None = None, limit: int | None = None
+    ) -> list[tuple[str, int]]:
+        """タグごとのシーン数を件数の多い順（同数はタグ名順）に返す。
+
+        Args:
+            positions: 集計対象のシーンの位置。None の場合は全シーン。
+            limit: 返すタグの最大数。None の場合はすべて。
+        """
+        self._ensure_built()
+        if positions is None:
+            ranked_ids = self._ranked_tag_ids[:limit]
+            return [(self._tags[i], len(self._postings[i])) for i in ranked_ids]
+
+        counts: Counter[int] = Counter()
+        for position in positions:
+            counts.update(self._scene_tags[position])
+        ranked = sorted(counts.items(), key=lambda item: (-item[1], self._tags[item[0]]))
+        return [(self._tags[tag_id], count) for tag_id, count in ranked[:limit]]
+
+
+def _normalized(tags: Iterable[str]) -> set[str]:
+    return {tag for tag in map(normalize_tag, tags) if tag}
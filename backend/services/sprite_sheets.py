@@ -0,0 +1,154 @@
+"""スプライトシート: シーンのプレビュー画像・環境のサムネイルを 1 枚の画像にまとめる
+
+一覧の画面でカードごとに /api/images を要求すると、初回表示で数百のリクエストが発生する。
+一覧の 1 ページ分（またはすべて）の画像を正方形のタイルに縮小して格子状に並べた 1 枚の画像と、
+各要素のタイルの座標を返すことで、1 回のリクエストにまとめる。
+
+スプライトシートは (ライブラリ, バージョン, 種類, ページ, タイルの大きさ) をキーに
+SpriteSheetCache に保持し、ライブラリのバージョンが変わるまで作り直さない。
+"""
+
+import hashlib
+import io
+import math
+import threading
+from collections import OrderedDict
+from collections.abc import Callable, Hashable, Sequence
+from dataclasses import dataclass
+from pathlib import Path
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+# スプライトシートの形式
+SPRITE_FORMAT: str = "WEBP"
+SPRITE_MEDIA_TYPE: str = "image/webp"
+_SPRITE_QUALITY: int = 80
+
+# キャッシュするスプライトシートの合計サイズの上限のデフォルト
+DEFAULT_SPRITE_CACHE_BYTES: int = 64 * 1024 * 1024
+
+
+@dataclass(frozen=True)
+class SpriteFrame:
+    """スプライトシート内の 1 要素のタイルの位置（左上の座標）。"""
+
+    name: str
+    x: int
+    y: int
+
+
+@dataclass(frozen=True)
+class SpriteSheet:
+    """合成したスプライトシートの画像と座標。"""
+
+    image: bytes
+    etag: str
+    width: int
+    height: int
+    tile_size: int
+    frames: list[SpriteFrame]
+
+
+def build_sprite_sheet(
+    sources: Sequence[tuple[str, Path | None]], tile_size: int
+) -> SpriteSheet:
+    """(name, 画像パス) の一覧からスプライトシートを合成する。
+
+    各画像は tile_size 四方に収まるよう中央で切り抜いて縮小し、定義順に左上から並べる。
+    画像がない要素や読み込めない画像は frames に含めない（タイルも割り当てない）。
+    """
+    tiles: list[tuple[str, Image.Image]] = []
+    for name, path in sources:
+        if path is None:
+            continue
+        try:
+            with Image.open(path) as image:
+                image.draft("RGB", (tile_size, tile_size))
+                image = ImageOps.exif_transpose(image)
+                tile = ImageOps.fit(
+                    image.convert("RGBA"), (tile_size, tile_size), Image.Resampling.LANCZOS
+                )
+        except (OSError, UnidentifiedImageError, ValueError):
+            continue
+        tiles.append((name, tile))
+
+    columns = max(1, math.ceil(math.sqrt(len(tiles))))
+    rows = max(1, math.ceil(len(tiles) / columns))
+    sheet = Image.new("RGBA", (columns * tile_size, rows * tile_size), (0, 0, 0, 0))
+    frames: list[SpriteFrame] = []
+    for i, (name, tile) in enumerate(tiles):
+        x, y = (i % columns) * tile_size, (i // columns) * tile_size
+        sheet.paste(tile, (x, y))
+        frames.append(SpriteFrame(name=name, x=x, y=y))
+
+    buffer = io.BytesIO()
+    sheet.save(buffer, format=SPRITE_FORMAT, quality=_SPRITE_QUALITY)
+    image_bytes = buffer.getvalue()
+    return SpriteSheet(
+        image=image_bytes,
+        etag=f'"{hashlib.sha256(image_bytes).hexdigest()[:32]}"',
+        width=sheet.width,
+        height=sheet.height,
+        tile_size=tile_size,
+        frames=frames,
+    )
+
+
+class SpriteSheetCache:
+    """合成済みのスプライトシートを合計サイズの上限つきで保持する（LRU）。
+
+    同じキーのスプライトシートを同時に要求された場合は、1 回だけ合成して共有する。
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_SPRITE_CACHE_BYTES) -> None:
+        self._max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._sheets: OrderedDict[Hashable, SpriteSheet] = OrderedDict()
+        self._total_bytes = 0
+        self._building: dict[Hashable, threading.Lock] = {}
+
+    @property
+    def total_bytes(self) -> int:
+        """保持しているスプライトシートの画像の合計サイズ（バイト）。"""
+        return self._total_bytes
+
+    def __len__(self) -> int:
+        return len(self._sheets)
+
+    def get_or_build(self, key: Hashable, build: Callable[[], SpriteSheet]) -> SpriteSheet:
+        """key のスプライトシートを返す。保持していない場合は build() で合成する。
+
+        合成はブロッキングで行うため、イベントループ外（スレッドプール）から呼ぶ。
+        """
+        with self._lock:
+            sheet = self._get(key)
+            if sheet is not None:
+                return sheet
+            building = self._building.setdefault(key, threading.Lock())
+
+        with building:
+            with self._lock:
+                sheet = self._get(key)
+                if sheet is not None:
+                    return sheet
+            try:
+                sheet = build()
+            except BaseException:
+                with self._lock:
+                    self._building.pop(key, None)
+                raise
+            with self._lock:
+                self._building.pop(key, None)
+                self._sheets[key] = sheet
+                self._total_bytes += len(sheet.image)
+                # 直前に追加したもの（末尾）は残す
+                while self._total_bytes > self._max_bytes and len(self._sheets) > 1:
+                    _, evicted = self._sheets.popitem(last=False)
+                    self._total_bytes -= len(evicted.image)
+            return sheet
+
+    def _get(self, key: Hashable) -> SpriteSheet | None:
+        sheet = self._sheets.get(key)
+        if sheet is not None:
+            self._sheets.move_to_end(key)
+        return sheet
@@ -89,6 +89,20 @@ class TestAppConfigWithArgs:
         with pytest.raises(Exception):  # FrozenInstanceError or AttributeError
             config.port = 9999  # type: ignore
 
+    def test_watch_library_defaults_to_false(self, tmp_path):
+        """--watch-library を指定しない場合、ライブラリ監視は無効であること"""
+        library_file = tmp_path / "library.yaml"
+        library_file.write_text("scenes: []\nenvironments: []\n")
+        config = AppConfig.from_args(["--library-path", str(library_file)])
+        assert config.watch_library is False
+
+    def test_watch_library_flag(self, tmp_path):
+        """--watch-library でライブラリ監視を有効にできること"""
+        library_file = tmp_path / "library.yaml"
+        library_file.write_text("scenes: []\nenvironments: []\n")
+        config = AppConfig.from_args(["--library-path", str(library_file), "--watch-library"])
+        assert config.watch_library is True
+
 
 class TestAppConfigFileNotFound:
     """ライブラリファイル不在のテスト"""
@@ -120,3 +134,190 @@ class TestAppConfigFileNotFound:
             assert exc_info.value.code == 1
         finally:
             mod.DEFAULT_LIBRARY_PATH = original
+
+
+class TestAppConfigLibraryDirectory:
+    """ディレクトリ指定のテスト"""
+
+    def test_library_directory_is_accepted(self, tmp_path):
+        """--library-path にシャードディレクトリを指定できること"""
+        library_dir = tmp_path / "library.d"
+        library_dir.mkdir()
+        config = AppConfig.from_args(["--library-path", str(library_dir)])
+        assert config.library_path == library_dir
+
+
+class TestAppConfigLibraryStore:
+    """--library-store / --library-db のテスト"""
+
+    def test_library_store_defaults_to_memory(self, tmp_path):
+        library_file = tmp_path / "library.yaml"
+        library_file.write_text("scenes: []\nenvironments: []\n")
+        config = AppConfig.from_args(["--library-path", str(library_file)])
+        assert config.library_store == "memory"
+        assert config.library_db is None
+
+    def test_sqlite_store_with_db_path(self, tmp_path):
+        library_file = tmp_path / "library.yaml"
+        library_file.write_text("scenes: []\nenvironments: []\n")
+        db = tmp_path / "lib.sqlite3"
+        config = AppConfig.from_args([
+            "--library-path", str(library_file),
+            "--library-store", "sqlite",
+            "--library-db", str(db),
+        ])
+        assert config.library_store == "sqlite"
+        assert config.library_db == db
+
+    def test_compact_store(self, tmp_path):
+        library_file = tmp_path / "library.yaml"
+        library_file.write_text("scenes: []\nenvironments: []\n")
+        config = AppConfig.from_args(["--library-path", str(library_file), "--library-store", "compact"])
+        assert config.library_store == "compact"
+
+    def test_unknown_store_is_rejected(self, tmp_path):
+        library_file = tmp_path / "library.yaml"
+        library_file.write_text("scenes: []\nenvironments: []\n")
+        with pytest.raises(SystemExit):
+            AppConfig.from_args(["--library-path", str(library_file), "--library-store", "redis"])
+
+
+class TestAppConfigStreamLibrary:
+    """--stream-library のテスト"""
+
+    def test_stream_library_defaults_to_false(self, tmp_path):
+        library_file = tmp_path / "library.yaml"
+        library_file.write_text("scenes: []\nenvironments: []\n")
+        config = AppConfig.from_args(["--library-path", str(library_file)])
+        assert config.stream_library is False
+
+    def test_stream_library_flag(self, tmp_path):
+        library_file = tmp_path / "library.yaml"
+        library_file.write_text("scenes: []\nenvironments: []\n")
+        config = AppConfig.from_args(["--library-path", str(library_file), "--stream-library"])
+        assert config.stream_library is True
+
+
+class TestAppConfigLazyLibrary:
+    """--lazy-library のテスト"""
+
+    def test_lazy_library_flag(self, tmp_path):
+        library_file = tmp_path / "library.yaml"
+        library_file.write_text("scenes: []\nenvironments: []\n")
+        config = AppConfig.from_args(["--library-path", str(library_file), "--lazy-library"])
+        assert config.lazy_library is True
+
+    def test_lazy_library_requires_memory_store(self, tmp_path):
+        library_file = tmp_path / "library.yaml"
+        library_file.write_text("scenes: []\nenvironments: []\n")
+        with pytest.raises(SystemExit):
+            AppConfig.from_args([
+                "--library-path", str(library_file), "--lazy-library", "--library-store", "sqlite",
+            ])
+
+
+class TestAppConfigNamedLibraries:
+    """--library / --library-memory-budget のテスト"""
+
+    def _library(self, tmp_path: Path, name: str = "library.yaml") -> Path:
+        library_file = tmp_path / name
+        library_file.write_text("scenes: []\nenvironments: []\n")
+        return library_file
+
+    def test_no_named_libraries_by_default(self, tmp_path):
+        config = AppConfig.from_args(["--library-path", str(self._library(tmp_path))])
+        assert config.libraries == {}
+        assert config.library_memory_budget_mib is None
+
+    def test_named_libraries(self, tmp_path):
+        default = self._library(tmp_path)
+        team_a = self._library(tmp_path, "a.yaml")
+        team_b = self._library(tmp_path, "b.yaml")
+        config = AppConfig.from_args([
+            "--library-path", str(default),
+            "--library", f"team-a={team_a}",
+            "--library", f"team-b={team_b}",
+            "--library-memory-budget", "256",
+        ])
+        assert config.libraries == {"team-a": team_a, "team-b": team_b}
+        assert config.library_memory_budget_mib == 256
+
+    def test_invalid_spec_is_rejected(self, tmp_path):
+        with pytest.raises(SystemExit):
+            AppConfig.from_args(["--library-path", str(self._library(tmp_path)), "--library", "team-a"])
+
+    def test_duplicate_name_is_rejected(self, tmp_path):
+        default = self._library(tmp_path)
+        with pytest.raises(SystemExit):
+            AppConfig.from_args([
+                "--library-path", str(default),
+                "--library", f"a={default}",
+                "--library", f"a={default}",
+            ])
+
+    def test_missing_named_library_exits_with_code_1(self, tmp_path, capsys):
+        with pytest.raises(SystemExit) as exc_info:
+            AppConfig.from_args([
+                "--library-path", str(self._library(tmp_path)),
+                "--library", f"a={tmp_path / 'missing.yaml'}",
+            ])
+        assert exc_info.value.code == 1
+        assert "missing.yaml" in capsys.readouterr().err
+
+
+class TestAppConfigImageCache:
+    """リサイズ画像のキャッシュ設定のテスト"""
+
+    def test_defaults(self, tmp_path):
+        from backend.app_config import DEFAULT_IMAGE_CACHE_DIR, DEFAULT_IMAGE_CACHE_SIZE_MIB
+        lib = tmp_path / "library.yaml"
+        lib.write_text("scenes: []")
+        config = AppConfig.from_args(["--library-path", str(lib)])
+        assert config.image_cache_dir == DEFAULT_IMAGE_CACHE_DIR
+        assert config.image_cache_size_mib == DEFAULT_IMAGE_CACHE_SIZE_MIB
+        assert config.image_workers is None
+
+    def test_flags(self, tmp_path):
+        lib = tmp_path / "library.yaml"
+        lib.write_text("scenes: []")
+        config = AppConfig.from_args([
+            "--library-path", str(lib),
+            "--image-cache-dir", str(tmp_path / "cache"),
+            "--image-cache-size", "64",
+            "--image-workers", "2",
+        ])
+        assert config.image_cache_dir == tmp_path / "cache"
+        assert config.image_cache_size_mib == 64
+        assert config.image_workers == 2
+
+    @pytest.mark.parametrize("workers", ["0", "-1"])
+    def test_invalid_image_workers(self, tmp_path, workers, capsys):
+        lib = tmp_path / "library.yaml"
+        lib.write_text("scenes: []")
+        with pytest.raises(SystemExit) as exc_info:
+            AppConfig.from_args(["--library-path", str(lib), "--image-workers", workers])
+        assert exc_info.value.code == 1
+        assert "エラー: --image-workers" in capsys.readouterr().err
+
+
+class TestAppConfigGenerateWorkers:
+    """/api/generate のワーカープロセス数の設定のテスト"""
+
+    def test_default(self, tmp_path):
+        from backend.app_config import DEFAULT_GENERATE_WORKERS
+        lib = tmp_path / "library.yaml"
+        lib.write_text("scenes: []")
+        config = AppConfig.from_args(["--library-path", str(lib)])
+        assert config.generate_workers == DEFAULT_GENERATE_WORKERS
+
+    def test_flag(self, tmp_path):
+        lib = tmp_path / "library.yaml"
+        lib.write_text("scenes: []")
+        config = AppConfig.from_args(["--library-path", str(lib), "--generate-workers", "4"])
+        assert config.generate_workers == 4
+
+    def test_invalid_workers_exits(self, tmp_path):
+        lib = tmp_path / "library.yaml"
+        lib.write_text("scenes: []")
+        with pytest.raises(SystemExit):
+            AppConfig.from_args(["--library-path", str(lib), "--generate-workers", "0"])
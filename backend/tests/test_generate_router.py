@@ -196,3 +196,118 @@ class TestGenerateRouterInvalidRequest:
         del body["tech_settings"]
         response = client.post("/api/generate", json=body)
         assert response.status_code == 422
+
+
+class TestGenerateRouterTemplateResolution:
+    def _make_client(self, known_names: set[str]):
+        from backend.models.library_models import LibraryScene
+        from backend.services.library_service import LibraryService
+        mock_generator = MagicMock(spec=ConfigGeneratorService)
+        mock_validator = MagicMock(spec=ConfigValidatorService)
+        mock_generator.generate.return_value = _make_valid_config_dict()
+        mock_library = MagicMock(spec=LibraryService)
+        mock_library.get_scene.side_effect = lambda name: (
+            LibraryScene(name=name, display_name=name, positive_prompt="p")
+            if name in known_names
+            else None
+        )
+        app = _create_test_app(mock_generator, mock_validator)
+        app.state.library_service = mock_library
+        return TestClient(app), mock_generator, mock_library
+
+    def test_known_template_is_accepted(self):
+        client, generator, library = self._make_client({"studying"})
+        response = client.post("/api/generate", json=_make_valid_request_body())
+        assert response.status_code == 200
+        library.get_scene.assert_called_with("studying")
+        generator.generate.assert_called_once()
+
+    def test_unknown_template_returns_422(self):
+        client, generator, _ = self._make_client({"studying"})
+        body = _make_valid_request_body()
+        body["scenes"].append({"template_name": "missing", "overrides": {}})
+        response = client.post("/api/generate", json=body)
+        assert response.status_code == 422
+        assert "missing" in response.json()["detail"]
+        generator.generate.assert_not_called()
+
+
+class TestGenerateRouterExecutor:
+    def test_runs_pipeline_in_generate_executor(self):
+        import threading
+        from concurrent.futures import ThreadPoolExecutor
+        mock_generator = MagicMock(spec=ConfigGeneratorService)
+        mock_validator = MagicMock(spec=ConfigValidatorService)
+        threads = []
+        mock_generator.generate.side_effect = lambda req: (
+            threads.append(threading.current_thread().name) or _make_valid_config_dict()
+        )
+        app = _create_test_app(mock_generator, mock_validator)
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="generate") as executor:
+            app.state.generate_executor = executor
+            response = TestClient(app).post("/api/generate", json=_make_valid_request_body())
+        assert response.status_code == 200
+        assert threads and threads[0].startswith("generate")
+
+    def test_validation_error_in_executor_returns_422(self):
+        from concurrent.futures import ThreadPoolExecutor
+        mock_generator = MagicMock(spec=ConfigGeneratorService)
+        mock_validator = MagicMock(spec=ConfigValidatorService)
+        mock_generator.generate.return_value = _make_valid_config_dict()
+        mock_validator.validate.side_effect = ConfigValidationError("スキーマ違反")
+        app = _create_test_app(mock_generator, mock_validator)
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            app.state.generate_executor = executor
+            response = TestClient(app).post("/api/generate", json=_make_valid_request_body())
+        assert response.status_code == 422
+        assert "スキーマ違反" in response.json()["detail"]
+
+    def test_process_pool_returns_same_yaml(self):
+        from backend.main import SCHEMA_PATH
+        from backend.models.api_models import GenerateRequest
+        from backend.routers.generate_router import create_generate_executor, render_config
+        generator = ConfigGeneratorService()
+        validator = ConfigValidatorService(SCHEMA_PATH)
+        body = _make_valid_request_body()
+        expected = render_config(generator, validator, GenerateRequest.model_validate(body))
+        app = _create_test_app(generator, validator)
+        executor = create_generate_executor(1)
+        try:
+            app.state.generate_executor = executor
+            response = TestClient(app).post("/api/generate", json=body)
+        finally:
+            executor.shutdown()
+        assert response.status_code == 200
+        assert response.text == expected
+
+    def test_broken_pool_is_replaced(self, monkeypatch):
+        import os
+        from concurrent.futures import ThreadPoolExecutor
+        from concurrent.futures.process import BrokenProcessPool
+        from backend.routers import generate_router
+        mock_generator = MagicMock(spec=ConfigGeneratorService)
+        mock_validator = MagicMock(spec=ConfigValidatorService)
+        mock_generator.generate.return_value = _make_valid_config_dict()
+        app = _create_test_app(mock_generator, mock_validator)
+        # ワーカープロセスを強制終了してプールを壊す
+        broken = generate_router.create_generate_executor(2)
+        with pytest.raises(BrokenProcessPool):
+            broken.submit(os._exit, 1).result()
+        rebuilt = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rebuilt")
+        workers = []
+        monkeypatch.setattr(
+            generate_router,
+            "create_generate_executor",
+            lambda n: workers.append(n) or rebuilt,
+        )
+        app.state.generate_executor = broken
+        try:
+            client = TestClient(app)
+            first = client.post("/api/generate", json=_make_valid_request_body())
+            second = client.post("/api/generate", json=_make_valid_request_body())
+        finally:
+            rebuilt.shutdown()
+        assert first.status_code == 200
+        assert second.status_code == 200
+        assert workers == [2]
+        assert app.state.generate_executor is rebuilt
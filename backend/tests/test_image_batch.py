@@ -0,0 +1,114 @@
+"""画像の一括取得（POST /api/images/batch）のユニットテスト"""
+
+import hashlib
+import io
+from email.parser import BytesParser
+from email.policy import HTTP
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+
+LIBRARY_YAML = """\
+scenes: []
+environments: []
+"""
+
+
+def write_image(path: Path, size: tuple[int, int] = (400, 200), color: str = "red") -> Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    Image.new("RGB", size, color).save(path)
+    return path
+
+
+def parse_parts(response) -> list:
+    """multipart/mixed のレスポンスをパートの一覧にする。"""
+    header = f"Content-Type: {response.headers['content-type']}\r\n\r\n".encode()
+    message = BytesParser(policy=HTTP).parsebytes(header + response.content)
+    assert message.is_multipart()
+    return list(message.iter_parts())
+
+
+@pytest.fixture
+def library_dir(tmp_path) -> Path:
+    root = tmp_path / "library"
+    root.mkdir()
+    (root / "library.yaml").write_text(LIBRARY_YAML, encoding="utf-8")
+    write_image(root / "thumbs" / "a.png")
+    write_image(root / "thumbs" / "b.png", color="blue")
+    (root / "thumbs" / "c.svg").write_text("<svg/>")
+    return root
+
+
+@pytest.fixture
+def client(tmp_path, library_dir):
+    from backend.main import create_app
+    from backend.services.image_variants import ImageVariantCache
+    from backend.services.library_service import LibraryService
+    service = LibraryService(parse_workers=1)
+    service.load(library_dir / "library.yaml")
+    variants = ImageVariantCache(tmp_path / "cache", workers=1)
+    yield TestClient(create_app(tmp_path / "dist", library_service=service, image_variants=variants))
+    variants.close()
+
+
+class TestImageBatch:
+    def test_returns_images_in_order(self, client, library_dir):
+        paths = ["thumbs/b.png", "thumbs/a.png", "thumbs/c.svg"]
+        response = client.post("/api/images/batch", json={"paths": paths})
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("multipart/mixed; boundary=")
+
+        parts = parse_parts(response)
+        assert [part["Content-Location"] for part in parts] == paths
+        assert [part.get_content_type() for part in parts] == [
+            "image/png", "image/png", "image/svg+xml",
+        ]
+        for path, part in zip(paths, parts):
+            data = (library_dir / path).read_bytes()
+            assert part.get_payload(decode=True) == data
+            assert int(part["Content-Length"]) == len(data)
+            assert part["ETag"] == f'"{hashlib.sha256(data).hexdigest()[:32]}"'
+
+    def test_missing_images_are_empty_parts(self, client):
+        response = client.post(
+            "/api/images/batch", json={"paths": ["none.png", "thumbs/a.png", "../library.yaml"]}
+        )
+        parts = parse_parts(response)
+        assert [part["X-Status"] for part in parts] == ["404", None, "404"]
+        assert parts[0].get_payload(decode=True) == b""
+
+    def test_thumbnails(self, client):
+        response = client.post(
+            "/api/images/batch",
+            json={"paths": ["thumbs/a.png", "thumbs/c.svg"], "w": 40, "h": 40, "fit": "cover"},
+        )
+        resized, svg = parse_parts(response)
+        with Image.open(io.BytesIO(resized.get_payload(decode=True))) as image:
+            assert image.size == (40, 40)
+        assert svg.get_payload(decode=True) == b"<svg/>"
+
+    def test_non_ascii_paths_are_encoded(self, client, library_dir):
+        # 読み込み後に追加した画像は、索引の再走査で拾う
+        write_image(library_dir / "thumbs" / "寝室.png")
+        with patch("backend.routers.image_router.IMAGE_REFRESH_INTERVAL", 0.0):
+            response = client.post("/api/images/batch", json={"paths": ["thumbs/寝室.png"]})
+        parts = parse_parts(response)
+        assert parts[0]["Content-Location"] == "thumbs/%E5%AF%9D%E5%AE%A4.png"
+        assert parts[0]["X-Status"] is None
+
+    def test_streams_in_chunks(self, client, library_dir):
+        from backend.routers import image_router
+        data = (library_dir / "thumbs" / "a.png").read_bytes()
+        with patch.object(image_router, "BATCH_CHUNK_SIZE", 100):
+            response = client.post("/api/images/batch", json={"paths": ["thumbs/a.png"]})
+        assert parse_parts(response)[0].get_payload(decode=True) == data
+
+    @pytest.mark.parametrize(
+        "body",
+        [{"paths": []}, {"paths": ["a.png"] * 101}, {"paths": ["a.png"], "w": 0}, {}],
+    )
+    def test_invalid_requests(self, client, body):
+        assert client.post("/api/images/batch", json=body).status_code == 422
@@ -0,0 +1,189 @@
+"""画像の条件付き GET（ETag・Last-Modified・304）と内容アドレスの URL のユニットテスト"""
+
+import hashlib
+import io
+import os
+from email.utils import formatdate
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+LIBRARY_YAML = """\
+scenes:
+  - {name: a, display_name: A, positive_prompt: p, preview_image: scenes/a.png}
+  - {name: b, display_name: B, positive_prompt: p, preview_image: scenes/missing.png}
+environments:
+  - {name: e, display_name: E, environment_prompt: room, thumbnail: thumbs/e.png}
+"""
+
+IMAGE_A = b"\\x89PNG image a"
+HASH_A = hashlib.sha256(IMAGE_A).hexdigest()
+
+
+@pytest.fixture
+def library_path(tmp_path) -> Path:
+    root = tmp_path / "library"
+    (root / "scenes").mkdir(parents=True)
+    (root / "thumbs").mkdir()
+    (root / "scenes" / "a.png").write_bytes(IMAGE_A)
+    (root / "thumbs" / "e.png").write_bytes(b"thumb")
+    path = root / "library.yaml"
+    path.write_text(LIBRARY_YAML, encoding="utf-8")
+    return path
+
+
+def make_client(tmp_path, library_path, content_addressed: bool = True) -> TestClient:
+    from backend.main import create_app
+    from backend.services.library_service import LibraryService
+    service = LibraryService()
+    service.load(library_path)
+    return TestClient(create_app(
+        tmp_path / "dist", library_service=service, content_addressed_images=content_addressed
+    ))
+
+
+@pytest.fixture
+def client(tmp_path, library_path):
+    return make_client(tmp_path, library_path)
+
+
+class TestConditionalGet:
+    def test_validators(self, client):
+        response = client.get("/api/images/scenes/a.png")
+        assert response.status_code == 200
+        assert response.headers["etag"] == f'"{HASH_A[:32]}"'
+        assert "last-modified" in response.headers
+        assert response.headers["cache-control"] == "no-cache"
+
+    def test_if_none_match_returns_304(self, client):
+        etag = client.get("/api/images/scenes/a.png").headers["etag"]
+        response = client.get("/api/images/scenes/a.png", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+
+    def test_stale_etag_returns_body(self, client):
+        response = client.get("/api/images/scenes/a.png", headers={"If-None-Match": '"old"'})
+        assert response.status_code == 200
+        assert response.content == IMAGE_A
+
+    def test_if_modified_since(self, client, library_path):
+        mtime = (library_path.parent / "scenes" / "a.png").stat().st_mtime
+        fresh = {"If-Modified-Since": formatdate(mtime + 60, usegmt=True)}
+        stale = {"If-Modified-Since": formatdate(mtime - 60, usegmt=True)}
+        assert client.get("/api/images/scenes/a.png", headers=fresh).status_code == 304
+        assert client.get("/api/images/scenes/a.png", headers=stale).status_code == 200
+        broken = {"If-Modified-Since": "yesterday"}
+        assert client.get("/api/images/scenes/a.png", headers=broken).status_code == 200
+
+    def test_if_none_match_takes_precedence(self, client, library_path):
+        mtime = (library_path.parent / "scenes" / "a.png").stat().st_mtime
+        headers = {
+            "If-None-Match": '"old"',
+            "If-Modified-Since": formatdate(mtime + 60, usegmt=True),
+        }
+        assert client.get("/api/images/scenes/a.png", headers=headers).status_code == 200
+
+
+class TestContentAddressedUrls:
+    def test_library_responses_use_hashed_urls(self, client):
+        scenes = client.get("/api/scenes").json()
+        assert scenes[0]["preview_image_url"] == f"/api/images/{HASH_A[:16]}/scenes/a.png"
+        # 索引にない画像は通常の URL のまま
+        assert scenes[1]["preview_image_url"] == "/api/images/scenes/missing.png"
+        thumbnail = client.get("/api/environments").json()[0]["thumbnail_url"]
+        assert thumbnail.startswith("/api/images/") and thumbnail.endswith("/thumbs/e.png")
+
+    def test_hashed_url_is_immutable(self, client):
+        url = client.get("/api/scenes").json()[0]["preview_image_url"]
+        response = client.get(url)
+        assert response.status_code == 200
+        assert response.content == IMAGE_A
+        assert "immutable" in response.headers["cache-control"]
+
+    def test_outdated_hash_is_revalidated(self, client):
+        response = client.get("/api/images/0123456789abcdef/scenes/a.png")
+        assert response.status_code == 200
+        assert response.content == IMAGE_A
+        assert response.headers["cache-control"] == "no-cache"
+
+    def test_unknown_path_under_hash_is_404(self, client):
+        assert client.get(f"/api/images/{HASH_A[:16]}/scenes/none.png").status_code == 404
+
+    def test_disabled_by_default_in_create_app(self, tmp_path, library_path):
+        client = make_client(tmp_path, library_path, content_addressed=False)
+        assert client.get("/api/scenes").json()[0]["preview_image_url"] == "/api/images/scenes/a.png"
+
+
+class TestOverwrittenImages:
+    """同じパスに上書きされた画像の ETag・内容アドレスの URL・バリアント"""
+
+    @pytest.fixture
+    def image_path(self, library_path) -> Path:
+        return library_path.parent / "scenes" / "a.png"
+
+    @staticmethod
+    def overwrite(path: Path, data: bytes) -> None:
+        stat = path.stat()
+        path.write_bytes(data)
+        os.utime(path, ns=(stat.st_mtime_ns + 10**9, stat.st_mtime_ns + 10**9))
+
+    def test_stale_etag_is_not_304(self, client, image_path):
+        etag = client.get("/api/images/scenes/a.png").headers["etag"]
+        self.overwrite(image_path, b"new image")
+        response = client.get("/api/images/scenes/a.png", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.content == b"new image"
+        assert response.headers["etag"] == f'"{hashlib.sha256(b"new image").hexdigest()[:32]}"'
+
+    def test_old_hashed_url_is_not_immutable(self, client, image_path):
+        old_url = client.get("/api/scenes").json()[0]["preview_image_url"]
+        self.overwrite(image_path, b"new image")
+        response = client.get(old_url)
+        assert response.content == b"new image"
+        assert response.headers["cache-control"] == "no-cache"
+        new_hash = hashlib.sha256(b"new image").hexdigest()
+        new_url = client.get("/api/scenes").json()[0]["preview_image_url"]
+        assert new_url == f"/api/images/{new_hash[:16]}/scenes/a.png"
+
+    def test_variant_is_regenerated(self, tmp_path, library_path, image_path):
+        from PIL import Image
+        from backend.main import create_app
+        from backend.services.image_variants import ImageVariantCache
+        from backend.services.library_service import LibraryService
+        Image.new("RGB", (400, 200), "red").save(image_path)
+        service = LibraryService()
+        service.load(library_path)
+        variants = ImageVariantCache(tmp_path / "cache", workers=1)
+        client = TestClient(create_app(
+            tmp_path / "dist", library_service=service, image_variants=variants
+        ))
+        try:
+            old = client.get("/api/images/scenes/a.png?w=100")
+            stat = image_path.stat()
+            Image.new("RGB", (400, 200), "blue").save(image_path)
+            os.utime(image_path, ns=(stat.st_mtime_ns + 10**9, stat.st_mtime_ns + 10**9))
+            new = client.get(
+                "/api/images/scenes/a.png?w=100", headers={"If-None-Match": old.headers["etag"]}
+            )
+        finally:
+            variants.close()
+        assert new.status_code == 200
+        assert new.headers["etag"] != old.headers["etag"]
+        with Image.open(io.BytesIO(new.content)) as image:
+            assert image.convert("RGB").getpixel((0, 0)) == (0, 0, 255)
+
+
+class TestAppConfigContentAddressedImages:
+    def test_disabled_by_default(self, library_path):
+        from backend.app_config import AppConfig
+        config = AppConfig.from_args(["--library-path", str(library_path)])
+        assert config.content_addressed_images is False
+
+    def test_can_be_enabled(self, library_path):
+        from backend.app_config import AppConfig
+        config = AppConfig.from_args(
+            ["--library-path", str(library_path), "--content-addressed-images"]
+        )
+        assert config.content_addressed_images is True
@@ -0,0 +1,177 @@
+"""画像の索引（ImageIndex）と索引からの画像配信のユニットテスト"""
+
+import hashlib
+import os
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+LIBRARY_YAML = """\
+scenes:
+  - {name: a, display_name: A, positive_prompt: p, preview_image: scenes/a.png}
+environments: []
+"""
+
+
+def write(path: Path, data: bytes = b"image") -> Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    return path
+
+
+@pytest.fixture
+def library_dir(tmp_path) -> Path:
+    root = tmp_path / "library"
+    write(root / "library.yaml", LIBRARY_YAML.encode())
+    write(root / "scenes" / "a.png", b"a")
+    write(root / "thumbnails" / "nested" / "b.JPG", b"b")
+    write(root / "notes.txt", b"not an image")
+    write(root / ".cache" / "hidden.png", b"hidden")
+    return root
+
+
+class TestImageIndex:
+    def test_indexes_images_with_hash(self, library_dir):
+        from backend.services.image_index import ImageIndex
+        index = ImageIndex.build(library_dir)
+        assert len(index) == 2
+        entry = index.get("scenes/a.png")
+        assert entry.path == (library_dir / "scenes" / "a.png").resolve()
+        assert entry.size == 1
+        assert entry.content_hash == hashlib.sha256(b"a").hexdigest()
+        assert "thumbnails/nested/b.JPG" in index
+
+    @pytest.mark.parametrize(
+        "path",
+        ["notes.txt", ".cache/hidden.png", "missing.png", "../library/scenes/a.png",
+         "/etc/passwd", "scenes\\a.png", ""],
+    )
+    def test_rejects_paths_not_in_index(self, library_dir, path):
+        from backend.services.image_index import ImageIndex
+        assert ImageIndex.build(library_dir).get(path) is None
+
+    def test_normalizes_paths(self, library_dir):
+        from backend.services.image_index import ImageIndex
+        index = ImageIndex.build(library_dir)
+        assert index.get("./scenes/a.png") is index.get("scenes/a.png")
+        assert index.get("thumbnails/../scenes/a.png") is index.get("scenes/a.png")
+
+    def test_skips_symlinks_outside_root(self, tmp_path, library_dir):
+        from backend.services.image_index import ImageIndex
+        outside = write(tmp_path / "secret.png", b"secret")
+        os.symlink(outside, library_dir / "link.png")
+        os.symlink(library_dir / "scenes" / "a.png", library_dir / "inside.png")
+        os.symlink(tmp_path, library_dir / "linked_dir")
+        index = ImageIndex.build(library_dir)
+        assert index.get("link.png") is None
+        assert index.get("inside.png") is not None
+        assert index.get("linked_dir/secret.png") is None
+
+    def test_rebuild_reuses_unchanged_hashes(self, library_dir):
+        from backend.services import image_index
+        first = image_index.ImageIndex.build(library_dir)
+        write(library_dir / "scenes" / "new.png", b"new")
+        with patch.object(image_index, "file_hash", wraps=image_index.file_hash) as hasher:
+            second = image_index.ImageIndex.build(library_dir, previous=first)
+        assert hasher.call_count == 1
+        assert second.get("scenes/a.png") is first.get("scenes/a.png")
+        assert second.get("scenes/new.png") is not None
+
+    def test_parallel_hashing(self, library_dir):
+        from backend.services.image_index import ImageIndex
+        sequential = ImageIndex.build(library_dir, hash_workers=1)
+        assert ImageIndex.build(library_dir, hash_workers=4).entries_equal(sequential)
+
+
+    def test_revalidate(self, library_dir):
+        from backend.services.image_index import ImageIndex, revalidate
+        entry = ImageIndex.build(library_dir).get("scenes/a.png")
+        assert revalidate(entry) is entry
+
+        path = write(library_dir / "scenes" / "a.png", b"changed")
+        os.utime(path, ns=(entry.mtime_ns + 10**9, entry.mtime_ns + 10**9))
+        changed = revalidate(entry)
+        assert changed.size == 7
+        assert changed.content_hash == hashlib.sha256(b"changed").hexdigest()
+
+        path.unlink()
+        assert revalidate(entry) is None
+
+    def test_with_entry(self, library_dir):
+        from backend.services.image_index import ImageIndex
+        index = ImageIndex.build(library_dir)
+        entry = index.get("scenes/a.png")
+        removed = index.with_entry("scenes/./a.png", None)
+        assert removed.get("scenes/a.png") is None
+        assert index.get("scenes/a.png") is entry  # 元の索引は変わらない
+        assert removed.with_entry("scenes/a.png", entry).entries_equal(index)
+
+
+class TestServiceImages:
+    def test_get_image_and_resolve(self, library_dir):
+        from backend.services.library_service import LibraryService
+        service = LibraryService()
+        service.load(library_dir / "library.yaml")
+        assert service.get_image("scenes/a.png").size == 1
+        assert service.resolve_image_path("../library/library.yaml") is None
+
+    def test_refresh_images(self, library_dir):
+        from backend.services.library_service import LibraryService
+        service = LibraryService()
+        service.load(library_dir / "library.yaml")
+        version = service.version
+
+        assert service.refresh_images() is True
+        assert service.version == version  # 変化がなければバージョンは変わらない
+
+        write(library_dir / "scenes" / "new.png")
+        assert service.refresh_images(min_interval=3600) is False  # 直前に走査済み
+        assert service.get_image("scenes/new.png") is None
+        assert service.refresh_images() is True
+        assert service.get_image("scenes/new.png") is not None
+        assert service.version > version
+
+    def test_router_refreshes_on_miss(self, tmp_path, library_dir):
+        from backend.main import create_app
+        from backend.services.library_service import LibraryService
+        service = LibraryService()
+        service.load(library_dir / "library.yaml")
+        client = TestClient(create_app(tmp_path / "dist", library_service=service))
+
+        write(library_dir / "scenes" / "added.png", b"added")
+        with patch("backend.routers.image_router.IMAGE_REFRESH_INTERVAL", 0.0):
+            response = client.get("/api/images/scenes/added.png")
+        assert response.status_code == 200
+        assert response.content == b"added"
+        assert client.get("/api/images/library.yaml").status_code == 404
+
+    def test_router_returns_404_for_deleted_image(self, tmp_path, library_dir):
+        from backend.main import create_app
+        from backend.services.library_service import LibraryService
+        service = LibraryService()
+        service.load(library_dir / "library.yaml")
+        client = TestClient(create_app(tmp_path / "dist", library_service=service))
+        version = service.version
+
+        (library_dir / "scenes" / "a.png").unlink()
+        assert client.get("/api/images/scenes/a.png").status_code == 404
+        assert service.get_image("scenes/a.png") is None
+        assert service.version > version
+
+    def test_router_rehashes_overwritten_image(self, tmp_path, library_dir):
+        from backend.main import create_app
+        from backend.services.library_service import LibraryService
+        service = LibraryService()
+        service.load(library_dir / "library.yaml")
+        client = TestClient(create_app(tmp_path / "dist", library_service=service))
+        old = service.get_image("scenes/a.png")
+
+        path = write(library_dir / "scenes" / "a.png", b"overwritten")
+        os.utime(path, ns=(old.mtime_ns + 10**9, old.mtime_ns + 10**9))
+        response = client.get("/api/images/scenes/a.png")
+        assert response.status_code == 200
+        assert response.content == b"overwritten"
+        new_hash = hashlib.sha256(b"overwritten").hexdigest()
+        assert service.get_image("scenes/a.png").content_hash == new_hash
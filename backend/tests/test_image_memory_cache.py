@@ -0,0 +1,148 @@
+"""画像のメモリキャッシュ（ImageMemoryCache・/api/image-cache）のユニットテスト"""
+
+import os
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+LIBRARY_YAML = """\
+scenes:
+  - {name: a, display_name: A, positive_prompt: p, preview_image: scenes/a.png}
+environments: []
+"""
+
+
+def write(path: Path, data: bytes) -> Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    return path
+
+
+class TestImageMemoryCache:
+    def test_hit_and_miss(self, tmp_path):
+        from backend.services.image_memory_cache import ImageMemoryCache
+        path = write(tmp_path / "a.png", b"abc")
+        cache = ImageMemoryCache(max_bytes=100, max_object_bytes=10)
+        assert cache.get(path, 1) is None
+        assert cache.load(path, 1) == b"abc"
+        assert cache.get(path, 1) == b"abc"
+        stats = cache.stats()
+        assert (stats.hits, stats.misses, stats.entries, stats.bytes) == (1, 1, 1, 3)
+
+    def test_stamp_change_invalidates(self, tmp_path):
+        from backend.services.image_memory_cache import ImageMemoryCache
+        path = write(tmp_path / "a.png", b"abc")
+        cache = ImageMemoryCache(max_bytes=100, max_object_bytes=10)
+        cache.load(path, 1)
+        assert cache.get(path, 2) is None
+        assert cache.stats().entries == 0
+        assert cache.stats().bytes == 0
+
+    def test_object_size_cap(self, tmp_path):
+        from backend.services.image_memory_cache import ImageMemoryCache
+        path = write(tmp_path / "big.png", b"x" * 11)
+        cache = ImageMemoryCache(max_bytes=100, max_object_bytes=10)
+        assert cache.load(path, 1) is None
+        assert cache.stats().entries == 0
+
+    def test_evicts_least_recently_used(self, tmp_path):
+        from backend.services.image_memory_cache import ImageMemoryCache
+        paths = [write(tmp_path / f"{i}.png", b"x" * 4) for i in range(3)]
+        cache = ImageMemoryCache(max_bytes=8, max_object_bytes=4)
+        cache.load(paths[0], 1)
+        cache.load(paths[1], 1)
+        cache.get(paths[0], 1)
+        cache.load(paths[2], 1)
+        assert cache.get(paths[0], 1) is not None
+        assert cache.get(paths[1], 1) is None
+        assert cache.stats().bytes == 8
+
+    def test_size_mismatch_is_not_cached(self, tmp_path):
+        from backend.services.image_memory_cache import ImageMemoryCache
+        path = write(tmp_path / "a.png", b"changed")
+        cache = ImageMemoryCache(max_bytes=100, max_object_bytes=10)
+        assert cache.load(path, 1, expected_size=3) == b"changed"
+        assert cache.stats().entries == 0
+
+    def test_missing_file_raises(self, tmp_path):
+        from backend.services.image_memory_cache import ImageMemoryCache
+        with pytest.raises(OSError):
+            ImageMemoryCache().load(tmp_path / "none.png", 1)
+
+
+@pytest.fixture
+def library_dir(tmp_path) -> Path:
+    root = tmp_path / "library"
+    write(root / "library.yaml", LIBRARY_YAML.encode())
+    write(root / "scenes" / "a.png", b"image a")
+    return root
+
+
+def make_client(tmp_path, library_dir, memory=None) -> tuple[TestClient, object]:
+    from backend.main import create_app
+    from backend.services.library_service import LibraryService
+    service = LibraryService()
+    service.load(library_dir / "library.yaml")
+    client = TestClient(create_app(
+        tmp_path / "dist", library_service=service, image_memory_cache=memory
+    ))
+    return client, service
+
+
+class TestRouterMemoryCache:
+    def test_serves_from_memory(self, tmp_path, library_dir):
+        from backend.services.image_memory_cache import ImageMemoryCache
+        client, _ = make_client(tmp_path, library_dir, ImageMemoryCache())
+        first = client.get("/api/images/scenes/a.png")
+        assert first.content == b"image a"
+        assert first.headers["content-type"] == "image/png"
+
+        with patch("builtins.open", side_effect=AssertionError("read from disk")):
+            second = client.get("/api/images/scenes/a.png")
+        assert second.content == b"image a"
+        assert second.headers["etag"] == first.headers["etag"]
+
+        stats = client.get("/api/image-cache").json()
+        assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+
+    def test_refreshed_index_invalidates(self, tmp_path, library_dir):
+        from backend.services.image_memory_cache import ImageMemoryCache
+        client, service = make_client(tmp_path, library_dir, ImageMemoryCache())
+        client.get("/api/images/scenes/a.png")
+        path = library_dir / "scenes" / "a.png"
+        path.write_bytes(b"image a, updated")
+        os.utime(path, ns=(path.stat().st_atime_ns, path.stat().st_mtime_ns + 10**9))
+        assert service.refresh_images() is True
+        assert client.get("/api/images/scenes/a.png").content == b"image a, updated"
+
+    def test_large_images_are_streamed(self, tmp_path, library_dir):
+        from backend.services.image_memory_cache import ImageMemoryCache
+        memory = ImageMemoryCache(max_bytes=100, max_object_bytes=4)
+        client, _ = make_client(tmp_path, library_dir, memory)
+        assert client.get("/api/images/scenes/a.png").content == b"image a"
+        assert memory.stats().entries == 0
+
+    def test_stats_404_when_disabled(self, tmp_path, library_dir):
+        client, _ = make_client(tmp_path, library_dir)
+        assert client.get("/api/images/scenes/a.png").status_code == 200
+        assert client.get("/api/image-cache").status_code == 404
+
+
+class TestAppConfigImageMemoryCache:
+    def test_defaults(self, library_dir):
+        from backend.app_config import AppConfig
+        config = AppConfig.from_args(["--library-path", str(library_dir / "library.yaml")])
+        assert config.image_memory_cache_size_mib == 64
+        assert config.image_memory_cache_max_object_kib == 1024
+
+    def test_options(self, library_dir):
+        from backend.app_config import AppConfig
+        config = AppConfig.from_args([
+            "--library-path", str(library_dir / "library.yaml"),
+            "--image-memory-cache-size", "0",
+            "--image-memory-cache-max-object", "256",
+        ])
+        assert config.image_memory_cache_size_mib == 0
+        assert config.image_memory_cache_max_object_kib == 256
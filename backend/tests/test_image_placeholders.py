@@ -0,0 +1,252 @@
+"""画像のプレースホルダー（寸法と LQIP）のユニットテスト"""
+
+import base64
+import io
+import json
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+
+LIBRARY_YAML = """\
+scenes:
+  - {name: a, display_name: A, positive_prompt: p, preview_image: scenes/a.png}
+  - {name: b, display_name: B, positive_prompt: p}
+  - {name: c, display_name: C, positive_prompt: p, preview_image: scenes/missing.png}
+environments:
+  - {name: e, display_name: E, environment_prompt: room, thumbnail: thumbs/e.jpg}
+"""
+
+
+def write_image(path: Path, size: tuple[int, int], color: str = "red", **options) -> Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    Image.new("RGB", size, color).save(path, **options)
+    return path
+
+
+def decode_lqip(lqip: str) -> Image.Image:
+    prefix = "data:image/webp;base64,"
+    assert lqip.startswith(prefix)
+    return Image.open(io.BytesIO(base64.b64decode(lqip[len(prefix):])))
+
+
+@pytest.fixture
+def library_path(tmp_path) -> Path:
+    root = tmp_path / "library"
+    write_image(root / "scenes" / "a.png", (640, 320))
+    write_image(root / "thumbs" / "e.jpg", (90, 120), "blue")
+    write_image(root / "unused.png", (10, 10))
+    path = root / "library.yaml"
+    path.write_text(LIBRARY_YAML, encoding="utf-8")
+    return path
+
+
+def load_service(library_path, placeholders, **options):
+    from backend.services.library_service import LibraryService
+    service = LibraryService(parse_workers=1, placeholders=placeholders, **options)
+    service.load(library_path)
+    assert service.wait_for_placeholders(timeout=30)
+    return service
+
+
+class TestComputePlaceholder:
+    def test_size_and_lqip(self, tmp_path):
+        from backend.services.image_placeholders import compute_placeholder
+        placeholder = compute_placeholder(write_image(tmp_path / "a.png", (640, 320)))
+        assert (placeholder.width, placeholder.height) == (640, 320)
+        with decode_lqip(placeholder.lqip) as image:
+            assert image.size == (16, 8)
+
+    def test_exif_orientation_swaps_size(self, tmp_path):
+        from backend.services.image_placeholders import compute_placeholder
+        exif = Image.Exif()
+        exif[0x0112] = 6  # 90 度回転
+        path = write_image(tmp_path / "a.jpg", (80, 40), exif=exif.tobytes())
+        placeholder = compute_placeholder(path)
+        assert (placeholder.width, placeholder.height) == (40, 80)
+        with decode_lqip(placeholder.lqip) as image:
+            assert image.size == (8, 16)
+
+    def test_unreadable_image(self, tmp_path):
+        from backend.services.image_placeholders import compute_placeholder
+        path = tmp_path / "a.svg"
+        path.write_text("<svg/>")
+        assert compute_placeholder(path) is None
+
+
+class TestImagePlaceholderCache:
+    def test_persists_across_instances(self, tmp_path, library_path):
+        from backend.services import image_placeholders
+        from backend.services.image_index import ImageIndex
+        index = ImageIndex.build(library_path.parent)
+        entries = [index.get("scenes/a.png"), index.get("thumbs/e.jpg")]
+        cache_path = tmp_path / "cache" / "placeholders.json"
+
+        first = image_placeholders.ImagePlaceholderCache(cache_path)
+        assert first.update(entries) == 2
+        assert first.update(entries) == 0
+
+        with patch.object(image_placeholders, "compute_placeholder") as compute:
+            second = image_placeholders.ImagePlaceholderCache(cache_path)
+            assert second.update(entries) == 0
+        compute.assert_not_called()
+        assert second.get(entries[0].content_hash) == first.get(entries[0].content_hash)
+
+    def test_unreadable_images_are_remembered(self, tmp_path):
+        from backend.services import image_placeholders
+        from backend.services.image_index import ImageIndex
+        (tmp_path / "images").mkdir()
+        (tmp_path / "images" / "broken.png").write_bytes(b"broken")
+        entries = [ImageIndex.build(tmp_path / "images").get("broken.png")]
+        cache_path = tmp_path / "placeholders.json"
+        image_placeholders.ImagePlaceholderCache(cache_path).update(entries)
+
+        reopened = image_placeholders.ImagePlaceholderCache(cache_path)
+        assert reopened.update(entries) == 0
+        assert reopened.get(entries[0].content_hash) is None
+
+    @pytest.mark.parametrize(
+        "content", ["not json", json.dumps({"version": 0, "placeholders": {}}), "[]"]
+    )
+    def test_invalid_file_is_discarded(self, tmp_path, content):
+        from backend.services.image_placeholders import ImagePlaceholderCache
+        path = tmp_path / "placeholders.json"
+        path.write_text(content)
+        assert len(ImagePlaceholderCache(path)) == 0
+
+    def test_process_pool(self, tmp_path, library_path):
+        from backend.services.image_index import ImageIndex
+        from backend.services.image_placeholders import ImagePlaceholderCache
+        index = ImageIndex.build(library_path.parent)
+        entries = [index.get("scenes/a.png"), index.get("thumbs/e.jpg")]
+        cache = ImagePlaceholderCache()
+        assert cache.update(entries, workers=2) == 2
+        assert cache.get(entries[1].content_hash).width == 90
+
+
+class TestServicePlaceholders:
+    def test_computed_for_referenced_images(self, library_path):
+        from backend.services.image_placeholders import ImagePlaceholderCache
+        placeholders = ImagePlaceholderCache()
+        service = load_service(library_path, placeholders)
+        assert len(placeholders) == 2  # unused.png は対象外
+        placeholder = service.get_image_placeholder("scenes/a.png")
+        assert (placeholder.width, placeholder.height) == (640, 320)
+        assert service.get_image_placeholder("unused.png") is None
+
+    def test_lazy_store(self, library_path):
+        from backend.services.image_placeholders import ImagePlaceholderCache
+        placeholders = ImagePlaceholderCache()
+        service = load_service(library_path, placeholders, lazy=True)
+        assert len(placeholders) == 2
+        assert service.get_image_placeholder("thumbs/e.jpg").height == 120
+
+    def test_refresh_images_computes_new_images(self, library_path):
+        from backend.services.image_placeholders import ImagePlaceholderCache
+        service = load_service(library_path, ImagePlaceholderCache())
+        assert service.get_image_placeholder("scenes/missing.png") is None
+        write_image(library_path.parent / "scenes" / "missing.png", (20, 30))
+        service.refresh_images()
+        assert service.wait_for_placeholders(timeout=10)
+        assert service.get_image_placeholder("scenes/missing.png").width == 20
+
+    def test_refresh_images_computes_placeholders_outside_lock(self, library_path):
+        import threading
+        from backend.services.image_placeholders import ImagePlaceholderCache
+        placeholders = ImagePlaceholderCache()
+        service = load_service(library_path, placeholders)
+        started, release = threading.Event(), threading.Event()
+        update = placeholders.update
+
+        def slow_update(images, workers=1):
+            started.set()
+            release.wait(10)
+            return update(images, workers)
+
+        write_image(library_path.parent / "scenes" / "missing.png", (20, 30))
+        with patch.object(placeholders, "update", slow_update):
+            assert service.refresh_images() is True  # 計算の完了を待たずに戻る
+            assert started.wait(10)
+            version = service.version
+            # 計算中も再読み込み・再走査はロックを待たない
+            assert service.reload() is True
+            assert service.refresh_images() is True
+            release.set()
+            assert service.wait_for_placeholders(timeout=10)
+        assert service.get_image_placeholder("scenes/missing.png").width == 20
+        assert service.version > version
+
+    def test_load_does_not_wait_for_placeholders(self, library_path):
+        import threading
+        from backend.services.image_placeholders import ImagePlaceholderCache
+        from backend.services.library_service import LibraryService
+        placeholders = ImagePlaceholderCache()
+        release = threading.Event()
+        update = placeholders.update
+
+        def slow_update(images, workers=1):
+            release.wait(10)
+            return update(images, workers)
+
+        service = LibraryService(parse_workers=1, placeholders=placeholders)
+        with patch.object(placeholders, "update", slow_update):
+            service.load(library_path)  # 計算の完了を待たずに戻る
+            assert service.get_image_placeholder("scenes/a.png") is None
+            version = service.version
+            release.set()
+            assert service.wait_for_placeholders(timeout=10)
+        assert service.get_image_placeholder("scenes/a.png").width == 640
+        assert service.version > version  # プレースホルダーを含む一覧を作り直す
+
+    def test_disabled(self, library_path):
+        service = load_service(library_path, None)
+        assert service.get_image_placeholder("scenes/a.png") is None
+
+
+class TestLibraryResponses:
+    def make_client(self, tmp_path, library_path) -> TestClient:
+        from backend.main import create_app
+        from backend.services.image_placeholders import ImagePlaceholderCache
+        placeholders = ImagePlaceholderCache()
+        service = load_service(library_path, placeholders)
+        return TestClient(create_app(
+            tmp_path / "dist", library_service=service, image_placeholders=placeholders
+        ))
+
+    def test_scenes(self, tmp_path, library_path):
+        scenes = self.make_client(tmp_path, library_path).get("/api/scenes").json()
+        assert (scenes[0]["preview_image_width"], scenes[0]["preview_image_height"]) == (640, 320)
+        assert scenes[0]["preview_image_placeholder"].startswith("data:image/webp;base64,")
+        for scene in scenes[1:]:
+            assert scene["preview_image_width"] is None
+            assert scene["preview_image_placeholder"] is None
+
+    def test_environments_and_fields(self, tmp_path, library_path):
+        client = self.make_client(tmp_path, library_path)
+        environment = client.get("/api/environments").json()[0]
+        assert (environment["thumbnail_width"], environment["thumbnail_height"]) == (90, 120)
+        page = client.get(
+            "/api/environments", params={"fields": "name,thumbnail_width", "limit": 1}
+        ).json()
+        assert page == [{"name": "e", "thumbnail_width": 90}]
+
+    def test_search_results(self, tmp_path, library_path):
+        client = self.make_client(tmp_path, library_path)
+        item = client.get("/api/scenes/search", params={"q": "A"}).json()["items"][0]
+        assert item["preview_image_height"] == 320
+
+
+class TestAppConfigPlaceholders:
+    def test_options(self, library_path, tmp_path):
+        from backend.app_config import AppConfig
+        config = AppConfig.from_args(["--library-path", str(library_path)])
+        assert config.image_placeholders is True
+        config = AppConfig.from_args([
+            "--library-path", str(library_path),
+            "--no-image-placeholders",
+            "--placeholder-cache", str(tmp_path / "p.json"),
+        ])
+        assert config.image_placeholders is False
+        assert config.placeholder_cache == tmp_path / "p.json"
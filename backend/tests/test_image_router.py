@@ -16,6 +16,7 @@ PROJECT_ROOT = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(PROJECT_ROOT))
 
 from backend.routers.image_router import router
+from backend.services.image_index import ImageEntry, file_hash
 from backend.services.library_service import LibraryService
 
 
@@ -32,10 +33,18 @@ def create_test_app(library_service: LibraryService) -> FastAPI:
     return app
 
 
+def image_entry(path: Path) -> ImageEntry:
+    """画像の索引のエントリを作る。"""
+    stat = path.stat()
+    return ImageEntry(path, stat.st_size, stat.st_mtime_ns, file_hash(path))
+
+
 @pytest.fixture
 def mock_service():
     """テスト用 LibraryService モック。"""
-    return MagicMock(spec=LibraryService)
+    service = MagicMock(spec=LibraryService)
+    service.refresh_images.return_value = False
+    return service
 
 
 # ---------------------------------------------------------------------------
@@ -50,7 +59,7 @@ class TestGetImage:
         """画像ファイルが存在するとき、200 が返ること。"""
         img = tmp_path / "test.jpg"
         img.write_bytes(b"fake jpeg data")
-        mock_service.resolve_image_path.return_value = img
+        mock_service.revalidate_image.return_value = image_entry(img)
         client = TestClient(create_test_app(mock_service))
 
         response = client.get("/api/images/test.jpg")
@@ -58,8 +67,8 @@ class TestGetImage:
         assert response.status_code == 200
 
     def test_returns_404_when_path_not_resolved(self, mock_service):
-        """resolve_image_path が None を返すとき、404 が返ること。"""
-        mock_service.resolve_image_path.return_value = None
+        """revalidate_image が None を返すとき、404 が返ること。"""
+        mock_service.revalidate_image.return_value = None
         client = TestClient(create_test_app(mock_service))
 
         response = client.get("/api/images/nonexistent.jpg")
@@ -68,7 +77,7 @@ class TestGetImage:
 
     def test_404_response_has_detail(self, mock_service):
         """404 レスポンスに detail フィールドが含まれること。"""
-        mock_service.resolve_image_path.return_value = None
+        mock_service.revalidate_image.return_value = None
         client = TestClient(create_test_app(mock_service))
 
         data = client.get("/api/images/nonexistent.jpg").json()
@@ -79,12 +88,12 @@ class TestGetImage:
         """単純なパスが LibraryService に正しく渡されること。"""
         img = tmp_path / "test.jpg"
         img.write_bytes(b"data")
-        mock_service.resolve_image_path.return_value = img
+        mock_service.revalidate_image.return_value = image_entry(img)
         client = TestClient(create_test_app(mock_service))
 
         client.get("/api/images/test.jpg")
 
-        mock_service.resolve_image_path.assert_called_once_with("test.jpg")
+        mock_service.revalidate_image.assert_called_once_with("test.jpg")
 
     def test_passes_subdirectory_path_to_service(self, tmp_path, mock_service):
         """サブディレクトリを含むパスが LibraryService に正しく渡されること。"""
@@ -92,18 +101,18 @@ class TestGetImage:
         subdir.mkdir()
         img = subdir / "studying.jpg"
         img.write_bytes(b"data")
-        mock_service.resolve_image_path.return_value = img
+        mock_service.revalidate_image.return_value = image_entry(img)
         client = TestClient(create_test_app(mock_service))
 
         client.get("/api/images/scenes/studying.jpg")
 
-        mock_service.resolve_image_path.assert_called_once_with("scenes/studying.jpg")
+        mock_service.revalidate_image.assert_called_once_with("scenes/studying.jpg")
 
     def test_returns_image_content(self, tmp_path, mock_service):
         """レスポンスボディに画像データが含まれること。"""
         img = tmp_path / "test.jpg"
         img.write_bytes(b"fake jpeg data")
-        mock_service.resolve_image_path.return_value = img
+        mock_service.revalidate_image.return_value = image_entry(img)
         client = TestClient(create_test_app(mock_service))
 
         response = client.get("/api/images/test.jpg")
@@ -114,7 +123,7 @@ class TestGetImage:
         """.jpg ファイルに image/jpeg の Content-Type が付与されること。"""
         img = tmp_path / "photo.jpg"
         img.write_bytes(b"fake jpeg")
-        mock_service.resolve_image_path.return_value = img
+        mock_service.revalidate_image.return_value = image_entry(img)
         client = TestClient(create_test_app(mock_service))
 
         response = client.get("/api/images/photo.jpg")
@@ -125,7 +134,7 @@ class TestGetImage:
         """.png ファイルに image/png の Content-Type が付与されること。"""
         img = tmp_path / "icon.png"
         img.write_bytes(b"fake png")
-        mock_service.resolve_image_path.return_value = img
+        mock_service.revalidate_image.return_value = image_entry(img)
         client = TestClient(create_test_app(mock_service))
 
         response = client.get("/api/images/icon.png")
@@ -136,7 +145,7 @@ class TestGetImage:
         """.gif ファイルに image/gif の Content-Type が付与されること。"""
         img = tmp_path / "anim.gif"
         img.write_bytes(b"fake gif")
-        mock_service.resolve_image_path.return_value = img
+        mock_service.revalidate_image.return_value = image_entry(img)
         client = TestClient(create_test_app(mock_service))
 
         response = client.get("/api/images/anim.gif")
@@ -149,9 +158,9 @@ class TestGetImage:
         nested.mkdir(parents=True)
         img = nested / "img.png"
         img.write_bytes(b"data")
-        mock_service.resolve_image_path.return_value = img
+        mock_service.revalidate_image.return_value = image_entry(img)
         client = TestClient(create_test_app(mock_service))
 
         client.get("/api/images/a/b/c/img.png")
 
-        mock_service.resolve_image_path.assert_called_once_with("a/b/c/img.png")
+        mock_service.revalidate_image.assert_called_once_with("a/b/c/img.png")
@@ -0,0 +1,379 @@
+"""画像のリサイズ版（ImageVariantCache・/api/images?w=&h=&fit=）のユニットテスト"""
+
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from PIL import Image
+
+
+def write_image(path: Path, size: tuple[int, int] = (400, 200), color: str = "red") -> Path:
+    Image.new("RGB", size, color).save(path)
+    return path
+
+
+def variant_size(path: Path) -> tuple[int, int]:
+    with Image.open(path) as image:
+        return image.size
+
+
+@pytest.fixture
+def cache(tmp_path):
+    from backend.services.image_variants import ImageVariantCache
+    variants = ImageVariantCache(tmp_path / "cache", workers=1)
+    yield variants
+    variants.close()
+
+
+def render(cache, source: Path, **spec) -> Path:
+    from backend.services.image_index import file_hash
+    from backend.services.image_variants import VariantSpec
+    return cache.get(source, file_hash(source), VariantSpec(**spec)).result(timeout=10)
+
+
+class TestVariantSpec:
+    def test_requires_width_or_height(self):
+        from backend.services.image_variants import VariantSpec
+        with pytest.raises(ValueError):
+            VariantSpec()
+
+    def test_cache_name_depends_on_source_and_params(self):
+        from backend.services.image_variants import VariantSpec
+        spec = VariantSpec(width=200)
+        assert spec.cache_name("a", ".PNG").endswith(".png")
+        assert spec.cache_name("a", ".png") == VariantSpec(width=200).cache_name("a", ".png")
+        assert spec.cache_name("a", ".png") != spec.cache_name("b", ".png")
+        assert spec.cache_name("a", ".png") != VariantSpec(width=200, fit="cover").cache_name(
+            "a", ".png"
+        )
+
+
+class TestResize:
+    @pytest.mark.parametrize(
+        "spec, expected",
+        [
+            ({"width": 200}, (200, 100)),
+            ({"height": 50}, (100, 50)),
+            ({"width": 100, "height": 100}, (100, 50)),
+            ({"width": 100, "height": 100, "fit": "cover"}, (100, 100)),
+            ({"width": 100, "height": 100, "fit": "fill"}, (100, 100)),
+            ({"width": 1000}, (400, 200)),  # 拡大はしない
+            ({"width": 800, "height": 800, "fit": "cover"}, (200, 200)),
+        ],
+    )
+    def test_variant_sizes(self, tmp_path, cache, spec, expected):
+        source = write_image(tmp_path / "a.png")
+        assert variant_size(render(cache, source, **spec)) == expected
+
+    def test_jpeg_source_stays_jpeg(self, tmp_path, cache):
+        source = write_image(tmp_path / "a.jpg")
+        path = render(cache, source, width=100)
+        assert path.suffix == ".jpg"
+        with Image.open(path) as image:
+            assert image.format == "JPEG"
+
+
+class TestCache:
+    def test_second_request_is_served_from_disk(self, tmp_path, cache):
+        from backend.services import image_variants
+        source = write_image(tmp_path / "a.png")
+        with patch.object(
+            image_variants, "render_variant", wraps=image_variants.render_variant
+        ) as renderer:
+            first = render(cache, source, width=100)
+            second = render(cache, source, width=100)
+        assert first == second
+        assert renderer.call_count == 1
+        assert len(cache) == 1
+
+    def test_source_change_produces_new_variant(self, tmp_path, cache):
+        source = write_image(tmp_path / "a.png")
+        first = render(cache, source, width=100)
+        write_image(source, color="blue")
+        assert render(cache, source, width=100) != first
+
+    def test_evicts_least_recently_used(self, tmp_path):
+        from backend.services.image_variants import ImageVariantCache
+        sources = [
+            write_image(tmp_path / f"{i}.png", color=color)
+            for i, color in enumerate(("red", "green", "blue"))
+        ]
+        probe = ImageVariantCache(tmp_path / "probe", workers=1)
+        size = render(probe, sources[0], width=50).stat().st_size
+        probe.close()
+
+        cache = ImageVariantCache(tmp_path / "cache", max_bytes=size * 2 + size // 2, workers=1)
+        first = render(cache, sources[0], width=50)
+        second = render(cache, sources[1], width=50)
+        render(cache, sources[0], width=50)  # first を最近の参照にする
+        render(cache, sources[2], width=50)
+        cache.close()
+
+        assert first.exists()
+        assert not second.exists()
+        assert cache.total_bytes <= size * 2 + size // 2
+
+    def test_process_pool(self, tmp_path):
+        from backend.services.image_variants import ImageVariantCache
+        cache = ImageVariantCache(tmp_path / "cache", workers=2)
+        try:
+            path = render(cache, write_image(tmp_path / "a.png"), width=100)
+        finally:
+            cache.close()
+        assert variant_size(path) == (100, 50)
+
+    def test_broken_process_pool_is_replaced(self, tmp_path):
+        import os
+        from concurrent.futures import ProcessPoolExecutor
+        from concurrent.futures.process import BrokenProcessPool
+        from backend.services.image_variants import ImageVariantCache
+        pools = []
+
+        def create_pool(**kwargs):
+            pools.append(ProcessPoolExecutor(**kwargs))
+            return pools[-1]
+
+        source = write_image(tmp_path / "a.png")
+        cache = ImageVariantCache(tmp_path / "cache", workers=2)
+        try:
+            with patch("backend.services.image_variants.ProcessPoolExecutor", create_pool):
+                render(cache, source, width=100)
+                # ワーカープロセスを強制終了してプールを壊す（Pillow のクラッシュなどに相当）
+                with pytest.raises(BrokenProcessPool):
+                    pools[0].submit(os._exit, 1).result()
+                path = render(cache, source, width=50)
+        finally:
+            cache.close()
+        assert variant_size(path) == (50, 25)
+        assert len(pools) == 2
+
+    def test_existing_files_are_loaded_on_start(self, tmp_path, cache):
+        from backend.services.image_variants import ImageVariantCache
+        render(cache, write_image(tmp_path / "a.png"), width=100)
+        (tmp_path / "cache" / "stale.png.123.partial").write_bytes(b"x")
+
+        reopened = ImageVariantCache(tmp_path / "cache", workers=1)
+        assert len(reopened) == 1
+        assert reopened.total_bytes == cache.total_bytes
+        assert not (tmp_path / "cache" / "stale.png.123.partial").exists()
+
+
+class TestImageRouterVariants:
+    @pytest.fixture
+    def client(self, tmp_path, cache):
+        from backend.routers.image_router import router
+        from backend.services.image_index import ImageIndex
+        from backend.services.library_service import LibraryService
+
+        service = MagicMock(spec=LibraryService)
+        service.revalidate_image.side_effect = lambda p: ImageIndex.build(tmp_path).get(p)
+        service.refresh_images.return_value = False
+        app = FastAPI()
+        app.state.library_service = service
+        app.state.image_variants = cache
+        app.include_router(router, prefix="/api")
+        return TestClient(app)
+
+    def test_resized_variant(self, tmp_path, client):
+        write_image(tmp_path / "a.png", size=(1600, 800))
+        response = client.get("/api/images/a.png?w=200")
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "image/png"
+        resized = tmp_path / "resized.png"
+        resized.write_bytes(response.content)
+        assert variant_size(resized) == (200, 100)
+
+    def test_variant_has_own_etag(self, tmp_path, client):
+        write_image(tmp_path / "a.png")
+        original = client.get("/api/images/a.png").headers["etag"]
+        etag = client.get("/api/images/a.png?w=100").headers["etag"]
+        assert etag != original
+        assert etag != client.get("/api/images/a.png?w=50").headers["etag"]
+        cached = client.get("/api/images/a.png?w=100", headers={"If-None-Match": etag})
+        assert cached.status_code == 304
+
+    def test_without_params_returns_original(self, tmp_path, client):
+        source = write_image(tmp_path / "a.png")
+        assert client.get("/api/images/a.png").content == source.read_bytes()
+
+    def test_unsupported_format_returns_original(self, tmp_path, client):
+        (tmp_path / "a.svg").write_text("<svg/>")
+        assert client.get("/api/images/a.svg?w=10").content == b"<svg/>"
+
+    def test_broken_image_returns_original(self, tmp_path, client):
+        (tmp_path / "broken.png").write_bytes(b"not a png")
+        response = client.get("/api/images/broken.png?w=10")
+        assert response.status_code == 200
+        assert response.content == b"not a png"
+
+    @pytest.mark.parametrize("query", ["w=0", "w=5000", "h=-1", "w=10&fit=stretch"])
+    def test_invalid_params(self, tmp_path, client, query):
+        write_image(tmp_path / "a.png")
+        assert client.get(f"/api/images/a.png?{query}").status_code == 422
+
+
+class TestRenditions:
+    def test_format_conversion_without_resize(self, tmp_path, cache):
+        source = write_image(tmp_path / "a.png")
+        path = render(cache, source, image_format="WEBP", quality=60)
+        assert path.suffix == ".webp"
+        with Image.open(path) as image:
+            assert image.format == "WEBP"
+            assert image.size == (400, 200)
+
+    def test_cache_name_depends_on_format_and_quality(self):
+        from backend.services.image_variants import VariantSpec
+        webp = VariantSpec(image_format="WEBP", quality=80)
+        assert webp.cache_name("a", ".png").endswith(".webp")
+        assert webp.cache_name("a", ".png") != VariantSpec(
+            image_format="WEBP", quality=60
+        ).cache_name("a", ".png")
+        assert VariantSpec(width=10, image_format="JPEG").cache_name("a", ".png").endswith(".jpg")
+
+    @pytest.mark.parametrize(
+        "spec", [{"image_format": "GIF"}, {"image_format": "WEBP", "quality": 0}]
+    )
+    def test_invalid_spec(self, spec):
+        from backend.services.image_variants import VariantSpec
+        with pytest.raises(ValueError):
+            VariantSpec(**spec)
+
+
+class TestNegotiateFormat:
+    @pytest.mark.parametrize(
+        "accept, source, expected",
+        [
+            ("image/avif,image/webp,image/apng,*/*;q=0.8", "PNG", "WEBP"),
+            ("image/webp", "JPEG", "WEBP"),
+            ("image/webp", "WEBP", None),
+            ("image/webp;q=0, image/jpeg", "PNG", "JPEG"),
+            ("image/jpeg", "JPEG", None),
+            ("image/*,*/*", "PNG", None),
+            (None, "PNG", None),
+            ("image/webp", None, None),
+            ("image/webp;q=abc", "PNG", None),
+        ],
+    )
+    def test_negotiation(self, accept, source, expected):
+        from backend.routers.image_router import negotiate_format
+        assert negotiate_format(accept, source) == expected
+
+
+class TestImageRouterRenditions:
+    @pytest.fixture
+    def client(self, tmp_path, cache):
+        from backend.routers.image_router import router
+        from backend.services.image_index import ImageIndex
+        from backend.services.library_service import LibraryService
+
+        service = MagicMock(spec=LibraryService)
+        service.revalidate_image.side_effect = lambda p: ImageIndex.build(tmp_path).get(p)
+        service.refresh_images.return_value = False
+        app = FastAPI()
+        app.state.library_service = service
+        app.state.image_variants = cache
+        app.state.image_rendition_quality = 70
+        app.include_router(router, prefix="/api")
+        return TestClient(app)
+
+    def test_webp_for_accepting_clients(self, tmp_path, client):
+        write_image(tmp_path / "a.png")
+        response = client.get("/api/images/a.png", headers={"Accept": "image/webp,*/*"})
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "image/webp"
+        assert response.headers["vary"] == "Accept"
+        converted = tmp_path / "converted.webp"
+        converted.write_bytes(response.content)
+        assert variant_size(converted) == (400, 200)
+
+    def test_original_for_other_clients(self, tmp_path, client):
+        source = write_image(tmp_path / "a.png")
+        response = client.get("/api/images/a.png", headers={"Accept": "*/*"})
+        assert response.content == source.read_bytes()
+        assert response.headers["vary"] == "Accept"
+
+    def test_jpeg_when_requested(self, tmp_path, client):
+        write_image(tmp_path / "a.png")
+        response = client.get("/api/images/a.png?w=100", headers={"Accept": "image/jpeg"})
+        assert response.headers["content-type"] == "image/jpeg"
+        converted = tmp_path / "converted.jpg"
+        converted.write_bytes(response.content)
+        assert variant_size(converted) == (100, 50)
+
+    def test_etag_depends_on_format(self, tmp_path, client):
+        write_image(tmp_path / "a.png")
+        webp = client.get("/api/images/a.png", headers={"Accept": "image/webp"}).headers["etag"]
+        png = client.get("/api/images/a.png", headers={"Accept": "*/*"}).headers["etag"]
+        assert webp != png
+        cached = client.get(
+            "/api/images/a.png", headers={"Accept": "image/webp", "If-None-Match": webp}
+        )
+        assert cached.status_code == 304
+
+    def test_rendition_is_cached_on_disk(self, tmp_path, client, cache):
+        from backend.services import image_variants
+        write_image(tmp_path / "a.png")
+        with patch.object(
+            image_variants, "render_variant", wraps=image_variants.render_variant
+        ) as renderer:
+            for _ in range(2):
+                client.get("/api/images/a.png", headers={"Accept": "image/webp"})
+        assert renderer.call_count == 1
+        assert len(cache) == 1
+
+    def test_rendition_of_overwritten_image_is_regenerated(self, tmp_path, cache):
+        import io
+        import os
+        from backend.main import create_app
+        from backend.services.library_service import LibraryService
+        library = tmp_path / "library"
+        library.mkdir()
+        (library / "library.yaml").write_text("scenes: []\nenvironments: []\n")
+        source = write_image(library / "a.png", color="red")
+        service = LibraryService()
+        service.load(library / "library.yaml")
+        client = TestClient(create_app(
+            tmp_path / "dist",
+            library_service=service,
+            image_variants=cache,
+            image_rendition_quality=90,
+        ))
+        old = client.get("/api/images/a.png", headers={"Accept": "image/webp"})
+        mtime_ns = source.stat().st_mtime_ns
+        write_image(source, color="blue")
+        os.utime(source, ns=(mtime_ns + 10**9, mtime_ns + 10**9))
+        new = client.get("/api/images/a.png", headers={"Accept": "image/webp"})
+        assert new.headers["etag"] != old.headers["etag"]
+        assert len(cache) == 2
+        with Image.open(io.BytesIO(new.content)) as image:
+            red, green, blue = image.convert("RGB").getpixel((0, 0))
+        assert blue > 200 and red < 50
+
+
+class TestAppConfigImageRenditions:
+    @pytest.fixture
+    def library_path(self, tmp_path) -> Path:
+        path = tmp_path / "library.yaml"
+        path.write_text("scenes: []\nenvironments: []\n", encoding="utf-8")
+        return path
+
+    def test_defaults(self, library_path):
+        from backend.app_config import AppConfig
+        config = AppConfig.from_args(["--library-path", str(library_path)])
+        assert config.image_renditions is True
+        assert config.image_quality == 80
+
+    def test_options(self, library_path):
+        from backend.app_config import AppConfig
+        config = AppConfig.from_args([
+            "--library-path", str(library_path), "--no-image-renditions", "--image-quality", "60",
+        ])
+        assert config.image_renditions is False
+        assert config.image_quality == 60
+
+    def test_invalid_quality(self, library_path):
+        from backend.app_config import AppConfig
+        with pytest.raises(SystemExit):
+            AppConfig.from_args(["--library-path", str(library_path), "--image-quality", "0"])
@@ -0,0 +1,201 @@
+"""バリアントの事前生成（ImageWarmup・/api/image-warmup）のユニットテスト"""
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+
+LIBRARY_YAML = """\
+scenes:
+  - {name: a, display_name: A, positive_prompt: p, preview_image: scenes/a.png}
+  - {name: b, display_name: B, positive_prompt: p, preview_image: scenes/b.svg}
+environments:
+  - {name: e, display_name: E, environment_prompt: room, thumbnail: thumbs/e.jpg}
+"""
+
+
+def write_image(path: Path, size: tuple[int, int] = (600, 300), color: str = "red") -> Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    Image.new("RGB", size, color).save(path)
+    return path
+
+
+@pytest.fixture
+def service(tmp_path):
+    from backend.services.library_service import LibraryService
+    root = tmp_path / "library"
+    write_image(root / "scenes" / "a.png")
+    (root / "scenes" / "b.svg").write_text("<svg/>")
+    write_image(root / "thumbs" / "e.jpg", color="blue")
+    write_image(root / "unused.png")
+    (root / "library.yaml").write_text(LIBRARY_YAML, encoding="utf-8")
+    service = LibraryService(parse_workers=1)
+    service.load(root / "library.yaml")
+    return service
+
+
+@pytest.fixture
+def cache(tmp_path):
+    from backend.services.image_variants import ImageVariantCache
+    variants = ImageVariantCache(tmp_path / "cache", workers=1)
+    yield variants
+    variants.close()
+
+
+class TestStandardVariants:
+    def test_widths_only(self):
+        from backend.services.image_warmup import standard_variants
+        from backend.services.image_variants import VariantSpec
+        assert standard_variants([128, 256]) == [VariantSpec(width=128), VariantSpec(width=256)]
+
+    def test_with_renditions(self):
+        from backend.services.image_warmup import standard_variants
+        specs = standard_variants([128], rendition_quality=70)
+        assert [(s.width, s.image_format, s.quality) for s in specs] == [
+            (128, None, 85), (128, "WEBP", 70), (None, "WEBP", 70),
+        ]
+
+
+class TestReferencedImages:
+    def test_referenced_images(self, service):
+        assert [entry.path.name for entry in service.referenced_images()] == [
+            "a.png", "b.svg", "e.jpg",
+        ]
+
+
+class TestImageWarmup:
+    def test_generates_variants(self, service, cache):
+        from backend.services.image_warmup import ImageWarmup, standard_variants
+        warmup = ImageWarmup(cache, standard_variants([64, 128]), workers=2)
+        try:
+            warmup.start(service.referenced_images())
+            assert warmup.wait(timeout=60)
+        finally:
+            warmup.close()
+        progress = warmup.progress()
+        # SVG はリサイズに対応しないため対象外
+        assert (progress.total, progress.done, progress.failed, progress.running) == (4, 4, 0, False)
+        assert len(cache) == 4
+
+    def test_live_requests_reuse_warmed_variants(self, service, cache):
+        from backend.services import image_variants
+        from backend.services.image_variants import VariantSpec
+        from backend.services.image_warmup import ImageWarmup
+        warmup = ImageWarmup(cache, [VariantSpec(width=64)], workers=1)
+        # テストではプロセスを起動せず、スレッドで生成する
+        with patch("backend.services.image_warmup.ProcessPoolExecutor",
+                   lambda **kwargs: ThreadPoolExecutor(max_workers=1)):
+            warmup.start(service.referenced_images())
+            assert warmup.wait(timeout=30)
+        warmup.close()
+
+        image = service.get_image("scenes/a.png")
+        with patch.object(image_variants, "render_variant") as renderer:
+            cache.get(image.path, image.content_hash, VariantSpec(width=64)).result(timeout=10)
+        renderer.assert_not_called()
+
+    def test_failures_are_counted(self, tmp_path, cache, capsys):
+        from backend.services.image_index import ImageIndex
+        from backend.services.image_variants import VariantSpec
+        from backend.services.image_warmup import ImageWarmup
+        (tmp_path / "images").mkdir()
+        (tmp_path / "images" / "broken.png").write_bytes(b"broken")
+        warmup = ImageWarmup(cache, [VariantSpec(width=64)], workers=1)
+        with patch("backend.services.image_warmup.ProcessPoolExecutor",
+                   lambda **kwargs: ThreadPoolExecutor(max_workers=1)):
+            warmup.start([ImageIndex.build(tmp_path / "images").get("broken.png")])
+            assert warmup.wait(timeout=30)
+        warmup.close()
+        assert warmup.progress().failed == 1
+        assert "事前生成に失敗しました" in capsys.readouterr().err
+
+
+    def test_broken_process_pool_is_replaced(self, service, cache, capsys):
+        import os
+        from concurrent.futures import ProcessPoolExecutor
+        from concurrent.futures.process import BrokenProcessPool
+        from backend.services.image_variants import VariantSpec
+        from backend.services.image_warmup import ImageWarmup
+        pools = []
+
+        def create_pool(**kwargs):
+            pools.append(ProcessPoolExecutor(**kwargs))
+            return pools[-1]
+
+        warmup = ImageWarmup(cache, [VariantSpec(width=64)], workers=1)
+        try:
+            with patch("backend.services.image_warmup.ProcessPoolExecutor", create_pool):
+                warmup.start([])
+                assert warmup.wait(timeout=30)
+                with pytest.raises(BrokenProcessPool):
+                    pools[0].submit(os._exit, 1).result()
+                warmup.start(service.referenced_images())
+                assert warmup.wait(timeout=60)
+        finally:
+            warmup.close()
+        progress = warmup.progress()
+        assert (progress.total, progress.done, progress.failed) == (2, 2, 0)
+        assert len(pools) == 2
+        assert "プールを作り直します" in capsys.readouterr().err
+
+
+class TestWarmupEndpoint:
+    def test_progress(self, tmp_path, service, cache):
+        from backend.main import create_app
+        from backend.services.image_variants import VariantSpec
+        from backend.services.image_warmup import ImageWarmup
+        warmup = ImageWarmup(cache, [VariantSpec(width=64)], workers=1)
+        client = TestClient(create_app(
+            tmp_path / "dist", library_service=service, image_warmup=warmup
+        ))
+        assert client.get("/api/image-warmup").json() == {
+            "total": 0, "done": 0, "failed": 0, "running": False,
+        }
+
+    def test_404_when_disabled(self, tmp_path, service):
+        from backend.main import create_app
+        client = TestClient(create_app(tmp_path / "dist", library_service=service))
+        assert client.get("/api/image-warmup").status_code == 404
+
+
+class TestAppConfigWarmImages:
+    @pytest.fixture
+    def library_path(self, tmp_path) -> Path:
+        path = tmp_path / "library.yaml"
+        path.write_text("scenes: []\nenvironments: []\n", encoding="utf-8")
+        return path
+
+    def test_defaults(self, library_path):
+        from backend.app_config import AppConfig
+        config = AppConfig.from_args(["--library-path", str(library_path)])
+        assert config.warm_images is False
+        assert config.warm_image_widths == (256, 512)
+
+    def test_options(self, library_path):
+        from backend.app_config import AppConfig
+        config = AppConfig.from_args([
+            "--library-path", str(library_path), "--warm-images", "--warm-image-widths", "128, 640",
+        ])
+        assert config.warm_images is True
+        assert config.warm_image_widths == (128, 640)
+
+    @pytest.mark.parametrize("widths", ["abc", "0", "128,5000"])
+    def test_invalid_widths(self, library_path, widths):
+        from backend.app_config import AppConfig
+        with pytest.raises(SystemExit):
+            AppConfig.from_args(
+                ["--library-path", str(library_path), "--warm-image-widths", widths]
+            )
+
+    @pytest.mark.parametrize("widths", ["", " , "])
+    def test_empty_widths(self, library_path, widths, capsys):
+        from backend.app_config import AppConfig
+        with pytest.raises(SystemExit) as exc_info:
+            AppConfig.from_args(
+                ["--library-path", str(library_path), "--warm-image-widths", widths]
+            )
+        assert exc_info.value.code == 1
+        assert "エラー: --warm-image-widths" in capsys.readouterr().err
@@ -452,3 +452,16 @@ class TestImageDeliveryIntegration:
 
         assert response.status_code == 200
         assert response.content == b"nested image"
+
+
+class TestGenerateTemplateResolutionIntegration:
+    """POST /api/generate の template_name 解決の往復テスト（モックなし）。"""
+
+    def test_unknown_template_returns_422(self, tmp_path):
+        client = _create_test_client(_create_library_file(tmp_path, LIBRARY_YAML_FULL))
+        body = _make_generate_request_body()
+        body["scenes"] = [{"template_name": "not_in_library", "overrides": {}}]
+        response = client.post("/api/generate", json=body)
+
+        assert response.status_code == 422
+        assert "not_in_library" in response.json()["detail"]
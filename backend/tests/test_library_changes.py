@@ -0,0 +1,166 @@
+"""変更履歴による差分同期（/api/scenes/changes・/api/environments/changes）のユニットテスト"""
+
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+
+def library_yaml(scenes: dict[str, str], environments: dict[str, str] | None = None) -> str:
+    lines = ["scenes:"]
+    for name, prompt in scenes.items():
+        lines.append(f"  - {{name: {name}, display_name: {name.upper()}, positive_prompt: {prompt}}}")
+    lines.append("environments:")
+    for name, prompt in (environments or {"e": "room"}).items():
+        lines.append(
+            f"  - {{name: {name}, display_name: {name.upper()}, environment_prompt: {prompt}}}"
+        )
+    return "\n".join(lines) + "\n"
+
+
+@pytest.fixture
+def library_path(tmp_path) -> Path:
+    path = tmp_path / "library.yaml"
+    path.write_text(library_yaml({"a": "p1", "b": "p2", "c": "p3"}), encoding="utf-8")
+    return path
+
+
+def rewrite(path: Path, content: str) -> None:
+    path.write_text(content, encoding="utf-8")
+
+
+class TestChangeHistory:
+    def test_composes_changes_across_versions(self):
+        from backend.services.library_changes import (
+            KIND_SCENES,
+            ChangeHistory,
+            ChangeSet,
+            ItemChanges,
+        )
+        history = ChangeHistory(size=10)
+        history.start(1)
+        history.record(ChangeSet(2, {KIND_SCENES: ItemChanges(
+            added=frozenset({"x"}), removed=frozenset({"a"}), modified=frozenset({"b"}),
+        )}))
+        history.record(ChangeSet(3, {KIND_SCENES: ItemChanges(
+            added=frozenset({"a"}), removed=frozenset({"x"}), modified=frozenset({"c"}),
+        )}))
+
+        changes = history.since(KIND_SCENES, 1, 3)
+        assert changes.full_resync is False
+        assert changes.added == []  # 期間内に追加されて削除された
+        assert changes.modified == ["a", "b", "c"]  # 削除後に再追加された a は変更
+        assert changes.removed == []
+
+        changes = history.since(KIND_SCENES, 2, 3)
+        assert (changes.added, changes.modified, changes.removed) == (["a"], ["c"], ["x"])
+
+    def test_full_resync_outside_window(self):
+        from backend.services.library_changes import KIND_SCENES, ChangeHistory, ChangeSet
+        history = ChangeHistory(size=2)
+        assert history.since(KIND_SCENES, 0, 0).full_resync is True  # 未開始
+        history.start(1)
+        for version in (2, 3, 4):
+            history.record(ChangeSet(version))
+
+        assert history.since(KIND_SCENES, 1, 4).full_resync is True  # 履歴から溢れた
+        assert history.since(KIND_SCENES, 2, 4).full_resync is False
+        assert history.since(KIND_SCENES, 5, 4).full_resync is True  # 未来のバージョン
+
+
+class TestServiceChanges:
+    def test_no_changes_at_current_version(self, library_path):
+        from backend.services.library_service import LibraryService
+        service = LibraryService()
+        service.load(library_path)
+
+        changes, added, modified = service.get_scene_changes(service.version)
+        assert changes.full_resync is False
+        assert (added, modified, changes.removed) == ([], [], [])
+
+    @pytest.mark.parametrize("options", [{}, {"store": "compact"}, {"lazy": True}])
+    def test_detects_added_modified_removed(self, library_path, options):
+        from backend.services.library_service import LibraryService
+        service = LibraryService(**options)
+        service.load(library_path)
+        since = service.version
+
+        rewrite(library_path, library_yaml({"a": "p1", "b": "changed", "d": "p4"}))
+        assert service.reload() is True
+
+        changes, added, modified = service.get_scene_changes(since)
+        assert changes.version == service.version
+        assert changes.full_resync is False
+        assert [s.name for s in added] == ["d"]
+        assert [s.name for s in modified] == ["b"]
+        assert modified[0].positive_prompt == "changed"
+        assert changes.removed == ["c"]
+
+        env_changes, env_added, env_modified = service.get_environment_changes(since)
+        assert (env_added, env_modified, env_changes.removed) == ([], [], [])
+
+    def test_full_resync_returns_all_items(self, library_path):
+        from backend.services.library_service import LibraryService
+        service = LibraryService(change_history_size=1)
+        service.load(library_path)
+        since = service.version
+        service.reload()
+        service.reload()
+
+        changes, added, modified = service.get_scene_changes(since)
+        assert changes.full_resync is True
+        assert [s.name for s in added] == ["a", "b", "c"]
+        assert modified == []
+
+
+class TestChangesEndpoints:
+    @pytest.fixture
+    def service(self, library_path):
+        from backend.services.library_service import LibraryService
+        svc = LibraryService()
+        svc.load(library_path)
+        return svc
+
+    @pytest.fixture
+    def client(self, tmp_path, service):
+        from backend.main import create_app
+        return TestClient(create_app(tmp_path / "dist", library_service=service))
+
+    def test_scene_changes(self, client, service, library_path):
+        since = service.version
+        rewrite(library_path, library_yaml({"a": "p1", "b": "changed"}))
+        service.reload()
+
+        data = client.get(f"/api/scenes/changes?since={since}").json()
+        assert data["version"] == service.version
+        assert data["full_resync"] is False
+        assert data["added"] == []
+        assert [s["name"] for s in data["modified"]] == ["b"]
+        assert data["removed"] == ["c"]
+
+        data = client.get(f"/api/scenes/changes?since={data['version']}").json()
+        assert (data["added"], data["modified"], data["removed"]) == ([], [], [])
+
+    def test_environment_changes(self, client, service, library_path):
+        since = service.version
+        rewrite(
+            library_path,
+            library_yaml({"a": "p1", "b": "p2", "c": "p3"}, {"e": "room", "f": "forest"}),
+        )
+        service.reload()
+
+        data = client.get(f"/api/environments/changes?since={since}").json()
+        assert data["full_resync"] is False
+        assert data["added"] == [{
+            "name": "f", "display_name": "F", "environment_prompt": "forest", "thumbnail_url": None,
+            "thumbnail_width": None, "thumbnail_height": None, "thumbnail_placeholder": None,
+        }]
+
+    def test_unknown_version_requires_full_resync(self, client):
+        data = client.get("/api/scenes/changes?since=999").json()
+        assert data["full_resync"] is True
+        assert [s["name"] for s in data["added"]] == ["a", "b", "c"]
+
+    def test_since_is_required(self, client):
+        assert client.get("/api/scenes/changes").status_code == 422
+        assert client.get("/api/scenes/changes?since=-1").status_code == 422
@@ -0,0 +1,163 @@
+"""ライブラリの更新通知（LibraryEventBroadcaster・/api/library/events）のユニットテスト"""
+
+import asyncio
+import json
+import threading
+
+import pytest
+
+LIBRARY_YAML = """\
+scenes:
+  - {name: a, display_name: A, positive_prompt: p1}
+  - {name: b, display_name: B, positive_prompt: p2}
+environments:
+  - {name: e, display_name: E, environment_prompt: room}
+"""
+
+
+def change_set(version: int, added: set[str] = frozenset()):
+    from backend.services.library_changes import KIND_SCENES, ChangeSet, ItemChanges
+    return ChangeSet(version, {KIND_SCENES: ItemChanges(added=frozenset(added))})
+
+
+class FakeRequest:
+    def __init__(self) -> None:
+        self.disconnected = False
+
+    async def is_disconnected(self) -> bool:
+        return self.disconnected
+
+
+class TestBroadcaster:
+    def test_fans_out_to_all_subscribers(self):
+        from backend.services.library_events import LibraryEventBroadcaster
+
+        async def scenario():
+            broadcaster = LibraryEventBroadcaster()
+            first, second = broadcaster.subscribe(), broadcaster.subscribe()
+            assert broadcaster.subscriber_count == 2
+            broadcaster.publish(change_set(2, {"x"}))
+            events = await asyncio.wait_for(asyncio.gather(first.get(), second.get()), 1)
+            broadcaster.unsubscribe(first)
+            assert broadcaster.subscriber_count == 1
+            return events
+
+        events = asyncio.run(scenario())
+        assert [e.version for e in events] == [2, 2]
+        assert events[0].to_dict()["scenes"] == {"added": ["x"], "modified": [], "removed": []}
+
+    def test_publish_from_another_thread(self):
+        from backend.services.library_events import LibraryEventBroadcaster
+
+        async def scenario():
+            broadcaster = LibraryEventBroadcaster()
+            subscription = broadcaster.subscribe()
+            thread = threading.Thread(target=broadcaster.publish, args=(change_set(7),))
+            thread.start()
+            event = await asyncio.wait_for(subscription.get(), 1)
+            thread.join()
+            return event
+
+        assert asyncio.run(scenario()).version == 7
+
+    def test_slow_subscriber_queue_is_bounded(self):
+        from backend.services.library_events import LibraryEventBroadcaster
+
+        async def scenario():
+            broadcaster = LibraryEventBroadcaster(max_queued=2)
+            subscription = broadcaster.subscribe()
+            for version in range(1, 6):
+                broadcaster.publish(change_set(version, {f"s{version}"}))
+            await asyncio.sleep(0)  # call_soon_threadsafe の配信を処理させる
+            assert subscription.pending <= 2
+            events = [await subscription.get() for _ in range(subscription.pending)]
+            return events
+
+        events = asyncio.run(scenario())
+        assert any(e.resync for e in events)
+        assert events[-1].version == 5
+
+
+class TestServiceWiring:
+    def test_reload_notifies_broadcaster(self, tmp_path):
+        from backend.main import create_app
+        from backend.services.library_service import LibraryService
+
+        library_path = tmp_path / "library.yaml"
+        library_path.write_text(LIBRARY_YAML, encoding="utf-8")
+        service = LibraryService()
+        service.load(library_path)
+        app = create_app(tmp_path / "dist", library_service=service)
+
+        async def scenario():
+            subscription = app.state.library_events.subscribe()
+            library_path.write_text(
+                LIBRARY_YAML.replace("p2", "changed"), encoding="utf-8"
+            )
+            await asyncio.to_thread(service.reload)
+            return await asyncio.wait_for(subscription.get(), 1)
+
+        event = asyncio.run(scenario())
+        assert event.version == service.version
+        assert event.scenes.modified == {"b"}
+
+    def test_failing_listener_does_not_break_reload(self, tmp_path, capsys):
+        from backend.services.library_service import LibraryService
+
+        library_path = tmp_path / "library.yaml"
+        library_path.write_text(LIBRARY_YAML, encoding="utf-8")
+        service = LibraryService()
+        service.load(library_path)
+
+        def broken(change_set):
+            raise RuntimeError("boom")
+
+        service.add_change_listener(broken)
+        assert service.reload() is True
+        assert "boom" in capsys.readouterr().err
+
+
+class TestEventStream:
+    def test_stream_sends_ready_and_library_events(self):
+        from backend.routers.library_router import library_event_stream
+        from backend.services.library_events import LibraryEventBroadcaster
+
+        async def scenario():
+            broadcaster = LibraryEventBroadcaster()
+            subscription = broadcaster.subscribe()
+            stream = library_event_stream(FakeRequest(), broadcaster, subscription, 1)
+            ready = await stream.__anext__()
+            broadcaster.publish(change_set(2, {"x"}))
+            update = await asyncio.wait_for(stream.__anext__(), 1)
+            await stream.aclose()
+            return ready, update, broadcaster.subscriber_count
+
+        ready, update, remaining = asyncio.run(scenario())
+        assert ready == 'event: ready\ndata: {"version":1}\n\n'
+        assert update.startswith("event: library\ndata: ")
+        data = json.loads(update.split("data: ", 1)[1])
+        assert data["version"] == 2
+        assert data["resync"] is False
+        assert data["scenes"]["added"] == ["x"]
+        assert remaining == 0  # 切断（aclose）で購読が終了する
+
+    def test_keepalive_and_disconnect(self):
+        from backend.routers.library_router import library_event_stream
+        from backend.services.library_events import LibraryEventBroadcaster
+
+        async def scenario():
+            broadcaster = LibraryEventBroadcaster()
+            request = FakeRequest()
+            stream = library_event_stream(
+                request, broadcaster, broadcaster.subscribe(), 1, keepalive_interval=0.01
+            )
+            await stream.__anext__()
+            keepalive = await stream.__anext__()
+            request.disconnected = True
+            with pytest.raises(StopAsyncIteration):
+                await stream.__anext__()
+            return keepalive, broadcaster.subscriber_count
+
+        keepalive, remaining = asyncio.run(scenario())
+        assert keepalive == ": keepalive\n\n"
+        assert remaining == 0
@@ -0,0 +1,158 @@
+"""一覧のカーソルページング・並び替え・フィールド絞り込みのユニットテスト"""
+
+import pytest
+
+from backend.models.library_models import LibraryScene
+
+
+def scene(name: str, display_name: str, positive_prompt: str = "p") -> LibraryScene:
+    return LibraryScene(name=name, display_name=display_name, positive_prompt=positive_prompt)
+
+
+SCENES = [
+    scene("delta", "D", "1girl"),
+    scene("alpha", "C", "1girl, smile"),
+    scene("charlie", "B"),
+    scene("bravo", "A", "smile"),
+    scene("alpha", "E"),  # 同名（定義位置で順序が決まる）
+]
+
+
+def all_pages(sort: str, limit: int, subset=None) -> list[list[str]]:
+    from backend.services.library_listing import SortedOrders, paginate
+    orders = SortedOrders(SCENES)
+    pages = []
+    cursor = None
+    while True:
+        page = paginate(SCENES, orders, sort, cursor, limit, subset)
+        pages.append([s.name for s in page.items])
+        if page.next_cursor is None:
+            return pages
+        cursor = page.next_cursor
+
+
+class TestPaginate:
+    def test_position_order(self):
+        assert all_pages("position", 2) == [["delta", "alpha"], ["charlie", "bravo"], ["alpha"]]
+
+    def test_name_order_with_ties(self):
+        assert all_pages("name", 2) == [["alpha", "alpha"], ["bravo", "charlie"], ["delta"]]
+
+    def test_display_name_order(self):
+        assert all_pages("display_name", 3) == [["bravo", "charlie", "alpha"], ["delta", "alpha"]]
+
+    def test_without_limit_returns_rest(self):
+        assert all_pages("name", None) == [["alpha", "alpha", "bravo", "charlie", "delta"]]
+
+    def test_exact_multiple_has_no_extra_page(self):
+        from backend.services.library_listing import SortedOrders, paginate
+        page = paginate(SCENES, SortedOrders(SCENES), "position", None, 5)
+        assert page.next_cursor is None
+        assert page.total == 5
+
+    def test_subset(self):
+        assert all_pages("position", 1, subset=[1, 3]) == [["alpha"], ["bravo"]]
+        assert all_pages("display_name", 1, subset=[1, 3]) == [["bravo"], ["alpha"]]
+
+    def test_cursor_for_other_sort_is_rejected(self):
+        from backend.services.library_listing import (
+            InvalidCursorError,
+            SortedOrders,
+            encode_cursor,
+            paginate,
+        )
+        with pytest.raises(InvalidCursorError):
+            paginate(SCENES, SortedOrders(SCENES), "name", encode_cursor("position", 1, 1), 2)
+
+    @pytest.mark.parametrize("cursor", ["!!!", "e30", "WyJuYW1lIiwxLDFd"])
+    def test_malformed_cursor(self, cursor):
+        from backend.services.library_listing import InvalidCursorError, decode_cursor
+        with pytest.raises(InvalidCursorError):
+            decode_cursor(cursor, "name")
+
+    def test_lazy_orders(self):
+        from backend.services.library_listing import SortedOrders
+        orders = SortedOrders(SCENES, eager=False)
+        assert orders.keys("name")[0] == ("alpha", 1)
+
+
+class TestListingApi:
+    @pytest.fixture
+    def client(self, tmp_path):
+        from fastapi.testclient import TestClient
+        from backend.main import create_app
+        from backend.services.library_service import LibraryService
+        lines = ["scenes:"]
+        for s in SCENES:
+            lines.append(
+                f'  - {{name: {s.name}, display_name: {s.display_name}, '
+                f'positive_prompt: "{s.positive_prompt}", preview_image: {s.name}.png}}'
+            )
+        lines += [
+            "environments:",
+            "  - {name: outdoor, display_name: 屋外, environment_prompt: sky}",
+            "  - {name: indoor, display_name: 室内, environment_prompt: room, thumbnail: i.jpg}",
+        ]
+        path = tmp_path / "library.yaml"
+        path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        svc = LibraryService()
+        svc.load(path)
+        return TestClient(create_app(tmp_path / "dist", library_service=svc))
+
+    def test_paging_by_cursor(self, client):
+        first = client.get("/api/scenes", params={"sort": "name", "limit": 2})
+        assert first.status_code == 200
+        assert first.headers["X-Total-Count"] == "5"
+        assert [s["name"] for s in first.json()] == ["alpha", "alpha"]
+        second = client.get(
+            "/api/scenes",
+            params={"sort": "name", "limit": 2, "cursor": first.headers["X-Next-Cursor"]},
+        )
+        assert [s["name"] for s in second.json()] == ["bravo", "charlie"]
+
+    def test_last_page_has_no_cursor(self, client):
+        response = client.get("/api/scenes", params={"limit": 5})
+        assert "X-Next-Cursor" not in response.headers
+
+    def test_fields_projection(self, client):
+        response = client.get(
+            "/api/scenes", params={"fields": "name,preview_image_url", "limit": 1}
+        )
+        assert response.json() == [{"name": "delta", "preview_image_url": "/api/images/delta.png"}]
+
+    def test_full_fields_match_default_listing(self, client):
+        assert client.get("/api/scenes", params={"sort": "position"}).json() == client.get(
+            "/api/scenes"
+        ).json()
+
+    def test_unknown_field_returns_422(self, client):
+        response = client.get("/api/scenes", params={"fields": "name,secret"})
+        assert response.status_code == 422
+        assert "secret" in response.json()["detail"]
+
+    def test_invalid_cursor_returns_400(self, client):
+        assert client.get("/api/scenes", params={"cursor": "broken"}).status_code == 400
+
+    def test_invalid_sort_returns_422(self, client):
+        assert client.get("/api/scenes", params={"sort": "batch_size"}).status_code == 422
+
+    def test_limit_is_bounded(self, client):
+        assert client.get("/api/scenes", params={"limit": 10000}).status_code == 422
+
+    def test_combined_with_tags(self, client):
+        response = client.get(
+            "/api/scenes", params={"tags": "smile", "sort": "display_name", "fields": "name"}
+        )
+        assert response.json() == [{"name": "bravo"}, {"name": "alpha"}]
+        assert response.headers["X-Total-Count"] == "2"
+
+    def test_environments(self, client):
+        response = client.get(
+            "/api/environments", params={"sort": "name", "fields": "name,thumbnail_url", "limit": 1}
+        )
+        assert response.json() == [{"name": "indoor", "thumbnail_url": "/api/images/i.jpg"}]
+        second = client.get(
+            "/api/environments",
+            params={"sort": "name", "limit": 1, "cursor": response.headers["X-Next-Cursor"]},
+        )
+        assert [e["name"] for e in second.json()] == ["outdoor"]
@@ -0,0 +1,173 @@
+"""名前付きライブラリ（--library NAME=PATH）と LibraryRegistry のユニットテスト"""
+
+import threading
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+
+def write_library(tmp_path: Path, name: str, scene_count: int = 1) -> Path:
+    library_dir = tmp_path / name
+    library_dir.mkdir()
+    lines = ["scenes:"]
+    for i in range(scene_count):
+        lines += [
+            f'  - name: "{name}-{i}"',
+            f'    display_name: "{name} {i}"',
+            '    positive_prompt: "p"',
+            f'    preview_image: "scenes/{name}.png"',
+        ]
+    lines += ["environments: []"]
+    path = library_dir / "library.yaml"
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    (library_dir / "scenes").mkdir()
+    (library_dir / "scenes" / f"{name}.png").write_bytes(b"\x89PNG\r\n\x1a\n" + name.encode())
+    return path
+
+
+class TestLibraryRegistry:
+    def test_loads_on_first_access(self, tmp_path):
+        from backend.services.library_registry import LibraryRegistry
+        registry = LibraryRegistry({"a": write_library(tmp_path, "a")})
+        assert registry.loaded_names == []
+        service = registry.get("a")
+        assert service.get_scene("a-0") is not None
+        assert registry.get("a") is service
+        assert registry.loaded_names == ["a"]
+
+    def test_unknown_name(self, tmp_path):
+        from backend.services.library_registry import LibraryRegistry, UnknownLibraryError
+        registry = LibraryRegistry({})
+        with pytest.raises(UnknownLibraryError):
+            registry.get("missing")
+
+    def test_load_error_is_raised_without_exit(self, tmp_path):
+        from backend.services.library_registry import LibraryRegistry
+        from backend.services.library_service import LibraryLoadError
+        path = tmp_path / "broken.yaml"
+        path.write_text("scenes: [\n", encoding="utf-8")
+        registry = LibraryRegistry({"broken": path})
+        with pytest.raises(LibraryLoadError):
+            registry.get("broken")
+        assert registry.loaded_names == []
+
+    def test_evicts_least_recently_used_over_budget(self, tmp_path):
+        from backend.services.library_registry import LibraryRegistry
+        paths = {name: write_library(tmp_path, name, scene_count=50) for name in ("a", "b", "c")}
+        probe = LibraryRegistry({"a": paths["a"]})
+        probe.get("a")
+        one = probe.memory_usage
+        registry = LibraryRegistry(paths, memory_budget=int(one * 2.5))
+        registry.get("a")
+        registry.get("b")
+        registry.get("a")  # b が最も古くなる
+        registry.get("c")
+        assert registry.loaded_names == ["a", "c"]
+        assert registry.memory_usage <= int(one * 2.5)
+
+    def test_keeps_latest_even_if_over_budget(self, tmp_path):
+        from backend.services.library_registry import LibraryRegistry
+        registry = LibraryRegistry(
+            {"a": write_library(tmp_path, "a"), "b": write_library(tmp_path, "b")},
+            memory_budget=1,
+        )
+        registry.get("a")
+        registry.get("b")
+        assert registry.loaded_names == ["b"]
+
+    def test_evicted_library_is_reloaded(self, tmp_path):
+        from backend.services.library_registry import LibraryRegistry
+        registry = LibraryRegistry(
+            {"a": write_library(tmp_path, "a"), "b": write_library(tmp_path, "b")},
+            memory_budget=1,
+        )
+        first = registry.get("a")
+        registry.get("b")
+        second = registry.get("a")
+        assert second is not first
+        assert second.get_scene("a-0") is not None
+
+    def test_concurrent_requests_load_once(self, tmp_path):
+        from backend.services.library_registry import LibraryRegistry
+        from backend.services.library_service import LibraryService
+        created = []
+
+        def factory() -> LibraryService:
+            service = LibraryService()
+            created.append(service)
+            return service
+
+        registry = LibraryRegistry({"a": write_library(tmp_path, "a", 200)}, service_factory=factory)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(registry.get("a"))) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert len(created) == 1
+        assert all(r is created[0] for r in results)
+
+
+class TestNamedLibraryApi:
+    @pytest.fixture
+    def client(self, tmp_path):
+        from backend.main import create_app
+        from backend.services.library_registry import LibraryRegistry
+        from backend.services.library_service import LibraryService
+        default = LibraryService()
+        default.load(write_library(tmp_path, "default"))
+        registry = LibraryRegistry({"team": write_library(tmp_path, "team")})
+        app = create_app(tmp_path / "dist", library_service=default, library_registry=registry)
+        return TestClient(app)
+
+    def test_default_library_without_parameter(self, client):
+        response = client.get("/api/scenes")
+        assert [s["name"] for s in response.json()] == ["default-0"]
+        assert response.json()[0]["preview_image_url"] == "/api/images/scenes/default.png"
+
+    def test_named_library_scenes(self, client):
+        response = client.get("/api/scenes", params={"library": "team"})
+        assert response.status_code == 200
+        scene = response.json()[0]
+        assert scene["name"] == "team-0"
+        assert scene["preview_image_url"] == "/api/images/scenes/team.png?library=team"
+
+    def test_named_library_images(self, client):
+        response = client.get("/api/images/scenes/team.png", params={"library": "team"})
+        assert response.status_code == 200
+        assert response.content.endswith(b"team")
+        assert client.get("/api/images/scenes/team.png").status_code == 404
+
+    def test_named_library_environments_and_defaults(self, client):
+        assert client.get("/api/environments", params={"library": "team"}).json() == []
+        assert client.get("/api/settings/defaults", params={"library": "team"}).status_code == 404
+
+    def test_unknown_library_returns_404(self, client):
+        response = client.get("/api/scenes", params={"library": "missing"})
+        assert response.status_code == 404
+        assert "missing" in response.json()["detail"]
+
+    def test_without_registry_named_library_returns_404(self, tmp_path):
+        from backend.main import create_app
+        from backend.services.library_service import LibraryService
+        default = LibraryService()
+        default.load(write_library(tmp_path, "default"))
+        client = TestClient(create_app(tmp_path / "dist", library_service=default))
+        assert client.get("/api/scenes", params={"library": "team"}).status_code == 404
+
+    def test_load_failure_returns_500(self, tmp_path):
+        from backend.main import create_app
+        from backend.services.library_registry import LibraryRegistry
+        from backend.services.library_service import LibraryService
+        default = LibraryService()
+        default.load(write_library(tmp_path, "default"))
+        broken = tmp_path / "broken.yaml"
+        broken.write_text("scenes: [\n", encoding="utf-8")
+        app = create_app(
+            tmp_path / "dist",
+            library_service=default,
+            library_registry=LibraryRegistry({"broken": broken}),
+        )
+        response = TestClient(app).get("/api/scenes", params={"library": "broken"})
+        assert response.status_code == 500
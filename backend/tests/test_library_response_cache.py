@@ -0,0 +1,124 @@
+"""バージョンごとのシリアライズ済みレスポンス（ETag・304）のユニットテスト"""
+
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+LIBRARY_YAML = """\
+default_tech_settings:
+  comfyui_config: {server_address: "127.0.0.1:8188", client_id: c}
+  workflow_config:
+    workflow_json_path: w.json
+    image_output_path: out
+    library_file_path: library.yaml
+    seed_node_id: 1
+    batch_size_node_id: 2
+    negative_prompt_node_id: 3
+    positive_prompt_node_id: 4
+    environment_prompt_node_id: 5
+    default_prompts: {base_positive_prompt: masterpiece}
+scenes:
+  - {name: a, display_name: A, positive_prompt: "1girl, smile", preview_image: a.png}
+environments:
+  - {name: e, display_name: E, environment_prompt: room}
+"""
+
+
+def write_library(tmp_path: Path, content: str = LIBRARY_YAML) -> Path:
+    path = tmp_path / "library.yaml"
+    path.write_text(content, encoding="utf-8")
+    return path
+
+
+@pytest.fixture
+def service(tmp_path):
+    from backend.services.library_service import LibraryService
+    svc = LibraryService()
+    svc.load(write_library(tmp_path))
+    return svc
+
+
+@pytest.fixture
+def client(tmp_path, service):
+    from backend.main import create_app
+    return TestClient(create_app(tmp_path / "dist", library_service=service))
+
+
+class TestServiceCache:
+    def test_version_increases_on_reload(self, service):
+        version = service.version
+        assert service.reload() is True
+        assert service.version == version + 1
+
+    def test_cached_builds_once_per_version(self, service):
+        calls = []
+
+        def build():
+            calls.append(1)
+            return len(calls)
+
+        assert service.cached("k", build) == 1
+        assert service.cached("k", build) == 1
+        service.reload()
+        assert service.cached("k", build) == 2
+
+
+class TestCachedEndpoints:
+    @pytest.mark.parametrize("url", ["/api/scenes", "/api/environments", "/api/settings/defaults"])
+    def test_etag_and_304(self, client, url):
+        first = client.get(url)
+        assert first.status_code == 200
+        etag = first.headers["ETag"]
+        assert etag.startswith('"') and not etag.startswith("W/")
+        assert first.headers["Content-Type"] == "application/json"
+
+        second = client.get(url, headers={"If-None-Match": etag})
+        assert second.status_code == 304
+        assert second.content == b""
+        assert second.headers["ETag"] == etag
+
+    def test_if_none_match_list_and_weak(self, client):
+        etag = client.get("/api/scenes").headers["ETag"]
+        assert client.get("/api/scenes", headers={"If-None-Match": f'"other", W/{etag}'}).status_code == 304
+        assert client.get("/api/scenes", headers={"If-None-Match": '"other"'}).status_code == 200
+
+    def test_body_matches_response_model(self, client):
+        assert client.get("/api/scenes").json() == [{
+            "name": "a",
+            "display_name": "A",
+            "positive_prompt": "1girl, smile",
+            "negative_prompt": "",
+            "batch_size": 1,
+            "preview_image_url": "/api/images/a.png",
+            "preview_image_width": None,
+            "preview_image_height": None,
+            "preview_image_placeholder": None,
+        }]
+        assert client.get("/api/settings/defaults").json()["comfyui_config"]["client_id"] == "c"
+
+    def test_serialized_once_per_version(self, client):
+        from backend.routers import library_router
+        with patch.object(library_router, "serialize_json", wraps=library_router.serialize_json) as spy:
+            client.get("/api/scenes")
+            client.get("/api/scenes")
+            assert spy.call_count == 1
+
+    def test_etag_changes_when_library_changes(self, tmp_path, client, service):
+        etag = client.get("/api/scenes").headers["ETag"]
+        write_library(tmp_path, LIBRARY_YAML.replace("display_name: A", "display_name: B"))
+        service.reload()
+        response = client.get("/api/scenes", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
+        assert response.json()[0]["display_name"] == "B"
+
+    def test_etag_is_stable_when_content_is_unchanged(self, client, service):
+        etag = client.get("/api/environments").headers["ETag"]
+        service.reload()
+        assert client.get("/api/environments", headers={"If-None-Match": etag}).status_code == 304
+
+    def test_filtered_and_paged_requests_are_not_cached(self, client):
+        assert "ETag" not in client.get("/api/scenes", params={"tags": "smile"}).headers
+        assert "ETag" not in client.get("/api/scenes", params={"limit": 1}).headers
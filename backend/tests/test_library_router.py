@@ -44,8 +44,10 @@ def create_test_app(library_service: LibraryService) -> FastAPI:
 
 @pytest.fixture
 def mock_service():
-    """テスト用 LibraryService モック。"""
-    return MagicMock(spec=LibraryService)
+    """テスト用 LibraryService モック（レスポンスキャッシュは毎回構築する）。"""
+    service = MagicMock(spec=LibraryService)
+    service.cached.side_effect = lambda key, build: build()
+    return service
 
 
 @pytest.fixture
@@ -168,6 +168,62 @@ class TestLibraryServiceLoad:
         assert len(svc.get_scenes()) == 1
 
 
+# ---------------------------------------------------------------------------
+# 正常系: 名前索引 get_scene() / get_environment()
+# ---------------------------------------------------------------------------
+
+class TestLibraryServiceNameIndex:
+    def test_get_scene_by_name(self, tmp_path):
+        from backend.services.library_service import LibraryService
+        svc = LibraryService()
+        svc.load(write_yaml(tmp_path, VALID_YAML_FULL))
+        scene = svc.get_scene("sleeping")
+        assert scene is not None
+        assert scene.positive_prompt == "lying in bed"
+
+    def test_get_scene_unknown_returns_none(self, tmp_path):
+        from backend.services.library_service import LibraryService
+        svc = LibraryService()
+        svc.load(write_yaml(tmp_path, VALID_YAML_FULL))
+        assert svc.get_scene("unknown") is None
+
+    def test_get_environment_by_name(self, tmp_path):
+        from backend.services.library_service import LibraryService
+        svc = LibraryService()
+        svc.load(write_yaml(tmp_path, VALID_YAML_FULL))
+        env = svc.get_environment("indoor")
+        assert env is not None
+        assert env.thumbnail == "thumbnails/indoor.jpg"
+        assert svc.get_environment("unknown") is None
+
+    def test_duplicate_name_resolves_to_first(self, tmp_path):
+        from backend.services.library_service import LibraryService
+        content = dedent("""\
+            scenes: []
+            environments:
+              - name: "e"
+                display_name: "E"
+                environment_prompt: "ep"
+              - name: "e"
+                display_name: "E2"
+                environment_prompt: "second"
+        """)
+        svc = LibraryService()
+        svc.load(write_yaml(tmp_path, content))
+        assert len(svc.get_environments()) == 2
+        assert svc.get_environment("e").environment_prompt == "ep"
+
+    def test_index_follows_reload(self, tmp_path):
+        from backend.services.library_service import LibraryService
+        path = write_yaml(tmp_path, VALID_YAML_MINIMAL)
+        svc = LibraryService()
+        svc.load(path)
+        write_yaml(tmp_path, VALID_YAML_FULL)
+        svc.reload()
+        assert svc.get_scene("s") is None
+        assert svc.get_scene("studying") is not None
+
+
 # ---------------------------------------------------------------------------
 # 正常系: resolve_image_path()
 # ---------------------------------------------------------------------------
@@ -264,3 +320,50 @@ class TestLibraryServiceErrors:
             svc.load(tmp_path / "nonexistent.yaml")
         captured = capsys.readouterr()
         assert captured.err != "" or captured.out != ""
+
+
+# ---------------------------------------------------------------------------
+# 再読み込み: reload()
+# ---------------------------------------------------------------------------
+
+class TestLibraryServiceReload:
+    def test_reload_swaps_in_new_content(self, tmp_path):
+        from backend.services.library_service import LibraryService
+        path = write_yaml(tmp_path, VALID_YAML_MINIMAL)
+        svc = LibraryService()
+        svc.load(path)
+        write_yaml(tmp_path, VALID_YAML_FULL)
+        assert svc.reload() is True
+        assert [s.name for s in svc.get_scenes()] == ["studying", "sleeping"]
+        assert svc.get_tech_defaults() is not None
+
+    def test_reload_keeps_previous_results_intact(self, tmp_path):
+        """再読み込み前に取得したリストは差し替え後も変化しないこと（RCU）"""
+        from backend.services.library_service import LibraryService
+        path = write_yaml(tmp_path, VALID_YAML_FULL)
+        svc = LibraryService()
+        svc.load(path)
+        before = svc.get_scenes()
+        write_yaml(tmp_path, VALID_YAML_MINIMAL)
+        svc.reload()
+        assert [s.name for s in before] == ["studying", "sleeping"]
+        assert [s.name for s in svc.get_scenes()] == ["s"]
+
+    def test_reload_invalid_yaml_keeps_current_state(self, tmp_path, capsys):
+        from backend.services.library_service import LibraryService
+        path = write_yaml(tmp_path, VALID_YAML_FULL)
+        svc = LibraryService()
+        svc.load(path)
+        write_yaml(tmp_path, INVALID_YAML_MISSING_REQUIRED)
+        assert svc.reload() is False
+        assert len(svc.get_scenes()) == 2
+        assert capsys.readouterr().err != ""
+
+    def test_reload_missing_file_keeps_current_state(self, tmp_path):
+        from backend.services.library_service import LibraryService
+        path = write_yaml(tmp_path, VALID_YAML_FULL)
+        svc = LibraryService()
+        svc.load(path)
+        path.unlink()
+        assert svc.reload() is False
+        assert len(svc.get_environments()) == 2
@@ -0,0 +1,199 @@
+"""ディレクトリ指定（シャード分割）ライブラリの LibraryService ユニットテスト"""
+
+from pathlib import Path
+from textwrap import dedent
+
+import pytest
+
+
+SHARD_SCENES_A = dedent("""\
+    scenes:
+      - name: "studying"
+        display_name: "勉強"
+        positive_prompt: "studying"
+        preview_image: "scenes/studying.jpg"
+""")
+
+SHARD_SCENES_B = dedent("""\
+    scenes:
+      - name: "sleeping"
+        display_name: "睡眠"
+        positive_prompt: "sleeping"
+""")
+
+SHARD_ENVIRONMENTS = dedent("""\
+    environments:
+      - name: "indoor"
+        display_name: "室内"
+        environment_prompt: "indoor room"
+""")
+
+SHARD_DEFAULTS = dedent("""\
+    default_tech_settings:
+      comfyui_config:
+        server_address: "127.0.0.1:8188"
+        client_id: "t2i_client"
+      workflow_config:
+        workflow_json_path: "/path/to/workflow.json"
+        image_output_path: "/path/to/output"
+        library_file_path: "/path/to/library.yaml"
+        seed_node_id: 164
+        batch_size_node_id: 22
+        negative_prompt_node_id: 174
+        positive_prompt_node_id: 257
+        environment_prompt_node_id: 303
+        default_prompts:
+          base_positive_prompt: "masterpiece"
+""")
+
+
+def make_library_dir(tmp_path: Path, shards: dict[str, str]) -> Path:
+    library_dir = tmp_path / "library.d"
+    library_dir.mkdir()
+    for name, content in shards.items():
+        (library_dir / name).write_text(content, encoding="utf-8")
+    return library_dir
+
+
+@pytest.mark.parametrize("parse_workers", [1, 2])
+class TestLoadDirectory:
+    def test_merges_shards_in_file_name_order(self, tmp_path, parse_workers):
+        from backend.services.library_service import LibraryService
+        library_dir = make_library_dir(tmp_path, {
+            "20-sleeping.yaml": SHARD_SCENES_B,
+            "10-studying.yaml": SHARD_SCENES_A,
+            "30-env.yml": SHARD_ENVIRONMENTS,
+            "00-defaults.yaml": SHARD_DEFAULTS,
+        })
+        svc = LibraryService(parse_workers=parse_workers)
+        svc.load(library_dir)
+        assert [s.name for s in svc.get_scenes()] == ["studying", "sleeping"]
+        assert [e.name for e in svc.get_environments()] == ["indoor"]
+        assert svc.get_tech_defaults() is not None
+        assert svc.get_scene("sleeping") is not None
+
+    def test_duplicate_names_across_shards_exit(self, tmp_path, capsys, parse_workers):
+        from backend.services.library_service import LibraryService
+        library_dir = make_library_dir(tmp_path, {
+            "a.yaml": SHARD_SCENES_A,
+            "b.yaml": SHARD_SCENES_A + SHARD_ENVIRONMENTS,
+        })
+        svc = LibraryService(parse_workers=parse_workers)
+        with pytest.raises(SystemExit) as exc_info:
+            svc.load(library_dir)
+        assert exc_info.value.code == 1
+        err = capsys.readouterr().err
+        assert "studying" in err
+        assert "a.yaml" in err and "b.yaml" in err
+
+    def test_invalid_shard_reports_file_name(self, tmp_path, capsys, parse_workers):
+        from backend.services.library_service import LibraryService
+        library_dir = make_library_dir(tmp_path, {
+            "a.yaml": SHARD_SCENES_A,
+            "broken.yaml": "scenes: [\n  invalid",
+        })
+        svc = LibraryService(parse_workers=parse_workers)
+        with pytest.raises(SystemExit):
+            svc.load(library_dir)
+        assert "broken.yaml" in capsys.readouterr().err
+
+
+class TestLoadDirectoryDetails:
+    def test_multiple_tech_defaults_exit(self, tmp_path, capsys):
+        from backend.services.library_service import LibraryService
+        library_dir = make_library_dir(tmp_path, {
+            "a.yaml": SHARD_DEFAULTS,
+            "b.yaml": SHARD_DEFAULTS,
+        })
+        with pytest.raises(SystemExit):
+            LibraryService(parse_workers=1).load(library_dir)
+        assert "default_tech_settings" in capsys.readouterr().err
+
+    def test_zero_parse_workers_disables_parallelism(self, tmp_path, monkeypatch):
+        from backend.services import library_service
+        from backend.services.library_service import LibraryService
+        library_dir = make_library_dir(tmp_path, {
+            "a.yaml": SHARD_SCENES_A,
+            "b.yaml": SHARD_SCENES_B,
+        })
+        monkeypatch.setattr(
+            library_service, "ProcessPoolExecutor",
+            lambda *args, **kwargs: pytest.fail("プロセスプールが使われた"),
+        )
+        svc = LibraryService(parse_workers=0)
+        svc.load(library_dir)
+        assert len(svc.get_scenes()) == 2
+
+    def test_os_error_while_reading_snapshot_exits(self, tmp_path, capsys, monkeypatch):
+        from backend.services import library_service
+        from backend.services.library_service import LibraryService
+        library_dir = make_library_dir(tmp_path, {"a.yaml": SHARD_SCENES_A})
+
+        def fail(*args):
+            raise PermissionError("アクセスが拒否されました")
+
+        monkeypatch.setattr(library_service, "read_snapshot", fail)
+        with pytest.raises(SystemExit):
+            LibraryService(parse_workers=1).load(library_dir)
+        assert "アクセスが拒否されました" in capsys.readouterr().err
+
+    def test_ignores_hidden_and_non_yaml_files(self, tmp_path):
+        from backend.services.library_service import LibraryService
+        library_dir = make_library_dir(tmp_path, {
+            "a.yaml": SHARD_SCENES_A,
+            ".hidden.yaml": "not: [valid",
+            "notes.txt": "memo",
+        })
+        svc = LibraryService(parse_workers=1)
+        svc.load(library_dir)
+        assert [s.name for s in svc.get_scenes()] == ["studying"]
+
+    def test_empty_shard_is_allowed(self, tmp_path):
+        from backend.services.library_service import LibraryService
+        library_dir = make_library_dir(tmp_path, {"a.yaml": SHARD_SCENES_A, "b.yaml": ""})
+        svc = LibraryService(parse_workers=1)
+        svc.load(library_dir)
+        assert len(svc.get_scenes()) == 1
+        assert svc.get_environments() == []
+
+    def test_images_resolve_relative_to_directory(self, tmp_path):
+        from backend.services.library_service import LibraryService
+        library_dir = make_library_dir(tmp_path, {"a.yaml": SHARD_SCENES_A})
+        img = library_dir / "scenes" / "studying.jpg"
+        img.parent.mkdir()
+        img.write_bytes(b"jpg")
+        svc = LibraryService(parse_workers=1)
+        svc.load(library_dir)
+        assert svc.resolve_image_path("scenes/studying.jpg") == img
+
+    def test_reload_picks_up_new_shard(self, tmp_path):
+        from backend.services.library_service import LibraryService
+        library_dir = make_library_dir(tmp_path, {"a.yaml": SHARD_SCENES_A})
+        svc = LibraryService(parse_workers=1)
+        svc.load(library_dir)
+        (library_dir / "b.yaml").write_text(SHARD_SCENES_B, encoding="utf-8")
+        assert svc.reload() is True
+        assert [s.name for s in svc.get_scenes()] == ["studying", "sleeping"]
+
+    def test_snapshot_for_directory(self, tmp_path, monkeypatch):
+        from backend.services import library_service
+        from backend.services.library_service import LibraryService
+        library_dir = make_library_dir(tmp_path, {"a.yaml": SHARD_SCENES_A})
+        snapshot = LibraryService(parse_workers=1).compile_snapshot(library_dir)
+        assert snapshot == tmp_path / "library.d.snapshot"
+
+        monkeypatch.setattr(
+            library_service, "_parse_shard", lambda name, data: pytest.fail("解析された")
+        )
+        svc = LibraryService(parse_workers=1)
+        svc.load(library_dir)
+        assert svc.get_scenes()[0].name == "studying"
+
+    def test_snapshot_stale_after_new_shard(self, tmp_path):
+        from backend.services.library_service import LibraryService
+        library_dir = make_library_dir(tmp_path, {"a.yaml": SHARD_SCENES_A})
+        LibraryService(parse_workers=1).compile_snapshot(library_dir)
+        (library_dir / "b.yaml").write_text(SHARD_SCENES_B, encoding="utf-8")
+        svc = LibraryService(parse_workers=1)
+        svc.load(library_dir)
+        assert len(svc.get_scenes()) == 2
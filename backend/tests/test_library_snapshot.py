@@ -0,0 +1,164 @@
+"""ライブラリスナップショット（compile-library）のユニットテスト"""
+
+import os
+import pickle
+from pathlib import Path
+from textwrap import dedent
+
+import pytest
+
+
+LIBRARY_YAML = dedent("""\
+    scenes:
+      - name: "studying"
+        display_name: "勉強"
+        positive_prompt: "sitting at desk, studying"
+    environments:
+      - name: "indoor"
+        display_name: "室内"
+        environment_prompt: "indoor room"
+""")
+
+LIBRARY_YAML_UPDATED = LIBRARY_YAML.replace("studying", "reading")
+
+
+def write_yaml(tmp_path: Path, content: str, filename: str = "library.yaml") -> Path:
+    p = tmp_path / filename
+    p.write_text(content, encoding="utf-8")
+    return p
+
+
+class TestCompileSnapshot:
+    def test_writes_snapshot_next_to_library(self, tmp_path):
+        from backend.services.library_service import LibraryService
+        path = write_yaml(tmp_path, LIBRARY_YAML)
+        snapshot = LibraryService().compile_snapshot(path)
+        assert snapshot == tmp_path / "library.yaml.snapshot"
+        assert snapshot.exists()
+
+    def test_writes_snapshot_to_given_path(self, tmp_path):
+        from backend.services.library_service import LibraryService
+        path = write_yaml(tmp_path, LIBRARY_YAML)
+        out = tmp_path / "build" / "lib.snapshot"
+        out.parent.mkdir()
+        assert LibraryService().compile_snapshot(path, out) == out
+        assert out.exists()
+
+    def test_invalid_yaml_exits_without_snapshot(self, tmp_path):
+        from backend.services.library_service import LibraryService
+        path = write_yaml(tmp_path, "scenes: [\n  invalid yaml")
+        with pytest.raises(SystemExit) as exc_info:
+            LibraryService().compile_snapshot(path)
+        assert exc_info.value.code == 1
+        assert not (tmp_path / "library.yaml.snapshot").exists()
+
+
+class TestLoadFromSnapshot:
+    def test_load_uses_fresh_snapshot(self, tmp_path, monkeypatch):
+        from backend.services.library_service import LibraryService
+        path = write_yaml(tmp_path, LIBRARY_YAML)
+        LibraryService().compile_snapshot(path)
+
+        def fail_parse(data):
+            raise AssertionError("スナップショットが使われていない")
+
+        monkeypatch.setattr(LibraryService, "_parse", staticmethod(fail_parse))
+        svc = LibraryService()
+        svc.load(path)
+        assert [s.name for s in svc.get_scenes()] == ["studying"]
+
+    def test_load_uses_snapshot_when_only_mtime_differs(self, tmp_path, monkeypatch):
+        """内容が同じなら mtime が変わってもスナップショットを使うこと（CI ビルド想定）"""
+        from backend.services.library_service import LibraryService
+        path = write_yaml(tmp_path, LIBRARY_YAML)
+        LibraryService().compile_snapshot(path)
+        stat = path.stat()
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+        monkeypatch.setattr(
+            LibraryService, "_parse", staticmethod(lambda data: pytest.fail("解析された"))
+        )
+        svc = LibraryService()
+        svc.load(path)
+        assert svc.get_scenes()[0].name == "studying"
+
+    def test_stale_snapshot_is_ignored(self, tmp_path):
+        from backend.services.library_service import LibraryService
+        path = write_yaml(tmp_path, LIBRARY_YAML)
+        LibraryService().compile_snapshot(path)
+        write_yaml(tmp_path, LIBRARY_YAML_UPDATED)
+
+        svc = LibraryService()
+        svc.load(path)
+        assert svc.get_scenes()[0].name == "reading"
+
+    def test_corrupt_snapshot_is_ignored(self, tmp_path):
+        from backend.services.library_service import LibraryService
+        path = write_yaml(tmp_path, LIBRARY_YAML)
+        (tmp_path / "library.yaml.snapshot").write_bytes(b"not a pickle")
+
+        svc = LibraryService()
+        svc.load(path)
+        assert svc.get_scenes()[0].name == "studying"
+
+    def test_other_format_version_is_ignored(self, tmp_path):
+        from backend.services.library_service import LibraryService
+        path = write_yaml(tmp_path, LIBRARY_YAML)
+        snapshot = LibraryService().compile_snapshot(path)
+        payload = pickle.loads(snapshot.read_bytes())
+        payload["format"] = -1
+        payload["library"].scenes[0].name = "from_snapshot"
+        snapshot.write_bytes(pickle.dumps(payload))
+
+        svc = LibraryService()
+        svc.load(path)
+        assert svc.get_scenes()[0].name == "studying"
+
+    def test_use_snapshot_false_always_parses(self, tmp_path):
+        from backend.services.library_service import LibraryService
+        path = write_yaml(tmp_path, LIBRARY_YAML)
+        snapshot = LibraryService().compile_snapshot(path)
+        payload = pickle.loads(snapshot.read_bytes())
+        payload["library"].scenes[0].name = "from_snapshot"
+        snapshot.write_bytes(pickle.dumps(payload))
+
+        svc = LibraryService()
+        svc.load(path)
+        assert svc.get_scenes()[0].name == "from_snapshot"
+        svc.load(path, use_snapshot=False)
+        assert svc.get_scenes()[0].name == "studying"
+
+
+class TestCompileLibraryCommand:
+    def test_main_writes_snapshot(self, tmp_path, capsys):
+        from backend.library_cli import main
+        path = write_yaml(tmp_path, LIBRARY_YAML)
+        main(["compile-library", "--library-path", str(path)])
+        assert (tmp_path / "library.yaml.snapshot").exists()
+        assert "library.yaml.snapshot" in capsys.readouterr().out
+
+    def test_main_with_output(self, tmp_path):
+        from backend.library_cli import main
+        path = write_yaml(tmp_path, LIBRARY_YAML)
+        out = tmp_path / "out.snapshot"
+        main(["compile-library", "--library-path", str(path), "--output", str(out)])
+        assert out.exists()
+
+    @pytest.mark.parametrize("command", ["compile-library", "validate-library"])
+    def test_main_does_not_index_images(self, tmp_path, monkeypatch, command):
+        from backend.library_cli import main
+        from backend.services import image_index
+        path = write_yaml(tmp_path, LIBRARY_YAML)
+        (tmp_path / "scenes").mkdir()
+        (tmp_path / "scenes" / "studying.png").write_bytes(b"png")
+        monkeypatch.setattr(
+            image_index, "file_hash", lambda path: pytest.fail("画像のハッシュを計算した")
+        )
+        monkeypatch.setattr(image_index, "_scan", lambda root: pytest.fail("画像を走査した"))
+        main([command, "--library-path", str(path)])
+
+    def test_main_missing_library_exits(self, tmp_path):
+        from backend.library_cli import main
+        with pytest.raises(SystemExit) as exc_info:
+            main(["compile-library", "--library-path", str(tmp_path / "none.yaml")])
+        assert exc_info.value.code == 1
@@ -0,0 +1,110 @@
+"""コンパクトストア（--library-store compact）のユニットテスト"""
+
+from pathlib import Path
+
+import pytest
+
+
+def build_library_yaml(count: int) -> str:
+    lines = ["scenes:"]
+    for i in range(count):
+        lines += [
+            f'  - name: "scene{i}"',
+            f'    display_name: "シーン{i}"',
+            f'    positive_prompt: "1girl, solo, looking at viewer,  pose{i % 5}, smile"',
+            '    negative_prompt: "lowres, bad anatomy, bad hands"',
+        ]
+    lines += [
+        "environments:",
+        '  - name: "indoor"',
+        '    display_name: "室内"',
+        '    environment_prompt: "indoor room"',
+        '    thumbnail: "thumbnails/indoor.jpg"',
+    ]
+    return "\n".join(lines) + "\n"
+
+
+def write_yaml(tmp_path: Path, content: str) -> Path:
+    p = tmp_path / "library.yaml"
+    p.write_text(content, encoding="utf-8")
+    return p
+
+
+class TestTagDictionary:
+    @pytest.mark.parametrize("prompt", [
+        "a, b, c",
+        "a,b,,c",
+        " leading, trailing ,",
+        "",
+        "no separators",
+    ])
+    def test_round_trip_is_exact(self, prompt):
+        from backend.services.library_store_compact import TagDictionary
+        tags = TagDictionary()
+        assert tags.decode(tags.encode(prompt)) == prompt
+
+    def test_shared_tags_get_same_id(self):
+        from backend.services.library_store_compact import TagDictionary
+        tags = TagDictionary()
+        first = tags.encode("1girl, smile")
+        second = tags.encode("1girl, frown")
+        assert first[0] == second[0]
+        assert len(tags) == 3
+
+
+class TestCompactStore:
+    def test_accessors_match_memory_store(self, tmp_path):
+        from backend.services.library_service import LibraryService
+        path = write_yaml(tmp_path, build_library_yaml(20))
+        memory = LibraryService()
+        memory.load(path)
+        compact = LibraryService(store="compact")
+        compact.load(path)
+        assert list(compact.get_scenes()) == list(memory.get_scenes())
+        assert list(compact.get_environments()) == list(memory.get_environments())
+        assert compact.get_scene("scene7") == memory.get_scene("scene7")
+        assert compact.get_scene("unknown") is None
+        assert compact.get_environment("indoor").thumbnail == "thumbnails/indoor.jpg"
+        assert compact.get_environment("unknown") is None
+        assert compact.get_scenes()[3].name == "scene3"
+        assert [s.name for s in compact.get_scenes()[1:3]] == ["scene1", "scene2"]
+
+    def test_strings_are_shared(self, tmp_path):
+        from backend.services.library_service import LibraryService
+        svc = LibraryService(store="compact")
+        svc.load(write_yaml(tmp_path, build_library_yaml(3)))
+        store = svc._current().store
+        a, b = store.get_scene("scene0"), store.get_scene("scene1")
+        assert a.negative_prompt is b.negative_prompt
+        assert store.tag_count == 4 + 3  # 共通タグ 4 種 + pose0..pose2
+
+    def test_uses_less_memory_and_reports_it(self, tmp_path, capsys):
+        from backend.services.library_service import LibraryService
+        from backend.services.library_store_compact import deep_sizeof
+        path = write_yaml(tmp_path, build_library_yaml(500))
+        memory = LibraryService()
+        memory.load(path)
+        compact = LibraryService(store="compact")
+        compact.load(path)
+        assert deep_sizeof(compact._current().store) < deep_sizeof(memory._current().store)
+        out = capsys.readouterr().out
+        assert "MiB" in out and "→" in out
+
+    def test_indexes_are_built_on_first_use(self, tmp_path):
+        from backend.services.library_service import LibraryService
+        svc = LibraryService(store="compact")
+        svc.load(write_yaml(tmp_path, build_library_yaml(5)))
+        state = svc._current()
+        assert not state.search_index._built
+        assert not state.tag_index._built
+        assert state.derived == {}
+        total, scenes = svc.search_scenes("pose3")
+        assert total == 1 and scenes[0].name == "scene3"
+        assert state.search_index._built
+
+
+class TestDeepSizeof:
+    def test_counts_shared_objects_once(self):
+        from backend.services.library_store_compact import deep_sizeof
+        shared = "x" * 1000
+        assert deep_sizeof([shared, shared]) < deep_sizeof([shared, "y" * 1000])
@@ -0,0 +1,175 @@
+"""遅延検証（--lazy-library）のユニットテスト"""
+
+from pathlib import Path
+from textwrap import dedent
+
+import pytest
+
+
+LIBRARY_YAML = dedent("""\
+    environments:
+      - name: "indoor"
+        display_name: "室内"
+        environment_prompt: "indoor room"
+      - name: "broken_env"
+        display_name: "壊れた環境"
+    scenes:
+      - name: "studying"
+        display_name: "勉強"
+        positive_prompt: "sitting at desk, studying"
+        batch_size: 2
+      - name: "broken"
+        display_name: "壊れたシーン"
+        positive_prompt: "p"
+        batch_size: 0
+      - name: "sleeping"
+        display_name: "睡眠"
+        positive_prompt: "lying in bed"
+""")
+
+VALID_YAML = LIBRARY_YAML.replace("batch_size: 0", "batch_size: 3").replace(
+    'display_name: "壊れた環境"', 'display_name: "壊れた環境"\n    environment_prompt: "x"'
+)
+
+
+def write_yaml(tmp_path: Path, content: str, filename: str = "library.yaml") -> Path:
+    p = tmp_path / filename
+    p.write_text(content, encoding="utf-8")
+    return p
+
+
+def load_lazy(path: Path):
+    from backend.services.library_service import LibraryService
+    svc = LibraryService(lazy=True)
+    svc.load(path)
+    return svc
+
+
+class TestLazyLibraryStore:
+    def test_load_does_not_validate_entries(self, tmp_path):
+        svc = load_lazy(write_yaml(tmp_path, LIBRARY_YAML))
+        store = svc._current().store
+        assert store.validated_count == 0
+        assert len(svc.get_scenes()) == 3
+        assert len(svc.get_environments()) == 2
+
+    def test_get_scene_validates_and_memoizes(self, tmp_path):
+        svc = load_lazy(write_yaml(tmp_path, LIBRARY_YAML))
+        scene = svc.get_scene("studying")
+        assert scene.batch_size == 2
+        assert svc.get_scene("studying") is scene
+        assert svc._current().store.validated_count == 1
+
+    def test_defaults_are_applied(self, tmp_path):
+        svc = load_lazy(write_yaml(tmp_path, LIBRARY_YAML))
+        scene = svc.get_scene("sleeping")
+        assert scene.negative_prompt == ""
+        assert scene.batch_size == 1
+
+    def test_unknown_name_returns_none(self, tmp_path):
+        svc = load_lazy(write_yaml(tmp_path, LIBRARY_YAML))
+        assert svc.get_scene("missing") is None
+        assert svc.get_environment("missing") is None
+
+    def test_invalid_entry_raises_on_access(self, tmp_path):
+        from backend.services.library_store_lazy import LibraryEntryError
+        svc = load_lazy(write_yaml(tmp_path, LIBRARY_YAML))
+        with pytest.raises(LibraryEntryError, match=r"scenes\[1\] 'broken'"):
+            svc.get_scene("broken")
+        with pytest.raises(LibraryEntryError, match=r"environments\[1\]"):
+            svc.get_environment("broken_env")
+        assert svc.get_environment("indoor").environment_prompt == "indoor room"
+
+    def test_sequence_access(self, tmp_path):
+        svc = load_lazy(write_yaml(tmp_path, LIBRARY_YAML))
+        scenes = svc.get_scenes()
+        assert scenes[-1].name == "sleeping"
+        assert [s.name for s in scenes[:1]] == ["studying"]
+        with pytest.raises(IndexError):
+            scenes[3]
+
+    def test_entry_without_name_is_load_error(self, tmp_path, capsys):
+        content = LIBRARY_YAML.replace('- name: "sleeping"', '- title: "sleeping"')
+        with pytest.raises(SystemExit) as exc_info:
+            load_lazy(write_yaml(tmp_path, content))
+        assert exc_info.value.code == 1
+        assert "scenes[2]" in capsys.readouterr().err
+
+    def test_missing_section_is_load_error(self, tmp_path):
+        with pytest.raises(SystemExit):
+            load_lazy(write_yaml(tmp_path, "scenes: []\n"))
+
+    def test_invalid_tech_defaults_is_load_error(self, tmp_path, capsys):
+        content = LIBRARY_YAML + "default_tech_settings:\n  comfyui_config: {}\n"
+        with pytest.raises(SystemExit):
+            load_lazy(write_yaml(tmp_path, content))
+        assert "default_tech_settings" in capsys.readouterr().err
+
+    def test_shards(self, tmp_path):
+        library_dir = tmp_path / "library.d"
+        library_dir.mkdir()
+        write_yaml(library_dir, "scenes:\n  - {name: a, display_name: A, positive_prompt: p}\n", "a.yaml")
+        write_yaml(library_dir, "environments:\n  - {name: e, display_name: E, environment_prompt: p}\n", "b.yaml")
+        svc = load_lazy(library_dir)
+        assert svc.get_scene("a").display_name == "A"
+        assert [e.name for e in svc.get_environments()] == ["e"]
+
+    def test_duplicate_across_shards_is_load_error(self, tmp_path, capsys):
+        library_dir = tmp_path / "library.d"
+        library_dir.mkdir()
+        shard = "scenes:\n  - {name: a, display_name: A, positive_prompt: p}\n"
+        write_yaml(library_dir, shard, "a.yaml")
+        write_yaml(library_dir, shard, "b.yaml")
+        with pytest.raises(SystemExit):
+            load_lazy(library_dir)
+        assert "シーン 'a': a.yaml, b.yaml" in capsys.readouterr().err
+
+    def test_fresh_snapshot_is_used(self, tmp_path):
+        from backend.services.library_service import LibraryService
+        from backend.services.library_store import MemoryLibraryStore
+        path = write_yaml(tmp_path, VALID_YAML)
+        LibraryService().compile_snapshot(path)
+        svc = load_lazy(path)
+        assert isinstance(svc._current().store, MemoryLibraryStore)
+
+    def test_lazy_requires_memory_store(self):
+        from backend.services.library_service import LibraryService
+        with pytest.raises(ValueError):
+            LibraryService(store="sqlite", lazy=True)
+
+
+class TestLazyLibraryApi:
+    def test_invalid_entry_returns_500(self, tmp_path):
+        from fastapi.testclient import TestClient
+        from backend.main import create_app
+        svc = load_lazy(write_yaml(tmp_path, LIBRARY_YAML))
+        client = TestClient(create_app(tmp_path / "dist", library_service=svc))
+        response = client.get("/api/scenes")
+        assert response.status_code == 500
+        assert "scenes[1]" in response.json()["detail"]
+        assert client.get("/api/environments").status_code == 500
+
+
+class TestValidateLibraryCommand:
+    def test_valid_library(self, tmp_path, capsys):
+        from backend.library_cli import main
+        main(["validate-library", "--library-path", str(write_yaml(tmp_path, VALID_YAML))])
+        assert "シーン 3 件 / 環境 2 件" in capsys.readouterr().out
+
+    def test_invalid_library_exits(self, tmp_path):
+        from backend.library_cli import main
+        with pytest.raises(SystemExit) as exc_info:
+            main(["validate-library", "--library-path", str(write_yaml(tmp_path, LIBRARY_YAML))])
+        assert exc_info.value.code == 1
+
+    def test_ignores_snapshot(self, tmp_path):
+        from backend.library_cli import main
+        from backend.services.library_service import LibraryService
+        path = write_yaml(tmp_path, VALID_YAML)
+        LibraryService().compile_snapshot(path)
+        snapshot = tmp_path / "library.yaml.snapshot"
+        stat = snapshot.stat()
+        path.write_text(LIBRARY_YAML, encoding="utf-8")
+        with pytest.raises(SystemExit):
+            main(["validate-library", "--library-path", str(path)])
+        assert snapshot.stat().st_mtime_ns == stat.st_mtime_ns
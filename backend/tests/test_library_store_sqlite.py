@@ -0,0 +1,342 @@
+"""SQLite ストア（--library-store sqlite）のユニットテスト"""
+
+from pathlib import Path
+from textwrap import dedent
+
+import pytest
+
+
+LIBRARY_YAML = dedent("""\
+    default_tech_settings:
+      comfyui_config:
+        server_address: "127.0.0.1:8188"
+        client_id: "t2i_client"
+      workflow_config:
+        workflow_json_path: "/path/to/workflow.json"
+        image_output_path: "/path/to/output"
+        library_file_path: "/path/to/library.yaml"
+        seed_node_id: 164
+        batch_size_node_id: 22
+        negative_prompt_node_id: 174
+        positive_prompt_node_id: 257
+        environment_prompt_node_id: 303
+        default_prompts:
+          base_positive_prompt: "masterpiece"
+    scenes:
+      - name: "studying"
+        display_name: "勉強"
+        positive_prompt: "sitting at desk, studying"
+        negative_prompt: "blurry"
+        batch_size: 2
+        preview_image: "scenes/studying.jpg"
+      - name: "sleeping"
+        display_name: "睡眠"
+        positive_prompt: "lying in bed"
+      - name: "cooking"
+        display_name: "料理"
+        positive_prompt: "cooking"
+    environments:
+      - name: "indoor"
+        display_name: "室内"
+        environment_prompt: "indoor room"
+        thumbnail: "thumbnails/indoor.jpg"
+""")
+
+
+def write_yaml(tmp_path: Path, content: str = LIBRARY_YAML) -> Path:
+    p = tmp_path / "library.yaml"
+    p.write_text(content, encoding="utf-8")
+    return p
+
+
+def load_sqlite(path: Path, **kwargs):
+    from backend.services.library_service import LibraryService
+    svc = LibraryService(store="sqlite", **kwargs)
+    svc.load(path)
+    return svc
+
+
+class TestSqliteStoreAccessors:
+    def test_builds_database_next_to_library(self, tmp_path):
+        load_sqlite(write_yaml(tmp_path))
+        assert (tmp_path / "library.yaml.sqlite3").exists()
+
+    def test_builds_database_at_given_path(self, tmp_path):
+        db = tmp_path / "db" / "lib.sqlite3"
+        db.parent.mkdir()
+        load_sqlite(write_yaml(tmp_path), sqlite_path=db)
+        assert db.exists()
+
+    def test_get_scenes_matches_memory_store(self, tmp_path):
+        from backend.services.library_service import LibraryService
+        path = write_yaml(tmp_path)
+        memory = LibraryService()
+        memory.load(path)
+        sqlite = load_sqlite(path)
+        assert list(sqlite.get_scenes()) == list(memory.get_scenes())
+        assert list(sqlite.get_environments()) == list(memory.get_environments())
+        assert sqlite.get_tech_defaults() == memory.get_tech_defaults()
+
+    def test_scenes_sequence_is_lazy_and_indexable(self, tmp_path):
+        svc = load_sqlite(write_yaml(tmp_path))
+        scenes = svc.get_scenes()
+        assert not isinstance(scenes, list)
+        assert len(scenes) == 3
+        assert scenes[0].name == "studying"
+        assert scenes[-1].name == "cooking"
+        assert [s.name for s in scenes[1:3]] == ["sleeping", "cooking"]
+        with pytest.raises(IndexError):
+            scenes[3]
+
+    def test_defaults_applied(self, tmp_path):
+        svc = load_sqlite(write_yaml(tmp_path))
+        sleeping = svc.get_scene("sleeping")
+        assert sleeping.batch_size == 1
+        assert sleeping.negative_prompt == ""
+        assert sleeping.preview_image is None
+
+    def test_get_by_name(self, tmp_path):
+        svc = load_sqlite(write_yaml(tmp_path))
+        assert svc.get_scene("studying").batch_size == 2
+        assert svc.get_scene("unknown") is None
+        assert svc.get_environment("indoor").thumbnail == "thumbnails/indoor.jpg"
+        assert svc.get_environment("unknown") is None
+
+    def test_query_scenes_by_display_name(self, tmp_path):
+        from backend.services.library_store_sqlite import SqliteLibraryStore
+        svc = load_sqlite(write_yaml(tmp_path))
+        store = SqliteLibraryStore(tmp_path / "library.yaml.sqlite3")
+        try:
+            names = [s.name for _, s in store.query_scenes(order_by="name")]
+            assert names == ["cooking", "sleeping", "studying"]
+            page = store.query_scenes(order_by="name", offset=1, limit=1)
+            assert [(p, s.name) for p, s in page] == [(1, "sleeping")]
+            after = store.query_scenes(order_by="name", after=("cooking", 2))
+            assert [s.name for _, s in after] == ["sleeping", "studying"]
+            with pytest.raises(ValueError):
+                store.query_scenes(order_by="positive_prompt")
+        finally:
+            store.close()
+        assert svc.get_scene("cooking") is not None
+
+    def test_no_tech_defaults(self, tmp_path):
+        content = LIBRARY_YAML[LIBRARY_YAML.index("scenes:"):]
+        svc = load_sqlite(write_yaml(tmp_path, content))
+        assert svc.get_tech_defaults() is None
+
+
+class TestSqliteStoreReuse:
+    def test_reuses_fresh_database_without_parsing(self, tmp_path, monkeypatch):
+        from backend.services.library_service import LibraryService
+        path = write_yaml(tmp_path)
+        load_sqlite(path)
+        monkeypatch.setattr(
+            LibraryService, "_parse", staticmethod(lambda data: pytest.fail("解析された"))
+        )
+        svc = load_sqlite(path)
+        assert len(svc.get_scenes()) == 3
+
+    def test_rebuilds_when_library_changes(self, tmp_path):
+        path = write_yaml(tmp_path)
+        load_sqlite(path)
+        write_yaml(tmp_path, LIBRARY_YAML.replace("cooking", "reading"))
+        svc = load_sqlite(path)
+        assert svc.get_scene("reading") is not None
+        assert svc.get_scene("cooking") is None
+
+    def test_rebuilds_corrupt_database(self, tmp_path):
+        path = write_yaml(tmp_path)
+        (tmp_path / "library.yaml.sqlite3").write_bytes(b"garbage")
+        svc = load_sqlite(path)
+        assert len(svc.get_scenes()) == 3
+
+    def test_reload_keeps_old_sequence_consistent(self, tmp_path):
+        path = write_yaml(tmp_path)
+        svc = load_sqlite(path)
+        before = svc.get_scenes()
+        write_yaml(tmp_path, LIBRARY_YAML.replace("cooking", "reading"))
+        assert svc.reload() is True
+        assert [s.name for s in before] == ["studying", "sleeping", "cooking"]
+        assert [s.name for s in svc.get_scenes()] == ["studying", "sleeping", "reading"]
+
+    def test_invalid_library_exits(self, tmp_path):
+        path = write_yaml(tmp_path, "scenes: [\n  invalid")
+        with pytest.raises(SystemExit) as exc_info:
+            load_sqlite(path)
+        assert exc_info.value.code == 1
+
+    def test_unknown_store_kind_rejected(self):
+        from backend.services.library_service import LibraryService
+        with pytest.raises(ValueError):
+            LibraryService(store="redis")
+
+
+class TestSqliteStoreApi:
+    def test_api_scenes_served_from_sqlite(self, tmp_path):
+        from fastapi.testclient import TestClient
+        from backend.main import create_app
+        svc = load_sqlite(write_yaml(tmp_path))
+        client = TestClient(create_app(Path("/nonexistent"), library_service=svc))
+        data = client.get("/api/scenes").json()
+        assert [s["name"] for s in data] == ["studying", "sleeping", "cooking"]
+        assert data[0]["preview_image_url"] == "/api/images/scenes/studying.jpg"
+        assert client.get("/api/settings/defaults").status_code == 200
+
+
+class TestLibraryStoreInterface:
+    def test_store_missing_a_method_fails_at_construction(self):
+        from backend.services.library_store import LibraryStore
+
+        class IncompleteStore(LibraryStore):
+            scenes = []
+            environments = []
+            tech_defaults = None
+
+            def get_scene(self, name):
+                return None
+
+        with pytest.raises(TypeError):
+            IncompleteStore()
+
+
+class TestSqliteStoreClose:
+    def test_reload_closes_old_connection_once_released(self, tmp_path):
+        import gc
+        import sqlite3
+        path = write_yaml(tmp_path)
+        svc = load_sqlite(path)
+        before = svc.get_scenes()
+        old_conn = svc._current().store._database._conn
+        write_yaml(tmp_path, LIBRARY_YAML.replace("cooking", "reading"))
+        gc.disable()  # 循環参照の回収に頼らずに閉じられることを確かめる
+        try:
+            assert svc.reload() is True
+            assert [s.name for s in before] == ["studying", "sleeping", "cooking"]
+            del before
+            with pytest.raises(sqlite3.ProgrammingError):
+                old_conn.execute("SELECT 1")
+        finally:
+            gc.enable()
+        assert svc.get_scene("reading") is not None
+
+    def test_close(self, tmp_path):
+        import sqlite3
+        svc = load_sqlite(write_yaml(tmp_path))
+        svc.close()
+        with pytest.raises(sqlite3.ProgrammingError):
+            svc.get_scene("studying")
+
+    def test_registry_eviction_releases_connection(self, tmp_path):
+        import gc
+        import sqlite3
+        from backend.services.library_registry import LibraryRegistry
+        from backend.services.library_service import LibraryService
+        paths = {}
+        for name in ("a", "b"):
+            (tmp_path / name).mkdir()
+            paths[name] = write_yaml(tmp_path / name)
+        registry = LibraryRegistry(
+            paths, memory_budget=1, service_factory=lambda: LibraryService(store="sqlite")
+        )
+        conn = registry.get("a")._current().store._database._conn
+        gc.disable()
+        try:
+            registry.get("b")
+            assert registry.loaded_names == ["b"]
+            with pytest.raises(sqlite3.ProgrammingError):
+                conn.execute("SELECT 1")
+        finally:
+            gc.enable()
+        registry.close()
+        assert registry.loaded_names == []
+
+
+class TestSqliteStoreListing:
+    TIES_YAML = dedent("""\
+        scenes:
+          - {name: "delta", display_name: "D", positive_prompt: "p"}
+          - {name: "alpha", display_name: "C", positive_prompt: "p"}
+          - {name: "charlie", display_name: "B", positive_prompt: "p"}
+          - {name: "bravo", display_name: "A", positive_prompt: "p"}
+          - {name: "alpha", display_name: "E", positive_prompt: "p"}
+        environments:
+          - {name: "b", display_name: "2", environment_prompt: "e"}
+          - {name: "a", display_name: "1", environment_prompt: "e"}
+    """)
+
+    @staticmethod
+    def all_pages(list_page, sort: str, limit: int | None) -> list[list[str]]:
+        pages, cursor = [], None
+        while True:
+            page = list_page(sort, cursor, limit)
+            pages.append([item.name for item in page.items])
+            if page.next_cursor is None:
+                return pages
+            cursor = page.next_cursor
+
+    @pytest.mark.parametrize("sort", ["position", "name", "display_name"])
+    @pytest.mark.parametrize("limit", [1, 2, 5, None])
+    def test_pages_match_memory_store(self, tmp_path, sort, limit):
+        from backend.services.library_service import LibraryService
+        path = write_yaml(tmp_path, self.TIES_YAML)
+        memory = LibraryService()
+        memory.load(path)
+        sqlite = load_sqlite(path)
+        for kind in ("list_scenes", "list_environments"):
+            expected = self.all_pages(getattr(memory, kind), sort, limit)
+            assert self.all_pages(getattr(sqlite, kind), sort, limit) == expected
+        assert sqlite.list_scenes(sort, None, 2).total == 5
+
+    def test_listing_does_not_read_every_row(self, tmp_path, monkeypatch):
+        from backend.services.library_store_sqlite import _LazyRows
+        svc = load_sqlite(write_yaml(tmp_path, self.TIES_YAML))
+        monkeypatch.setattr(_LazyRows, "__iter__", lambda self: pytest.fail("全件を読み込んだ"))
+        page = svc.list_scenes("name", None, 2)
+        assert [s.name for s in page.items] == ["alpha", "alpha"]
+        page = svc.list_scenes("name", page.next_cursor, 2)
+        assert [s.name for s in page.items] == ["bravo", "charlie"]
+
+
+class TestSqliteStoreIndexes:
+    def test_indexes_are_built_on_first_use(self, tmp_path, monkeypatch):
+        from backend.services.library_store_sqlite import _Table
+        path = write_yaml(tmp_path)
+        monkeypatch.setattr(_Table, "to_model", lambda self, row: pytest.fail("行を読み込んだ"))
+        svc = load_sqlite(path)
+        monkeypatch.undo()
+        assert svc.filter_scenes(["studying"])[0].name == "studying"
+        assert svc.search_scenes("睡眠")[1][0].name == "sleeping"
+
+    def test_placeholders_read_image_paths_without_building_models(self, tmp_path, monkeypatch):
+        from PIL import Image
+        from backend.services.image_placeholders import ImagePlaceholderCache
+        from backend.services.library_store_sqlite import _Table
+        path = write_yaml(tmp_path)
+        (tmp_path / "scenes").mkdir()
+        Image.new("RGB", (40, 20), "red").save(tmp_path / "scenes" / "studying.jpg")
+        built = []
+        to_model = _Table.to_model
+        monkeypatch.setattr(
+            _Table, "to_model", lambda self, row: built.append(row) or to_model(self, row)
+        )
+        svc = load_sqlite(path, placeholders=ImagePlaceholderCache(), parse_workers=1)
+        assert svc.wait_for_placeholders(timeout=30)
+        assert built == []
+        assert svc.get_image_placeholder("scenes/studying.jpg").width == 40
+        assert sorted(p for p in svc._current().store.image_paths() if p) == [
+            "scenes/studying.jpg", "thumbnails/indoor.jpg",
+        ]
+
+    def test_reload_diffs_rows_without_building_models(self, tmp_path, monkeypatch):
+        from backend.services.library_store_sqlite import _Table
+        path = write_yaml(tmp_path)
+        svc = load_sqlite(path)
+        version = svc.version
+        write_yaml(tmp_path, LIBRARY_YAML.replace('"料理"', '"料理する"'))
+        monkeypatch.setattr(_Table, "to_model", lambda self, row: pytest.fail("行を読み込んだ"))
+        assert svc.reload() is True
+        monkeypatch.undo()
+        changes, added, modified = svc.get_scene_changes(version)
+        assert [s.name for s in modified] == ["cooking"]
+        assert added == [] and changes.removed == []
+        assert svc._current().derived == {}
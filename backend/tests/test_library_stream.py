@@ -0,0 +1,147 @@
+"""ストリーミング読み込み（--stream-library）のユニットテスト"""
+
+import io
+import tracemalloc
+from pathlib import Path
+from textwrap import dedent
+
+import pytest
+
+
+LIBRARY_YAML = dedent("""\
+    default_tech_settings:
+      comfyui_config:
+        server_address: "127.0.0.1:8188"
+        client_id: "t2i_client"
+      workflow_config:
+        workflow_json_path: "/path/to/workflow.json"
+        image_output_path: "/path/to/output"
+        library_file_path: "/path/to/library.yaml"
+        seed_node_id: 164
+        batch_size_node_id: 22
+        negative_prompt_node_id: 174
+        positive_prompt_node_id: 257
+        environment_prompt_node_id: 303
+        default_prompts:
+          base_positive_prompt: "masterpiece"
+    environments:
+      - name: "indoor"
+        display_name: "室内"
+        environment_prompt: "indoor room"
+        thumbnail: "thumbnails/indoor.jpg"
+    scenes:
+      - name: "studying"
+        display_name: "勉強"
+        positive_prompt: "sitting at desk, studying"
+        batch_size: 2
+        preview_image: "scenes/studying.jpg"
+      - {name: "sleeping", display_name: "睡眠", positive_prompt: "lying in bed"}
+""")
+
+
+def write_yaml(tmp_path: Path, content: str, filename: str = "library.yaml") -> Path:
+    p = tmp_path / filename
+    p.write_text(content, encoding="utf-8")
+    return p
+
+
+def build_large_yaml(count: int) -> str:
+    lines = ["environments: []", "scenes:"]
+    for i in range(count):
+        lines += [
+            f'  - name: "scene{i}"  # コメント',
+            f'    display_name: "シーン{i}"',
+            f'    positive_prompt: "1girl, solo, looking at viewer, pose{i}"',
+            '    negative_prompt: "lowres, bad anatomy"',
+        ]
+    return "\n".join(lines) + "\n"
+
+
+class TestLoadStreaming:
+    def test_matches_regular_load(self, tmp_path):
+        from backend.services.library_service import LibraryService
+        path = write_yaml(tmp_path, LIBRARY_YAML)
+        regular = LibraryService()
+        regular.load(path)
+        streaming = LibraryService(streaming=True)
+        streaming.load(path)
+        assert list(streaming.get_scenes()) == list(regular.get_scenes())
+        assert list(streaming.get_environments()) == list(regular.get_environments())
+        assert streaming.get_tech_defaults() == regular.get_tech_defaults()
+        assert streaming.get_scene("sleeping").batch_size == 1
+
+    def test_empty_sequences(self):
+        from backend.services.library_stream import load_streaming
+        library = load_streaming(io.BytesIO(b"scenes: []\nenvironments: []\n"))
+        assert library.scenes == []
+        assert library.environments == []
+        assert library.default_tech_settings is None
+
+    def test_missing_section_is_error(self):
+        from backend.services.library_stream import LibraryStreamError, load_streaming
+        with pytest.raises(LibraryStreamError):
+            load_streaming(io.BytesIO(b"scenes: []\n"))
+
+    def test_missing_section_allowed_when_partial(self):
+        from backend.services.library_stream import load_streaming
+        library = load_streaming(io.BytesIO(b"scenes: []\n"), partial=True)
+        assert library.environments == []
+
+    def test_null_section_is_error(self):
+        from backend.services.library_stream import LibraryStreamError, load_streaming
+        with pytest.raises(LibraryStreamError):
+            load_streaming(io.BytesIO(b"scenes:\nenvironments: []\n"))
+
+    def test_top_level_must_be_mapping(self):
+        from backend.services.library_stream import LibraryStreamError, load_streaming
+        with pytest.raises(LibraryStreamError):
+            load_streaming(io.BytesIO(b"- a\n- b\n"))
+
+    def test_invalid_item_reports_position(self, tmp_path, capsys):
+        from backend.services.library_service import LibraryService
+        content = LIBRARY_YAML.replace('positive_prompt: "lying in bed"', 'batch_size: 0')
+        with pytest.raises(SystemExit) as exc_info:
+            LibraryService(streaming=True).load(write_yaml(tmp_path, content))
+        assert exc_info.value.code == 1
+        assert "scenes[1]" in capsys.readouterr().err
+
+    def test_syntax_error_exits(self, tmp_path):
+        from backend.services.library_service import LibraryService
+        with pytest.raises(SystemExit):
+            LibraryService(streaming=True).load(write_yaml(tmp_path, "scenes: [\n  invalid"))
+
+    def test_streaming_shards(self, tmp_path):
+        from backend.services.library_service import LibraryService
+        library_dir = tmp_path / "library.d"
+        library_dir.mkdir()
+        write_yaml(library_dir, "scenes:\n  - {name: a, display_name: A, positive_prompt: p}\n", "a.yaml")
+        write_yaml(library_dir, "environments:\n  - {name: e, display_name: E, environment_prompt: p}\n", "b.yaml")
+        svc = LibraryService(parse_workers=1, streaming=True)
+        svc.load(library_dir)
+        assert [s.name for s in svc.get_scenes()] == ["a"]
+        assert [e.name for e in svc.get_environments()] == ["e"]
+
+    def test_snapshot_of_streamed_library(self, tmp_path):
+        from backend.services.library_service import LibraryService
+        path = write_yaml(tmp_path, LIBRARY_YAML)
+        LibraryService(streaming=True).compile_snapshot(path)
+        svc = LibraryService()
+        svc.load(path)
+        assert len(svc.get_scenes()) == 2
+
+    def test_peak_memory_is_lower_than_regular_load(self):
+        from backend.services.library_service import LibraryService
+        from backend.services.library_stream import load_streaming
+        data = build_large_yaml(2000).encode("utf-8")
+
+        def peak(fn) -> int:
+            tracemalloc.start()
+            try:
+                fn()
+                return tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+
+        regular = peak(lambda: LibraryService._parse(data))
+        streaming = peak(lambda: load_streaming(io.BytesIO(data)))
+        assert streaming < regular / 2
@@ -0,0 +1,105 @@
+"""LibraryWatcher のユニットテスト"""
+
+import time
+from pathlib import Path
+from textwrap import dedent
+
+import pytest
+
+from backend.services.library_service import LibraryService
+from backend.services.library_watcher import LibraryWatcher
+
+
+LIBRARY_YAML = dedent("""\
+    scenes:
+      - name: "studying"
+        display_name: "勉強"
+        positive_prompt: "studying"
+    environments: []
+""")
+
+
+def write_yaml(path: Path, content: str) -> Path:
+    path.write_text(content, encoding="utf-8")
+    return path
+
+
+def wait_until(predicate, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+@pytest.fixture
+def loaded_service(tmp_path):
+    svc = LibraryService()
+    svc.load(write_yaml(tmp_path / "library.yaml", LIBRARY_YAML))
+    return svc
+
+
+class TestLibraryWatcher:
+    def test_requires_loaded_service(self):
+        with pytest.raises(AssertionError):
+            LibraryWatcher(LibraryService())
+
+    @pytest.mark.parametrize("use_polling", [True, False])
+    def test_reloads_on_change(self, tmp_path, loaded_service, use_polling):
+        watcher = LibraryWatcher(loaded_service, poll_interval=0.05, use_polling=use_polling)
+        watcher.start()
+        try:
+            time.sleep(0.2)
+            write_yaml(tmp_path / "library.yaml", LIBRARY_YAML.replace("studying", "reading"))
+            assert wait_until(lambda: loaded_service.get_scenes()[0].name == "reading")
+        finally:
+            watcher.stop()
+
+    def test_invalid_change_keeps_current_state(self, tmp_path, loaded_service):
+        watcher = LibraryWatcher(loaded_service, poll_interval=0.05, use_polling=True)
+        watcher.start()
+        try:
+            write_yaml(tmp_path / "library.yaml", "scenes: [\n  invalid")
+            time.sleep(0.3)
+            assert loaded_service.get_scenes()[0].name == "studying"
+        finally:
+            watcher.stop()
+
+    def test_ignores_other_files(self, tmp_path, loaded_service, monkeypatch):
+        calls = []
+        monkeypatch.setattr(loaded_service, "reload", lambda: calls.append(1) or True)
+        watcher = LibraryWatcher(loaded_service, use_polling=False)
+        watcher.start()
+        try:
+            time.sleep(0.2)
+            (tmp_path / "other.txt").write_text("x")
+            time.sleep(0.5)
+            assert calls == []
+        finally:
+            watcher.stop()
+
+    def test_stop_is_idempotent(self, loaded_service):
+        watcher = LibraryWatcher(loaded_service, use_polling=True)
+        watcher.stop()
+        watcher.start()
+        watcher.stop()
+        watcher.stop()
+
+
+class TestLibraryWatcherDirectory:
+    @pytest.mark.parametrize("use_polling", [True, False])
+    def test_reloads_when_shard_added(self, tmp_path, use_polling):
+        library_dir = tmp_path / "library.d"
+        library_dir.mkdir()
+        write_yaml(library_dir / "a.yaml", LIBRARY_YAML)
+        svc = LibraryService(parse_workers=1)
+        svc.load(library_dir)
+        watcher = LibraryWatcher(svc, poll_interval=0.05, use_polling=use_polling)
+        watcher.start()
+        try:
+            time.sleep(0.2)
+            write_yaml(library_dir / "b.yaml", LIBRARY_YAML.replace("studying", "reading"))
+            assert wait_until(lambda: len(svc.get_scenes()) == 2)
+        finally:
+            watcher.stop()
@@ -151,3 +151,38 @@ class TestStartServer:
             start_server(config, tmp_path)
             _, kwargs = mock_run.call_args
             assert kwargs.get("host") == "0.0.0.0"
+
+    def test_starts_and_stops_watcher_when_enabled(self, tmp_path):
+        """watch_library が有効な場合、サーバ稼働中のみ LibraryWatcher が動作すること"""
+        library_file = tmp_path / "library.yaml"
+        library_file.write_text("scenes: []\nenvironments: []\n")
+        config = AppConfig(port=8080, library_path=library_file, watch_library=True)
+
+        with patch("backend.main.uvicorn.run"), patch("backend.main.LibraryWatcher") as mock_watcher:
+            start_server(config, tmp_path)
+            mock_watcher.return_value.start.assert_called_once()
+            mock_watcher.return_value.stop.assert_called_once()
+
+    def test_does_not_start_watcher_by_default(self, tmp_path):
+        """watch_library が無効な場合、LibraryWatcher を起動しないこと"""
+        config = self._make_config(tmp_path)
+
+        with patch("backend.main.uvicorn.run"), patch("backend.main.LibraryWatcher") as mock_watcher:
+            start_server(config, tmp_path)
+            mock_watcher.assert_not_called()
+
+    def test_registers_named_libraries(self, tmp_path):
+        """--library で名前付きライブラリを指定した場合、LibraryRegistry が app.state に格納されること"""
+        library_file = tmp_path / "library.yaml"
+        library_file.write_text("scenes: []\nenvironments: []\n")
+        config = AppConfig(
+            port=8080,
+            library_path=library_file,
+            libraries={"team": library_file},
+            library_memory_budget_mib=64,
+        )
+
+        with patch("backend.main.uvicorn.run") as mock_run:
+            start_server(config, tmp_path)
+            app = mock_run.call_args[0][0]
+            assert app.state.library_registry.names == ["team"]
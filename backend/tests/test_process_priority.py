@@ -0,0 +1,16 @@
+"""ワーカープロセスの優先度（lower_priority）のユニットテスト"""
+
+from unittest.mock import patch
+
+
+class TestLowerPriority:
+    def test_calls_nice(self):
+        from backend.services.process_priority import lower_priority
+        with patch("os.nice", create=True) as nice:
+            lower_priority(19)
+        nice.assert_called_once_with(19)
+
+    def test_ignores_permission_error(self):
+        from backend.services.process_priority import lower_priority
+        with patch("os.nice", create=True, side_effect=PermissionError):
+            lower_priority(19)
@@ -0,0 +1,146 @@
+"""シーン全文検索（SceneSearchIndex・GET /api/scenes/search）のユニットテスト"""
+
+import time
+
+import pytest
+
+from backend.models.library_models import LibraryScene
+
+
+def scene(name: str, display_name: str, positive_prompt: str) -> LibraryScene:
+    return LibraryScene(name=name, display_name=display_name, positive_prompt=positive_prompt)
+
+
+SCENES = [
+    scene("studying", "勉強シーン", "sitting at desk, studying, pencil"),
+    scene("sleeping", "睡眠", "lying in bed, sleeping"),
+    scene("cat", "猫と遊ぶ", "playing with cat, smile"),
+    scene("desk_cat", "デスクワーク", "cat on desk, typing"),
+    scene("study_room", "Study Room", "bookshelf, quiet room"),
+]
+
+
+class TestSceneSearchIndex:
+    def _search(self, query: str, **kwargs):
+        from backend.services.scene_search import SceneSearchIndex
+        return SceneSearchIndex(SCENES).search(query, **kwargs)
+
+    def _names(self, query: str, **kwargs) -> list[str]:
+        return [SCENES[p].name for p in self._search(query, **kwargs).positions]
+
+    def test_japanese_display_name(self):
+        assert self._names("勉強") == ["studying"]
+
+    def test_single_character_query(self):
+        assert self._names("猫") == ["cat"]
+
+    def test_prompt_match(self):
+        assert self._names("bed") == ["sleeping"]
+
+    def test_display_name_ranks_above_prompt(self):
+        # "study" は study_room の表示名と studying のプロンプトに一致する
+        assert self._names("study") == ["study_room", "studying"]
+
+    def test_multiple_terms_are_and(self):
+        assert self._names("cat desk") == ["desk_cat"]
+        assert self._names("cat, smile") == ["cat"]
+
+    def test_normalization(self):
+        assert self._names("ＳＴＵＤＹ　ＲＯＯＭ") == ["study_room"]
+
+    def test_exact_display_name_ranks_first(self):
+        assert self._names("睡眠")[0] == "sleeping"
+
+    def test_no_match(self):
+        result = self._search("dragon")
+        assert result.total == 0
+        assert result.positions == []
+
+    def test_blank_query(self):
+        assert self._search("  , ").total == 0
+
+    def test_pagination(self):
+        all_names = self._names("e")
+        result = self._search("e", offset=1, limit=2)
+        assert result.total == len(all_names)
+        assert [SCENES[p].name for p in result.positions] == all_names[1:3]
+
+    def test_lazy_build(self):
+        from backend.services.scene_search import SceneSearchIndex
+        index = SceneSearchIndex(SCENES, eager=False)
+        assert index.search("猫").positions == [2]
+
+    def test_search_is_fast_on_large_catalog(self):
+        from backend.services.scene_search import SceneSearchIndex
+        scenes = [
+            scene(f"s{i}", f"シーン{i}", f"1girl, solo, pose{i % 97}, outfit{i % 13}")
+            for i in range(20000)
+        ]
+        index = SceneSearchIndex(scenes)
+        start = time.perf_counter()
+        result = index.search("pose42 outfit3", limit=20)
+        elapsed = time.perf_counter() - start
+        assert result.total > 0
+        assert elapsed < 0.1
+
+
+class TestSearchScenesService:
+    def test_returns_scenes_in_rank_order(self, tmp_path):
+        from backend.services.library_service import LibraryService
+        path = tmp_path / "library.yaml"
+        path.write_text(
+            "environments: []\nscenes:\n"
+            "  - {name: a, display_name: 朝の散歩, positive_prompt: walking}\n"
+            "  - {name: b, display_name: 夜, positive_prompt: 散歩, batch_size: 2}\n",
+            encoding="utf-8",
+        )
+        svc = LibraryService()
+        svc.load(path)
+        total, scenes = svc.search_scenes("散歩")
+        assert total == 2
+        assert [s.name for s in scenes] == ["a", "b"]
+
+    @pytest.mark.parametrize("kwargs", [{"lazy": True}, {"store": "compact"}])
+    def test_other_stores(self, tmp_path, kwargs):
+        from backend.services.library_service import LibraryService
+        path = tmp_path / "library.yaml"
+        path.write_text(
+            "environments: []\nscenes:\n  - {name: a, display_name: 朝の散歩, positive_prompt: walking}\n",
+            encoding="utf-8",
+        )
+        svc = LibraryService(**kwargs)
+        svc.load(path)
+        assert svc.search_scenes("walk")[1][0].name == "a"
+
+
+class TestSearchScenesApi:
+    @pytest.fixture
+    def client(self, tmp_path):
+        from fastapi.testclient import TestClient
+        from backend.main import create_app
+        from backend.services.library_service import LibraryService
+        lines = ["environments: []", "scenes:"]
+        for i in range(30):
+            lines.append(f"  - {{name: s{i}, display_name: 散歩{i}, positive_prompt: walking, preview_image: p{i}.png}}")
+        path = tmp_path / "library.yaml"
+        path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        svc = LibraryService()
+        svc.load(path)
+        return TestClient(create_app(tmp_path / "dist", library_service=svc))
+
+    def test_paginated_response(self, client):
+        response = client.get("/api/scenes/search", params={"q": "散歩", "offset": 5, "limit": 10})
+        assert response.status_code == 200
+        body = response.json()
+        assert body["query"] == "散歩"
+        assert body["total"] == 30
+        assert body["offset"] == 5
+        assert body["limit"] == 10
+        assert [item["name"] for item in body["items"]] == [f"s{i}" for i in range(5, 15)]
+        assert body["items"][0]["preview_image_url"] == "/api/images/p5.png"
+
+    def test_query_is_required(self, client):
+        assert client.get("/api/scenes/search").status_code == 422
+
+    def test_limit_is_bounded(self, client):
+        assert client.get("/api/scenes/search", params={"q": "a", "limit": 1000}).status_code == 422
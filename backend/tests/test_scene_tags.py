@@ -0,0 +1,113 @@
+"""プロンプトタグ索引（SceneTagIndex・?tags=&exclude=・GET /api/scenes/facets）のユニットテスト"""
+
+import pytest
+
+from backend.models.library_models import LibraryScene
+
+
+def scene(name: str, positive_prompt: str) -> LibraryScene:
+    return LibraryScene(name=name, display_name=name, positive_prompt=positive_prompt)
+
+
+SCENES = [
+    scene("a", "1girl, solo, smile, indoors"),
+    scene("b", "1girl, Solo,  looking_at_viewer, outdoors"),
+    scene("c", "2girls, smile, outdoors"),
+    scene("d", "1girl, looking at viewer, smile, indoors, smile"),
+]
+
+
+class TestSplitTags:
+    def test_normalizes_and_deduplicates(self):
+        from backend.services.scene_tags import split_tags
+        assert split_tags(" Looking_At  Viewer ,, SMILE, smile ,") == ["looking at viewer", "smile"]
+
+    def test_fullwidth(self):
+        from backend.services.scene_tags import normalize_tag
+        assert normalize_tag("ＳＭＩＬＥ") == "smile"
+
+
+class TestSceneTagIndex:
+    @pytest.fixture
+    def index(self):
+        from backend.services.scene_tags import SceneTagIndex
+        return SceneTagIndex(SCENES)
+
+    def test_tag_count(self, index):
+        assert index.tag_count == 7
+
+    def test_filter_by_tags(self, index):
+        assert index.filter(["1girl", "smile"]) == [0, 3]
+        assert index.filter(["looking at viewer"]) == [1, 3]
+
+    def test_filter_normalizes_query(self, index):
+        assert index.filter(["Looking_At_Viewer"]) == [1, 3]
+
+    def test_exclude(self, index):
+        assert index.filter(["1girl"], exclude=["indoors"]) == [1]
+        assert index.filter(exclude=["1girl"]) == [2]
+
+    def test_unknown_tag(self, index):
+        assert index.filter(["dragon"]) == []
+        assert index.filter(exclude=["dragon"]) == [0, 1, 2, 3]
+
+    def test_no_condition_returns_all(self, index):
+        assert index.filter() == [0, 1, 2, 3]
+
+    def test_facets_for_all(self, index):
+        facets = index.facets()
+        assert facets[:2] == [("1girl", 3), ("smile", 3)]
+        assert dict(facets)["2girls"] == 1
+
+    def test_facets_for_filtered(self, index):
+        facets = index.facets(index.filter(["smile"]), limit=3)
+        assert facets == [("smile", 3), ("1girl", 2), ("indoors", 2)]
+
+    def test_lazy_build(self):
+        from backend.services.scene_tags import SceneTagIndex
+        index = SceneTagIndex(SCENES, eager=False)
+        assert index.filter(["2girls"]) == [2]
+
+
+class TestSceneTagApi:
+    @pytest.fixture
+    def client(self, tmp_path):
+        from fastapi.testclient import TestClient
+        from backend.main import create_app
+        from backend.services.library_service import LibraryService
+        lines = ["environments: []", "scenes:"]
+        for s in SCENES:
+            lines.append(f'  - {{name: {s.name}, display_name: {s.name}, positive_prompt: "{s.positive_prompt}"}}')
+        path = tmp_path / "library.yaml"
+        path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        svc = LibraryService()
+        svc.load(path)
+        return TestClient(create_app(tmp_path / "dist", library_service=svc))
+
+    def test_scenes_without_filter(self, client):
+        assert [s["name"] for s in client.get("/api/scenes").json()] == ["a", "b", "c", "d"]
+
+    def test_scenes_filtered_by_tags(self, client):
+        response = client.get("/api/scenes", params={"tags": "1girl,smile"})
+        assert [s["name"] for s in response.json()] == ["a", "d"]
+
+    def test_repeated_tag_params_and_exclude(self, client):
+        response = client.get(
+            "/api/scenes", params=[("tags", "1girl"), ("tags", "smile"), ("exclude", "indoors")]
+        )
+        assert response.json() == []
+        response = client.get("/api/scenes", params={"exclude": "1girl"})
+        assert [s["name"] for s in response.json()] == ["c"]
+
+    def test_facets(self, client):
+        response = client.get("/api/scenes/facets", params={"tags": "outdoors", "limit": 2})
+        assert response.status_code == 200
+        assert response.json() == {
+            "total": 2,
+            "tags": [{"tag": "outdoors", "count": 2}, {"tag": "1girl", "count": 1}],
+        }
+
+    def test_facets_without_filter(self, client):
+        body = client.get("/api/scenes/facets").json()
+        assert body["total"] == 4
+        assert body["tags"][0] == {"tag": "1girl", "count": 3}
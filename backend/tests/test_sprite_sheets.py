@@ -0,0 +1,222 @@
+"""スプライトシート（SpriteSheetCache・/api/sprites）のユニットテスト"""
+
+import io
+import threading
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+
+LIBRARY_YAML = """\
+scenes:
+  - {name: a, display_name: A, positive_prompt: p, preview_image: scenes/a.png}
+  - {name: b, display_name: B, positive_prompt: p}
+  - {name: c, display_name: C, positive_prompt: p, preview_image: scenes/c.jpg}
+  - {name: d, display_name: D, positive_prompt: p, preview_image: scenes/broken.png}
+environments:
+  - {name: e, display_name: E, environment_prompt: room, thumbnail: thumbs/e.png}
+"""
+
+
+def write_image(path: Path, size: tuple[int, int], color: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    Image.new("RGB", size, color).save(path)
+
+
+@pytest.fixture
+def library_path(tmp_path) -> Path:
+    root = tmp_path / "library"
+    write_image(root / "scenes" / "a.png", (200, 100), "red")
+    write_image(root / "scenes" / "c.jpg", (50, 80), "blue")
+    (root / "scenes" / "broken.png").write_bytes(b"not an image")
+    write_image(root / "thumbs" / "e.png", (64, 64), "green")
+    path = root / "library.yaml"
+    path.write_text(LIBRARY_YAML, encoding="utf-8")
+    return path
+
+
+@pytest.fixture
+def service(library_path):
+    from backend.services.library_service import LibraryService
+    service = LibraryService()
+    service.load(library_path)
+    return service
+
+
+@pytest.fixture
+def client(tmp_path, service):
+    from backend.main import create_app
+    return TestClient(create_app(tmp_path / "dist", library_service=service))
+
+
+class TestBuildSpriteSheet:
+    def test_lays_out_tiles(self, library_path):
+        from backend.services.sprite_sheets import build_sprite_sheet
+        root = library_path.parent
+        sheet = build_sprite_sheet(
+            [
+                ("a", root / "scenes" / "a.png"),
+                ("b", None),
+                ("c", root / "scenes" / "c.jpg"),
+                ("d", root / "scenes" / "broken.png"),
+                ("e", root / "thumbs" / "e.png"),
+            ],
+            tile_size=32,
+        )
+        assert [(f.name, f.x, f.y) for f in sheet.frames] == [
+            ("a", 0, 0), ("c", 32, 0), ("e", 0, 32),
+        ]
+        assert (sheet.width, sheet.height) == (64, 64)
+        with Image.open(io.BytesIO(sheet.image)) as image:
+            assert image.format == "WEBP"
+            assert image.size == (64, 64)
+            r, g, b, *_ = image.convert("RGBA").getpixel((16, 16))
+            assert r > 200 and g < 50 and b < 50
+
+    def test_empty(self):
+        from backend.services.sprite_sheets import build_sprite_sheet
+        sheet = build_sprite_sheet([("a", None)], tile_size=16)
+        assert sheet.frames == []
+        assert (sheet.width, sheet.height) == (16, 16)
+
+
+class TestSpriteSheetCache:
+    def make_sheet(self, size: int):
+        from backend.services.sprite_sheets import SpriteSheet
+        return SpriteSheet(b"x" * size, '"e"', 1, 1, 1, [])
+
+    def test_builds_once(self):
+        from backend.services.sprite_sheets import SpriteSheetCache
+        cache = SpriteSheetCache()
+        calls = []
+        build = lambda: calls.append(1) or self.make_sheet(10)
+        first = cache.get_or_build("k", build)
+        assert cache.get_or_build("k", build) is first
+        assert len(calls) == 1
+
+    def test_evicts_least_recently_used(self):
+        from backend.services.sprite_sheets import SpriteSheetCache
+        cache = SpriteSheetCache(max_bytes=25)
+        cache.get_or_build("a", lambda: self.make_sheet(10))
+        cache.get_or_build("b", lambda: self.make_sheet(10))
+        cache.get_or_build("a", lambda: self.make_sheet(10))
+        cache.get_or_build("c", lambda: self.make_sheet(10))
+        assert len(cache) == 2
+        assert cache.total_bytes == 20
+        rebuilt = []
+        cache.get_or_build("a", lambda: rebuilt.append("a") or self.make_sheet(10))
+        assert rebuilt == []
+        cache.get_or_build("b", lambda: rebuilt.append("b") or self.make_sheet(10))
+        assert rebuilt == ["b"]
+
+    def test_concurrent_requests_share_build(self):
+        from backend.services.sprite_sheets import SpriteSheetCache
+        cache = SpriteSheetCache()
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def build():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return self.make_sheet(10)
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(cache.get_or_build("k", build)))
+            for _ in range(3)
+        ]
+        for thread in threads:
+            thread.start()
+        started.wait(5)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+        assert len(calls) == 1
+        assert len(results) == 3 and all(r is results[0] for r in results)
+
+    def test_failed_build_is_retried(self):
+        from backend.services.sprite_sheets import SpriteSheetCache
+        cache = SpriteSheetCache()
+
+        def fail():
+            raise OSError("boom")
+
+        with pytest.raises(OSError):
+            cache.get_or_build("k", fail)
+        assert cache.get_or_build("k", lambda: self.make_sheet(1)).image == b"x"
+
+
+class TestImageSources:
+    def test_pages(self, service, library_path):
+        root = library_path.parent.resolve()
+        version, total, sources = service.image_sources("scenes", offset=1, limit=2)
+        assert version == service.version
+        assert total == 4
+        assert sources == [("b", None), ("c", root / "scenes" / "c.jpg")]
+
+    def test_environments(self, service, library_path):
+        _, total, sources = service.image_sources("environments")
+        assert total == 1
+        assert sources == [("e", library_path.parent.resolve() / "thumbs" / "e.png")]
+
+
+class TestSpriteRouter:
+    def test_sprite_sheet(self, client, service):
+        body = client.get("/api/sprites/scenes?tile=32").json()
+        assert body["version"] == service.version
+        assert body["total"] == 4
+        assert body["tile_size"] == 32
+        assert [f["name"] for f in body["frames"]] == ["a", "c"]
+        assert (body["width"], body["height"]) == (64, 32)
+        assert f"v={service.version}" in body["image_url"]
+
+        response = client.get(body["image_url"])
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "image/webp"
+        assert "immutable" in response.headers["cache-control"]
+        with Image.open(io.BytesIO(response.content)) as image:
+            assert image.size == (64, 32)
+
+    def test_paging(self, client):
+        body = client.get("/api/sprites/scenes?page=1&per_page=2&tile=16").json()
+        assert [f["name"] for f in body["frames"]] == ["c"]
+        assert "page=1" in body["image_url"] and "per_page=2" in body["image_url"]
+
+    def test_image_etag(self, client):
+        response = client.get("/api/sprites/environments/image")
+        assert response.headers["cache-control"] == "no-cache"  # v なし
+        etag = response.headers["etag"]
+        not_modified = client.get(
+            "/api/sprites/environments/image", headers={"If-None-Match": etag}
+        )
+        assert not_modified.status_code == 304
+        assert not_modified.content == b""
+
+    def test_rebuilt_only_when_version_changes(self, client, service, library_path):
+        from unittest.mock import patch
+
+        from backend.routers import sprite_router
+        with patch.object(
+            sprite_router, "build_sprite_sheet", wraps=sprite_router.build_sprite_sheet
+        ) as build:
+            first = client.get("/api/sprites/scenes").json()
+            client.get("/api/sprites/scenes").json()
+            client.get(first["image_url"])
+            assert build.call_count == 1
+
+            write_image(library_path.parent / "scenes" / "new.png", (8, 8), "white")
+            assert service.refresh_images() is True
+            second = client.get("/api/sprites/scenes").json()
+            assert build.call_count == 2
+        assert second["version"] > first["version"]
+
+        # 古いバージョンの URL は現在の画像を再検証付きで返す
+        stale = client.get(first["image_url"])
+        assert stale.status_code == 200
+        assert stale.headers["cache-control"] == "no-cache"
+
+    def test_unknown_kind(self, client):
+        assert client.get("/api/sprites/others").status_code == 422